@@ -4,3 +4,71 @@ import os
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # Ruta absoluta al archivo SQLite
 DB_PATH = os.path.join(BASE_DIR, "storage", "lifetrack.db")
+
+# =========================
+# SQLite — tuning de conexiones (FASE P1)
+# =========================
+# Conexiones inactivas que se conservan por thread
+DB_POOL_SIZE = int(os.environ.get("LIFETRACK_DB_POOL_SIZE", "4"))
+# Espera máxima ante "database is locked" (ms)
+DB_BUSY_TIMEOUT_MS = int(os.environ.get("LIFETRACK_DB_BUSY_TIMEOUT_MS", "5000"))
+# Memoria mapeada por conexión (bytes)
+DB_MMAP_SIZE = int(os.environ.get("LIFETRACK_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Page cache por conexión (KiB; se pasa negativo a PRAGMA cache_size)
+DB_CACHE_SIZE_KB = int(os.environ.get("LIFETRACK_DB_CACHE_SIZE_KB", "16384"))
+# Sentencias preparadas en cache por conexión
+DB_STATEMENT_CACHE_SIZE = int(os.environ.get("LIFETRACK_DB_STATEMENT_CACHE_SIZE", "256"))
+
+# =========================
+# PDF CMS-1500 — renderer Chromium persistente (FASE P11)
+# =========================
+# Páginas reutilizables abiertas en el browser (renders en paralelo)
+PDF_RENDER_PAGES = int(os.environ.get("LIFETRACK_PDF_RENDER_PAGES", "2"))
+# Renders en vuelo + en cola; por encima se responde 503
+PDF_RENDER_MAX_PENDING = int(os.environ.get("LIFETRACK_PDF_RENDER_MAX_PENDING", "16"))
+# Tiempo máximo por render, incluida la espera en cola (segundos)
+PDF_RENDER_TIMEOUT_S = float(os.environ.get("LIFETRACK_PDF_RENDER_TIMEOUT_S", "30"))
+
+# =========================
+# Artefactos CMS-1500 (HTML/PDF) por snapshot_hash (FASE P12)
+# =========================
+ARTIFACTS_DIR = os.environ.get("LIFETRACK_ARTIFACTS_DIR", os.path.join(BASE_DIR, "storage", "artifacts"))
+# Tope de disco; por encima se borran los menos usados (LRU)
+ARTIFACTS_MAX_BYTES = int(os.environ.get("LIFETRACK_ARTIFACTS_MAX_BYTES", str(512 * 1024 * 1024)))
+# Generar HTML/PDF en background al crear el snapshot
+ARTIFACTS_PREBUILD = os.environ.get("LIFETRACK_ARTIFACTS_PREBUILD", "0") == "1"
+
+# =========================
+# Snapshots parseados en memoria (FASE P15)
+# =========================
+# Tope del LRU de snapshot_json ya parseados (bytes de JSON; 0 = desactivado)
+SNAPSHOT_CACHE_MAX_BYTES = int(os.environ.get("LIFETRACK_SNAPSHOT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# =========================
+# Árbol Merkle de snapshots (FASE P22)
+# =========================
+# Clave HMAC-SHA256 para firmar checkpoints de la raíz (vacía = sin firma)
+MERKLE_SIGNING_KEY = os.environ.get("LIFETRACK_MERKLE_SIGNING_KEY", "")
+
+# =========================
+# Event ledger encadenado (FASE P23)
+# =========================
+# Clave HMAC-SHA256 para firmar checkpoints del ledger (vacía = sin firma)
+LEDGER_SIGNING_KEY = os.environ.get("LIFETRACK_LEDGER_SIGNING_KEY", "")
+
+# =========================
+# Eventos de lectura en buffer (FASE P24)
+# =========================
+# Eventos acumulados que disparan una escritura (0 = sin buffer, se escribe al momento)
+LEDGER_BUFFER_MAX_EVENTS = int(os.environ.get("LIFETRACK_LEDGER_BUFFER_MAX_EVENTS", "100"))
+# Espera máxima de un evento en el buffer antes de escribirse (segundos)
+LEDGER_BUFFER_FLUSH_S = float(os.environ.get("LIFETRACK_LEDGER_BUFFER_FLUSH_S", "1.0"))
+
+# =========================
+# Eventos de lectura agrupados (FASE P25)
+# =========================
+# Ventana en la que las repeticiones de un evento de lectura (misma entidad,
+# tipo y hash) se agrupan en una sola fila con count (0 = una fila por evento).
+# La primera vista se escribe con el flush normal del buffer; lo que espera
+# la ventana en memoria es solo la cuenta de repeticiones.
+LEDGER_COALESCE_WINDOW_S = float(os.environ.get("LIFETRACK_LEDGER_COALESCE_WINDOW_S", "60"))
@@ -19,6 +19,9 @@ from app.db.payments import *
 # Applications (EOB)
 from app.db.applications import *
 
+# Posteo de EOB por lote (FASE P6)
+from app.db.eob_posting import *
+
 # CMS-1500 Snapshot
 from app.db.cms1500_snapshot import *
 
@@ -30,3 +33,27 @@ from app.db.adjustments import *
 
 # Provider Settings
 from app.db.provider_settings import *
+
+# Balances materializados (FASE P4, opt-in)
+from app.db.materialized_balances import *
+
+# Capacidades del schema, cacheadas por proceso (FASE P10)
+from app.db.schema_capabilities import *
+
+# Envío de claims por lote (FASE P14)
+from app.db.claim_submission import *
+
+# Snapshots parseados en memoria (FASE P15)
+from app.db.snapshot_cache import *
+
+# Columnas resumen de snapshots (FASE P18)
+from app.db.snapshot_summary import *
+
+# Líneas de servicio de snapshots (FASE P19)
+from app.db.snapshot_service_lines import *
+
+# Escaneo de integridad del store (FASE P21)
+from app.db.snapshot_integrity import *
+
+# Árbol Merkle de snapshots (FASE P22)
+from app.db.snapshot_merkle import *
@@ -1,6 +1,6 @@
 from datetime import datetime
-from app.db.connection import get_connection
-from app.db.financial_lock import is_claim_locked
+from app.db.connection import get_connection, unit_of_work
+from app.db.financial_lock import freeze_guard
 
 
 def create_adjustment(
@@ -22,37 +22,25 @@ def create_adjustment(
 
     now = datetime.utcnow().isoformat()
 
-    with get_connection() as conn:
+    with unit_of_work() as conn:
         cur = conn.cursor()
 
-        # 1) Validar que el charge exista y obtener claim_id
-        cur.execute(
-            """
-            SELECT s.claim_id
-            FROM charges c
-            JOIN services s ON s.id = c.service_id
-            WHERE c.id = ?
-            """,
-            (charge_id,),
-        )
-        row = cur.fetchone()
-        if not row:
+        # Insertar adjustment
+        # (bloqueo financiero: trigger trg_freeze_adjustments_insert)
+        with freeze_guard():
+            cur.execute(
+                """
+                INSERT INTO adjustments (charge_id, amount, reason, created_at)
+                SELECT id, ?, ?, ?
+                FROM charges
+                WHERE id = ?
+                """,
+                (float(amount), reason, now, charge_id),
+            )
+
+        if cur.rowcount == 0:
             raise ValueError("Charge no existe")
 
-        claim_id = row["claim_id"]
-
-        # 2) Bloqueo financiero por snapshot
-        if is_claim_locked(claim_id):
-            raise ValueError("Claim está congelado por snapshot")
-
-        # 3) Insertar adjustment
-        cur.execute(
-            """
-            INSERT INTO adjustments (charge_id, amount, reason, created_at)
-            VALUES (?, ?, ?, ?)
-            """,
-            (charge_id, float(amount), reason, now),
-        )
         conn.commit()
         return cur.lastrowid
 
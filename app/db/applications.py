@@ -1,6 +1,7 @@
 from datetime import datetime
-from app.db.connection import get_connection
-from app.db.financial_lock import is_claim_locked
+from app.db.connection import get_connection, unit_of_work
+from app.db.financial_lock import freeze_guard
+from app.db.materialized_balances import materialized_balances_enabled
 
 
 def create_application(
@@ -23,124 +24,134 @@ def create_application(
 
     now = datetime.utcnow().isoformat()
 
-    with get_connection() as conn:
+    with unit_of_work() as conn:
         cur = conn.cursor()
 
         # =========================
-        # 1. Obtener claim_id del charge
-        # =========================
-        cur.execute(
-            """
-            SELECT s.claim_id
-            FROM charges c
-            JOIN services s ON s.id = c.service_id
-            WHERE c.id = ?
-            """,
-            (charge_id,),
-        )
-        row = cur.fetchone()
-        if not row:
-            raise ValueError("Charge no existe")
-
-        claim_id = row["claim_id"]
-
-        # =========================
-        # 2. Verificar bloqueo financiero
+        # 1. VALIDAR PAYMENT DISPONIBLE
+        # 2. VALIDAR BALANCE DEL CHARGE
         # =========================
-        if is_claim_locked(claim_id):
-            raise ValueError("Claim está congelado por snapshot")
-
-        # =========================
-        # 3. VALIDAR PAYMENT DISPONIBLE
-        # =========================
-        cur.execute(
-            "SELECT amount FROM payments WHERE id = ?",
-            (payment_id,),
-        )
-        payment_row = cur.fetchone()
-        if not payment_row:
-            raise ValueError("Payment no existe")
-
-        total_payment = float(payment_row["amount"])
-
-        cur.execute(
-            """
-            SELECT COALESCE(SUM(amount_applied), 0)
-            FROM applications
-            WHERE payment_id = ?
-            """,
-            (payment_id,),
-        )
-        already_applied_payment = float(cur.fetchone()[0])
-
-        available_payment = total_payment - already_applied_payment
+        if materialized_balances_enabled():
+            available_payment, current_balance = _materialized_availability(cur, payment_id, charge_id)
+        else:
+            available_payment, current_balance = _derived_availability(cur, payment_id, charge_id)
 
         if float(amount_applied) > available_payment:
             raise ValueError("No hay suficiente monto disponible en el payment")
 
-        # =========================
-        # 4. VALIDAR BALANCE DEL CHARGE
-        # =========================
-        cur.execute(
-            "SELECT amount FROM charges WHERE id = ?",
-            (charge_id,),
-        )
-        charge_row = cur.fetchone()
-        if not charge_row:
-            raise ValueError("Charge no existe")
-
-        total_charge = float(charge_row["amount"])
-
-        cur.execute(
-            """
-            SELECT COALESCE(SUM(amount_applied), 0)
-            FROM applications
-            WHERE charge_id = ?
-            """,
-            (charge_id,),
-        )
-        already_applied_charge = float(cur.fetchone()[0])
-
-        cur.execute(
-            """
-            SELECT COALESCE(SUM(amount), 0)
-            FROM adjustments
-            WHERE charge_id = ?
-            """,
-            (charge_id,),
-        )
-        total_adjustments = float(cur.fetchone()[0])
-
-        current_balance = total_charge - already_applied_charge - total_adjustments
-
         if float(amount_applied) > current_balance:
             raise ValueError("No se puede aplicar más del balance actual del charge")
 
         # =========================
-        # 5. INSERTAR APPLICATION
+        # 3. INSERTAR APPLICATION
+        # (bloqueo financiero: trigger trg_freeze_applications_insert)
         # =========================
-        cur.execute(
-            """
-            INSERT INTO applications (
-                payment_id,
-                charge_id,
-                amount_applied,
-                created_at
+        with freeze_guard():
+            cur.execute(
+                """
+                INSERT INTO applications (
+                    payment_id,
+                    charge_id,
+                    amount_applied,
+                    created_at
+                )
+                VALUES (?, ?, ?, ?)
+                """,
+                (
+                    payment_id,
+                    charge_id,
+                    float(amount_applied),
+                    now,
+                ),
             )
-            VALUES (?, ?, ?, ?)
-            """,
-            (
-                payment_id,
-                charge_id,
-                float(amount_applied),
-                now,
-            ),
-        )
 
         conn.commit()
         return cur.lastrowid
 
 
+def _materialized_availability(cur, payment_id: int, charge_id: int) -> tuple[float, float]:
+    """
+    Disponible del payment y balance del charge desde las tablas FASE P4.
+    """
+    cur.execute(
+        "SELECT remaining FROM payment_balances WHERE payment_id = ?",
+        (payment_id,),
+    )
+    payment_row = cur.fetchone()
+    if not payment_row:
+        raise ValueError("Payment no existe")
+
+    cur.execute(
+        "SELECT balance FROM charge_balances WHERE charge_id = ?",
+        (charge_id,),
+    )
+    charge_row = cur.fetchone()
+    if not charge_row:
+        raise ValueError("Charge no existe")
+
+    return float(payment_row["remaining"]), float(charge_row["balance"])
+
+
+def _derived_availability(cur, payment_id: int, charge_id: int) -> tuple[float, float]:
+    """
+    Disponible del payment y balance del charge derivados de las filas fuente.
+    """
+    cur.execute(
+        "SELECT amount FROM payments WHERE id = ?",
+        (payment_id,),
+    )
+    payment_row = cur.fetchone()
+    if not payment_row:
+        raise ValueError("Payment no existe")
+
+    total_payment = float(payment_row["amount"])
+
+    cur.execute(
+        """
+        SELECT COALESCE(SUM(amount_applied), 0)
+        FROM applications
+        WHERE payment_id = ?
+        """,
+        (payment_id,),
+    )
+    already_applied_payment = float(cur.fetchone()[0])
+
+    cur.execute(
+        "SELECT amount FROM charges WHERE id = ?",
+        (charge_id,),
+    )
+    charge_row = cur.fetchone()
+    if not charge_row:
+        raise ValueError("Charge no existe")
+
+    total_charge = float(charge_row["amount"])
+
+    cur.execute(
+        """
+        SELECT COALESCE(SUM(amount_applied), 0)
+        FROM applications
+        WHERE charge_id = ?
+        """,
+        (charge_id,),
+    )
+    already_applied_charge = float(cur.fetchone()[0])
+
+    cur.execute(
+        """
+        SELECT COALESCE(SUM(amount), 0)
+        FROM adjustments
+        WHERE charge_id = ?
+        """,
+        (charge_id,),
+    )
+    total_adjustments = float(cur.fetchone()[0])
+
+    return (
+        total_payment - already_applied_payment,
+        total_charge - already_applied_charge - total_adjustments,
+    )
+
+
 def list_applications_by_charge(charge_id: int):
     """
     Lista todas las aplicaciones asociadas a un charge.
@@ -1,78 +1,180 @@
 from app.db.connection import get_connection
+from app.db.materialized_balances import materialized_balances_enabled
 
 
-def get_charge_balance(charge_id: int) -> dict:
+# ============================================================
+# FASE P5 — Motor de balances por lote
+# ============================================================
+# Una sola consulta agrupada devuelve los balances de N charges (por id o
+# por claim). get_charge_balance y get_claim_balance son casos de 1 elemento.
+
+def _where(filters: dict, prefix: str = "") -> str:
+    conditions = [
+        f"{prefix}{column} IN ({','.join(['?'] * len(ids))})"
+        for column, ids in filters.items()
+    ]
+    return f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+
+def get_charge_balances(charge_ids=None, claim_ids=None) -> dict[int, dict]:
     """
-    Calcula el balance de un charge:
+    Balances de varios charges en una sola pasada:
     charge.amount - sum(applications.amount_applied) - sum(adjustments.amount)
+
+    - charge_ids: limita a esos charges
+    - claim_ids: limita a los charges de esos claims
+    - sin filtros: todos los charges
+
+    Devuelve {charge_id: {...}} en orden de charge_id.
+    Con balances materializados (FASE P4) lee charge_balances directamente.
     """
+    filters = {}
+    if charge_ids is not None:
+        filters["charge_id"] = tuple(int(i) for i in charge_ids)
+    if claim_ids is not None:
+        filters["claim_id"] = tuple(int(i) for i in claim_ids)
+
+    if any(not ids for ids in filters.values()):
+        return {}
+
+    params = tuple(i for ids in filters.values() for i in ids)
+    where = _where(filters)
+
     with get_connection() as conn:
         cur = conn.cursor()
 
-        cur.execute(
-            "SELECT amount FROM charges WHERE id = ?",
-            (charge_id,),
-        )
-        charge = cur.fetchone()
-        if not charge:
-            raise ValueError("Charge no existe")
-
-        total_charge = float(charge["amount"])
-
-        cur.execute(
-            """
-            SELECT COALESCE(SUM(amount_applied), 0)
-            FROM applications
-            WHERE charge_id = ?
-            """,
-            (charge_id,),
-        )
-        total_applied = float(cur.fetchone()[0])
-
-        cur.execute(
-            """
-            SELECT COALESCE(SUM(amount), 0)
-            FROM adjustments
-            WHERE charge_id = ?
-            """,
-            (charge_id,),
-        )
-        total_adjustments = float(cur.fetchone()[0])
-
-        return {
-            "charge_id": charge_id,
+        if materialized_balances_enabled():
+            cur.execute(
+                f"""
+                SELECT charge_id, claim_id, total_charge, total_applied, total_adjustments, balance
+                FROM charge_balances
+                {where}
+                ORDER BY charge_id
+                """,
+                params,
+            )
+        else:
+            cur.execute(
+                f"""
+                WITH target AS (
+                    SELECT c.id AS charge_id, s.claim_id AS claim_id, c.amount AS amount
+                    FROM charges c
+                    LEFT JOIN services s ON s.id = c.service_id
+                )
+                SELECT
+                    t.charge_id,
+                    t.claim_id,
+                    t.amount AS total_charge,
+                    COALESCE(a.total, 0) AS total_applied,
+                    COALESCE(ad.total, 0) AS total_adjustments
+                FROM target t
+                LEFT JOIN (
+                    SELECT charge_id, SUM(amount_applied) AS total
+                    FROM applications
+                    WHERE charge_id IN (SELECT charge_id FROM target {where})
+                    GROUP BY charge_id
+                ) a ON a.charge_id = t.charge_id
+                LEFT JOIN (
+                    SELECT charge_id, SUM(amount) AS total
+                    FROM adjustments
+                    WHERE charge_id IN (SELECT charge_id FROM target {where})
+                    GROUP BY charge_id
+                ) ad ON ad.charge_id = t.charge_id
+                {_where(filters, prefix="t.")}
+                ORDER BY t.charge_id
+                """,
+                params * 3,
+            )
+
+        rows = cur.fetchall()
+
+    balances = {}
+    for r in rows:
+        total_charge = float(r["total_charge"])
+        total_applied = float(r["total_applied"])
+        total_adjustments = float(r["total_adjustments"])
+
+        balances[r["charge_id"]] = {
+            "charge_id": r["charge_id"],
+            "claim_id": r["claim_id"],
             "total_charge": total_charge,
             "total_applied": total_applied,
             "total_adjustments": total_adjustments,
             "balance": total_charge - total_applied - total_adjustments,
         }
 
+    return balances
 
-def get_claim_balance(claim_id: int) -> dict:
+
+def get_claim_balances(claim_ids) -> dict[int, dict]:
     """
-    Calcula el balance total de un claim sumando balances de sus charges.
+    Balance de varios claims (con el detalle por charge) en una sola pasada.
+    Claims sin charges devuelven totales en 0.
+    Con balances materializados (FASE P4) los totales salen de claim_balances.
     """
-    with get_connection() as conn:
-        cur = conn.cursor()
+    claim_ids = [int(cid) for cid in claim_ids]
 
-        cur.execute(
-            """
-            SELECT c.id
-            FROM charges c
-            JOIN services s ON s.id = c.service_id
-            WHERE s.claim_id = ?
-            """,
-            (claim_id,),
-        )
-        charge_ids = [row["id"] for row in cur.fetchall()]
-
-    balances = [get_charge_balance(cid) for cid in charge_ids]
-
-    return {
-        "claim_id": claim_id,
-        "charges": balances,
-        "total_charge": sum(b["total_charge"] for b in balances),
-        "total_applied": sum(b["total_applied"] for b in balances),
-        "total_adjustments": sum(b["total_adjustments"] for b in balances),
-        "balance_due": sum(b["balance"] for b in balances),
+    claims = {
+        cid: {
+            "claim_id": cid,
+            "charges": [],
+            "total_charge": 0.0,
+            "total_applied": 0.0,
+            "total_adjustments": 0.0,
+            "balance_due": 0.0,
+        }
+        for cid in claim_ids
     }
+    if not claim_ids:
+        return claims
+
+    with get_connection() as conn:
+        charges = get_charge_balances(claim_ids=claim_ids)
+
+        materialized = materialized_balances_enabled()
+        if materialized:
+            cur = conn.cursor()
+            cur.execute(
+                f"""
+                SELECT claim_id, total_charge, total_applied, total_adjustments, balance_due
+                FROM claim_balances
+                {_where({"claim_id": claim_ids})}
+                """,
+                tuple(claim_ids),
+            )
+            for r in cur.fetchall():
+                claims[r["claim_id"]].update(
+                    total_charge=float(r["total_charge"]),
+                    total_applied=float(r["total_applied"]),
+                    total_adjustments=float(r["total_adjustments"]),
+                    balance_due=float(r["balance_due"]),
+                )
+
+    for b in charges.values():
+        claim = claims[b["claim_id"]]
+        claim["charges"].append(b)
+        if not materialized:
+            claim["total_charge"] += b["total_charge"]
+            claim["total_applied"] += b["total_applied"]
+            claim["total_adjustments"] += b["total_adjustments"]
+            claim["balance_due"] += b["balance"]
+
+    return claims
+
+
+def get_charge_balance(charge_id: int) -> dict:
+    """
+    Calcula el balance de un charge:
+    charge.amount - sum(applications.amount_applied) - sum(adjustments.amount)
+    """
+    balance = get_charge_balances(charge_ids=[charge_id]).get(int(charge_id))
+    if not balance:
+        raise ValueError("Charge no existe")
+    return balance
+
+
+def get_claim_balance(claim_id: int) -> dict:
+    """
+    Calcula el balance total de un claim sumando balances de sus charges.
+    """
+    return get_claim_balances([claim_id])[int(claim_id)]
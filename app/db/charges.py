@@ -1,48 +1,41 @@
 from datetime import datetime
-from app.db.connection import get_connection
-from app.db.financial_lock import is_claim_locked
+from app.db.connection import get_connection, unit_of_work
+from app.db.financial_lock import freeze_guard
 
 
 def create_charge(service_id: int, amount: float):
-    with get_connection() as conn:
+    """
+    La congelación por snapshot la aplica el trigger trg_freeze_charges_insert.
+    """
+    now = datetime.utcnow().isoformat()
+
+    with unit_of_work() as conn:
         cur = conn.cursor()
 
-        # 1. Obtener claim_id del service
-        cur.execute(
-            """
-            SELECT claim_id
-            FROM services
-            WHERE id = ?
-            """,
-            (service_id,),
-        )
-        row = cur.fetchone()
-        if not row:
+        with freeze_guard():
+            cur.execute(
+                """
+                INSERT INTO charges (
+                    service_id,
+                    amount,
+                    created_at,
+                    updated_at
+                )
+                SELECT id, ?, ?, ?
+                FROM services
+                WHERE id = ?
+                """,
+                (
+                    amount,
+                    now,
+                    now,
+                    service_id,
+                ),
+            )
+
+        if cur.rowcount == 0:
             raise ValueError("Service no existe")
 
-        claim_id = row["claim_id"]
-
-        # 2. Verificar bloqueo financiero
-        if is_claim_locked(claim_id):
-            raise ValueError("Claim está congelado por snapshot")
-
-        # 3. Insertar charge
-        cur.execute(
-            """
-            INSERT INTO charges (
-                service_id,
-                amount,
-                created_at,
-                updated_at
-            ) VALUES (?, ?, ?, ?)
-            """,
-            (
-                service_id,
-                amount,
-                datetime.utcnow().isoformat(),
-                datetime.utcnow().isoformat(),
-            ),
-        )
         conn.commit()
         return cur.lastrowid
 
@@ -78,70 +71,49 @@ def get_charge_by_service(service_id: int):
 
 
 def update_charge(charge_id: int, amount: float):
-    with get_connection() as conn:
+    """
+    La congelación por snapshot la aplica el trigger trg_freeze_charges_update.
+    """
+    with unit_of_work() as conn:
         cur = conn.cursor()
 
-        # 1. Obtener service_id del charge
-        cur.execute(
-            """
-            SELECT service_id
-            FROM charges
-            WHERE id = ?
-            """,
-            (charge_id,),
-        )
-        row = cur.fetchone()
-        if not row:
+        with freeze_guard():
+            cur.execute(
+                """
+                UPDATE charges
+                SET amount = ?, updated_at = ?
+                WHERE id = ?
+                """,
+                (
+                    amount,
+                    datetime.utcnow().isoformat(),
+                    charge_id,
+                ),
+            )
+
+        if cur.rowcount == 0:
             raise ValueError("Charge no existe")
 
-        service_id = row["service_id"]
-
-        # 2. Obtener claim_id desde services
-        cur.execute(
-            """
-            SELECT claim_id
-            FROM services
-            WHERE id = ?
-            """,
-            (service_id,),
-        )
-        service_row = cur.fetchone()
-        if not service_row:
-            raise ValueError("Service no existe")
-
-        claim_id = service_row["claim_id"]
-
-        # 3. Verificar bloqueo financiero
-        if is_claim_locked(claim_id):
-            raise ValueError("Claim está congelado por snapshot")
-
-        # 4. Actualizar
-        cur.execute(
-            """
-            UPDATE charges
-            SET amount = ?, updated_at = ?
-            WHERE id = ?
-            """,
-            (
-                amount,
-                datetime.utcnow().isoformat(),
-                charge_id,
-            ),
-        )
         conn.commit()
         return cur.rowcount > 0
 
 
 def delete_charge(charge_id: int):
-    with get_connection() as conn:
+    """
+    La congelación por snapshot la aplica el trigger trg_freeze_charges_delete.
+    """
+    with unit_of_work() as conn:
         cur = conn.cursor()
 
-        # 1. Obtener service_id
         cur.execute(
             """
-            SELECT service_id
-            FROM charges
-            WHERE id = ?
+            SELECT EXISTS (
+                SELECT 1
+                FROM applications
+                WHERE charge_id = c.id
+            ) AS has_applications
+            FROM charges c
+            WHERE c.id = ?
             """,
             (charge_id,),
         )
@@ -149,47 +121,17 @@ def delete_charge(charge_id: int):
         if not row:
             raise ValueError("Charge no existe")
 
-        service_id = row["service_id"]
-
-        # 2. Obtener claim_id
-        cur.execute(
-            """
-            SELECT claim_id
-            FROM services
-            WHERE id = ?
-            """,
-            (service_id,),
-        )
-        service_row = cur.fetchone()
-        if not service_row:
-            raise ValueError("Service no existe")
-
-        claim_id = service_row["claim_id"]
-
-        # 🔒 BLOQUEO FINANCIERO
-        if is_claim_locked(claim_id):
-            raise ValueError("Claim está congelado por snapshot")
-
-        # Verificar si tiene applications
-        cur.execute(
-            """
-            SELECT 1
-            FROM applications
-            WHERE charge_id = ?
-            LIMIT 1
-            """,
-            (charge_id,),
-        )
-        if cur.fetchone():
+        if row["has_applications"]:
             raise ValueError("No se puede borrar: charge tiene applications")
 
         # Eliminar
-        cur.execute(
-            """
-            DELETE FROM charges
-            WHERE id = ?
-            """,
-            (charge_id,),
-        )
+        with freeze_guard():
+            cur.execute(
+                """
+                DELETE FROM charges
+                WHERE id = ?
+                """,
+                (charge_id,),
+            )
         conn.commit()
-        return cur.rowcount > 0
\ No newline at end of file
+        return cur.rowcount > 0
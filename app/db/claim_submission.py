@@ -0,0 +1,217 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from app.db.connection import after_commit, unit_of_work
+from app.db.claims import VALID_TRANSITIONS
+from app.db.event_ledger import append_events, ledger_event
+from app.db.cms1500_snapshot import (
+    SNAPSHOT_BASE_SQL,
+    _notify_snapshot_created,
+    build_cms1500_snapshot_payload,
+    get_active_provider_settings,
+    get_financial_totals,
+    insert_snapshot_row,
+    snapshot_columns,
+)
+
+
+# ============================================================
+# FASE P14 — Envío de claims por lote (SUBMITTED + snapshot)
+# ============================================================
+# Equivale a N veces claim_transition(..., "SUBMITTED"), pero:
+# - valida todos los claims con consultas IN / GROUP BY,
+# - arma los snapshots con build_cms1500_snapshot (en procesos si el lote
+#   es grande),
+# - escribe status + snapshots + eventos en UNA transacción.
+#
+# Un claim que no pasa la validación (o cuya escritura falla) queda en
+# "failed" con su motivo; el resto se envía igual.
+
+SUBMIT_MAX_CLAIMS = 500
+# A partir de este tamaño el JSON canónico se arma en un pool de procesos
+SUBMIT_PROCESS_POOL_MIN = 200
+
+TARGET_STATUS = "SUBMITTED"
+
+
+def _validate(cur, claim_ids: list[int], failed: dict[int, str]) -> tuple[dict, set, dict, dict]:
+    q_marks = ",".join(["?"] * len(claim_ids))
+    params = tuple(claim_ids)
+
+    # -------------------------
+    # Claims + paciente + cobertura
+    # -------------------------
+    cur.execute(SNAPSHOT_BASE_SQL + f" WHERE c.id IN ({q_marks})", params)
+    bases = {r["id"]: dict(r) for r in cur.fetchall()}
+
+    for cid in claim_ids:
+        if cid not in bases:
+            failed[cid] = "Claim no existe"
+
+    # -------------------------
+    # Transición y congelación
+    # -------------------------
+    # Con snapshot previo el claim está congelado (update_claim_operational_status
+    # lo bloquea), así que el lote siempre genera version_number = 1.
+    cur.execute(
+        f"""
+        SELECT claim_id
+        FROM claim_latest_snapshot
+        WHERE claim_id IN ({q_marks})
+        """,
+        params,
+    )
+    frozen = {r["claim_id"] for r in cur.fetchall()}
+
+    for cid, base in bases.items():
+        if cid in frozen:
+            failed[cid] = "Claim congelado por snapshot — transición bloqueada"
+        elif TARGET_STATUS not in VALID_TRANSITIONS.get(base["status"], set()):
+            failed[cid] = f"Transición inválida: {base['status']} → {TARGET_STATUS}"
+
+    # -------------------------
+    # Services + totales (pre-CMS)
+    # -------------------------
+    cur.execute(
+        f"""
+        SELECT *
+        FROM services
+        WHERE claim_id IN ({q_marks})
+        ORDER BY claim_id, service_date ASC, id ASC
+        """,
+        params,
+    )
+    services: dict[int, list] = {}
+    for r in cur.fetchall():
+        services.setdefault(r["claim_id"], []).append(dict(r))
+
+    financials = get_financial_totals(cur, claim_ids)
+
+    for cid in bases:
+        if cid in failed:
+            continue
+        if not services.get(cid):
+            failed[cid] = "Claim no tiene services"
+        elif not financials[cid]["charge_count"]:
+            failed[cid] = "Claim no tiene charges"
+        elif financials[cid]["total_charge"] <= 0:
+            failed[cid] = "Total charge debe ser mayor que 0"
+
+    return bases, frozen, services, financials
+
+
+def _build_payloads(jobs: list[tuple], workers: int | None) -> list[tuple]:
+    if len(jobs) >= SUBMIT_PROCESS_POOL_MIN and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(build_cms1500_snapshot_payload, jobs, chunksize=32))
+    return [build_cms1500_snapshot_payload(job) for job in jobs]
+
+
+def _write_claim(
+    cur, claim_id: int, previous_status: str, snapshot: dict, snapshot_json: str, snapshot_hash: str, now: str
+) -> None:
+    cur.execute(
+        """
+        UPDATE claims
+        SET status = ?, updated_at = ?
+        WHERE id = ? AND status = ?
+        """,
+        (TARGET_STATUS, now, claim_id, previous_status),
+    )
+    if cur.rowcount != 1:
+        raise ValueError("Claim cambió de estado durante el envío")
+
+    insert_snapshot_row(cur, claim_id, 1, snapshot_json, snapshot_hash, snapshot)
+
+    # Mismos eventos que claim_transition → SUBMITTED, en el SAVEPOINT del claim
+    # (update_claim_operational_status escribe operational_transition dos veces, G43)
+    transition = {"from": previous_status, "to": TARGET_STATUS}
+    append_events(
+        cur,
+        [
+            ledger_event("claim", claim_id, "operational_transition", transition),
+            ledger_event("claim", claim_id, "operational_transition", transition),
+            ledger_event("claim", claim_id, "snapshot_created", {"snapshot_hash": snapshot_hash, "version_number": 1}),
+            ledger_event("claim", claim_id, "claim_status_transition", transition),
+        ],
+    )
+
+
+def submit_claims(claim_ids: list[int], workers: int | None = None) -> dict:
+    """
+    Pasa a SUBMITTED todos los claims válidos y genera su snapshot v1.
+
+    Retorna:
+    {
+        "submitted": [{"claim_id", "snapshot_hash", "version_number"}, ...],
+        "failed":    [{"claim_id", "error"}, ...],
+    }
+    workers: procesos para armar snapshots (None = os.cpu_count(), 1 = sin pool).
+    """
+    claim_ids = list(dict.fromkeys(int(c) for c in claim_ids))
+    if not claim_ids:
+        raise ValueError("No hay claims para enviar")
+    if len(claim_ids) > SUBMIT_MAX_CLAIMS:
+        raise ValueError(f"Máximo {SUBMIT_MAX_CLAIMS} claims por envío")
+
+    failed: dict[int, str] = {}
+    submitted = []
+    now = datetime.utcnow().isoformat()
+
+    with unit_of_work() as conn:
+        cur = conn.cursor()
+
+        bases, frozen, services, financials = _validate(cur, claim_ids, failed)
+
+        provider = get_active_provider_settings(cur)
+        if provider is None:
+            for cid in claim_ids:
+                failed.setdefault(cid, "No hay provider_settings activo")
+
+        # Intentos bloqueados por congelación quedan auditados (igual que el flujo individual)
+        append_events(
+            cur,
+            [
+                ledger_event(
+                    "claim",
+                    cid,
+                    "freeze_blocked_transition",
+                    {"attempted_new_status": TARGET_STATUS, "current_status": bases[cid]["status"]},
+                )
+                for cid in frozen
+                if cid in bases
+            ],
+        )
+
+        ready = [cid for cid in claim_ids if cid not in failed]
+
+        # -------------------------
+        # Snapshots (JSON canónico + hash)
+        # -------------------------
+        columns = snapshot_columns()
+        jobs = []
+        for cid in ready:
+            base = dict(bases[cid], status=TARGET_STATUS)
+            jobs.append((base, services[cid], provider, financials[cid], 1, now, columns))
+
+        payloads = dict(zip(ready, _build_payloads(jobs, workers)))
+
+        # -------------------------
+        # Escritura: un SAVEPOINT por claim dentro de la transacción
+        # -------------------------
+        for cid in ready:
+            snapshot, snapshot_json, snapshot_hash = payloads[cid]
+            try:
+                with conn:
+                    _write_claim(cur, cid, bases[cid]["status"], snapshot, snapshot_json, snapshot_hash, now)
+                    after_commit(lambda c=cid, h=snapshot_hash, s=snapshot: _notify_snapshot_created(c, h, s))
+            except Exception as e:
+                failed[cid] = str(e)
+                continue
+
+            submitted.append({"claim_id": cid, "snapshot_hash": snapshot_hash, "version_number": 1})
+
+    return {
+        "submitted": submitted,
+        "failed": [{"claim_id": cid, "error": failed[cid]} for cid in claim_ids if cid in failed],
+    }
@@ -1,7 +1,7 @@
 from datetime import datetime
-from app.db.connection import get_connection
-from app.db.financial_lock import is_claim_locked
-from app.db.event_ledger import log_event
+from app.db.connection import get_connection, unit_of_work
+from app.db.financial_lock import is_claim_locked, freeze_guard
+from app.db.event_ledger import append_events, ledger_event, log_rejected_event
 
 
 # ============================================================
@@ -75,7 +75,7 @@ def update_claim_operational_status(claim_id: int, new_status: str) -> bool:
     if new_status not in ALLOWED_STATUSES:
         raise ValueError("Estado inválido")
 
-    with get_connection() as conn:
+    with unit_of_work() as conn:
         cur = conn.cursor()
 
         cur.execute("SELECT status FROM claims WHERE id = ?", (claim_id,))
@@ -86,61 +86,50 @@ def update_claim_operational_status(claim_id: int, new_status: str) -> bool:
         current_status = row["status"]
 
         # HARD FREEZE CHECK
-        if is_claim_locked(claim_id):
-            from app.db.event_ledger import log_event
-
-            log_event(
-                entity_type="claim",
-                entity_id=claim_id,
-                event_type="freeze_blocked_transition",
-                event_data={
-                    "attempted_new_status": new_status,
-                    "current_status": current_status,
-                },
-           )
-
-            raise ValueError("Claim congelado por snapshot — transición bloqueada")
-
-        if new_status not in VALID_TRANSITIONS.get(current_status, set()):
-            raise ValueError(
-                f"Transición inválida: {current_status} → {new_status}"
+        # El intento bloqueado se audita al salir del bloque, fuera de la
+        # transacción del caller (un request que responde 400 hace rollback).
+        frozen = is_claim_locked(claim_id)
+
+        if not frozen:
+            if new_status not in VALID_TRANSITIONS.get(current_status, set()):
+                raise ValueError(
+                    f"Transición inválida: {current_status} → {new_status}"
+                )
+
+            cur.execute(
+                """
+                UPDATE claims
+                SET status = ?, updated_at = ?
+                WHERE id = ?
+                """,
+                (new_status, datetime.utcnow().isoformat(), claim_id),
+            )
+            updated = cur.rowcount > 0
+
+            # Eventos en la misma transacción del UPDATE (FASE P24)
+            transition = {"from": current_status, "to": new_status}
+            append_events(
+                cur,
+                [
+                    ledger_event("claim", claim_id, "operational_transition", transition),
+                    # G43 — EVENT LEDGER AUTOMÁTICO
+                    ledger_event("claim", claim_id, "operational_transition", transition),
+                ],
             )
 
-        cur.execute(
-            """
-            UPDATE claims
-            SET status = ?, updated_at = ?
-            WHERE id = ?
-            """,
-            (new_status, datetime.utcnow().isoformat(), claim_id),
-        )
-        conn.commit()
-        from app.db.event_ledger import log_event
-
-        log_event(
-            entity_type="claim",
-            entity_id=claim_id,
-            event_type="operational_transition",
-            event_data={
-                 "from": current_status,
-                 "to": new_status,
-            },
-       )
-
-        # =========================================================
-        # G43 — EVENT LEDGER AUTOMÁTICO (NUEVO)
-        # =========================================================
-        log_event(
+    if frozen:
+        log_rejected_event(
             entity_type="claim",
             entity_id=claim_id,
-            event_type="operational_transition",
+            event_type="freeze_blocked_transition",
             event_data={
-                "from": current_status,
-                "to": new_status,
+                "attempted_new_status": new_status,
+                "current_status": current_status,
             },
         )
+        raise ValueError("Claim congelado por snapshot — transición bloqueada")
 
-        return cur.rowcount > 0
+    return updated
 
 
 # ============================================================
@@ -157,9 +146,6 @@ def update_claim_cms_fields(
     prior_authorization_23: str | None = None,
 ) -> bool:
 
-    if is_claim_locked(claim_id):
-        raise ValueError("Claim está congelado por snapshot")
-
     now = datetime.utcnow().isoformat()
 
     sql = """
@@ -175,21 +161,25 @@ def update_claim_cms_fields(
     WHERE id = ?
     """
 
-    with get_connection() as conn:
+    with unit_of_work() as conn:
         cur = conn.cursor()
-        cur.execute(
-            sql,
-            (
-                referring_provider_name,
-                referring_provider_npi,
-                reserved_local_use_19,
-                resubmission_code_22,
-                original_ref_no_22,
-                prior_authorization_23,
-                now,
-                claim_id,
-            ),
-        )
+
+        # 🔒 BLOQUEO FINANCIERO: trigger trg_freeze_claims_cms_update
+        with freeze_guard():
+            cur.execute(
+                sql,
+                (
+                    referring_provider_name,
+                    referring_provider_npi,
+                    reserved_local_use_19,
+                    resubmission_code_22,
+                    original_ref_no_22,
+                    prior_authorization_23,
+                    now,
+                    claim_id,
+                ),
+            )
+
         conn.commit()
         return cur.rowcount > 0
 
@@ -199,7 +189,7 @@ def update_claim_cms_fields(
 # ============================================================
 
 def delete_claim(claim_id: int) -> bool:
-    with get_connection() as conn:
+    with unit_of_work() as conn:
         cur = conn.cursor()
 
         if is_claim_locked(claim_id):
@@ -230,68 +220,119 @@ def delete_claim(claim_id: int) -> bool:
 # ESTADO FINANCIERO DERIVADO
 # ============================================================
 
-def get_claim_financial_status(claim_id: int) -> dict:
+def _financial_status_label(balance_due: float) -> str:
+    if balance_due > 0:
+        return "OPEN"
+    elif balance_due == 0:
+        return "PAID"
+    return "OVERPAID"
+
+
+def get_claims_financial_status(claim_ids: list[int] | None = None) -> dict[int, dict]:
+    """
+    Estado financiero derivado de MUCHOS claims a la vez (FASE P3).
+
+    - claim_ids=None → todos los claims.
+    - Corre un número fijo de queries agrupadas (no una por claim).
+    - Devuelve {claim_id: estado}; los claims inexistentes no aparecen.
+    """
+    if claim_ids is not None:
+        claim_ids = sorted({int(cid) for cid in claim_ids})
+        if not claim_ids:
+            return {}
+        q_marks = ",".join(["?"] * len(claim_ids))
+        claims_filter = f"WHERE id IN ({q_marks})"
+        services_filter = f"WHERE s.claim_id IN ({q_marks})"
+        snapshots_filter = f"WHERE claim_id IN ({q_marks})"
+        params = tuple(claim_ids)
+    else:
+        claims_filter = services_filter = snapshots_filter = ""
+        params = ()
 
     with get_connection() as conn:
         cur = conn.cursor()
 
-        cur.execute("SELECT id FROM claims WHERE id = ?", (claim_id,))
-        if not cur.fetchone():
-            raise ValueError("Claim no existe")
+        cur.execute(f"SELECT id FROM claims {claims_filter} ORDER BY id", params)
+        existing = [row["id"] for row in cur.fetchall()]
 
         cur.execute(
-            """
-            SELECT COALESCE(SUM(c.amount), 0)
+            f"""
+            SELECT s.claim_id, COALESCE(SUM(c.amount), 0) AS total
             FROM charges c
             JOIN services s ON s.id = c.service_id
-            WHERE s.claim_id = ?
+            {services_filter}
+            GROUP BY s.claim_id
             """,
-            (claim_id,),
+            params,
         )
-        total_charge = float(cur.fetchone()[0])
+        charges = {row["claim_id"]: float(row["total"]) for row in cur.fetchall()}
 
         cur.execute(
-            """
-            SELECT COALESCE(SUM(a.amount_applied), 0)
+            f"""
+            SELECT s.claim_id, COALESCE(SUM(a.amount_applied), 0) AS total
             FROM applications a
             JOIN charges c ON c.id = a.charge_id
             JOIN services s ON s.id = c.service_id
-            WHERE s.claim_id = ?
+            {services_filter}
+            GROUP BY s.claim_id
             """,
-            (claim_id,),
+            params,
         )
-        total_applied = float(cur.fetchone()[0])
+        applied = {row["claim_id"]: float(row["total"]) for row in cur.fetchall()}
 
         cur.execute(
-            """
-            SELECT COALESCE(SUM(ad.amount), 0)
+            f"""
+            SELECT s.claim_id, COALESCE(SUM(ad.amount), 0) AS total
             FROM adjustments ad
             JOIN charges c ON c.id = ad.charge_id
             JOIN services s ON s.id = c.service_id
-            WHERE s.claim_id = ?
+            {services_filter}
+            GROUP BY s.claim_id
             """,
-            (claim_id,),
+            params,
         )
-        total_adjustments = float(cur.fetchone()[0])
+        adjusted = {row["claim_id"]: float(row["total"]) for row in cur.fetchall()}
 
-        balance_due = total_charge - total_applied - total_adjustments
+        # Congelación: cualquier snapshot bloquea el claim
+        cur.execute(
+            f"""
+            SELECT claim_id, version_number AS latest_version
+            FROM claim_latest_snapshot
+            {snapshots_filter}
+            """,
+            params,
+        )
+        snapshot_versions = {row["claim_id"]: row["latest_version"] for row in cur.fetchall()}
 
-        if balance_due > 0:
-            status = "OPEN"
-        elif balance_due == 0:
-            status = "PAID"
-        else:
-            status = "OVERPAID"
+    result = {}
+    for claim_id in existing:
+        total_charge = charges.get(claim_id, 0.0)
+        total_applied = applied.get(claim_id, 0.0)
+        total_adjustments = adjusted.get(claim_id, 0.0)
+        balance_due = total_charge - total_applied - total_adjustments
 
-        return {
+        result[claim_id] = {
             "claim_id": claim_id,
             "total_charge": total_charge,
             "total_applied": total_applied,
             "total_adjustments": total_adjustments,
             "balance_due": balance_due,
-            "status": status,
+            "status": _financial_status_label(balance_due),
+            "locked": claim_id in snapshot_versions,
+            "snapshot_version": snapshot_versions.get(claim_id),
         }
 
+    return result
+
+
+def get_claim_financial_status(claim_id: int) -> dict:
+
+    statuses = get_claims_financial_status([claim_id])
+    if int(claim_id) not in statuses:
+        raise ValueError("Claim no existe")
+
+    return statuses[int(claim_id)]
+
 
 # ============================================================
 # ESTADO OPERACIONAL DERIVADO
@@ -303,8 +344,8 @@ def get_claim_operational_status(claim_id: int) -> dict:
     if not claim:
         raise ValueError("Claim no existe")
 
-    locked = is_claim_locked(claim_id)
     financial = get_claim_financial_status(claim_id)
+    locked = financial["locked"]
 
     # DERIVED OPERATIONAL STATUS (NO PERSISTENTE)
     if not locked:
@@ -1,34 +1,29 @@
 import json
 import hashlib
-import sqlite3
+import re
 from datetime import datetime
 from typing import Any, Dict, Optional
 
-from app.db.event_ledger import log_event
-from app.config import DB_PATH
+from app.db.connection import after_commit, get_connection, unit_of_work
+from app.db.event_ledger import append_event, log_read_event
+from app.db.schema_capabilities import has_column
+from app.db.snapshot_cache import load_snapshot
+from app.db.snapshot_summary import SNAPSHOT_SUMMARY_COLUMNS, has_snapshot_summary, snapshot_summary
+from app.db.snapshot_service_lines import has_snapshot_service_lines, insert_service_lines
+from app.db.snapshot_merkle import append_merkle_leaves, has_snapshot_merkle
 
 
-def _conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+def _conn():
+    return get_connection()
 
 
-def _table_has_column(conn: sqlite3.Connection, table: str, column: str) -> bool:
-    cur = conn.cursor()
-    cur.execute(f"PRAGMA table_info({table})")
-    cols = [r["name"] for r in cur.fetchall()]
-    return column in cols
+# FASE P12 — callbacks (claim_id, snapshot_hash, snapshot) tras confirmar un snapshot.
+# Opcionales: un error en un callback nunca afecta la generación.
+_snapshot_listeners = []
 
 
-def _sum_float(rows, key: str) -> float:
-    total = 0.0
-    for r in rows:
-        v = r[key]
-        if v is None:
-            continue
-        total += float(v)
-    return float(total)
+def on_snapshot_created(callback) -> None:
+    _snapshot_listeners.append(callback)
 
 
 def _canonical_json(data: Any) -> str:
@@ -44,27 +39,25 @@ def get_latest_snapshot_by_claim(claim_id: int) -> Optional[Dict[str, Any]]:
     try:
         cur = conn.cursor()
 
-        has_version_number = _table_has_column(conn, "cms1500_snapshots", "version_number")
+        has_version_number = has_column("cms1500_snapshots", "version_number")
 
         if has_version_number:
             cur.execute(
                 """
-                SELECT id, claim_id, version_number, snapshot_json, snapshot_hash, created_at
-                FROM cms1500_snapshots
-                WHERE claim_id = ?
-                ORDER BY id DESC
-                LIMIT 1
+                SELECT s.id, s.claim_id, s.version_number, s.snapshot_hash, s.created_at
+                FROM claim_latest_snapshot l
+                JOIN cms1500_snapshots s ON s.id = l.snapshot_id
+                WHERE l.claim_id = ?
                 """,
                 (claim_id,),
             )
         else:
             cur.execute(
                 """
-                SELECT id, claim_id, snapshot_json, snapshot_hash, created_at
-                FROM cms1500_snapshots
-                WHERE claim_id = ?
-                ORDER BY id DESC
-                LIMIT 1
+                SELECT s.id, s.claim_id, s.snapshot_hash, s.created_at
+                FROM claim_latest_snapshot l
+                JOIN cms1500_snapshots s ON s.id = l.snapshot_id
+                WHERE l.claim_id = ?
                 """,
                 (claim_id,),
             )
@@ -73,7 +66,8 @@ def get_latest_snapshot_by_claim(claim_id: int) -> Optional[Dict[str, Any]]:
         if not row:
             return None
 
-        payload = json.loads(row["snapshot_json"])
+        # FASE P15: parseado una vez por proceso (solo lectura)
+        payload = load_snapshot(cur, row["id"], row["snapshot_hash"])
         out = {
             "id": row["id"],
             "claim_id": row["claim_id"],
@@ -91,6 +85,397 @@ def get_latest_snapshot_by_claim(claim_id: int) -> Optional[Dict[str, Any]]:
         conn.close()
 
 
+# ============================================================
+# FASE P14 — Construcción del snapshot (pura) + totales agrupados
+# ============================================================
+# build_cms1500_snapshot no toca la DB: recibe filas como dict y los flags
+# de columnas. La usan generate_cms1500_snapshot (un claim) y
+# submit_claims (lote, opcionalmente en un pool de procesos).
+
+SNAPSHOT_BASE_SQL = """
+    SELECT
+        c.*,
+        p.first_name AS p_first_name,
+        p.last_name AS p_last_name,
+        p.date_of_birth AS p_dob,
+        p.sex AS p_sex,
+        p.marital_status AS p_marital_status,
+        p.employment_status AS p_employment_status,
+        p.student_status AS p_student_status,
+
+        cov.insurer_name AS cov_insurer_name,
+        cov.plan_name AS cov_plan_name,
+        cov.insured_id AS cov_insured_id,
+        cov.insured_first_name AS cov_insured_first_name,
+        cov.insured_last_name AS cov_insured_last_name,
+        cov.relationship_to_insured AS cov_relationship_to_insured,
+        cov.policy_number AS cov_policy_number,
+        cov.group_number AS cov_group_number,
+        cov.other_health_plan_11d AS cov_other_health_plan_11d,
+
+        cov.insured_address AS cov_insured_address,
+        cov.insured_city AS cov_insured_city,
+        cov.insured_state AS cov_insured_state,
+        cov.insured_zip AS cov_insured_zip
+    FROM claims c
+    JOIN patients p ON p.id = c.patient_id
+    JOIN coverages cov ON cov.id = c.coverage_id
+"""
+
+
+def snapshot_columns() -> Dict[str, Any]:
+    """
+    Flags de columnas que cambian el contenido del snapshot (cache P10).
+    """
+    return {
+        "units": has_column("services", "units"),
+        "units_24g": has_column("services", "units_24g"),
+        "charge_amount_24f": has_column("services", "charge_amount_24f"),
+        "diagnosis_pointer_24e": has_column("services", "diagnosis_pointer_24e"),
+        "diagnosis_code": has_column("services", "diagnosis_code"),
+        "claim_diagnoses": [idx for idx in range(1, 13) if has_column("claims", f"diagnosis_{idx}")],
+    }
+
+
+def get_active_provider_settings(cur) -> Optional[Dict[str, Any]]:
+    cur.execute(
+        """
+        SELECT *
+        FROM provider_settings
+        WHERE active = 1
+        ORDER BY id DESC
+        LIMIT 1
+        """
+    )
+    row = cur.fetchone()
+    return dict(row) if row else None
+
+
+def get_financial_totals(cur, claim_ids: list[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Cargos, pagos y ajustes por claim con tres consultas agrupadas.
+    charge_count = 0 indica que el claim no tiene charges.
+    """
+    out = {
+        int(cid): {"charge_count": 0, "total_charge": 0.0, "amount_paid": 0.0, "adjustments_total": 0.0}
+        for cid in claim_ids
+    }
+    if not out:
+        return out
+
+    q_marks = ",".join(["?"] * len(out))
+    params = tuple(out)
+
+    cur.execute(
+        f"""
+        SELECT s.claim_id, COUNT(c.id) AS charge_count, COALESCE(SUM(c.amount), 0) AS total
+        FROM charges c
+        JOIN services s ON s.id = c.service_id
+        WHERE s.claim_id IN ({q_marks})
+        GROUP BY s.claim_id
+        """,
+        params,
+    )
+    for r in cur.fetchall():
+        out[r["claim_id"]]["charge_count"] = int(r["charge_count"])
+        out[r["claim_id"]]["total_charge"] = float(r["total"])
+
+    cur.execute(
+        f"""
+        SELECT s.claim_id, COALESCE(SUM(a.amount_applied), 0) AS total
+        FROM applications a
+        JOIN charges c ON c.id = a.charge_id
+        JOIN services s ON s.id = c.service_id
+        WHERE s.claim_id IN ({q_marks})
+        GROUP BY s.claim_id
+        """,
+        params,
+    )
+    for r in cur.fetchall():
+        out[r["claim_id"]]["amount_paid"] = float(r["total"])
+
+    cur.execute(
+        f"""
+        SELECT s.claim_id, COALESCE(SUM(adj.amount), 0) AS total
+        FROM adjustments adj
+        JOIN charges c ON c.id = adj.charge_id
+        JOIN services s ON s.id = c.service_id
+        WHERE s.claim_id IN ({q_marks})
+        GROUP BY s.claim_id
+        """,
+        params,
+    )
+    for r in cur.fetchall():
+        out[r["claim_id"]]["adjustments_total"] = float(r["total"])
+
+    return out
+
+
+def build_cms1500_snapshot(
+    base: Dict[str, Any],
+    service_rows: list[Dict[str, Any]],
+    ps: Optional[Dict[str, Any]],
+    financials: Dict[str, Any],
+    version_number: int,
+    created_at: str,
+    columns: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Arma el snapshot CMS-1500 (1–33) sin tocar la DB.
+    base: fila de SNAPSHOT_BASE_SQL; service_rows ordenadas por service_date, id.
+    """
+    # -------------------------
+    # Provider settings (GLOBAL)
+    # -------------------------
+    provider = {
+        "signature": (ps["signature"] if ps else "Signature on File"),
+        "signature_date": (ps["signature_date"] if ps else None),
+        "facility": {
+            "name": (ps["facility_name"] if ps else None),
+            "address": (ps["facility_address"] if ps else None),
+            "city": (ps["facility_city"] if ps else None),
+            "state": (ps["facility_state"] if ps else None),
+            "zip": (ps["facility_zip"] if ps else None),
+        },
+        "billing": {
+            "name": (ps["billing_name"] if ps else None),
+            "npi": (ps["billing_npi"] if ps else None),
+            "tax_id": (ps["billing_tax_id"] if ps else None),
+            "address": (ps["billing_address"] if ps else None),
+            "city": (ps["billing_city"] if ps else None),
+            "state": (ps["billing_state"] if ps else None),
+            "zip": (ps["billing_zip"] if ps else None),
+        },
+    }
+
+    # -------------------------
+    # Services (24A–24J + 20)
+    # -------------------------
+    services = []
+    for s in service_rows:
+        units_val = None
+        if columns["units_24g"]:
+            units_val = s["units_24g"]
+        elif columns["units"]:
+            units_val = s["units"]
+
+        charge_val = None
+        if columns["charge_amount_24f"]:
+            charge_val = s["charge_amount_24f"]
+
+        dx_pointer_val = None
+        if columns["diagnosis_pointer_24e"]:
+            dx_pointer_val = s["diagnosis_pointer_24e"]
+
+        diagnosis_code_val = None
+        if columns["diagnosis_code"]:
+            diagnosis_code_val = s["diagnosis_code"]
+
+        services.append(
+            {
+                "id": s["id"],
+                "service_date": s["service_date"],
+                "place_of_service_24b": (s["place_of_service_24b"] if "place_of_service_24b" in s.keys() else None),
+                "emergency_24c": (s["emergency_24c"] if "emergency_24c" in s.keys() else 0),
+                "cpt_code": s["cpt_code"],
+                "modifiers": [
+                    (s["modifier1"] if "modifier1" in s.keys() else None),
+                    (s["modifier2"] if "modifier2" in s.keys() else None),
+                    (s["modifier3"] if "modifier3" in s.keys() else None),
+                    (s["modifier4"] if "modifier4" in s.keys() else None),
+                ],
+                "dx_pointer": dx_pointer_val,
+                "diagnosis_code": diagnosis_code_val,
+                "charge_amount_24f": charge_val,
+                "units": units_val,
+                "epsdt_24h": (s["epsdt_24h"] if "epsdt_24h" in s.keys() else None),
+                "id_qualifier_24i": (s["id_qualifier_24i"] if "id_qualifier_24i" in s.keys() else None),
+                "rendering_npi_24j": (s["rendering_npi_24j"] if "rendering_npi_24j" in s.keys() else None),
+                "outside_lab_20": bool(s["outside_lab_20"]) if "outside_lab_20" in s.keys() else False,
+                "lab_charges_20": (s["lab_charges_20"] if "lab_charges_20" in s.keys() else None),
+            }
+        )
+
+    # -------------------------
+    # Diagnoses (21 A–L)
+    # -------------------------
+    diagnoses = {k: None for k in list("ABCDEFGHIJKL")}
+
+    for idx, letter in enumerate("ABCDEFGHIJKL", start=1):
+        if idx in columns["claim_diagnoses"]:
+            diagnoses[letter] = base[f"diagnosis_{idx}"]
+
+    if all(v is None for v in diagnoses.values()) and columns["diagnosis_code"]:
+        for s in service_rows:
+            if s["diagnosis_code"]:
+                diagnoses["A"] = s["diagnosis_code"]
+                break
+
+    # -------------------------
+    # Totals 28–30 (finanzas)
+    # -------------------------
+    if financials["charge_count"]:
+        total_charge = float(financials["total_charge"])
+    else:
+        total_charge = 0.0
+        for s in services:
+            if s.get("charge_amount_24f") is not None:
+                total_charge += float(s["charge_amount_24f"])
+
+    amount_paid = float(financials["amount_paid"])
+    adjustments_total = float(financials["adjustments_total"])
+
+    balance_due = float(total_charge - amount_paid - adjustments_total)
+
+    totals = {
+        "total_charge": float(round(total_charge, 2)),
+        "amount_paid": float(round(amount_paid, 2)),
+        "total_adjustments": float(round(adjustments_total, 2)),
+        "balance_due": float(round(balance_due, 2)),
+    }
+
+    # -------------------------
+    # Snapshot object (1–33)
+    # -------------------------
+    insured_name = " ".join(
+        [
+            (base["cov_insured_first_name"] or "").strip(),
+            (base["cov_insured_last_name"] or "").strip(),
+        ]
+    ).strip() or None
+
+    snapshot = {
+        "meta": {
+            "claim_id": base["id"],
+            "created_at": created_at,
+            "version": "B1",
+            "version_number": version_number,
+        },
+        "claim": {
+            "id": base["id"],
+            "patient_id": base["patient_id"],
+            "coverage_id": base["coverage_id"],
+            "claim_number": base["claim_number"],
+            "status": base["status"],
+            "related_employment_10a": base["related_employment_10a"] if "related_employment_10a" in base.keys() else 0,
+            "related_auto_10b": base["related_auto_10b"] if "related_auto_10b" in base.keys() else 0,
+            "related_other_10c": base["related_other_10c"] if "related_other_10c" in base.keys() else 0,
+            "related_state_10d": base["related_state_10d"] if "related_state_10d" in base.keys() else None,
+            "date_current_illness_14": base["date_current_illness_14"] if "date_current_illness_14" in base.keys() else None,
+            "other_date_15": base["other_date_15"] if "other_date_15" in base.keys() else None,
+            "unable_work_from_16": base["unable_work_from_16"] if "unable_work_from_16" in base.keys() else None,
+            "unable_work_to_16": base["unable_work_to_16"] if "unable_work_to_16" in base.keys() else None,
+            "referring_provider_name_17": base["referring_provider_name"] if "referring_provider_name" in base.keys() else None,
+            "referring_provider_npi_17": base["referring_provider_npi"] if "referring_provider_npi" in base.keys() else None,
+            "hosp_from_18": base["hosp_from_18"] if "hosp_from_18" in base.keys() else None,
+            "hosp_to_18": base["hosp_to_18"] if "hosp_to_18" in base.keys() else None,
+            "reserved_local_use_19": base["reserved_local_use_19"] if "reserved_local_use_19" in base.keys() else None,
+            "resubmission_code_22": base["resubmission_code_22"] if "resubmission_code_22" in base.keys() else None,
+            "original_ref_no_22": base["original_ref_no_22"] if "original_ref_no_22" in base.keys() else None,
+            "prior_authorization_23": base["prior_authorization_23"] if "prior_authorization_23" in base.keys() else None,
+            "patient_account_no_26": base["patient_account_no_26"] if "patient_account_no_26" in base.keys() else None,
+            "accept_assignment_27": base["accept_assignment_27"] if "accept_assignment_27" in base.keys() else 1,
+        },
+        "patient": {
+            "first_name": base["p_first_name"],
+            "last_name": base["p_last_name"],
+            "date_of_birth": base["p_dob"],
+            "sex": base["p_sex"],
+            "marital_status": base["p_marital_status"],
+            "employment_status": base["p_employment_status"],
+            "student_status": base["p_student_status"],
+        },
+        "insurance": {
+            "insurer_name": base["cov_insurer_name"],
+            "plan_name": base["cov_plan_name"],
+            "insured_id": base["cov_insured_id"],
+            "insured_name": insured_name,
+            "relationship_to_insured": base["cov_relationship_to_insured"],
+            "policy_number": base["cov_policy_number"],
+            "group_number": base["cov_group_number"],
+            "other_health_plan_11d": base["cov_other_health_plan_11d"],
+            "insured_address": {
+                "address": base["cov_insured_address"],
+                "city": base["cov_insured_city"],
+                "state": base["cov_insured_state"],
+                "zip": base["cov_insured_zip"],
+            },
+        },
+        "diagnoses": diagnoses,
+        "services": services,
+        "totals": totals,
+        "provider": provider,
+    }
+
+    return snapshot
+
+
+def insert_snapshot_row(
+    cur,
+    claim_id: int,
+    version_number: int,
+    snapshot_json: str,
+    snapshot_hash: str,
+    snapshot: dict | None = None,
+) -> int:
+    """
+    INSERT de la fila del snapshot (único punto de escritura; lo usan
+    generate_cms1500_snapshot y submit_claims). Retorna el id.
+    snapshot: el dict ya armado (evita re-parsear snapshot_json).
+    """
+    values = {"claim_id": claim_id, "snapshot_json": snapshot_json, "snapshot_hash": snapshot_hash}
+
+    if has_column("cms1500_snapshots", "version_number"):
+        values["version_number"] = int(version_number)
+
+    # FASE P16: tamaño en bytes para el catálogo (sin leer snapshot_json)
+    if has_column("cms1500_snapshots", "payload_bytes"):
+        values["payload_bytes"] = len(snapshot_json.encode("utf-8"))
+
+    if snapshot is None:
+        snapshot = json.loads(snapshot_json)
+
+    # FASE P18: columnas resumen para listados / filtros
+    if has_snapshot_summary():
+        values.update(snapshot_summary(snapshot))
+
+    cur.execute(
+        f"""
+        INSERT INTO cms1500_snapshots ({", ".join(values)})
+        VALUES ({", ".join(["?"] * len(values))})
+        """,
+        tuple(values.values()),
+    )
+    snapshot_id = cur.lastrowid
+
+    # FASE P19: líneas 24A–24J normalizadas, misma transacción
+    if has_snapshot_service_lines():
+        insert_service_lines(cur, snapshot_id, claim_id, snapshot)
+
+    # FASE P22: hoja Merkle (O(log n) nodos), misma transacción
+    if has_snapshot_merkle():
+        append_merkle_leaves(cur)
+
+    return snapshot_id
+
+
+def build_cms1500_snapshot_payload(args: tuple) -> tuple[Dict[str, Any], str, str]:
+    """
+    (snapshot, snapshot_json, snapshot_hash). Top-level para ProcessPoolExecutor.
+    """
+    snapshot = build_cms1500_snapshot(*args)
+    snapshot_json = _canonical_json(snapshot)
+    return snapshot, snapshot_json, _sha256(snapshot_json)
+
+
+def _notify_snapshot_created(claim_id: int, snapshot_hash: str, snapshot: Dict[str, Any]) -> None:
+    for callback in _snapshot_listeners:
+        try:
+            callback(claim_id, snapshot_hash, snapshot)
+        except Exception:
+            pass
+
+
 def generate_cms1500_snapshot(claim_id: int) -> Dict[str, Any]:
     """
     Genera snapshot inmutable CMS-1500 para un claim y lo persiste con hash.
@@ -100,8 +485,7 @@ def generate_cms1500_snapshot(claim_id: int) -> Dict[str, Any]:
     - Si YA existen snapshots: requiere resubmission_code_22 y original_ref_no_22 en claims,
       entonces crea version_number = max(version_number) + 1
     """
-    conn = _conn()
-    try:
+    with unit_of_work() as conn:
         cur = conn.cursor()
 
         # =========================================================
@@ -119,10 +503,11 @@ def generate_cms1500_snapshot(claim_id: int) -> Dict[str, Any]:
         if not claim_row:
             raise ValueError("Claim no existe")
 
+        # FASE P17: versión del último snapshot desde el puntero
         cur.execute(
             """
             SELECT COALESCE(MAX(version_number), 0)
-            FROM cms1500_snapshots
+            FROM claim_latest_snapshot
             WHERE claim_id = ?
             """,
             (claim_id,),
@@ -139,78 +524,11 @@ def generate_cms1500_snapshot(claim_id: int) -> Dict[str, Any]:
         # -------------------------
         # Claim + Patient + Coverage
         # -------------------------
-        cur.execute(
-            """
-            SELECT
-                c.*,
-                p.first_name AS p_first_name,
-                p.last_name AS p_last_name,
-                p.date_of_birth AS p_dob,
-                p.sex AS p_sex,
-                p.marital_status AS p_marital_status,
-                p.employment_status AS p_employment_status,
-                p.student_status AS p_student_status,
-
-                cov.insurer_name AS cov_insurer_name,
-                cov.plan_name AS cov_plan_name,
-                cov.insured_id AS cov_insured_id,
-                cov.insured_first_name AS cov_insured_first_name,
-                cov.insured_last_name AS cov_insured_last_name,
-                cov.relationship_to_insured AS cov_relationship_to_insured,
-                cov.policy_number AS cov_policy_number,
-                cov.group_number AS cov_group_number,
-                cov.other_health_plan_11d AS cov_other_health_plan_11d,
-
-                cov.insured_address AS cov_insured_address,
-                cov.insured_city AS cov_insured_city,
-                cov.insured_state AS cov_insured_state,
-                cov.insured_zip AS cov_insured_zip
-            FROM claims c
-            JOIN patients p ON p.id = c.patient_id
-            JOIN coverages cov ON cov.id = c.coverage_id
-            WHERE c.id = ?
-            """,
-            (claim_id,),
-        )
+        cur.execute(SNAPSHOT_BASE_SQL + " WHERE c.id = ?", (claim_id,))
         base = cur.fetchone()
         if not base:
             raise ValueError("Claim no existe")
 
-        # -------------------------
-        # Provider settings (GLOBAL)
-        # -------------------------
-        cur.execute(
-            """
-            SELECT *
-            FROM provider_settings
-            WHERE active = 1
-            ORDER BY id DESC
-            LIMIT 1
-            """
-        )
-        ps = cur.fetchone()
-
-        provider = {
-            "signature": (ps["signature"] if ps else "Signature on File"),
-            "signature_date": (ps["signature_date"] if ps else None),
-            "facility": {
-                "name": (ps["facility_name"] if ps else None),
-                "address": (ps["facility_address"] if ps else None),
-                "city": (ps["facility_city"] if ps else None),
-                "state": (ps["facility_state"] if ps else None),
-                "zip": (ps["facility_zip"] if ps else None),
-            },
-            "billing": {
-                "name": (ps["billing_name"] if ps else None),
-                "npi": (ps["billing_npi"] if ps else None),
-                "tax_id": (ps["billing_tax_id"] if ps else None),
-                "address": (ps["billing_address"] if ps else None),
-                "city": (ps["billing_city"] if ps else None),
-                "state": (ps["billing_state"] if ps else None),
-                "zip": (ps["billing_zip"] if ps else None),
-            },
-        }
-
         # -------------------------
         # Services (24A–24J + 20)
         # -------------------------
@@ -223,238 +541,34 @@ def generate_cms1500_snapshot(claim_id: int) -> Dict[str, Any]:
             """,
             (claim_id,),
         )
-        service_rows = cur.fetchall()
-
-        # Detect “old vs new” column names (para no romper si cambió algo)
-        has_units = _table_has_column(conn, "services", "units")
-        has_units_24g = _table_has_column(conn, "services", "units_24g")
-        has_charge_amount_24f = _table_has_column(conn, "services", "charge_amount_24f")
-        has_diag_pointer_24e = _table_has_column(conn, "services", "diagnosis_pointer_24e")
-        has_diagnosis_code = _table_has_column(conn, "services", "diagnosis_code")
-
-        services = []
-        for s in service_rows:
-            units_val = None
-            if has_units_24g:
-                units_val = s["units_24g"]
-            elif has_units:
-                units_val = s["units"]
-
-            charge_val = None
-            if has_charge_amount_24f:
-                charge_val = s["charge_amount_24f"]
-
-            dx_pointer_val = None
-            if has_diag_pointer_24e:
-                dx_pointer_val = s["diagnosis_pointer_24e"]
-
-            diagnosis_code_val = None
-            if has_diagnosis_code:
-                diagnosis_code_val = s["diagnosis_code"]
-
-            services.append(
-                {
-                    "id": s["id"],
-                    "service_date": s["service_date"],
-                    "place_of_service_24b": (s["place_of_service_24b"] if "place_of_service_24b" in s.keys() else None),
-                    "emergency_24c": (s["emergency_24c"] if "emergency_24c" in s.keys() else 0),
-                    "cpt_code": s["cpt_code"],
-                    "modifiers": [
-                        (s["modifier1"] if "modifier1" in s.keys() else None),
-                        (s["modifier2"] if "modifier2" in s.keys() else None),
-                        (s["modifier3"] if "modifier3" in s.keys() else None),
-                        (s["modifier4"] if "modifier4" in s.keys() else None),
-                    ],
-                    "dx_pointer": dx_pointer_val,
-                    "diagnosis_code": diagnosis_code_val,
-                    "charge_amount_24f": charge_val,
-                    "units": units_val,
-                    "epsdt_24h": (s["epsdt_24h"] if "epsdt_24h" in s.keys() else None),
-                    "id_qualifier_24i": (s["id_qualifier_24i"] if "id_qualifier_24i" in s.keys() else None),
-                    "rendering_npi_24j": (s["rendering_npi_24j"] if "rendering_npi_24j" in s.keys() else None),
-                    "outside_lab_20": bool(s["outside_lab_20"]) if "outside_lab_20" in s.keys() else False,
-                    "lab_charges_20": (s["lab_charges_20"] if "lab_charges_20" in s.keys() else None),
-                }
-            )
-
-        # -------------------------
-        # Diagnoses (21 A–L)
-        # -------------------------
-        diagnoses = {k: None for k in list("ABCDEFGHIJKL")}
-
-        for idx, letter in enumerate("ABCDEFGHIJKL", start=1):
-            col = f"diagnosis_{idx}"
-            if _table_has_column(conn, "claims", col):
-                val = base[col]
-                diagnoses[letter] = val
-
-        if all(v is None for v in diagnoses.values()) and has_diagnosis_code:
-            for s in service_rows:
-                if s["diagnosis_code"]:
-                    diagnoses["A"] = s["diagnosis_code"]
-                    break
-
-        # -------------------------
-        # Totals 28–30 (finanzas)
-        # -------------------------
-        cur.execute(
-            """
-            SELECT amount
-            FROM charges
-            WHERE service_id IN (SELECT id FROM services WHERE claim_id = ?)
-            """,
-            (claim_id,),
-        )
-        charge_rows = cur.fetchall()
-        if charge_rows:
-            total_charge = _sum_float(charge_rows, "amount")
-        else:
-            total_charge = 0.0
-            for s in services:
-                if s.get("charge_amount_24f") is not None:
-                    total_charge += float(s["charge_amount_24f"])
-
-        cur.execute(
-            """
-            SELECT amount_applied
-            FROM applications
-            WHERE charge_id IN (
-                SELECT id FROM charges
-                WHERE service_id IN (SELECT id FROM services WHERE claim_id = ?)
-            )
-            """,
-            (claim_id,),
+        service_rows = [dict(r) for r in cur.fetchall()]
+
+        snapshot = build_cms1500_snapshot(
+            dict(base),
+            service_rows,
+            get_active_provider_settings(cur),
+            get_financial_totals(cur, [claim_id])[claim_id],
+            version_number,
+            datetime.utcnow().isoformat(),
+            snapshot_columns(),
         )
-        app_rows = cur.fetchall()
-        amount_paid = _sum_float(app_rows, "amount_applied")
-
-        cur.execute(
-            """
-            SELECT amount
-            FROM adjustments
-            WHERE charge_id IN (
-                SELECT id FROM charges
-                WHERE service_id IN (SELECT id FROM services WHERE claim_id = ?)
-            )
-            """,
-            (claim_id,),
-        )
-        adj_rows = cur.fetchall()
-        adjustments_total = _sum_float(adj_rows, "amount")
-
-        balance_due = float(total_charge - amount_paid - adjustments_total)
-
-        totals = {
-            "total_charge": float(round(total_charge, 2)),
-            "amount_paid": float(round(amount_paid, 2)),
-            "total_adjustments": float(round(adjustments_total, 2)),
-            "balance_due": float(round(balance_due, 2)),
-        }
-
-        # -------------------------
-        # Snapshot object (1–33)
-        # -------------------------
-        insured_name = " ".join(
-            [
-                (base["cov_insured_first_name"] or "").strip(),
-                (base["cov_insured_last_name"] or "").strip(),
-            ]
-        ).strip() or None
-
-        snapshot = {
-            "meta": {
-                "claim_id": base["id"],
-                "created_at": datetime.utcnow().isoformat(),
-                "version": "B1",
-                "version_number": version_number,
-            },
-            "claim": {
-                "id": base["id"],
-                "patient_id": base["patient_id"],
-                "coverage_id": base["coverage_id"],
-                "claim_number": base["claim_number"],
-                "status": base["status"],
-                "related_employment_10a": base["related_employment_10a"] if "related_employment_10a" in base.keys() else 0,
-                "related_auto_10b": base["related_auto_10b"] if "related_auto_10b" in base.keys() else 0,
-                "related_other_10c": base["related_other_10c"] if "related_other_10c" in base.keys() else 0,
-                "related_state_10d": base["related_state_10d"] if "related_state_10d" in base.keys() else None,
-                "date_current_illness_14": base["date_current_illness_14"] if "date_current_illness_14" in base.keys() else None,
-                "other_date_15": base["other_date_15"] if "other_date_15" in base.keys() else None,
-                "unable_work_from_16": base["unable_work_from_16"] if "unable_work_from_16" in base.keys() else None,
-                "unable_work_to_16": base["unable_work_to_16"] if "unable_work_to_16" in base.keys() else None,
-                "referring_provider_name_17": base["referring_provider_name"] if "referring_provider_name" in base.keys() else None,
-                "referring_provider_npi_17": base["referring_provider_npi"] if "referring_provider_npi" in base.keys() else None,
-                "hosp_from_18": base["hosp_from_18"] if "hosp_from_18" in base.keys() else None,
-                "hosp_to_18": base["hosp_to_18"] if "hosp_to_18" in base.keys() else None,
-                "reserved_local_use_19": base["reserved_local_use_19"] if "reserved_local_use_19" in base.keys() else None,
-                "resubmission_code_22": base["resubmission_code_22"] if "resubmission_code_22" in base.keys() else None,
-                "original_ref_no_22": base["original_ref_no_22"] if "original_ref_no_22" in base.keys() else None,
-                "prior_authorization_23": base["prior_authorization_23"] if "prior_authorization_23" in base.keys() else None,
-                "patient_account_no_26": base["patient_account_no_26"] if "patient_account_no_26" in base.keys() else None,
-                "accept_assignment_27": base["accept_assignment_27"] if "accept_assignment_27" in base.keys() else 1,
-            },
-            "patient": {
-                "first_name": base["p_first_name"],
-                "last_name": base["p_last_name"],
-                "date_of_birth": base["p_dob"],
-                "sex": base["p_sex"],
-                "marital_status": base["p_marital_status"],
-                "employment_status": base["p_employment_status"],
-                "student_status": base["p_student_status"],
-            },
-            "insurance": {
-                "insurer_name": base["cov_insurer_name"],
-                "plan_name": base["cov_plan_name"],
-                "insured_id": base["cov_insured_id"],
-                "insured_name": insured_name,
-                "relationship_to_insured": base["cov_relationship_to_insured"],
-                "policy_number": base["cov_policy_number"],
-                "group_number": base["cov_group_number"],
-                "other_health_plan_11d": base["cov_other_health_plan_11d"],
-                "insured_address": {
-                    "address": base["cov_insured_address"],
-                    "city": base["cov_insured_city"],
-                    "state": base["cov_insured_state"],
-                    "zip": base["cov_insured_zip"],
-                },
-            },
-            "diagnoses": diagnoses,
-            "services": services,
-            "totals": totals,
-            "provider": provider,
-        }
 
         snapshot_json = _canonical_json(snapshot)
         snapshot_hash = _sha256(snapshot_json)
 
-        has_version_number_col = _table_has_column(conn, "cms1500_snapshots", "version_number")
+        insert_snapshot_row(cur, claim_id, int(version_number), snapshot_json, snapshot_hash, snapshot)
 
-        if has_version_number_col:
-            cur.execute(
-                """
-                INSERT INTO cms1500_snapshots (claim_id, version_number, snapshot_json, snapshot_hash)
-                VALUES (?, ?, ?, ?)
-                """,
-                (claim_id, int(version_number), snapshot_json, snapshot_hash),
-            )
-        else:
-            cur.execute(
-                """
-                INSERT INTO cms1500_snapshots (claim_id, snapshot_json, snapshot_hash)
-                VALUES (?, ?, ?)
-                """,
-                (claim_id, snapshot_json, snapshot_hash),
-            )
-
-        conn.commit()
-
-        log_event(
+        append_event(
+            cur,
             entity_type="claim",
             entity_id=claim_id,
             event_type="snapshot_created",
             event_data={"snapshot_hash": snapshot_hash, "version_number": int(version_number)},
         )
 
+        # Listeners (FASE P12) solo cuando el snapshot ya está confirmado
+        after_commit(lambda: _notify_snapshot_created(claim_id, snapshot_hash, snapshot))
+
         # Compat tests: r["hash"] y r["snapshot_hash"]
         return {
             "snapshot": snapshot,
@@ -463,9 +577,6 @@ def generate_cms1500_snapshot(claim_id: int) -> Dict[str, Any]:
             "version_number": int(version_number),
         }
 
-    finally:
-        conn.close()
-
 
 # ============================================================
 # FASE G29 — Snapshot Index / Listing Layer (READ-ONLY)
@@ -479,7 +590,7 @@ def list_snapshots_admin() -> list[dict]:
     conn = _conn()
     try:
         cur = conn.cursor()
-        has_version_number = _table_has_column(conn, "cms1500_snapshots", "version_number")
+        has_version_number = has_column("cms1500_snapshots", "version_number")
 
         if has_version_number:
             cur.execute(
@@ -533,6 +644,86 @@ def list_snapshots_admin() -> list[dict]:
         conn.close()
 
 
+# ============================================================
+# FASE P16 — Catálogo de snapshots (solo metadatos, keyset)
+# ============================================================
+# Nunca lee snapshot_json: el tamaño sale de payload_bytes.
+# - Índice global: keyset por id descendente (WHERE s.id < before_id),
+#   recorre la PK sin OFFSET.
+# - Por claim: usa idx_snapshot_claim_version (claim_id, version_number).
+
+SNAPSHOT_CATALOG_PAGE_SIZE = 50
+SNAPSHOT_CATALOG_MAX_PAGE_SIZE = 500
+
+
+def _catalog_select() -> str:
+    columns = [
+        "s.id",
+        "s.claim_id",
+        "s.version_number" if has_column("cms1500_snapshots", "version_number") else "NULL AS version_number",
+        "s.snapshot_hash",
+        "s.created_at",
+        "s.payload_bytes" if has_column("cms1500_snapshots", "payload_bytes") else "NULL AS payload_bytes",
+        "c.claim_number",
+        "c.status AS claim_status",
+    ]
+    # FASE P18: resumen (totales, paciente, fechas) sin parsear el JSON
+    if has_snapshot_summary():
+        columns.extend(f"s.{col}" for col in SNAPSHOT_SUMMARY_COLUMNS)
+    return f"""
+        SELECT {", ".join(columns)}
+        FROM cms1500_snapshots s
+        JOIN claims c ON c.id = s.claim_id
+    """
+
+
+def _catalog_item(r) -> dict:
+    item = dict(r)
+    # Compat con list_snapshots_admin (templates usan snapshot_id)
+    item["snapshot_id"] = item["id"]
+    item["locked"] = True
+    return item
+
+
+def list_snapshot_catalog(before_id: int | None = None, limit: int = SNAPSHOT_CATALOG_PAGE_SIZE) -> dict:
+    """
+    Una página del índice global, del más nuevo al más viejo.
+
+    Retorna {"items": [...], "next_before_id": int | None}.
+    Para la página siguiente se pasa before_id = next_before_id.
+    """
+    limit = max(1, min(int(limit), SNAPSHOT_CATALOG_MAX_PAGE_SIZE))
+
+    with get_connection() as conn:
+        cur = conn.cursor()
+        if before_id is not None:
+            cur.execute(
+                _catalog_select() + " WHERE s.id < ? ORDER BY s.id DESC LIMIT ?",
+                (int(before_id), limit + 1),
+            )
+        else:
+            cur.execute(_catalog_select() + " ORDER BY s.id DESC LIMIT ?", (limit + 1,))
+        rows = cur.fetchall()
+
+    items = [_catalog_item(r) for r in rows[:limit]]
+    return {
+        "items": items,
+        "next_before_id": items[-1]["id"] if len(rows) > limit else None,
+    }
+
+
+def list_claim_snapshots(claim_id: int) -> list[dict]:
+    """
+    Snapshots de un claim (metadatos), versión más alta primero.
+    """
+    order = "s.version_number DESC, s.id DESC" if has_column("cms1500_snapshots", "version_number") else "s.id DESC"
+
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(_catalog_select() + f" WHERE s.claim_id = ? ORDER BY {order}", (claim_id,))
+        return [_catalog_item(r) for r in cur.fetchall()]
+
+
 # ============================================================
 # FASE G31 — Snapshot Detail (READ-ONLY)
 # ============================================================
@@ -546,12 +737,12 @@ def get_snapshot_by_id(snapshot_id: int) -> Optional[Dict[str, Any]]:
     conn = _conn()
     try:
         cur = conn.cursor()
-        has_version_number = _table_has_column(conn, "cms1500_snapshots", "version_number")
+        has_version_number = has_column("cms1500_snapshots", "version_number")
 
         if has_version_number:
             cur.execute(
                 """
-                SELECT id, claim_id, version_number, snapshot_json, snapshot_hash, created_at
+                SELECT id, claim_id, version_number, snapshot_hash, created_at
                 FROM cms1500_snapshots
                 WHERE id = ?
                 """,
@@ -560,7 +751,7 @@ def get_snapshot_by_id(snapshot_id: int) -> Optional[Dict[str, Any]]:
         else:
             cur.execute(
                 """
-                SELECT id, claim_id, snapshot_json, snapshot_hash, created_at
+                SELECT id, claim_id, snapshot_hash, created_at
                 FROM cms1500_snapshots
                 WHERE id = ?
                 """,
@@ -571,7 +762,8 @@ def get_snapshot_by_id(snapshot_id: int) -> Optional[Dict[str, Any]]:
         if not row:
             return None
 
-        payload = json.loads(row["snapshot_json"])
+        # FASE P15: parseado una vez por proceso (solo lectura)
+        payload = load_snapshot(cur, row["id"], row["snapshot_hash"])
 
         out = {
             "id": row["id"],
@@ -590,6 +782,108 @@ def get_snapshot_by_id(snapshot_id: int) -> Optional[Dict[str, Any]]:
         conn.close()
 
 
+# ============================================================
+# FASE P20 — Proyección de campos en SQL (JSON1)
+# ============================================================
+# fields=["totals", "services", "patient.last_name"]: SQLite arma un
+# json_object solo con esos subárboles (json_extract sobre snapshot_json),
+# así a Python cruza el pedazo pedido y no el documento entero.
+# Un campo inexistente vuelve como null.
+
+SNAPSHOT_PROJECTION_MAX_FIELDS = 20
+SNAPSHOT_PROJECTION_MAX_IDS = 500
+
+# Segmentos identificador, con índice opcional: services[0].cpt_code
+_FIELD_PATH = re.compile(r"^[A-Za-z_]\w*(\[\d+\])?(\.[A-Za-z_]\w*(\[\d+\])?)*$")
+
+
+def parse_snapshot_fields(fields) -> list[str]:
+    """
+    Normaliza fields ("a,b" o lista) a una lista sin repetidos.
+    ValueError si algún campo no es un path válido.
+    """
+    if isinstance(fields, str):
+        fields = fields.split(",")
+
+    out = []
+    for f in fields or []:
+        f = f.strip()
+        if not f or f in out:
+            continue
+        if not _FIELD_PATH.match(f):
+            raise ValueError(f"Campo inválido: {f}")
+        out.append(f)
+
+    if not out:
+        raise ValueError("Indique al menos un campo")
+    if len(out) > SNAPSHOT_PROJECTION_MAX_FIELDS:
+        raise ValueError(f"Máximo {SNAPSHOT_PROJECTION_MAX_FIELDS} campos")
+    return out
+
+
+def _projection_select(fields: list[str]) -> tuple[str, list]:
+    pairs = ", ".join("?, json_extract(s.snapshot_json, ?)" for _ in fields)
+    params = []
+    for f in fields:
+        params.extend((f, "$." + f))
+
+    version = "s.version_number" if has_column("cms1500_snapshots", "version_number") else "NULL AS version_number"
+    sql = f"""
+        SELECT s.id, s.claim_id, {version}, s.snapshot_hash, s.created_at,
+               json_object({pairs}) AS projection
+        FROM cms1500_snapshots s
+    """
+    return sql, params
+
+
+def _projection_item(r) -> dict:
+    out = {
+        "id": r["id"],
+        "claim_id": r["claim_id"],
+        "snapshot": json.loads(r["projection"]),
+        "snapshot_hash": r["snapshot_hash"],
+        "created_at": r["created_at"],
+        "locked": True,
+    }
+    if r["version_number"] is not None:
+        out["version_number"] = r["version_number"]
+    return out
+
+
+def get_snapshot_projection(snapshot_id: int, fields) -> Optional[Dict[str, Any]]:
+    """
+    Como get_snapshot_by_id, pero "snapshot" trae solo los campos pedidos.
+    """
+    fields = parse_snapshot_fields(fields)
+    sql, params = _projection_select(fields)
+
+    with get_connection() as conn:
+        row = conn.execute(sql + " WHERE s.id = ?", (*params, int(snapshot_id))).fetchone()
+
+    return _projection_item(row) if row else None
+
+
+def get_snapshots_projection(snapshot_ids: list[int], fields) -> Dict[int, Dict[str, Any]]:
+    """
+    Proyección para varios snapshots en una consulta: {snapshot_id: item}.
+    Los ids inexistentes no aparecen en el resultado.
+    """
+    fields = parse_snapshot_fields(fields)
+    ids = list(dict.fromkeys(int(i) for i in snapshot_ids))
+    if len(ids) > SNAPSHOT_PROJECTION_MAX_IDS:
+        raise ValueError(f"Máximo {SNAPSHOT_PROJECTION_MAX_IDS} snapshots por consulta")
+    if not ids:
+        return {}
+
+    sql, params = _projection_select(fields)
+    q_marks = ",".join(["?"] * len(ids))
+
+    with get_connection() as conn:
+        rows = conn.execute(sql + f" WHERE s.id IN ({q_marks})", (*params, *ids)).fetchall()
+
+    return {r["id"]: _projection_item(r) for r in rows}
+
+
 # ============================================================
 # FASE G32 — Snapshot Integrity Verification (READ-ONLY)
 # ============================================================
@@ -598,10 +892,10 @@ def verify_snapshot_integrity(snapshot_id: int) -> dict:
     """
     Recalcula el hash del snapshot_json almacenado
     y lo compara con el snapshot_hash persistido.
-    No modifica snapshot. Solo registra auditoría en event_ledger.
+    No modifica snapshot. Solo registra auditoría en event_ledger
+    (evento de lectura, FASE P24).
     """
-    conn = _conn()
-    try:
+    with get_connection() as conn:
         cur = conn.cursor()
 
         cur.execute(
@@ -623,35 +917,32 @@ def verify_snapshot_integrity(snapshot_id: int) -> dict:
         recalculated_hash = _sha256(stored_json)
         match = stored_hash == recalculated_hash
 
-        if match:
-            log_event(
-                entity_type="claim",
-                entity_id=row["claim_id"],
-                event_type="snapshot_integrity_verified",
-                event_data={
-                    "snapshot_id": row["id"],
-                    "hash": stored_hash,
-                },
-            )
-        else:
-            log_event(
-                entity_type="claim",
-                entity_id=row["claim_id"],
-                event_type="snapshot_integrity_failed",
-                event_data={
-                    "snapshot_id": row["id"],
-                    "expected_hash": stored_hash,
-                    "recalculated_hash": recalculated_hash,
-                },
-            )
-
-        return {
-            "snapshot_id": row["id"],
-            "claim_id": row["claim_id"],
-            "stored_hash": stored_hash,
-            "recalculated_hash": recalculated_hash,
-            "match": match,
-        }
+    if match:
+        log_read_event(
+            entity_type="claim",
+            entity_id=row["claim_id"],
+            event_type="snapshot_integrity_verified",
+            event_data={
+                "snapshot_id": row["id"],
+                "hash": stored_hash,
+            },
+        )
+    else:
+        log_read_event(
+            entity_type="claim",
+            entity_id=row["claim_id"],
+            event_type="snapshot_integrity_failed",
+            event_data={
+                "snapshot_id": row["id"],
+                "expected_hash": stored_hash,
+                "recalculated_hash": recalculated_hash,
+            },
+        )
 
-    finally:
-        conn.close()
\ No newline at end of file
+    return {
+        "snapshot_id": row["id"],
+        "claim_id": row["claim_id"],
+        "stored_hash": stored_hash,
+        "recalculated_hash": recalculated_hash,
+        "match": match,
+    }
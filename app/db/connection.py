@@ -1,8 +1,375 @@
 import sqlite3
-from app.config import DB_PATH
+import threading
+from contextlib import contextmanager
 
+from flask import g, has_request_context, request
 
-def get_connection():
-    conn = sqlite3.connect(DB_PATH)
+from app.config import (
+    DB_PATH,
+    DB_POOL_SIZE,
+    DB_BUSY_TIMEOUT_MS,
+    DB_MMAP_SIZE,
+    DB_CACHE_SIZE_KB,
+    DB_STATEMENT_CACHE_SIZE,
+)
+
+
+# ============================================================
+# FASE P1 — Pool de conexiones SQLite por thread
+# ============================================================
+# sqlite3 no permite compartir conexiones entre threads, así que cada
+# thread mantiene su propia lista de conexiones inactivas (acotada por
+# DB_POOL_SIZE). Cada conexión se configura UNA sola vez al crearse.
+
+_local = threading.local()
+_schema_checked = False
+
+
+def _idle_connections() -> list:
+    idle = getattr(_local, "idle", None)
+    if idle is None:
+        idle = []
+        _local.idle = idle
+    return idle
+
+
+def _open_connection() -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        DB_PATH,
+        timeout=DB_BUSY_TIMEOUT_MS / 1000.0,
+        cached_statements=DB_STATEMENT_CACHE_SIZE,
+    )
     conn.row_factory = sqlite3.Row
+
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA busy_timeout = {int(DB_BUSY_TIMEOUT_MS)}")
+    conn.execute(f"PRAGMA mmap_size = {int(DB_MMAP_SIZE)}")
+    conn.execute(f"PRAGMA cache_size = -{int(DB_CACHE_SIZE_KB)}")
+    conn.execute("PRAGMA foreign_keys = ON")
+
+    _ensure_runtime_schema(conn)
     return conn
+
+
+def _ensure_runtime_schema(conn: sqlite3.Connection) -> None:
+    """
+    Una vez por proceso: aplica las migraciones pendientes (FASE P9).
+    Si la DB aún no tiene schema base, se reintenta en la próxima conexión.
+    """
+    global _schema_checked
+    if _schema_checked:
+        return
+
+    from app.db.migrations import has_base_schema, run_migrations
+
+    if has_base_schema(conn):
+        run_migrations(conn)
+        _schema_checked = True
+
+
+def _acquire() -> sqlite3.Connection:
+    idle = _idle_connections()
+    if idle:
+        return idle.pop()
+    return _open_connection()
+
+
+def _release(conn: sqlite3.Connection) -> None:
+    """
+    Devuelve la conexión al pool del thread.
+    Cualquier transacción no confirmada se descarta (igual que close()).
+    """
+    try:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.row_factory = sqlite3.Row
+    except sqlite3.Error:
+        conn.close()
+        return
+
+    idle = _idle_connections()
+    if len(idle) < DB_POOL_SIZE:
+        idle.append(conn)
+    else:
+        conn.close()
+
+
+class PooledConnection:
+    """
+    Envoltura de sqlite3.Connection prestada del pool.
+
+    Se comporta como la conexión original:
+    - `with get_connection() as conn:` hace commit/rollback al salir
+    - conn.close() (o salir del `with`) la devuelve al pool en vez de cerrarla
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def _raw(self) -> sqlite3.Connection:
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return self._conn
+
+    def __getattr__(self, name):
+        return getattr(self._raw(), name)
+
+    @property
+    def row_factory(self):
+        return self._raw().row_factory
+
+    @row_factory.setter
+    def row_factory(self, value):
+        self._raw().row_factory = value
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._raw().commit()
+            else:
+                self._raw().rollback()
+        finally:
+            self.close()
+        return False
+
+    def close(self) -> None:
+        conn = self._conn
+        if conn is None:
+            return
+        self._conn = None
+        _release(conn)
+
+
+# ============================================================
+# FASE P2 — Conexión compartida por request / unidad de trabajo
+# ============================================================
+# Dentro de un request de Flask (o de un `with unit_of_work()`), todos los
+# helpers de app/db reciben la MISMA conexión y corren dentro de UNA sola
+# transacción. Cada `with get_connection() as conn:` interno se convierte en
+# un SAVEPOINT, así un helper que falla deshace solo su parte.
+
+READ_ONLY_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class ScopedConnection:
+    """
+    Conexión ligada a un request o a una unidad de trabajo explícita.
+
+    - commit() y close() de los helpers no tienen efecto:
+      el dueño del scope confirma (o descarta) todo al final.
+    - `with conn:` abre un SAVEPOINT anidado.
+    - after_commit(): callbacks que corren solo si el scope se confirma
+      (los de un SAVEPOINT deshecho se descartan con él).
+    """
+
+    def __init__(self, conn: sqlite3.Connection, write: bool):
+        self._conn = conn
+        self._depth = 0
+        self._after_commit = []  # (profundidad del SAVEPOINT, callback)
+        self.write = write
+        conn.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+
+    def _raw(self) -> sqlite3.Connection:
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return self._conn
+
+    def __getattr__(self, name):
+        return getattr(self._raw(), name)
+
+    @property
+    def row_factory(self):
+        return self._raw().row_factory
+
+    @row_factory.setter
+    def row_factory(self, value):
+        self._raw().row_factory = value
+
+    def __enter__(self):
+        self._depth += 1
+        self._raw().execute(f"SAVEPOINT scope_{self._depth}")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        depth = self._depth
+        self._depth -= 1
+        conn = self._raw()
+        if exc_type is not None:
+            conn.execute(f"ROLLBACK TO scope_{depth}")
+            self._discard_after_commit(depth)
+        conn.execute(f"RELEASE scope_{depth}")
+        # Lo confirmado en el SAVEPOINT pasa a depender del nivel de arriba
+        self._after_commit = [(min(d, self._depth), cb) for d, cb in self._after_commit]
+        return False
+
+    def after_commit(self, callback) -> None:
+        self._after_commit.append((self._depth, callback))
+
+    def _discard_after_commit(self, depth: int) -> None:
+        self._after_commit = [(d, cb) for d, cb in self._after_commit if d < depth]
+
+    def commit(self) -> None:
+        pass
+
+    def rollback(self) -> None:
+        conn = self._raw()
+        if self._depth:
+            conn.execute(f"ROLLBACK TO scope_{self._depth}")
+            self._discard_after_commit(self._depth)
+        else:
+            conn.rollback()
+            self._after_commit = []
+            conn.execute("BEGIN IMMEDIATE" if self.write else "BEGIN")
+
+    def close(self) -> None:
+        pass
+
+    def detach(self) -> sqlite3.Connection:
+        conn = self._raw()
+        self._conn = None
+        return conn
+
+
+def _finish_scope(scope: ScopedConnection, commit: bool) -> None:
+    callbacks = [cb for _, cb in scope._after_commit]
+    conn = scope.detach()
+    try:
+        if commit:
+            conn.commit()
+        else:
+            conn.rollback()
+    finally:
+        _release(conn)
+
+    if commit:
+        for callback in callbacks:
+            callback()
+
+
+def _current_scope() -> ScopedConnection | None:
+    scope = getattr(_local, "unit_of_work", None)
+    if scope is not None:
+        return scope
+
+    if not has_request_context():
+        return None
+
+    scope = g.get("_db_scope")
+    if scope is None:
+        scope = ScopedConnection(_acquire(), write=request.method not in READ_ONLY_METHODS)
+        g._db_scope = scope
+    return scope
+
+
+def get_connection():
+    scope = _current_scope()
+    if scope is not None:
+        return scope
+    return PooledConnection(_acquire())
+
+
+def in_write_transaction() -> bool:
+    """
+    True si el thread actual tiene abierta una transacción de escritura
+    (unit_of_work o request fuera de READ_ONLY_METHODS).
+    """
+    scope = _current_scope()
+    return scope is not None and scope.write
+
+
+def after_commit(callback) -> None:
+    """
+    Corre callback() cuando se confirme la transacción del scope actual
+    (request o unidad de trabajo); se descarta si se hace rollback.
+    Sin scope no hay transacción pendiente: corre ya.
+    """
+    scope = _current_scope()
+    if scope is None:
+        callback()
+    else:
+        scope.after_commit(callback)
+
+
+@contextmanager
+def unit_of_work(write: bool = True):
+    """
+    Agrupa varias llamadas a app/db en una sola transacción.
+
+    Si ya existe un scope (request o unidad de trabajo externa),
+    se anida como SAVEPOINT dentro de él.
+    """
+    scope = _current_scope()
+    if scope is not None:
+        with scope:
+            yield scope
+        return
+
+    scope = ScopedConnection(_acquire(), write=write)
+    _local.unit_of_work = scope
+    try:
+        yield scope
+    except BaseException:
+        _local.unit_of_work = None
+        _finish_scope(scope, commit=False)
+        raise
+    _local.unit_of_work = None
+    _finish_scope(scope, commit=True)
+
+
+@contextmanager
+def separate_transaction():
+    """
+    Transacción de escritura en otra conexión del pool, aunque el thread
+    tenga un scope abierto (FASE P24). Pensada para escribir desde un
+    request de lectura sin convertir su transacción en escritura.
+
+    No se registra como scope: solo escribe quien usa la conexión recibida.
+    Llamarla con una transacción de escritura abierta en el mismo thread
+    espera el lock hasta DB_BUSY_TIMEOUT_MS y falla.
+    """
+    scope = ScopedConnection(_acquire(), write=True)
+    try:
+        yield scope
+    except BaseException:
+        _finish_scope(scope, commit=False)
+        raise
+    _finish_scope(scope, commit=True)
+
+
+def commit_request_connection(response):
+    # Una respuesta de error (4xx/5xx) descarta todo lo escrito en el request:
+    # un route que corta a mitad de camino no deja escrituras parciales
+    scope = g.pop("_db_scope", None)
+    if scope is not None:
+        _finish_scope(scope, commit=response.status_code < 400)
+    return response
+
+
+def discard_request_connection(exc=None) -> None:
+    scope = g.pop("_db_scope", None)
+    if scope is not None:
+        _finish_scope(scope, commit=False)
+
+
+def init_app(app) -> None:
+    """
+    Registra el ciclo de vida de la conexión por request:
+    commit antes de enviar una respuesta < 400, rollback si la respuesta
+    es de error o el request falla.
+    """
+    app.after_request(commit_request_connection)
+    app.teardown_request(discard_request_connection)
+
+
+def close_thread_connections() -> None:
+    """
+    Cierra las conexiones inactivas del thread actual.
+    Útil al apagar workers o en scripts que reemplazan el archivo DB.
+    """
+    idle = _idle_connections()
+    while idle:
+        idle.pop().close()
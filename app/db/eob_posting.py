@@ -0,0 +1,222 @@
+import math
+from datetime import datetime
+
+from app.db.connection import unit_of_work
+from app.db.balances import get_charge_balances
+from app.db.payments import get_payment_balances
+from app.db.event_ledger import append_event, append_events, ledger_event
+from app.db.financial_lock import freeze_guard
+
+
+# ============================================================
+# FASE P6 — Posteo de EOB por lote
+# ============================================================
+# Un remittance completo (un payment + N líneas) se valida con consultas
+# set-based y se inserta con executemany en UNA transacción.
+# Todo el EOB entra o no entra nada.
+
+
+def _normalize_lines(lines) -> tuple[list[dict], list[str]]:
+    normalized = []
+    errors = []
+
+    for idx, line in enumerate(lines, start=1):
+        try:
+            charge_id = int(line["charge_id"])
+        except (KeyError, TypeError, ValueError):
+            errors.append(f"Línea {idx}: charge_id inválido")
+            continue
+
+        amount_applied = float(line.get("amount_applied") or 0)
+        if not math.isfinite(amount_applied):
+            errors.append(f"Línea {idx}: amount_applied debe ser un número finito")
+        elif amount_applied < 0:
+            errors.append(f"Línea {idx}: amount_applied no puede ser negativo")
+
+        adjustments = []
+        for adj in line.get("adjustments") or []:
+            amount = float(adj.get("amount") or 0)
+            reason = (adj.get("reason") or "").strip()
+            if not math.isfinite(amount):
+                errors.append(f"Línea {idx}: adjustment amount debe ser un número finito")
+            elif amount <= 0:
+                errors.append(f"Línea {idx}: adjustment amount debe ser > 0")
+            if not reason:
+                errors.append(f"Línea {idx}: adjustment reason es obligatorio")
+            adjustments.append({"amount": amount, "reason": reason})
+
+        if amount_applied == 0 and not adjustments:
+            errors.append(f"Línea {idx}: sin monto aplicado ni adjustments")
+
+        normalized.append(
+            {
+                "line": idx,
+                "charge_id": charge_id,
+                "amount_applied": amount_applied,
+                "adjustments": adjustments,
+            }
+        )
+
+    return normalized, errors
+
+
+def post_eob(payment_id: int | None, lines: list[dict]) -> dict:
+    """
+    Postea un EOB completo contra un payment existente.
+    Con payment_id=None solo se aceptan líneas de ajuste (amount_applied 0),
+    p. ej. un 835 con BPR02 = 0 que solo trae denegaciones / CAS.
+
+    lines: [
+        {
+            "charge_id": int,
+            "amount_applied": float,            # 0 si solo hay ajustes
+            "adjustments": [{"amount": float, "reason": str}, ...],
+        },
+        ...
+    ]
+
+    VALIDACIONES (todas las líneas juntas):
+    - Payment debe existir y cubrir la suma de amount_applied.
+    - Cada charge debe existir y su claim no puede estar congelado por snapshot.
+    - La suma aplicada a un charge no supera su balance actual.
+      Los adjustments no tienen tope (igual que create_adjustment).
+
+    Si algo falla se lanza ValueError con TODOS los errores y no se inserta nada.
+    Para crear el payment en la misma transacción:
+        with unit_of_work():
+            pid = create_payment(...)
+            post_eob(pid, lines)
+    """
+    if not lines:
+        raise ValueError("El EOB no tiene líneas")
+
+    normalized, errors = _normalize_lines(lines)
+    if payment_id is None and any(line["amount_applied"] > 0 for line in normalized):
+        errors.append("Sin payment solo se pueden postear adjustments")
+    if errors:
+        raise ValueError("; ".join(errors))
+
+    now = datetime.utcnow().isoformat()
+    charge_ids = sorted({line["charge_id"] for line in normalized})
+
+    with unit_of_work() as conn:
+        cur = conn.cursor()
+
+        # =========================
+        # 1. Payment disponible
+        # =========================
+        total_applied = sum(line["amount_applied"] for line in normalized)
+
+        if payment_id is not None:
+            payment = get_payment_balances([payment_id]).get(int(payment_id))
+            if not payment:
+                raise ValueError("Payment no existe")
+
+            if round(total_applied, 2) > round(payment["remaining"], 2):
+                raise ValueError(
+                    f"No hay suficiente monto disponible en el payment "
+                    f"(disponible={payment['remaining']:.2f}, EOB={total_applied:.2f})"
+                )
+
+        # =========================
+        # 2. Charges + balances (una consulta)
+        # =========================
+        balances = get_charge_balances(charge_ids=charge_ids)
+
+        for charge_id in charge_ids:
+            if charge_id not in balances:
+                errors.append(f"Charge no existe: {charge_id}")
+
+        # =========================
+        # 3. Bloqueo financiero (una consulta)
+        # =========================
+        claim_ids = sorted({b["claim_id"] for b in balances.values()})
+        if claim_ids:
+            q_marks = ",".join(["?"] * len(claim_ids))
+            cur.execute(
+                f"""
+                SELECT claim_id
+                FROM claim_latest_snapshot
+                WHERE claim_id IN ({q_marks})
+                """,
+                tuple(claim_ids),
+            )
+            for row in cur.fetchall():
+                errors.append(f"Claim está congelado por snapshot: {row['claim_id']}")
+
+        # =========================
+        # 4. Balance por charge (agregado por charge)
+        # =========================
+        applied_by_charge: dict[int, float] = {}
+        for line in normalized:
+            applied_by_charge[line["charge_id"]] = applied_by_charge.get(line["charge_id"], 0.0) + line["amount_applied"]
+
+        for charge_id, applied in applied_by_charge.items():
+            balance = balances.get(charge_id)
+            if balance and round(applied, 2) > round(balance["balance"], 2):
+                errors.append(
+                    f"No se puede aplicar más del balance actual del charge {charge_id} "
+                    f"(balance={balance['balance']:.2f}, EOB={applied:.2f})"
+                )
+
+        if errors:
+            raise ValueError("; ".join(errors))
+
+        # =========================
+        # 5. Inserts por lote
+        # =========================
+        application_rows = [
+            (int(payment_id), line["charge_id"], line["amount_applied"], now)
+            for line in normalized
+            if line["amount_applied"] > 0
+        ]
+        adjustment_rows = [
+            (line["charge_id"], adj["amount"], adj["reason"], now)
+            for line in normalized
+            for adj in line["adjustments"]
+        ]
+
+        with freeze_guard():
+            cur.executemany(
+                """
+                INSERT INTO applications (payment_id, charge_id, amount_applied, created_at)
+                VALUES (?, ?, ?, ?)
+                """,
+                application_rows,
+            )
+            cur.executemany(
+                """
+                INSERT INTO adjustments (charge_id, amount, reason, created_at)
+                VALUES (?, ?, ?, ?)
+                """,
+                adjustment_rows,
+            )
+
+        total_adjusted = sum(row[1] for row in adjustment_rows)
+
+        # =========================
+        # 6. Un solo evento de ledger (uno por claim si no hay payment)
+        # =========================
+        event_data = {
+            "lines": len(normalized),
+            "applications": len(application_rows),
+            "adjustments": len(adjustment_rows),
+            "total_applied": round(total_applied, 2),
+            "total_adjusted": round(total_adjusted, 2),
+            "charge_ids": charge_ids,
+            "claim_ids": claim_ids,
+        }
+        if payment_id is not None:
+            append_event(cur, "payment", int(payment_id), "eob_posted", event_data)
+        else:
+            append_events(cur, [ledger_event("claim", claim_id, "eob_posted", event_data) for claim_id in claim_ids])
+
+    return {
+        "payment_id": int(payment_id) if payment_id is not None else None,
+        "lines": len(normalized),
+        "applications": len(application_rows),
+        "adjustments": len(adjustment_rows),
+        "total_applied": total_applied,
+        "total_adjusted": total_adjusted,
+        "claim_ids": claim_ids,
+    }
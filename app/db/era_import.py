@@ -0,0 +1,420 @@
+from datetime import date
+
+from app.db.connection import get_connection, unit_of_work
+from app.db.balances import get_charge_balances
+from app.db.payments import create_payment, get_payment_balances
+from app.db.eob_posting import post_eob
+from app.utils.x12_835 import (
+    iter_835,
+    ADJUSTMENT_GROUP_CODES,
+    PATIENT_RESPONSIBILITY_GROUP,
+)
+
+
+# ============================================================
+# FASE P7 — Importador ERA / 835
+# ============================================================
+# Lee el 835 en streaming (app/utils/x12_835.py), agrupa los CLP en lotes,
+# resuelve claims/charges con consultas IN indexadas (idx_claims_claim_number,
+# migración "hot_path_indexes") y postea cada lote con
+# post_eob (una transacción por lote).
+#
+# El payment se crea en la MISMA transacción que su primer lote: si ese lote
+# falla no queda un payment sin líneas. Un reimport del mismo payment
+# (referencia + monto + fecha) retoma las líneas que no llegaron a postearse.
+#
+# Reglas:
+# - CLP01 se compara contra claims.claim_number
+# - SVC se empareja con un charge del claim por CPT (+ fecha de servicio)
+# - CAS CO/OA/PI/CR → adjustments; PR solo se reporta (responsabilidad del paciente)
+# - CAS a nivel de claim (después del CLP, antes de los SVC) va a la primera
+#   línea SVC emparejada; si ninguna empareja, queda en skipped
+# - Una línea que excede el balance del charge o el payment NO se postea
+#   y queda en over_applied
+# - Un 835 con BPR02 = 0 no crea payment; sus líneas de solo ajustes
+#   se postean igual (post_eob sin payment)
+
+ERA_BATCH_SIZE = 200
+AMOUNT_TOLERANCE = 0.005
+
+
+def _find_duplicate_payment(payment: dict) -> int | None:
+    if not payment["reference"]:
+        return None
+
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT id
+            FROM payments
+            WHERE reference = ? AND amount = ? AND received_date = ?
+            LIMIT 1
+            """,
+            (payment["reference"], payment["amount"], payment["received_date"]),
+        )
+        row = cur.fetchone()
+        return row["id"] if row else None
+
+
+def _load_posted(payment_id: int | None, charge_ids: list[int]) -> tuple[set, set]:
+    """
+    Lo ya posteado sobre estos charges: charges con application de este
+    payment y ajustes (charge_id, amount, reason) existentes.
+    Como post_eob postea cada lote entero o nada, alcanza con eso para
+    saber qué líneas de un reimport ya entraron.
+    """
+    if not charge_ids:
+        return set(), set()
+
+    q_marks = ",".join(["?"] * len(charge_ids))
+    with get_connection() as conn:
+        cur = conn.cursor()
+        applied = set()
+        if payment_id is not None:
+            cur.execute(
+                f"""
+                SELECT DISTINCT charge_id
+                FROM applications
+                WHERE payment_id = ? AND charge_id IN ({q_marks})
+                """,
+                (payment_id, *charge_ids),
+            )
+            applied = {r["charge_id"] for r in cur.fetchall()}
+
+        cur.execute(
+            f"""
+            SELECT charge_id, amount, reason
+            FROM adjustments
+            WHERE charge_id IN ({q_marks})
+            """,
+            tuple(charge_ids),
+        )
+        adjusted = {(r["charge_id"], round(r["amount"], 2), r["reason"]) for r in cur.fetchall()}
+
+    return applied, adjusted
+
+
+def _already_posted(charge_id: int, paid: float, adjustments: list[dict], posted: tuple[set, set]) -> bool:
+    applied, adjusted = posted
+    if paid > 0:
+        return charge_id in applied
+    return all((charge_id, round(a["amount"], 2), a["reason"]) in adjusted for a in adjustments)
+
+
+def _load_batch_context(claim_numbers: list[str]) -> tuple[dict, dict, set]:
+    """
+    Para un lote de CLP01: claims por claim_number, charges por claim y claims congelados.
+    Tres consultas, sin importar el tamaño del lote.
+    """
+    if not claim_numbers:
+        return {}, {}, set()
+
+    with get_connection() as conn:
+        cur = conn.cursor()
+
+        q_marks = ",".join(["?"] * len(claim_numbers))
+        cur.execute(
+            f"""
+            SELECT id, claim_number
+            FROM claims
+            WHERE claim_number IN ({q_marks})
+            """,
+            tuple(claim_numbers),
+        )
+        claims_by_number = {r["claim_number"]: r["id"] for r in cur.fetchall()}
+
+        claim_ids = tuple(sorted(set(claims_by_number.values())))
+        if not claim_ids:
+            return claims_by_number, {}, set()
+
+        q_marks = ",".join(["?"] * len(claim_ids))
+        cur.execute(
+            f"""
+            SELECT c.id AS charge_id, s.claim_id, s.cpt_code, s.service_date
+            FROM charges c
+            JOIN services s ON s.id = c.service_id
+            WHERE s.claim_id IN ({q_marks})
+            ORDER BY c.id
+            """,
+            claim_ids,
+        )
+        charges_by_claim: dict[int, list[dict]] = {}
+        for r in cur.fetchall():
+            charges_by_claim.setdefault(r["claim_id"], []).append(dict(r))
+
+        cur.execute(
+            f"""
+            SELECT claim_id
+            FROM claim_latest_snapshot
+            WHERE claim_id IN ({q_marks})
+            """,
+            claim_ids,
+        )
+        frozen = {r["claim_id"] for r in cur.fetchall()}
+
+    return claims_by_number, charges_by_claim, frozen
+
+
+def _match_charge(candidates: list[dict], used: set, cpt_code: str, service_date: str | None) -> dict | None:
+    by_cpt = [c for c in candidates if c["charge_id"] not in used and c["cpt_code"] == cpt_code]
+    if service_date:
+        for c in by_cpt:
+            if c["service_date"] == service_date:
+                return c
+    return by_cpt[0] if by_cpt else None
+
+
+def _new_summary(path: str) -> dict:
+    return {
+        "file": path,
+        "payments": [],
+        "duplicates": [],
+        "claims": 0,
+        "service_lines": 0,
+        "matched": 0,
+        "posted_applications": 0,
+        "posted_adjustments": 0,
+        "total_applied": 0.0,
+        "total_adjusted": 0.0,
+        "patient_responsibility": 0.0,
+        "unmatched": [],
+        "over_applied": [],
+        "frozen": [],
+        "already_posted": [],
+        "skipped": [],
+        "failed": [],
+    }
+
+
+def _line_ref(claim: dict, svc: dict | None, reason: str) -> dict:
+    return {
+        "claim_number": claim["claim_number"],
+        "cpt_code": svc["cpt_code"] if svc else None,
+        "service_date": (svc["service_date"] if svc else None) or claim["service_date"],
+        "paid": svc["paid"] if svc else claim["total_paid"],
+        "reason": reason,
+    }
+
+
+def _create_pending_payment(payment_ctx: dict, summary: dict) -> None:
+    event = payment_ctx["pending"]
+    payment_ctx["payment_id"] = create_payment(
+        event["amount"],
+        event["method"],
+        event["reference"],
+        event["received_date"],
+    )
+    summary["payments"].append(
+        {
+            "payment_id": payment_ctx["payment_id"],
+            "reference": event["reference"],
+            "payer": event["payer"],
+            "amount": event["amount"],
+        }
+    )
+
+
+def _flush_batch(batch: list[dict], payment_ctx: dict, summary: dict) -> None:
+    if not batch and payment_ctx["pending"] is None:
+        return
+
+    claims_by_number, charges_by_claim, frozen = _load_batch_context(
+        sorted({c["claim_number"] for c in batch if c["claim_number"]})
+    )
+
+    all_charge_ids = [c["charge_id"] for charges in charges_by_claim.values() for c in charges]
+    balances = {
+        cid: b["balance"] for cid, b in get_charge_balances(charge_ids=all_charge_ids).items()
+    } if all_charge_ids else {}
+
+    has_payment = payment_ctx["payment_id"] is not None or payment_ctx["pending"] is not None
+
+    # Reimport (o 835 sin payment): se saltan las líneas que ya están posteadas
+    posted = None
+    if payment_ctx["resumed"] or not has_payment:
+        posted = _load_posted(payment_ctx["payment_id"], all_charge_ids)
+
+    lines = []
+    refs = []
+
+    for claim in batch:
+        claim_id = claims_by_number.get(claim["claim_number"])
+        services = claim["services"]
+
+        if claim_id is None:
+            for svc in services or [None]:
+                summary["unmatched"].append(_line_ref(claim, svc, "claim no encontrado"))
+            continue
+
+        if claim_id in frozen:
+            for svc in services or [None]:
+                summary["frozen"].append(_line_ref(claim, svc, "claim congelado por snapshot"))
+            continue
+
+        candidates = charges_by_claim.get(claim_id, [])
+
+        # CAS del claim con líneas SVC: se postean con la primera línea emparejada
+        claim_cas = claim["adjustments"] if services else []
+
+        # CLP sin SVC: solo se puede postear si el claim tiene un único charge
+        if not services:
+            if len(candidates) != 1:
+                summary["unmatched"].append(_line_ref(claim, None, "CLP sin líneas SVC"))
+                continue
+            services = [
+                {
+                    "cpt_code": candidates[0]["cpt_code"],
+                    "service_date": claim["service_date"],
+                    "paid": claim["total_paid"],
+                    "adjustments": claim["adjustments"],
+                }
+            ]
+
+        used: set = set()
+        for svc in services:
+            charge = _match_charge(candidates, used, svc["cpt_code"], svc["service_date"] or claim["service_date"])
+            if charge is None:
+                summary["unmatched"].append(_line_ref(claim, svc, "línea SVC sin charge"))
+                continue
+
+            used.add(charge["charge_id"])
+            summary["matched"] += 1
+
+            cas_list = svc["adjustments"] + claim_cas
+            claim_cas = []
+
+            adjustments = []
+            for cas in cas_list:
+                if cas["group"] == PATIENT_RESPONSIBILITY_GROUP:
+                    summary["patient_responsibility"] += cas["amount"]
+                elif cas["group"] in ADJUSTMENT_GROUP_CODES and cas["amount"] > 0:
+                    adjustments.append({"amount": cas["amount"], "reason": f"{cas['group']}-{cas['reason']}"})
+                else:
+                    summary["skipped"].append(_line_ref(claim, svc, f"CAS no posteable {cas['group']}-{cas['reason']} {cas['amount']}"))
+
+            paid = svc["paid"]
+            if paid < 0:
+                summary["skipped"].append(_line_ref(claim, svc, "reverso (monto negativo)"))
+                continue
+
+            if paid <= 0 and not adjustments:
+                continue
+
+            if posted is not None and _already_posted(charge["charge_id"], paid, adjustments, posted):
+                summary["already_posted"].append(_line_ref(claim, svc, "ya posteada"))
+                continue
+
+            if paid > balances.get(charge["charge_id"], 0.0) + AMOUNT_TOLERANCE:
+                summary["over_applied"].append(_line_ref(claim, svc, "excede balance del charge"))
+                continue
+
+            if paid > 0 and not has_payment:
+                summary["skipped"].append(_line_ref(claim, svc, "payment sin monto"))
+                continue
+
+            if paid > payment_ctx["remaining"] + AMOUNT_TOLERANCE:
+                summary["over_applied"].append(_line_ref(claim, svc, "excede disponible del payment"))
+                continue
+
+            balances[charge["charge_id"]] = balances.get(charge["charge_id"], 0.0) - paid - sum(a["amount"] for a in adjustments)
+            payment_ctx["remaining"] -= paid
+
+            lines.append({"charge_id": charge["charge_id"], "amount_applied": paid, "adjustments": adjustments})
+            refs.append(_line_ref(claim, svc, ""))
+
+        for cas in claim_cas:
+            if cas["group"] == PATIENT_RESPONSIBILITY_GROUP:
+                summary["patient_responsibility"] += cas["amount"]
+            else:
+                summary["skipped"].append(
+                    _line_ref(claim, None, f"CAS de claim sin línea SVC emparejada {cas['group']}-{cas['reason']} {cas['amount']}")
+                )
+
+    if not lines and payment_ctx["pending"] is None:
+        return
+
+    try:
+        with unit_of_work():
+            if payment_ctx["pending"] is not None:
+                _create_pending_payment(payment_ctx, summary)
+            result = post_eob(payment_ctx["payment_id"], lines) if lines else None
+    except ValueError as e:
+        if payment_ctx["pending"] is not None:
+            # El payment se descartó con el lote: lo crea el próximo lote
+            if payment_ctx["payment_id"] is not None:
+                summary["payments"].pop()
+            payment_ctx["payment_id"] = None
+        for ref in refs:
+            ref["reason"] = str(e)
+        summary["failed"].extend(refs)
+        payment_ctx["remaining"] += sum(line["amount_applied"] for line in lines)
+        return
+
+    payment_ctx["pending"] = None
+    if result is None:
+        return
+
+    summary["posted_applications"] += result["applications"]
+    summary["posted_adjustments"] += result["adjustments"]
+    summary["total_applied"] += result["total_applied"]
+    summary["total_adjusted"] += result["total_adjusted"]
+
+
+def import_835(path: str, batch_size: int = ERA_BATCH_SIZE) -> dict:
+    """
+    Importa un archivo X12 835 desde disco.
+
+    - Cada transacción ST/SE crea un payment (BPR02 / TRN02 / BPR16) junto
+      con su primer lote. Si ya existe un payment con la misma referencia,
+      monto y fecha, se reporta como duplicado y se retoma: solo se postean
+      las líneas que aún no están (las demás quedan en already_posted).
+    - Los CLP se postean en lotes de `batch_size` claims (una transacción por lote).
+
+    Devuelve un resumen con matched / unmatched / over_applied / frozen /
+    already_posted / skipped / failed.
+    """
+    summary = _new_summary(path)
+    payment_ctx = None
+    batch: list[dict] = []
+
+    with open(path, "r", encoding="utf-8", errors="replace", newline="") as stream:
+        for event in iter_835(stream):
+
+            if event["type"] == "payment":
+                if payment_ctx is not None:
+                    _flush_batch(batch, payment_ctx, summary)
+                batch = []
+
+                payment_ctx = {"payment_id": None, "pending": None, "remaining": 0.0, "resumed": False}
+                event["received_date"] = event["received_date"] or date.today().isoformat()
+
+                duplicate_id = _find_duplicate_payment(event)
+                if duplicate_id is not None:
+                    payment_ctx["payment_id"] = duplicate_id
+                    payment_ctx["remaining"] = get_payment_balances([duplicate_id])[duplicate_id]["remaining"]
+                    payment_ctx["resumed"] = True
+                    summary["duplicates"].append({"reference": event["reference"], "payment_id": duplicate_id})
+                    continue
+
+                if event["amount"] > 0:
+                    payment_ctx["pending"] = event
+                    payment_ctx["remaining"] = event["amount"]
+                continue
+
+            # event["type"] == "claim"
+            if payment_ctx is None:
+                continue
+
+            summary["claims"] += 1
+            summary["service_lines"] += len(event["services"])
+            batch.append(event)
+
+            if len(batch) >= batch_size:
+                _flush_batch(batch, payment_ctx, summary)
+                batch = []
+
+    if payment_ctx is not None:
+        _flush_batch(batch, payment_ctx, summary)
+
+    return summary
@@ -1,31 +1,655 @@
+import atexit
+import hashlib
+import hmac
 import json
+import threading
+import time
 from datetime import datetime
-from app.db.connection import get_connection
+
+from app.config import (
+    LEDGER_BUFFER_FLUSH_S,
+    LEDGER_BUFFER_MAX_EVENTS,
+    LEDGER_COALESCE_WINDOW_S,
+    LEDGER_SIGNING_KEY,
+)
+from app.db.connection import get_connection, in_write_transaction, separate_transaction, unit_of_work
+from app.db.schema_capabilities import has_column
+
+
+# ============================================================
+# FASE P23 — Event ledger encadenado por hash
+# ============================================================
+# Cada evento guarda prev_hash (row_hash del evento anterior por id) y
+# row_hash = sha256 del contenido canónico + prev_hash, calculados en la
+# misma transacción del INSERT. Editar o borrar un evento rompe la cadena.
+#
+# Checkpoints (event_ledger_checkpoints) guardan la cabeza de la cadena:
+# - periódicos: cada LEDGER_CHECKPOINT_EVERY eventos (verified = 0);
+# - de verificación: verify_event_ledger() recorre desde el último
+#   checkpoint verificado y, si todo coincide, deja uno nuevo (verified = 1).
+# Así verificar cuesta lo que creció el ledger, no toda la historia.
+# Firmados con HMAC si hay LIFETRACK_LEDGER_SIGNING_KEY.
+#
+# Eventos anteriores a la migración 9: scripts/rechain_event_ledger.py.
+# Cada escritura encadena a lo sumo LEDGER_INLINE_CHAIN_LIMIT de ellos; mientras
+# quede backlog, los eventos nuevos se insertan sin hash (la cadena sigue el
+# orden de id) y los encadena el rechain o las escrituras siguientes.
+
+LEDGER_GENESIS_HASH = "0" * 64
+LEDGER_CHECKPOINT_EVERY = 1000
+LEDGER_RECHAIN_BATCH_SIZE = 1000
+LEDGER_INLINE_CHAIN_LIMIT = 100
+LEDGER_VERIFY_MAX_ERRORS = 100
+
+
+def has_ledger_chain() -> bool:
+    return has_column("event_ledger", "row_hash")
+
+
+def ledger_row_hash(
+    prev_hash: str, entity_type: str, entity_id, event_type: str, event_data: str | None, created_at: str
+) -> str:
+    """
+    sha256 del evento tal como quedó guardado (event_data es el texto JSON).
+    """
+    content = json.dumps(
+        [prev_hash, entity_type, entity_id, event_type, event_data, created_at],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _last_chained_hash(cur, before_id: int | None = None) -> str:
+    if before_id is None:
+        row = cur.execute(
+            "SELECT row_hash FROM event_ledger WHERE row_hash IS NOT NULL ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+    else:
+        row = cur.execute(
+            "SELECT row_hash FROM event_ledger WHERE id < ? AND row_hash IS NOT NULL ORDER BY id DESC LIMIT 1",
+            (before_id,),
+        ).fetchone()
+    return row[0] if row else LEDGER_GENESIS_HASH
+
+
+def _chain_pending(cur, limit: int | None = None) -> int:
+    """
+    Encadena eventos sin row_hash (anteriores a la migración), en orden de id.
+    """
+    sql = """
+        SELECT id, entity_type, entity_id, event_type, event_data, created_at
+        FROM event_ledger
+        WHERE row_hash IS NULL
+        ORDER BY id
+    """
+    params = ()
+    if limit is not None:
+        sql += " LIMIT ?"
+        params = (int(limit),)
+
+    rows = cur.execute(sql, params).fetchall()
+    if not rows:
+        return 0
+
+    prev = _last_chained_hash(cur, before_id=rows[0][0])
+    updates = []
+    for r in rows:
+        h = ledger_row_hash(prev, r[1], r[2], r[3], r[4], r[5])
+        updates.append((prev, h, r[0]))
+        prev = h
+
+    cur.executemany("UPDATE event_ledger SET prev_hash = ?, row_hash = ? WHERE id = ? AND row_hash IS NULL", updates)
+    return len(rows)
+
+
+def _has_unchained(cur) -> bool:
+    # idx_event_ledger_unchained (índice parcial): no recorre el ledger
+    return cur.execute("SELECT 1 FROM event_ledger WHERE row_hash IS NULL LIMIT 1").fetchone() is not None
+
+
+def _sign_checkpoint(event_id: int, row_hash: str, verified: int, created_at: str) -> str | None:
+    if not LEDGER_SIGNING_KEY:
+        return None
+    message = f"{event_id}:{row_hash}:{verified}:{created_at}".encode("utf-8")
+    return hmac.new(LEDGER_SIGNING_KEY.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def _insert_checkpoint(cur, event_id: int, row_hash: str, verified: bool) -> int:
+    created_at = datetime.utcnow().isoformat()
+    cur.execute(
+        """
+        INSERT INTO event_ledger_checkpoints (event_id, row_hash, verified, signature, created_at)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (event_id, row_hash, int(verified), _sign_checkpoint(event_id, row_hash, int(verified), created_at), created_at),
+    )
+    return cur.lastrowid
+
+
+def _insert_events(cur, events: list[tuple]) -> None:
+    """
+    events: (entity_type, entity_id, event_type, event_data_json, created_at).
+    Lee la cabeza de la cadena y la extiende en la transacción del caller.
+    """
+    chained = 0
+    if has_ledger_chain():
+        chained = _chain_pending(cur, limit=LEDGER_INLINE_CHAIN_LIMIT)
+
+    if not has_ledger_chain() or (chained == LEDGER_INLINE_CHAIN_LIMIT and _has_unchained(cur)):
+        # Sin cadena, o con backlog anterior: sin hash (ver rechain_event_ledger)
+        cur.executemany(
+            """
+            INSERT INTO event_ledger (entity_type, entity_id, event_type, event_data, created_at)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            events,
+        )
+        return
+
+    prev = _last_chained_hash(cur)
+
+    rows = []
+    for event in events:
+        h = ledger_row_hash(prev, *event)
+        rows.append((*event, prev, h))
+        prev = h
+
+    cur.executemany(
+        """
+        INSERT INTO event_ledger (entity_type, entity_id, event_type, event_data, created_at, prev_hash, row_hash)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        rows,
+    )
+
+    # Checkpoint periódico de la cabeza
+    head_id = cur.execute("SELECT MAX(id) FROM event_ledger").fetchone()[0]
+    last_cp = cur.execute("SELECT COALESCE(MAX(event_id), 0) FROM event_ledger_checkpoints").fetchone()[0]
+    if head_id - last_cp >= LEDGER_CHECKPOINT_EVERY:
+        _insert_checkpoint(cur, head_id, prev, verified=False)
+
+
+def ledger_event(entity_type: str, entity_id: int, event_type: str, event_data: dict | None = None) -> tuple:
+    """
+    Evento listo para append_events(): la fecha se fija al crearlo,
+    no al escribirlo.
+    """
+    return (
+        entity_type,
+        int(entity_id),
+        event_type,
+        json.dumps(event_data) if event_data else None,
+        datetime.utcnow().isoformat(),
+    )
 
 
 def log_event(entity_type: str, entity_id: int, event_type: str, event_data: dict | None = None):
 
+    event = ledger_event(entity_type, entity_id, event_type, event_data)
+
+    # Cabeza de la cadena + INSERT en una sola transacción (o SAVEPOINT del scope)
+    with unit_of_work() as conn:
+        _insert_events(conn.cursor(), [event])
+
+
+# ============================================================
+# FASE P24 — Escritura en la transacción del caller + buffer de lecturas
+# ============================================================
+# - Escrituras (transiciones, snapshots, EOB): append_event(cur, ...) /
+#   append_events(cur, [...]) usan el cursor de la transacción que ya
+#   está abierta: sin SAVEPOINT propio, y N eventos = un executemany.
+#   El evento se confirma o se descarta junto con el cambio que audita.
+# - Lecturas (export de PDF, verificación de integridad): log_read_event()
+#   no convierte la transacción de lectura del request en escritura. Si el
+#   caller ya tiene una de escritura abierta escribe ahí; si no, el evento
+#   va a un buffer que un thread escribe en lotes (executemany, conexión
+#   propia) al juntar LEDGER_BUFFER_MAX_EVENTS o tras LEDGER_BUFFER_FLUSH_S
+#   segundos. Al cerrar el proceso se vacía (atexit). Si la escritura
+#   falla, el lote vuelve al frente del buffer y se reintenta.
+
+
+def append_events(cur, events: list[tuple]) -> None:
+    """
+    events: tuplas de ledger_event(). Se escriben con el cursor del caller,
+    en su transacción.
+    """
+    if events:
+        _insert_events(cur, events)
+
+
+def append_event(cur, entity_type: str, entity_id: int, event_type: str, event_data: dict | None = None) -> None:
+    _insert_events(cur, [ledger_event(entity_type, entity_id, event_type, event_data)])
+
+
+def _write_read_events(events: list[tuple]) -> None:
+    # Transacción de escritura del caller si la hay; si no, una aparte
+    # (nunca dentro de la transacción de lectura del request)
+    if in_write_transaction():
+        with unit_of_work() as conn:
+            _insert_events(conn.cursor(), events)
+        return
+
+    with separate_transaction() as conn:
+        _insert_events(conn.cursor(), events)
+
+
+# ============================================================
+# FASE P25 — Eventos de lectura agrupados
+# ============================================================
+# Ver un snapshot o bajar su PDF no cambia nada: registrar una fila por
+# vista hace crecer el ledger con el tráfico. Para los tipos de
+# LEDGER_COALESCED_EVENTS, la primera vista de (entidad, tipo, hash) se
+# escribe como cualquier evento de lectura (flush del buffer) y abre una
+# ventana de LEDGER_COALESCE_WINDOW_S segundos; las repeticiones dentro de
+# la ventana se escriben al cerrarla como UNA fila: el event_data de la
+# primera repetición + count, first_seen y last_seen (created_at = last_seen).
+# Un corte del proceso solo puede perder la cuenta de repeticiones, nunca
+# el registro de que hubo acceso.
+#
+# Las transiciones, snapshots y exports por lote (batch_id) siguen exactos:
+# solo log_read_event() agrupa, y solo fuera de una transacción de escritura.
+
+# event_type → campo de event_data con el hash que identifica lo leído
+LEDGER_COALESCED_EVENTS = {
+    "snapshot_integrity_verified": "hash",
+    "snapshot_pdf_exported": "snapshot_hash",
+}
+
+
+def _coalesced_event(group: dict) -> tuple:
+    entity_type, entity_id, event_type, event_data, first_seen = group["event"]
+    data = json.loads(event_data) if event_data else {}
+    data.update(count=group["count"], first_seen=first_seen, last_seen=group["last_seen"])
+    return (entity_type, entity_id, event_type, json.dumps(data), group["last_seen"])
+
+
+class LedgerBuffer:
+    def __init__(
+        self,
+        max_events: int = LEDGER_BUFFER_MAX_EVENTS,
+        flush_s: float = LEDGER_BUFFER_FLUSH_S,
+        coalesce_s: float = LEDGER_COALESCE_WINDOW_S,
+    ):
+        self.max_events = int(max_events)
+        self.flush_s = float(flush_s)
+        self.coalesce_s = float(coalesce_s)
+
+        self._cond = threading.Condition()
+        self._events = []
+        self._oldest = None
+        # Ventanas abiertas (FASE P25), en orden de apertura = orden de vencimiento.
+        # Cada una acumula las repeticiones posteriores a la primera vista.
+        self._groups = {}
+        self._closed = False
+        self._thread = None
+
+        # Un solo flush a la vez: el orden del buffer es el orden en la cadena
+        self._flush_lock = threading.Lock()
+
+        self.stats = {"events": 0, "coalesced": 0, "flushes": 0, "failures": 0, "last_error": None}
+
+    # =========================
+    # API (cualquier thread)
+    # =========================
+
+    def add(self, events: list[tuple]) -> None:
+        if not events:
+            return
+        if self.max_events <= 0 or self._closed:
+            _write_read_events(events)
+            return
+
+        with self._cond:
+            self._events.extend(events)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            self._ensure_thread()
+            if len(self._events) >= self.max_events:
+                self._cond.notify()
+
+    def coalesce(self, event: tuple, key: tuple) -> None:
+        """
+        La primera vista de una clave se encola como un evento más y abre la
+        ventana; dentro de ella, las repeticiones suman a un grupo en vez de
+        agregar filas.
+        """
+        if self.coalesce_s <= 0 or self.max_events <= 0 or self._closed:
+            self.add([event])
+            return
+
+        now = time.monotonic()
+        with self._cond:
+            group = self._groups.get(key)
+            if group is not None and now < group["deadline"]:
+                if group["event"] is None:
+                    group["event"] = event
+                group["count"] += 1
+                group["last_seen"] = event[4]
+                self.stats["coalesced"] += 1
+                return
+
+            if group is not None:
+                self._close_group(key)
+            self._groups[key] = {"event": None, "count": 0, "last_seen": None, "deadline": now + self.coalesce_s}
+            self._events.append(event)
+            if self._oldest is None:
+                self._oldest = now
+            self._ensure_thread()
+            # El thread recalcula su espera (flush de la primera vista / vencimiento)
+            self._cond.notify()
+
+    def pending(self) -> int:
+        """
+        Filas por escribir (un grupo con repeticiones cuenta como una).
+        """
+        with self._cond:
+            return len(self._events) + sum(1 for g in self._groups.values() if g["count"])
+
+    def flush(self) -> int:
+        """
+        Escribe todo lo pendiente (grupos abiertos incluidos) en una sola
+        transacción. Llamado con una transacción de escritura abierta, los
+        eventos quedan en ella. Retorna cuántas filas escribió.
+        """
+        return self._flush(close_groups=True)
+
+    def _flush(self, close_groups: bool) -> int:
+        with self._flush_lock:
+            with self._cond:
+                now = time.monotonic()
+                for key in [k for k, g in self._groups.items() if close_groups or g["deadline"] <= now]:
+                    self._close_group(key)
+                events, self._events = self._events, []
+                self._oldest = None
+            if not events:
+                return 0
+
+            try:
+                _write_read_events(events)
+            except Exception as e:
+                with self._cond:
+                    self._events[:0] = events
+                    self._oldest = time.monotonic()
+                    self.stats["failures"] += 1
+                    self.stats["last_error"] = str(e)
+                raise
+
+            self.stats["events"] += len(events)
+            self.stats["flushes"] += 1
+            return len(events)
+
+    def shutdown(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(10)
+        self.flush()
+
+    # =========================
+    # Thread de escritura
+    # =========================
+
+    def _close_group(self, key: tuple) -> None:
+        # Llamar con self._cond tomado. Sin repeticiones no hay fila que escribir.
+        group = self._groups.pop(key)
+        if not group["count"]:
+            return
+        self._events.append(_coalesced_event(group))
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+
+    def _ensure_thread(self) -> None:
+        # Llamar con self._cond tomado
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="ledger-buffer", daemon=True)
+        self._thread.start()
+
+    def _deadline(self) -> float | None:
+        # Próximo momento en que hay algo para escribir
+        deadlines = []
+        if self._oldest is not None:
+            deadlines.append(self._oldest + self.flush_s)
+        if self._groups:
+            deadlines.append(next(iter(self._groups.values()))["deadline"])
+        return min(deadlines) if deadlines else None
+
+    def _due(self) -> bool:
+        if len(self._events) >= self.max_events:
+            return True
+        deadline = self._deadline()
+        return deadline is not None and time.monotonic() >= deadline
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and not self._due():
+                    deadline = self._deadline()
+                    self._cond.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+                closed = self._closed
+
+            try:
+                self._flush(close_groups=closed)
+            except Exception:
+                # El lote quedó en el buffer: reintento tras flush_s
+                if closed:
+                    return
+                with self._cond:
+                    self._cond.wait(self.flush_s)
+                continue
+
+            if closed:
+                return
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_ledger_buffer() -> LedgerBuffer:
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = LedgerBuffer()
+            atexit.register(_buffer.shutdown)
+        return _buffer
+
+
+def log_read_events(events: list[tuple], wait: bool = False) -> None:
+    """
+    Auditoría de lecturas (tuplas de ledger_event()). Dentro de una
+    transacción de escritura se escriben en ella; si no, pasan por el
+    buffer sin bloquear al caller.
+
+    wait=True: vacía el buffer antes de volver (los eventos ya están en
+    el ledger al terminar, p. ej. un export por lote).
+    """
+    if in_write_transaction():
+        with unit_of_work() as conn:
+            append_events(conn.cursor(), events)
+        return
+
+    buffer = get_ledger_buffer()
+    buffer.add(events)
+    if wait:
+        buffer.flush()
+
+
+def log_read_event(entity_type: str, entity_id: int, event_type: str, event_data: dict | None = None) -> None:
+    event = ledger_event(entity_type, entity_id, event_type, event_data)
+
+    hash_field = LEDGER_COALESCED_EVENTS.get(event_type)
+    if hash_field is None or in_write_transaction():
+        log_read_events([event])
+        return
+
+    key = (entity_type, int(entity_id), event_type, (event_data or {}).get(hash_field))
+    get_ledger_buffer().coalesce(event, key)
+
+
+def log_rejected_event(entity_type: str, entity_id: int, event_type: str, event_data: dict | None = None) -> None:
+    """
+    Auditoría de un intento rechazado: tiene que quedar aunque el caller
+    haga rollback (p. ej. un request que responde 400). Con una transacción
+    de escritura abierta va al buffer, que la escribe con su propia conexión
+    cuando el caller libera el lock; si no, se escribe ya, en una aparte.
+    """
+    event = ledger_event(entity_type, entity_id, event_type, event_data)
+
+    if in_write_transaction():
+        get_ledger_buffer().add([event])
+        return
+
+    with separate_transaction() as conn:
+        _insert_events(conn.cursor(), [event])
+
+
+def flush_ledger_buffer() -> int:
+    """
+    Escribe ya los eventos de lectura pendientes (scripts, tests, apagado).
+    """
+    return get_ledger_buffer().flush() if _buffer is not None else 0
+
+
+def rechain_event_ledger(batch_size: int = LEDGER_RECHAIN_BATCH_SIZE) -> int:
+    """
+    Encadena los eventos existentes sin row_hash, por lotes (una
+    transacción por lote). Idempotente. Retorna cuántos encadenó.
+    """
+    if not has_ledger_chain():
+        raise ValueError("Faltan las columnas de cadena del ledger (migración 9)")
+
+    total = 0
+    while True:
+        with unit_of_work() as conn:
+            n = _chain_pending(conn.cursor(), limit=batch_size)
+        total += n
+        if n < batch_size:
+            return total
+
+
+def create_ledger_checkpoint() -> dict:
+    """
+    Checkpoint periódico de la cabeza actual (sin verificar la cadena).
+    """
+    with unit_of_work() as conn:
+        cur = conn.cursor()
+        _chain_pending(cur)
+        head = cur.execute("SELECT id, row_hash FROM event_ledger ORDER BY id DESC LIMIT 1").fetchone()
+        if not head:
+            raise ValueError("El ledger está vacío")
+        checkpoint_id = _insert_checkpoint(cur, head[0], head[1], verified=False)
+        row = cur.execute("SELECT * FROM event_ledger_checkpoints WHERE id = ?", (checkpoint_id,)).fetchone()
+        return dict(row)
+
+
+def verify_checkpoint_signature(checkpoint: dict) -> bool | None:
+    """
+    True/False si hay clave configurada; None si no se puede verificar.
+    """
+    if not LEDGER_SIGNING_KEY or not checkpoint.get("signature"):
+        return None
+    expected = _sign_checkpoint(
+        checkpoint["event_id"], checkpoint["row_hash"], checkpoint["verified"], checkpoint["created_at"]
+    )
+    return hmac.compare_digest(expected, checkpoint["signature"])
+
+
+def _trusted_checkpoint(cur) -> dict | None:
+    # Último checkpoint verificado con firma válida (o sin clave configurada)
+    rows = cur.execute("SELECT * FROM event_ledger_checkpoints WHERE verified = 1 ORDER BY id DESC").fetchall()
+    for r in rows:
+        cp = dict(r)
+        if verify_checkpoint_signature(cp) is not False and (not LEDGER_SIGNING_KEY or cp["signature"]):
+            return cp
+    return None
+
+
+def verify_event_ledger(full: bool = False) -> dict:
+    """
+    Recorre la cadena desde el último checkpoint confiable (o desde el
+    génesis con full=True) recalculando cada row_hash. Si todo coincide,
+    registra un checkpoint verificado en la cabeza.
+
+    Retorna {"ok", "full", "from_event_id", "to_event_id", "checked",
+    "errors", "checkpoint_id"}.
+    """
+    if not has_ledger_chain():
+        raise ValueError("Faltan las columnas de cadena del ledger (migración 9)")
+
+    errors = []
+
+    def _error(event_id, problem):
+        if len(errors) < LEDGER_VERIFY_MAX_ERRORS:
+            errors.append({"event_id": event_id, "error": problem})
+
     with get_connection() as conn:
         cur = conn.cursor()
 
-        cur.execute("""
-            INSERT INTO event_ledger (
-                entity_type,
-                entity_id,
-                event_type,
-                event_data,
-                created_at
-            )
-            VALUES (?, ?, ?, ?, ?)
-        """, (
-            entity_type,
-            entity_id,
-            event_type,
-            json.dumps(event_data) if event_data else None,
-            datetime.utcnow().isoformat()
-        ))
-
-        conn.commit()
+        anchor = None if full else _trusted_checkpoint(cur)
+        start_id, prev = (anchor["event_id"], anchor["row_hash"]) if anchor else (0, LEDGER_GENESIS_HASH)
+
+        if anchor:
+            row = cur.execute("SELECT row_hash FROM event_ledger WHERE id = ?", (start_id,)).fetchone()
+            if not row or row[0] != anchor["row_hash"]:
+                _error(start_id, "checkpoint no coincide con el evento")
+
+        checkpoints = {}
+        for r in cur.execute(
+            "SELECT event_id, row_hash FROM event_ledger_checkpoints WHERE event_id > ?", (start_id,)
+        ).fetchall():
+            checkpoints.setdefault(r[0], set()).add(r[1])
+
+        checked = 0
+        last_id = start_id
+        rows = cur.execute(
+            """
+            SELECT id, entity_type, entity_id, event_type, event_data, created_at, prev_hash, row_hash
+            FROM event_ledger
+            WHERE id > ?
+            ORDER BY id
+            """,
+            (start_id,),
+        )
+        for r in rows:
+            event_id, stored_prev, stored_hash = r[0], r[6], r[7]
+            if stored_hash is None:
+                _error(event_id, "evento sin encadenar (correr rechain_event_ledger)")
+                break
+            if stored_prev != prev:
+                _error(event_id, "prev_hash no coincide (evento borrado o reordenado)")
+            if ledger_row_hash(stored_prev, r[1], r[2], r[3], r[4], r[5]) != stored_hash:
+                _error(event_id, "row_hash no coincide (evento modificado)")
+            if event_id in checkpoints and checkpoints[event_id] != {stored_hash}:
+                _error(event_id, "checkpoint no coincide con el evento")
+
+            prev = stored_hash
+            last_id = event_id
+            checked += 1
+
+        # Checkpoints que apuntan más allá de la cabeza: eventos truncados
+        for event_id in sorted(e for e in checkpoints if e > last_id):
+            _error(event_id, "checkpoint posterior a la cabeza (eventos borrados)")
+
+    checkpoint_id = None
+    if not errors and last_id:
+        with unit_of_work() as conn:
+            checkpoint_id = _insert_checkpoint(conn.cursor(), last_id, prev, verified=True)
+
+    return {
+        "ok": not errors,
+        "full": anchor is None,
+        "from_event_id": start_id,
+        "to_event_id": last_id,
+        "checked": checked,
+        "errors": errors,
+        "checkpoint_id": checkpoint_id,
+    }
+
+
 def list_events_admin(limit: int = 50, offset: int = 0, claim_id: int | None = None) -> list[dict]:
     with get_connection() as conn:
         cur = conn.cursor()
@@ -1,6 +1,13 @@
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+
 from app.db.connection import get_connection
 
 
+FREEZE_MESSAGE = "Claim está congelado por snapshot"
+
+
 def is_claim_locked(claim_id: int) -> bool:
     """
     Retorna True si el claim ya tiene snapshot CMS-1500.
@@ -11,10 +18,137 @@ def is_claim_locked(claim_id: int) -> bool:
         cur.execute(
             """
             SELECT 1
-            FROM cms1500_snapshots
+            FROM claim_latest_snapshot
             WHERE claim_id = ?
-            LIMIT 1
             """,
             (claim_id,),
         )
         return cur.fetchone() is not None
+
+
+# ============================================================
+# FASE P8 — Congelación aplicada por la DB (triggers)
+# ============================================================
+# BEFORE INSERT/UPDATE/DELETE en services, charges, applications y
+# adjustments abortan si el claim dueño tiene snapshot. La regla vale
+# también para escrituras que no pasan por app/db (scripts/, sqlite3 CLI).
+#
+# freeze_overrides: única vía de escape, para reparaciones forenses
+# explícitas (ver freeze_override()).
+#
+# Se instalan con storage/schema.sql o con la migración "freeze_triggers"
+# (app/db/migrations.py).
+
+_FROZEN = (
+    "EXISTS (SELECT 1 FROM cms1500_snapshots WHERE claim_id = {claim})"
+    " AND NOT EXISTS (SELECT 1 FROM freeze_overrides WHERE claim_id = {claim})"
+)
+
+_CLAIM_OF = {
+    "services": "{row}.claim_id",
+    "charges": "(SELECT claim_id FROM services WHERE id = {row}.service_id)",
+    "applications": (
+        "(SELECT s.claim_id FROM charges c JOIN services s ON s.id = c.service_id"
+        " WHERE c.id = {row}.charge_id)"
+    ),
+    "adjustments": (
+        "(SELECT s.claim_id FROM charges c JOIN services s ON s.id = c.service_id"
+        " WHERE c.id = {row}.charge_id)"
+    ),
+}
+
+# Campos CMS del claim que update_claim_cms_fields edita
+FROZEN_CLAIM_FIELDS = (
+    "referring_provider_name",
+    "referring_provider_npi",
+    "reserved_local_use_19",
+    "resubmission_code_22",
+    "original_ref_no_22",
+    "prior_authorization_23",
+)
+
+FREEZE_OVERRIDES_SQL = """
+CREATE TABLE IF NOT EXISTS freeze_overrides (
+    claim_id INTEGER PRIMARY KEY,
+    reason TEXT NOT NULL,
+    created_at TEXT NOT NULL
+)
+"""
+
+
+def _frozen(table: str, row: str) -> str:
+    return _FROZEN.format(claim=_CLAIM_OF[table].format(row=row))
+
+
+def _trigger(name: str, timing: str, table: str, condition: str) -> str:
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS {name}\n"
+        f"{timing} ON {table}\n"
+        f"WHEN {condition}\n"
+        f"BEGIN\n"
+        f"    SELECT RAISE(ABORT, '{FREEZE_MESSAGE}');\n"
+        f"END"
+    )
+
+
+def _build_freeze_triggers() -> dict[str, str]:
+    triggers = {}
+
+    for table in ("services", "charges", "applications", "adjustments"):
+        triggers[f"trg_freeze_{table}_insert"] = _trigger(
+            f"trg_freeze_{table}_insert", "BEFORE INSERT", table, _frozen(table, "NEW")
+        )
+        triggers[f"trg_freeze_{table}_update"] = _trigger(
+            f"trg_freeze_{table}_update",
+            "BEFORE UPDATE",
+            table,
+            f"({_frozen(table, 'OLD')}) OR ({_frozen(table, 'NEW')})",
+        )
+        triggers[f"trg_freeze_{table}_delete"] = _trigger(
+            f"trg_freeze_{table}_delete", "BEFORE DELETE", table, _frozen(table, "OLD")
+        )
+
+    triggers["trg_freeze_claims_cms_update"] = _trigger(
+        "trg_freeze_claims_cms_update",
+        f"BEFORE UPDATE OF {', '.join(FROZEN_CLAIM_FIELDS)}",
+        "claims",
+        _FROZEN.format(claim="OLD.id"),
+    )
+
+    return triggers
+
+
+FREEZE_TRIGGERS = _build_freeze_triggers()
+
+
+@contextmanager
+def freeze_guard():
+    """
+    Traduce el RAISE(ABORT) de los triggers de congelación a ValueError,
+    el mismo error que devolvía la verificación en Python.
+    """
+    try:
+        yield
+    except sqlite3.IntegrityError as e:
+        if FREEZE_MESSAGE in str(e):
+            raise ValueError(FREEZE_MESSAGE) from None
+        raise
+
+
+@contextmanager
+def freeze_override(conn, claim_id: int, reason: str):
+    """
+    Permite escribir sobre un claim congelado DENTRO de la transacción de `conn`.
+    Solo para reparaciones forenses; el caller debe auditar la operación.
+    """
+    if not reason:
+        raise ValueError("freeze_override requiere reason")
+
+    conn.execute(
+        "INSERT INTO freeze_overrides (claim_id, reason, created_at) VALUES (?, ?, ?)",
+        (int(claim_id), reason, datetime.utcnow().isoformat()),
+    )
+    try:
+        yield
+    finally:
+        conn.execute("DELETE FROM freeze_overrides WHERE claim_id = ?", (int(claim_id),))
@@ -0,0 +1,478 @@
+from app.db.connection import get_connection, unit_of_work
+
+
+# ============================================================
+# FASE P4 — Balances materializados (OPT-IN)
+# ============================================================
+# charge_balances, claim_balances y payment_balances son un CACHE de los
+# balances derivados. Los mantienen triggers de SQLite dentro de la misma
+# transacción de cada INSERT/UPDATE/DELETE en charges, applications,
+# adjustments y payments, así que cubren también escrituras fuera de app/db.
+#
+# La verdad sigue siendo charges - applications - adjustments:
+# verify_materialized_balances() recalcula desde las filas fuente y reporta
+# cualquier diferencia (docs/FINANCIAL_MODEL.md — Auditoría).
+
+BALANCE_TOLERANCE = 0.005
+
+BALANCE_TABLES_SQL = """
+CREATE TABLE IF NOT EXISTS charge_balances (
+    charge_id INTEGER PRIMARY KEY,
+    claim_id INTEGER NOT NULL,
+    total_charge REAL NOT NULL DEFAULT 0,
+    total_applied REAL NOT NULL DEFAULT 0,
+    total_adjustments REAL NOT NULL DEFAULT 0,
+    balance REAL NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_charge_balances_claim ON charge_balances(claim_id);
+
+CREATE TABLE IF NOT EXISTS claim_balances (
+    claim_id INTEGER PRIMARY KEY,
+    total_charge REAL NOT NULL DEFAULT 0,
+    total_applied REAL NOT NULL DEFAULT 0,
+    total_adjustments REAL NOT NULL DEFAULT 0,
+    balance_due REAL NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS payment_balances (
+    payment_id INTEGER PRIMARY KEY,
+    total_amount REAL NOT NULL DEFAULT 0,
+    total_applied REAL NOT NULL DEFAULT 0,
+    remaining REAL NOT NULL DEFAULT 0
+);
+"""
+
+# Quita / suma la contribución completa de un charge a su claim.
+# {ref} es OLD o NEW según el trigger.
+_CLAIM_REMOVE_CHARGE = """
+    UPDATE claim_balances
+    SET total_charge = total_charge - (SELECT total_charge FROM charge_balances WHERE charge_id = {ref}.id),
+        total_applied = total_applied - (SELECT total_applied FROM charge_balances WHERE charge_id = {ref}.id),
+        total_adjustments = total_adjustments - (SELECT total_adjustments FROM charge_balances WHERE charge_id = {ref}.id),
+        balance_due = balance_due - (SELECT balance FROM charge_balances WHERE charge_id = {ref}.id)
+    WHERE claim_id = (SELECT claim_id FROM charge_balances WHERE charge_id = {ref}.id);
+"""
+
+_CLAIM_ADD_CHARGE = """
+    INSERT OR IGNORE INTO claim_balances (claim_id)
+    SELECT claim_id FROM charge_balances WHERE charge_id = {ref}.id;
+
+    UPDATE claim_balances
+    SET total_charge = total_charge + (SELECT total_charge FROM charge_balances WHERE charge_id = {ref}.id),
+        total_applied = total_applied + (SELECT total_applied FROM charge_balances WHERE charge_id = {ref}.id),
+        total_adjustments = total_adjustments + (SELECT total_adjustments FROM charge_balances WHERE charge_id = {ref}.id),
+        balance_due = balance_due + (SELECT balance FROM charge_balances WHERE charge_id = {ref}.id)
+    WHERE claim_id = (SELECT claim_id FROM charge_balances WHERE charge_id = {ref}.id);
+"""
+
+# Aplica un movimiento (application o adjustment) con signo {sign}.
+_APPLY_MOVEMENT = """
+    UPDATE charge_balances
+    SET {column} = {column} {sign} {ref}.{amount},
+        balance = balance {inverse} {ref}.{amount}
+    WHERE charge_id = {ref}.charge_id;
+
+    UPDATE claim_balances
+    SET {column} = {column} {sign} {ref}.{amount},
+        balance_due = balance_due {inverse} {ref}.{amount}
+    WHERE claim_id = (SELECT claim_id FROM charge_balances WHERE charge_id = {ref}.charge_id);
+"""
+
+_APPLY_PAYMENT = """
+    UPDATE payment_balances
+    SET total_applied = total_applied {sign} {ref}.amount_applied,
+        remaining = remaining {inverse} {ref}.amount_applied
+    WHERE payment_id = {ref}.payment_id;
+"""
+
+
+def _movement(ref: str, sign: str, column: str, amount: str) -> str:
+    inverse = "-" if sign == "+" else "+"
+    return _APPLY_MOVEMENT.format(ref=ref, sign=sign, inverse=inverse, column=column, amount=amount)
+
+
+def _payment(ref: str, sign: str) -> str:
+    inverse = "-" if sign == "+" else "+"
+    return _APPLY_PAYMENT.format(ref=ref, sign=sign, inverse=inverse)
+
+
+BALANCE_TRIGGERS = {
+    # -------------------------
+    # Charges
+    # -------------------------
+    "trg_balances_charge_insert": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_balances_charge_insert
+        AFTER INSERT ON charges
+        BEGIN
+            INSERT INTO charge_balances (charge_id, claim_id, total_charge, balance)
+            VALUES (NEW.id, (SELECT claim_id FROM services WHERE id = NEW.service_id), NEW.amount, NEW.amount);
+            {_CLAIM_ADD_CHARGE.format(ref="NEW")}
+        END;
+    """,
+    "trg_balances_charge_update": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_balances_charge_update
+        AFTER UPDATE OF amount, service_id ON charges
+        BEGIN
+            {_CLAIM_REMOVE_CHARGE.format(ref="OLD")}
+            UPDATE charge_balances
+            SET claim_id = (SELECT claim_id FROM services WHERE id = NEW.service_id),
+                total_charge = NEW.amount,
+                balance = NEW.amount - total_applied - total_adjustments
+            WHERE charge_id = NEW.id;
+            {_CLAIM_ADD_CHARGE.format(ref="NEW")}
+        END;
+    """,
+    "trg_balances_charge_delete": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_balances_charge_delete
+        AFTER DELETE ON charges
+        BEGIN
+            {_CLAIM_REMOVE_CHARGE.format(ref="OLD")}
+            DELETE FROM charge_balances WHERE charge_id = OLD.id;
+        END;
+    """,
+    # -------------------------
+    # Applications
+    # -------------------------
+    "trg_balances_application_insert": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_balances_application_insert
+        AFTER INSERT ON applications
+        BEGIN
+            {_movement("NEW", "+", "total_applied", "amount_applied")}
+            {_payment("NEW", "+")}
+        END;
+    """,
+    "trg_balances_application_update": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_balances_application_update
+        AFTER UPDATE OF amount_applied, charge_id, payment_id ON applications
+        BEGIN
+            {_movement("OLD", "-", "total_applied", "amount_applied")}
+            {_payment("OLD", "-")}
+            {_movement("NEW", "+", "total_applied", "amount_applied")}
+            {_payment("NEW", "+")}
+        END;
+    """,
+    "trg_balances_application_delete": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_balances_application_delete
+        AFTER DELETE ON applications
+        BEGIN
+            {_movement("OLD", "-", "total_applied", "amount_applied")}
+            {_payment("OLD", "-")}
+        END;
+    """,
+    # -------------------------
+    # Adjustments
+    # -------------------------
+    "trg_balances_adjustment_insert": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_balances_adjustment_insert
+        AFTER INSERT ON adjustments
+        BEGIN
+            {_movement("NEW", "+", "total_adjustments", "amount")}
+        END;
+    """,
+    "trg_balances_adjustment_update": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_balances_adjustment_update
+        AFTER UPDATE OF amount, charge_id ON adjustments
+        BEGIN
+            {_movement("OLD", "-", "total_adjustments", "amount")}
+            {_movement("NEW", "+", "total_adjustments", "amount")}
+        END;
+    """,
+    "trg_balances_adjustment_delete": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_balances_adjustment_delete
+        AFTER DELETE ON adjustments
+        BEGIN
+            {_movement("OLD", "-", "total_adjustments", "amount")}
+        END;
+    """,
+    # -------------------------
+    # Payments
+    # -------------------------
+    "trg_balances_payment_insert": """
+        CREATE TRIGGER IF NOT EXISTS trg_balances_payment_insert
+        AFTER INSERT ON payments
+        BEGIN
+            INSERT INTO payment_balances (payment_id, total_amount, total_applied, remaining)
+            VALUES (NEW.id, NEW.amount, 0, NEW.amount);
+        END;
+    """,
+    "trg_balances_payment_update": """
+        CREATE TRIGGER IF NOT EXISTS trg_balances_payment_update
+        AFTER UPDATE OF amount ON payments
+        BEGIN
+            UPDATE payment_balances
+            SET total_amount = NEW.amount,
+                remaining = NEW.amount - total_applied
+            WHERE payment_id = NEW.id;
+        END;
+    """,
+    "trg_balances_payment_delete": """
+        CREATE TRIGGER IF NOT EXISTS trg_balances_payment_delete
+        AFTER DELETE ON payments
+        BEGIN
+            DELETE FROM payment_balances WHERE payment_id = OLD.id;
+        END;
+    """,
+}
+
+
+# ============================================================
+# Recalculo desde filas fuente (verdad derivada)
+# ============================================================
+
+_DERIVED_CHARGES_SQL = """
+    SELECT
+        c.id AS charge_id,
+        s.claim_id,
+        c.amount AS total_charge,
+        COALESCE(a.total, 0) AS total_applied,
+        COALESCE(ad.total, 0) AS total_adjustments,
+        c.amount - COALESCE(a.total, 0) - COALESCE(ad.total, 0) AS balance
+    FROM charges c
+    JOIN services s ON s.id = c.service_id
+    LEFT JOIN (
+        SELECT charge_id, SUM(amount_applied) AS total
+        FROM applications
+        GROUP BY charge_id
+    ) a ON a.charge_id = c.id
+    LEFT JOIN (
+        SELECT charge_id, SUM(amount) AS total
+        FROM adjustments
+        GROUP BY charge_id
+    ) ad ON ad.charge_id = c.id
+"""
+
+_DERIVED_CLAIMS_SQL = f"""
+    SELECT
+        claim_id,
+        SUM(total_charge) AS total_charge,
+        SUM(total_applied) AS total_applied,
+        SUM(total_adjustments) AS total_adjustments,
+        SUM(balance) AS balance_due
+    FROM ({_DERIVED_CHARGES_SQL})
+    GROUP BY claim_id
+"""
+
+_DERIVED_PAYMENTS_SQL = """
+    SELECT
+        p.id AS payment_id,
+        p.amount AS total_amount,
+        COALESCE(a.total, 0) AS total_applied,
+        p.amount - COALESCE(a.total, 0) AS remaining
+    FROM payments p
+    LEFT JOIN (
+        SELECT payment_id, SUM(amount_applied) AS total
+        FROM applications
+        GROUP BY payment_id
+    ) a ON a.payment_id = p.id
+"""
+
+
+# ============================================================
+# Activación / estado
+# ============================================================
+
+# (PRAGMA schema_version, habilitado)
+_enabled_cache: tuple[int, bool] | None = None
+
+
+def materialized_balances_enabled() -> bool:
+    """
+    True si las tablas y triggers de balances existen en la DB.
+
+    PRAGMA schema_version (header de la DB, sin recorrer sqlite_master) se lee
+    en cada llamada: cualquier CREATE/DROP, también desde otro proceso
+    (p. ej. disable_materialized_balances()), lo cambia y fuerza a volver a
+    contar los triggers. La lectura corre en la transacción del caller.
+    """
+    global _enabled_cache
+    with get_connection() as conn:
+        cur = conn.cursor()
+        version = int(cur.execute("PRAGMA schema_version").fetchone()[0])
+        if _enabled_cache is None or _enabled_cache[0] != version:
+            cur.execute(
+                """
+                SELECT COUNT(*)
+                FROM sqlite_master
+                WHERE type = 'trigger' AND name LIKE 'trg_balances_%'
+                """
+            )
+            _enabled_cache = (version, int(cur.fetchone()[0]) == len(BALANCE_TRIGGERS))
+    return _enabled_cache[1]
+
+
+def rebuild_materialized_balances() -> dict:
+    """
+    Reconstruye las tres tablas desde charges/applications/adjustments/payments.
+    """
+    with unit_of_work() as conn:
+        cur = conn.cursor()
+
+        cur.execute("DELETE FROM charge_balances")
+        cur.execute("DELETE FROM claim_balances")
+        cur.execute("DELETE FROM payment_balances")
+
+        cur.execute(
+            f"""
+            INSERT INTO charge_balances (charge_id, claim_id, total_charge, total_applied, total_adjustments, balance)
+            {_DERIVED_CHARGES_SQL}
+            """
+        )
+        charges = cur.rowcount
+
+        cur.execute(
+            f"""
+            INSERT INTO claim_balances (claim_id, total_charge, total_applied, total_adjustments, balance_due)
+            {_DERIVED_CLAIMS_SQL}
+            """
+        )
+        claims = cur.rowcount
+
+        cur.execute(
+            f"""
+            INSERT INTO payment_balances (payment_id, total_amount, total_applied, remaining)
+            {_DERIVED_PAYMENTS_SQL}
+            """
+        )
+        payments = cur.rowcount
+
+    return {"charges": charges, "claims": claims, "payments": payments}
+
+
+def enable_materialized_balances() -> dict:
+    """
+    Crea tablas + triggers y hace el backfill inicial, todo en una transacción.
+    Idempotente.
+    """
+    global _enabled_cache
+
+    with unit_of_work() as conn:
+        cur = conn.cursor()
+
+        for statement in BALANCE_TABLES_SQL.split(";"):
+            if statement.strip():
+                cur.execute(statement)
+
+        for sql in BALANCE_TRIGGERS.values():
+            cur.execute(sql)
+
+        counts = rebuild_materialized_balances()
+
+    _enabled_cache = None
+    return counts
+
+
+def disable_materialized_balances() -> None:
+    """
+    Elimina triggers y tablas. Los balances vuelven a derivarse en cada lectura.
+    """
+    global _enabled_cache
+
+    with unit_of_work() as conn:
+        cur = conn.cursor()
+
+        for name in BALANCE_TRIGGERS:
+            cur.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+        cur.execute("DROP TABLE IF EXISTS charge_balances")
+        cur.execute("DROP TABLE IF EXISTS claim_balances")
+        cur.execute("DROP TABLE IF EXISTS payment_balances")
+
+    _enabled_cache = None
+
+
+# ============================================================
+# Verificador de drift (AUDITORÍA)
+# ============================================================
+
+def _compare(stored: dict, derived: dict, key: str, fields: tuple, tolerance: float) -> list[dict]:
+    drift = []
+
+    for entity_id, expected in derived.items():
+        actual = stored.get(entity_id)
+        if actual is None:
+            drift.append({key: entity_id, "reason": "MISSING", "expected": expected})
+            continue
+
+        for field in fields:
+            if abs(float(actual[field]) - float(expected[field])) > tolerance:
+                drift.append(
+                    {
+                        key: entity_id,
+                        "reason": "MISMATCH",
+                        "field": field,
+                        "stored": float(actual[field]),
+                        "expected": float(expected[field]),
+                    }
+                )
+
+    for entity_id in stored.keys() - derived.keys():
+        drift.append({key: entity_id, "reason": "ORPHAN", "stored": stored[entity_id]})
+
+    return drift
+
+
+def verify_materialized_balances(tolerance: float = BALANCE_TOLERANCE) -> dict:
+    """
+    Recalcula todos los balances desde las filas fuente y los compara
+    con las tablas materializadas. Solo lectura.
+
+    Claims sin charges pueden no tener fila materializada; se tratan como 0.
+    """
+    if not materialized_balances_enabled():
+        raise ValueError("Balances materializados no están activados")
+
+    with get_connection() as conn:
+        cur = conn.cursor()
+
+        cur.execute(_DERIVED_CHARGES_SQL)
+        derived_charges = {r["charge_id"]: dict(r) for r in cur.fetchall()}
+        cur.execute("SELECT * FROM charge_balances")
+        stored_charges = {r["charge_id"]: dict(r) for r in cur.fetchall()}
+
+        cur.execute(_DERIVED_CLAIMS_SQL)
+        derived_claims = {r["claim_id"]: dict(r) for r in cur.fetchall()}
+        cur.execute("SELECT * FROM claim_balances")
+        stored_claims = {
+            r["claim_id"]: dict(r)
+            for r in cur.fetchall()
+            if r["claim_id"] in derived_claims or any(
+                abs(float(r[f])) > tolerance
+                for f in ("total_charge", "total_applied", "total_adjustments", "balance_due")
+            )
+        }
+
+        cur.execute(_DERIVED_PAYMENTS_SQL)
+        derived_payments = {r["payment_id"]: dict(r) for r in cur.fetchall()}
+        cur.execute("SELECT * FROM payment_balances")
+        stored_payments = {r["payment_id"]: dict(r) for r in cur.fetchall()}
+
+    charges_drift = _compare(
+        stored_charges, derived_charges, "charge_id",
+        ("total_charge", "total_applied", "total_adjustments", "balance"), tolerance,
+    )
+    charges_drift += [
+        {"charge_id": cid, "reason": "WRONG_CLAIM", "stored": stored_charges[cid]["claim_id"], "expected": d["claim_id"]}
+        for cid, d in derived_charges.items()
+        if cid in stored_charges and stored_charges[cid]["claim_id"] != d["claim_id"]
+    ]
+    claims_drift = _compare(
+        stored_claims, derived_claims, "claim_id",
+        ("total_charge", "total_applied", "total_adjustments", "balance_due"), tolerance,
+    )
+    payments_drift = _compare(
+        stored_payments, derived_payments, "payment_id",
+        ("total_amount", "total_applied", "remaining"), tolerance,
+    )
+
+    return {
+        "ok": not (charges_drift or claims_drift or payments_drift),
+        "checked": {
+            "charges": len(derived_charges),
+            "claims": len(derived_claims),
+            "payments": len(derived_payments),
+        },
+        "charges": charges_drift,
+        "claims": claims_drift,
+        "payments": payments_drift,
+    }
@@ -0,0 +1,421 @@
+import sqlite3
+
+
+# ============================================================
+# FASE P9 — Migraciones versionadas (PRAGMA user_version)
+# ============================================================
+# storage/schema.sql crea las tablas base. Todo cambio posterior de schema
+# vive aquí como un paso numerado e idempotente. Al abrir la primera
+# conexión del proceso se aplican, en orden y cada uno en su propia
+# transacción, los pasos con versión > user_version.
+#
+# Reglas para agregar un paso:
+# - Nunca editar ni reordenar pasos ya publicados; solo agregar al final.
+# - Cada paso debe poder correr sobre una DB que ya lo tenga (IF NOT EXISTS).
+
+
+def _hot_path_indexes(cur: sqlite3.Cursor) -> None:
+    # progress_note_addendums la usan las rutas de notas pero no estaba en schema.sql
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS progress_note_addendums (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            note_id INTEGER NOT NULL,
+            addendum_text TEXT,
+            created_at TEXT NOT NULL DEFAULT (datetime('now')),
+            FOREIGN KEY (note_id) REFERENCES progress_notes(id)
+        )
+        """
+    )
+
+    for sql in (
+        # get_payment_balance / reportes por payment
+        "CREATE INDEX IF NOT EXISTS idx_applications_payment ON applications(payment_id)",
+        # dashboard / listas por estado y por paciente
+        "CREATE INDEX IF NOT EXISTS idx_claims_status ON claims(status)",
+        "CREATE INDEX IF NOT EXISTS idx_claims_patient ON claims(patient_id)",
+        # importador 835 (FASE P7)
+        "CREATE INDEX IF NOT EXISTS idx_claims_claim_number ON claims(claim_number)",
+        # ledger: rangos por fecha y filtros por tipo con paginación por id
+        "CREATE INDEX IF NOT EXISTS idx_event_ledger_created ON event_ledger(created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_event_ledger_type_id ON event_ledger(event_type, id)",
+        # reportes por fecha de servicio
+        "CREATE INDEX IF NOT EXISTS idx_services_service_date ON services(service_date)",
+        # addendums por nota, en orden
+        "CREATE INDEX IF NOT EXISTS idx_addendums_note ON progress_note_addendums(note_id, created_at)",
+    ):
+        cur.execute(sql)
+
+
+def _freeze_triggers(cur: sqlite3.Cursor) -> None:
+    from app.db.financial_lock import FREEZE_OVERRIDES_SQL, FREEZE_TRIGGERS
+
+    cur.execute(FREEZE_OVERRIDES_SQL)
+    for sql in FREEZE_TRIGGERS.values():
+        cur.execute(sql)
+
+
+def _snapshot_payload_bytes(cur: sqlite3.Cursor) -> None:
+    # FASE P16: el catálogo de snapshots muestra el tamaño sin leer snapshot_json
+    columns = {r[1] for r in cur.execute("PRAGMA table_info(cms1500_snapshots)").fetchall()}
+    if "payload_bytes" not in columns:
+        cur.execute("ALTER TABLE cms1500_snapshots ADD COLUMN payload_bytes INTEGER")
+
+    cur.execute(
+        """
+        UPDATE cms1500_snapshots
+        SET payload_bytes = length(CAST(snapshot_json AS BLOB))
+        WHERE payload_bytes IS NULL
+        """
+    )
+
+
+def _claim_latest_snapshot(cur: sqlite3.Cursor) -> None:
+    # FASE P17: puntero al último snapshot de cada claim (mayor id).
+    # Lo mantienen triggers en la misma transacción del INSERT/DELETE, así
+    # vale también para escrituras que no pasan por app/db.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS claim_latest_snapshot (
+            claim_id INTEGER PRIMARY KEY,
+            snapshot_id INTEGER NOT NULL,
+            version_number INTEGER,
+            snapshot_hash TEXT NOT NULL,
+            FOREIGN KEY (claim_id) REFERENCES claims(id),
+            FOREIGN KEY (snapshot_id) REFERENCES cms1500_snapshots(id)
+        )
+        """
+    )
+
+    columns = {r[1] for r in cur.execute("PRAGMA table_info(cms1500_snapshots)").fetchall()}
+    version = "version_number" if "version_number" in columns else "NULL"
+    new_version = "NEW.version_number" if "version_number" in columns else "NULL"
+
+    cur.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_latest_snapshot_insert
+        AFTER INSERT ON cms1500_snapshots
+        BEGIN
+            INSERT INTO claim_latest_snapshot (claim_id, snapshot_id, version_number, snapshot_hash)
+            VALUES (NEW.claim_id, NEW.id, {new_version}, NEW.snapshot_hash)
+            ON CONFLICT (claim_id) DO UPDATE SET
+                snapshot_id = excluded.snapshot_id,
+                version_number = excluded.version_number,
+                snapshot_hash = excluded.snapshot_hash
+            WHERE excluded.snapshot_id > claim_latest_snapshot.snapshot_id;
+        END
+        """
+    )
+
+    # Los snapshots no se borran; si ocurre (reparación forense) se recalcula
+    cur.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_latest_snapshot_delete
+        AFTER DELETE ON cms1500_snapshots
+        WHEN EXISTS (
+            SELECT 1 FROM claim_latest_snapshot
+            WHERE claim_id = OLD.claim_id AND snapshot_id = OLD.id
+        )
+        BEGIN
+            DELETE FROM claim_latest_snapshot WHERE claim_id = OLD.claim_id;
+            INSERT INTO claim_latest_snapshot (claim_id, snapshot_id, version_number, snapshot_hash)
+            SELECT claim_id, id, {version}, snapshot_hash
+            FROM cms1500_snapshots
+            WHERE claim_id = OLD.claim_id
+            ORDER BY id DESC
+            LIMIT 1;
+        END
+        """
+    )
+
+    cur.execute(
+        f"""
+        INSERT OR REPLACE INTO claim_latest_snapshot (claim_id, snapshot_id, version_number, snapshot_hash)
+        SELECT s.claim_id, s.id, {version}, s.snapshot_hash
+        FROM cms1500_snapshots s
+        WHERE s.id = (SELECT MAX(s2.id) FROM cms1500_snapshots s2 WHERE s2.claim_id = s.claim_id)
+        """
+    )
+
+
+def _snapshot_summary_columns(cur: sqlite3.Cursor) -> None:
+    # FASE P18: resumen desnormalizado para listar/filtrar claims congelados.
+    # Las filas existentes quedan en NULL hasta correr
+    # scripts/backfill_snapshot_summaries.py.
+    summary_columns = (
+        ("total_charge", "REAL"),
+        ("amount_paid", "REAL"),
+        ("balance_due", "REAL"),
+        ("service_count", "INTEGER"),
+        ("patient_last_name", "TEXT"),
+        ("insurer_name", "TEXT"),
+        ("first_service_date", "TEXT"),
+        ("last_service_date", "TEXT"),
+    )
+    columns = {r[1] for r in cur.execute("PRAGMA table_info(cms1500_snapshots)").fetchall()}
+    for col, col_type in summary_columns:
+        if col not in columns:
+            cur.execute(f"ALTER TABLE cms1500_snapshots ADD COLUMN {col} {col_type}")
+
+    for sql in (
+        "CREATE INDEX IF NOT EXISTS idx_snapshots_patient_last_name ON cms1500_snapshots(patient_last_name)",
+        "CREATE INDEX IF NOT EXISTS idx_snapshots_insurer_name ON cms1500_snapshots(insurer_name)",
+        "CREATE INDEX IF NOT EXISTS idx_snapshots_first_service_date ON cms1500_snapshots(first_service_date)",
+        "CREATE INDEX IF NOT EXISTS idx_snapshots_balance_due ON cms1500_snapshots(balance_due)",
+    ):
+        cur.execute(sql)
+
+
+def _snapshot_service_lines(cur: sqlite3.Cursor) -> None:
+    # FASE P19: una fila por línea 24A–24J de cada snapshot (write-once).
+    # Las filas existentes se proyectan con scripts/backfill_snapshot_service_lines.py.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS snapshot_service_lines (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            snapshot_id INTEGER NOT NULL,
+            claim_id INTEGER NOT NULL,
+            line_number INTEGER NOT NULL,
+            service_id INTEGER,
+            service_date TEXT,
+            place_of_service TEXT,
+            cpt_code TEXT,
+            modifier_1 TEXT,
+            modifier_2 TEXT,
+            modifier_3 TEXT,
+            modifier_4 TEXT,
+            dx_pointer TEXT,
+            diagnosis_code TEXT,
+            units REAL,
+            charge_amount REAL,
+            rendering_npi TEXT,
+            UNIQUE (snapshot_id, line_number),
+            FOREIGN KEY (snapshot_id) REFERENCES cms1500_snapshots(id) ON DELETE CASCADE,
+            FOREIGN KEY (claim_id) REFERENCES claims(id)
+        )
+        """
+    )
+
+    for sql in (
+        "CREATE INDEX IF NOT EXISTS idx_service_lines_cpt_date ON snapshot_service_lines(cpt_code, service_date)",
+        "CREATE INDEX IF NOT EXISTS idx_service_lines_date ON snapshot_service_lines(service_date)",
+        "CREATE INDEX IF NOT EXISTS idx_service_lines_npi ON snapshot_service_lines(rendering_npi)",
+        "CREATE INDEX IF NOT EXISTS idx_service_lines_claim ON snapshot_service_lines(claim_id)",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_service_lines_no_update
+        BEFORE UPDATE ON snapshot_service_lines
+        BEGIN
+            SELECT RAISE(ABORT, 'snapshot_service_lines es inmutable');
+        END
+        """,
+    ):
+        cur.execute(sql)
+
+
+def _snapshot_integrity_scans(cur: sqlite3.Cursor) -> None:
+    # FASE P21: progreso de los escaneos de integridad (checkpoint por lote)
+    # y cola de snapshots cuyo JSON/hash cambió después de escrito.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS snapshot_integrity_scans (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            mode TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'RUNNING',
+            start_after_id INTEGER NOT NULL DEFAULT 0,
+            last_id INTEGER NOT NULL DEFAULT 0,
+            scanned INTEGER NOT NULL DEFAULT 0,
+            failures INTEGER NOT NULL DEFAULT 0,
+            started_at TEXT NOT NULL,
+            finished_at TEXT
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS snapshot_integrity_pending (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            snapshot_id INTEGER NOT NULL UNIQUE
+        )
+        """
+    )
+
+    for sql in (
+        "CREATE INDEX IF NOT EXISTS idx_integrity_scans_status ON snapshot_integrity_scans(status, id)",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_integrity_pending_update
+        AFTER UPDATE OF snapshot_json, snapshot_hash ON cms1500_snapshots
+        BEGIN
+            INSERT OR REPLACE INTO snapshot_integrity_pending (snapshot_id) VALUES (NEW.id);
+        END
+        """,
+    ):
+        cur.execute(sql)
+
+
+def _snapshot_merkle(cur: sqlite3.Cursor) -> None:
+    # FASE P22: árbol Merkle append-only sobre los snapshot_hash (orden por id).
+    # Los snapshots existentes se agregan con scripts/backfill_snapshot_merkle.py.
+    for sql in (
+        """
+        CREATE TABLE IF NOT EXISTS snapshot_merkle_leaves (
+            position INTEGER PRIMARY KEY,
+            snapshot_id INTEGER NOT NULL UNIQUE,
+            snapshot_hash TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS snapshot_merkle_nodes (
+            level INTEGER NOT NULL,
+            idx INTEGER NOT NULL,
+            hash TEXT NOT NULL,
+            PRIMARY KEY (level, idx)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS snapshot_merkle_checkpoints (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tree_size INTEGER NOT NULL,
+            root_hash TEXT NOT NULL,
+            signature TEXT,
+            created_at TEXT NOT NULL
+        )
+        """,
+    ):
+        cur.execute(sql)
+
+    for table in ("snapshot_merkle_leaves", "snapshot_merkle_nodes", "snapshot_merkle_checkpoints"):
+        for op in ("UPDATE", "DELETE"):
+            cur.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_no_{op.lower()}
+                BEFORE {op} ON {table}
+                BEGIN
+                    SELECT RAISE(ABORT, '{table} es append-only');
+                END
+                """
+            )
+
+
+def _event_ledger_chain(cur: sqlite3.Cursor) -> None:
+    # FASE P23: cada evento guarda prev_hash / row_hash (cadena de hashes).
+    # Las filas existentes se encadenan con scripts/rechain_event_ledger.py.
+    columns = {r[1] for r in cur.execute("PRAGMA table_info(event_ledger)").fetchall()}
+    for col in ("prev_hash", "row_hash"):
+        if col not in columns:
+            cur.execute(f"ALTER TABLE event_ledger ADD COLUMN {col} TEXT")
+
+    for sql in (
+        """
+        CREATE TABLE IF NOT EXISTS event_ledger_checkpoints (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER NOT NULL,
+            row_hash TEXT NOT NULL,
+            verified INTEGER NOT NULL DEFAULT 0,
+            signature TEXT,
+            created_at TEXT NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_event_ledger_unchained ON event_ledger(id) WHERE row_hash IS NULL",
+        "CREATE INDEX IF NOT EXISTS idx_ledger_checkpoints_event ON event_ledger_checkpoints(event_id)",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_event_ledger_no_delete
+        BEFORE DELETE ON event_ledger
+        BEGIN
+            SELECT RAISE(ABORT, 'event_ledger es append-only');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_event_ledger_chained_no_update
+        BEFORE UPDATE ON event_ledger
+        WHEN OLD.row_hash IS NOT NULL
+        BEGIN
+            SELECT RAISE(ABORT, 'event_ledger es append-only');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_ledger_checkpoints_no_update
+        BEFORE UPDATE ON event_ledger_checkpoints
+        BEGIN
+            SELECT RAISE(ABORT, 'event_ledger_checkpoints es append-only');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_ledger_checkpoints_no_delete
+        BEFORE DELETE ON event_ledger_checkpoints
+        BEGIN
+            SELECT RAISE(ABORT, 'event_ledger_checkpoints es append-only');
+        END
+        """,
+    ):
+        cur.execute(sql)
+
+
+# (versión, nombre, paso)
+MIGRATIONS = [
+    (1, "hot_path_indexes", _hot_path_indexes),
+    (2, "freeze_triggers", _freeze_triggers),
+    (3, "snapshot_payload_bytes", _snapshot_payload_bytes),
+    (4, "claim_latest_snapshot", _claim_latest_snapshot),
+    (5, "snapshot_summary_columns", _snapshot_summary_columns),
+    (6, "snapshot_service_lines", _snapshot_service_lines),
+    (7, "snapshot_integrity_scans", _snapshot_integrity_scans),
+    (8, "snapshot_merkle", _snapshot_merkle),
+    (9, "event_ledger_chain", _event_ledger_chain),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# Callbacks a notificar cuando una migración cambia el schema
+_listeners = []
+
+
+def on_schema_change(callback) -> None:
+    _listeners.append(callback)
+
+
+def get_schema_version(conn) -> int:
+    return int(conn.execute("PRAGMA user_version").fetchone()[0])
+
+
+def has_base_schema(conn) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cms1500_snapshots'"
+    ).fetchone()
+    return row is not None
+
+
+def run_migrations(conn) -> list[str]:
+    """
+    Aplica los pasos pendientes sobre una conexión sqlite3 (sin scope).
+    Retorna los nombres aplicados. Seguro entre procesos: cada paso
+    toma el lock de escritura y vuelve a leer user_version antes de correr.
+    """
+    if not has_base_schema(conn) or get_schema_version(conn) >= SCHEMA_VERSION:
+        return []
+
+    applied = []
+
+    for version, name, step in MIGRATIONS:
+        if conn.in_transaction:
+            conn.commit()
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if get_schema_version(conn) >= version:
+                conn.rollback()
+                continue
+
+            step(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+        applied.append(name)
+
+    if applied:
+        for callback in _listeners:
+            callback()
+
+    return applied
@@ -1,5 +1,6 @@
 from datetime import datetime
 from app.db.connection import get_connection
+from app.db.materialized_balances import materialized_balances_enabled
 
 ALLOWED_METHODS = {"cash", "check", "eft", "other"}
 
@@ -50,38 +51,77 @@ def list_payments(limit: int = 50):
         return [dict(r) for r in cur.fetchall()]
 
 
-def get_payment_balance(payment_id: int) -> dict:
+def get_payment_balances(payment_ids) -> dict[int, dict]:
     """
-    Calcula:
+    Balance de varios payments en una sola consulta agrupada:
     payment.amount - SUM(applications.amount_applied)
-    """
-    with get_connection() as conn:
-        cur = conn.cursor()
 
-        cur.execute("SELECT amount FROM payments WHERE id = ?", (payment_id,))
-        row = cur.fetchone()
-        if not row:
-            raise ValueError("Payment no existe")
+    Con balances materializados (FASE P4) lee payment_balances directamente.
+    """
+    payment_ids = tuple(int(pid) for pid in payment_ids)
+    if not payment_ids:
+        return {}
 
-        total_amount = float(row["amount"])
+    q_marks = ",".join(["?"] * len(payment_ids))
 
-        cur.execute(
-            """
-            SELECT COALESCE(SUM(amount_applied), 0)
-            FROM applications
-            WHERE payment_id = ?
-            """,
-            (payment_id,),
-        )
-        total_applied = float(cur.fetchone()[0])
+    with get_connection() as conn:
+        cur = conn.cursor()
 
-        return {
-            "payment_id": payment_id,
+        if materialized_balances_enabled():
+            cur.execute(
+                f"""
+                SELECT payment_id, total_amount, total_applied
+                FROM payment_balances
+                WHERE payment_id IN ({q_marks})
+                """,
+                payment_ids,
+            )
+        else:
+            cur.execute(
+                f"""
+                SELECT
+                    p.id AS payment_id,
+                    p.amount AS total_amount,
+                    COALESCE(a.total, 0) AS total_applied
+                FROM payments p
+                LEFT JOIN (
+                    SELECT payment_id, SUM(amount_applied) AS total
+                    FROM applications
+                    WHERE payment_id IN ({q_marks})
+                    GROUP BY payment_id
+                ) a ON a.payment_id = p.id
+                WHERE p.id IN ({q_marks})
+                """,
+                payment_ids * 2,
+            )
+
+        rows = cur.fetchall()
+
+    balances = {}
+    for r in rows:
+        total_amount = float(r["total_amount"])
+        total_applied = float(r["total_applied"])
+
+        balances[r["payment_id"]] = {
+            "payment_id": r["payment_id"],
             "total_amount": total_amount,
             "total_applied": total_applied,
             "remaining": total_amount - total_applied,
         }
 
+    return balances
+
+
+def get_payment_balance(payment_id: int) -> dict:
+    """
+    Calcula:
+    payment.amount - SUM(applications.amount_applied)
+    """
+    balance = get_payment_balances([payment_id]).get(int(payment_id))
+    if not balance:
+        raise ValueError("Payment no existe")
+    return balance
+
 
 def update_payment(payment_id: int, amount: float, method: str, reference: str | None, received_date: str) -> bool:
     if amount is None or float(amount) <= 0:
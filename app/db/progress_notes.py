@@ -1,11 +1,9 @@
-import sqlite3
-from app.config import DB_PATH
+from app.db.connection import get_connection
 
 
 def get_notes_by_encounter(encounter_id):
 
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = get_connection()
 
     cur = conn.cursor()
 
@@ -0,0 +1,77 @@
+import threading
+
+from app.db.connection import get_connection
+from app.db.migrations import get_schema_version, on_schema_change
+
+
+# ============================================================
+# FASE P10 — Capacidades del schema (cache por proceso)
+# ============================================================
+# Qué tablas y columnas existen se lee UNA vez por proceso con una sola
+# consulta (sqlite_master + pragma_table_info) y se guarda junto al
+# user_version leído. Se invalida solo cuando run_migrations aplica un paso.
+#
+# Uso en caliente (sin tocar la DB):
+#     if has_column("cms1500_snapshots", "version_number"): ...
+
+# RLock: la primera conexión del proceso puede correr migraciones y
+# notificar invalidate_schema_capabilities() mientras _load() tiene el lock
+_lock = threading.RLock()
+_cache = None
+
+
+def _load() -> dict:
+    with get_connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT m.name AS table_name, p.name AS column_name
+            FROM sqlite_master m
+            JOIN pragma_table_info(m.name) p
+            WHERE m.type = 'table'
+            """
+        ).fetchall()
+        version = get_schema_version(conn)
+
+    tables: dict[str, set] = {}
+    for r in rows:
+        tables.setdefault(r["table_name"], set()).add(r["column_name"])
+
+    return {
+        "schema_version": version,
+        "tables": {name: frozenset(cols) for name, cols in tables.items()},
+    }
+
+
+def schema_capabilities() -> dict:
+    """
+    {"schema_version": int, "tables": {tabla: frozenset(columnas)}}
+    """
+    global _cache
+    caps = _cache
+    if caps is None:
+        with _lock:
+            if _cache is None:
+                _cache = _load()
+            caps = _cache
+    return caps
+
+
+def has_table(table: str) -> bool:
+    return table in schema_capabilities()["tables"]
+
+
+def has_column(table: str, column: str) -> bool:
+    return column in schema_capabilities()["tables"].get(table, ())
+
+
+def invalidate_schema_capabilities() -> None:
+    """
+    Descarta el cache. Lo llama run_migrations; también sirve si un script
+    altera el schema por fuera de las migraciones.
+    """
+    global _cache
+    with _lock:
+        _cache = None
+
+
+on_schema_change(invalidate_schema_capabilities)
@@ -1,6 +1,6 @@
 from datetime import datetime
-from app.db.connection import get_connection
-from app.db.financial_lock import is_claim_locked
+from app.db.connection import unit_of_work
+from app.db.financial_lock import freeze_guard
 
 
 def create_service(
@@ -32,56 +32,56 @@ def create_service(
       El monto real del core financiero debe vivir en la tabla charges.
     """
 
-    # 🔒 BLOQUEO FINANCIERO
-    if is_claim_locked(claim_id):
-        raise ValueError("Claim está congelado por snapshot")
-
     now = datetime.utcnow().isoformat()
 
     if charge_amount_24f is None:
         charge_amount_24f = 0.0
 
-    with get_connection() as conn:
+    with unit_of_work() as conn:
         cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO services (
-                claim_id,
-                service_date,
-                place_of_service_24b,
-                emergency_24c,
-                cpt_code,
-                diagnosis_pointer_24e,
-                charge_amount_24f,
-                units_24g,
-                epsdt_24h,
-                id_qualifier_24i,
-                rendering_npi_24j,
-                outside_lab_20,
-                lab_charges_20,
-                created_at,
-                updated_at
+
+        # 🔒 BLOQUEO FINANCIERO: trigger trg_freeze_services_insert
+        with freeze_guard():
+            cur.execute(
+                """
+                INSERT INTO services (
+                    claim_id,
+                    service_date,
+                    place_of_service_24b,
+                    emergency_24c,
+                    cpt_code,
+                    diagnosis_pointer_24e,
+                    charge_amount_24f,
+                    units_24g,
+                    epsdt_24h,
+                    id_qualifier_24i,
+                    rendering_npi_24j,
+                    outside_lab_20,
+                    lab_charges_20,
+                    created_at,
+                    updated_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    int(claim_id),
+                    service_date,
+                    place_of_service_24b,
+                    int(emergency_24c),
+                    cpt_code,
+                    diagnosis_pointer_24e,
+                    float(charge_amount_24f),
+                    int(units),
+                    epsdt_24h,
+                    id_qualifier_24i,
+                    rendering_npi_24j,
+                    int(outside_lab_20),
+                    lab_charges_20,
+                    now,
+                    now,
+                ),
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                int(claim_id),
-                service_date,
-                place_of_service_24b,
-                int(emergency_24c),
-                cpt_code,
-                diagnosis_pointer_24e,
-                float(charge_amount_24f),
-                int(units),
-                epsdt_24h,
-                id_qualifier_24i,
-                rendering_npi_24j,
-                int(outside_lab_20),
-                lab_charges_20,
-                now,
-                now,
-            ),
-        )
+
         conn.commit()
         return cur.lastrowid
 
@@ -98,36 +98,22 @@ def update_service_box20(
 
     now = datetime.utcnow().isoformat()
 
-    with get_connection() as conn:
+    with unit_of_work() as conn:
         cur = conn.cursor()
 
-        # 1. Obtener claim_id desde services
-        cur.execute(
-            """
-            SELECT claim_id
-            FROM services
-            WHERE id = ?
-            """,
-            (int(service_id),),
-        )
-        row = cur.fetchone()
-        if not row:
-            raise ValueError("Service no existe")
-
-        claim_id = row["claim_id"]
+        # 🔒 BLOQUEO FINANCIERO: trigger trg_freeze_services_update
+        with freeze_guard():
+            cur.execute(
+                """
+                UPDATE services
+                SET outside_lab_20 = ?, lab_charges_20 = ?, updated_at = ?
+                WHERE id = ?
+                """,
+                (int(outside_lab_20), lab_charges_20, now, int(service_id)),
+            )
 
-        # 🔒 BLOQUEO FINANCIERO
-        if is_claim_locked(claim_id):
-            raise ValueError("Claim está congelado por snapshot")
+        if cur.rowcount == 0:
+            raise ValueError("Service no existe")
 
-        # 2. Actualizar
-        cur.execute(
-            """
-            UPDATE services
-            SET outside_lab_20 = ?, lab_charges_20 = ?, updated_at = ?
-            WHERE id = ?
-            """,
-            (int(outside_lab_20), lab_charges_20, now, int(service_id)),
-        )
         conn.commit()
         return cur.rowcount > 0
@@ -0,0 +1,201 @@
+import json
+import threading
+from collections import OrderedDict
+
+from app.config import SNAPSHOT_CACHE_MAX_BYTES
+
+
+# ============================================================
+# FASE P15 — Snapshots parseados en memoria (LRU por proceso)
+# ============================================================
+# La aplicación nunca reescribe un snapshot (solo inserta versiones nuevas),
+# así que su snapshot_json se parsea una sola vez por proceso y se reutiliza.
+# Ningún trigger impide un UPDATE directo sobre cms1500_snapshots: una
+# edición fuera de la app que mantenga snapshot_hash no se ve en este cache.
+# La detectan los verificadores de integridad (verify_snapshot_integrity,
+# FASE P21), que recalculan el hash desde la fila sin pasar por aquí.
+#
+# - Clave: (snapshot_id, snapshot_hash). Si el hash de la fila no coincide
+#   con el guardado, es otra entrada y se vuelve a parsear.
+# - Tope por tamaño: se cuenta el largo de snapshot_json de cada entrada;
+#   por encima de SNAPSHOT_CACHE_MAX_BYTES se descartan las menos usadas.
+# - Las entradas son de solo lectura (FrozenDict / FrozenList): siguen
+#   siendo dict / list para templates, jsonify y compute_snapshot_hash,
+#   pero cualquier mutación levanta TypeError. copy.deepcopy devuelve
+#   una copia mutable.
+#
+# Uso desde un reader (cursor ya abierto):
+#     snapshot = load_snapshot(cur, row["id"], row["snapshot_hash"])
+
+
+def _read_only(*args, **kwargs):
+    raise TypeError("Snapshot de solo lectura (use copy.deepcopy para modificarlo)")
+
+
+class FrozenDict(dict):
+    __slots__ = ()
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+class FrozenList(list):
+    __slots__ = ()
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+
+def freeze(obj):
+    if isinstance(obj, dict):
+        return FrozenDict((k, freeze(v)) for k, v in obj.items())
+    if isinstance(obj, list):
+        return FrozenList(freeze(v) for v in obj)
+    return obj
+
+
+def thaw(obj):
+    if isinstance(obj, dict):
+        return {k: thaw(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [thaw(v) for v in obj]
+    return obj
+
+
+class SnapshotCache:
+    def __init__(self, max_bytes: int = SNAPSHOT_CACHE_MAX_BYTES):
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (id, hash) → (snapshot, bytes)
+        self._total = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, snapshot_id: int, snapshot_hash: str):
+        key = (snapshot_id, snapshot_hash)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, snapshot_id: int, snapshot_hash: str, snapshot_json: str):
+        """
+        Parsea snapshot_json, lo guarda y devuelve la versión de solo lectura.
+        """
+        snapshot = freeze(json.loads(snapshot_json))
+        size = len(snapshot_json)
+
+        if size > self.max_bytes:
+            return snapshot
+
+        key = (snapshot_id, snapshot_hash)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total -= old[1]
+
+            self._entries[key] = (snapshot, size)
+            self._total += size
+
+            while self._total > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._total -= evicted_size
+                self._evictions += 1
+
+        return snapshot
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_cache = SnapshotCache()
+
+
+def get_snapshot_cache() -> SnapshotCache:
+    return _cache
+
+
+def snapshot_cache_stats() -> dict:
+    return _cache.stats()
+
+
+def load_snapshot(cur, snapshot_id: int, snapshot_hash: str):
+    """
+    Snapshot parseado (solo lectura). snapshot_json se lee de la DB
+    solo si no está en cache.
+    """
+    snapshot = _cache.get(snapshot_id, snapshot_hash)
+    if snapshot is not None:
+        return snapshot
+
+    cur.execute("SELECT snapshot_json FROM cms1500_snapshots WHERE id = ?", (snapshot_id,))
+    row = cur.fetchone()
+    if not row:
+        return None
+
+    return _cache.put(snapshot_id, snapshot_hash, row["snapshot_json"])
+
+
+def load_snapshots(cur, keys: list[tuple[int, str]]) -> dict:
+    """
+    {snapshot_id: snapshot} para varias claves (snapshot_id, snapshot_hash).
+    Los que faltan en cache se leen con una sola consulta IN.
+    """
+    out = {}
+    missing = {}
+    for snapshot_id, snapshot_hash in keys:
+        snapshot = _cache.get(snapshot_id, snapshot_hash)
+        if snapshot is not None:
+            out[snapshot_id] = snapshot
+        else:
+            missing[snapshot_id] = snapshot_hash
+
+    if missing:
+        q_marks = ",".join(["?"] * len(missing))
+        cur.execute(
+            f"SELECT id, snapshot_json FROM cms1500_snapshots WHERE id IN ({q_marks})",
+            tuple(missing),
+        )
+        for r in cur.fetchall():
+            out[r["id"]] = _cache.put(r["id"], missing[r["id"]], r["snapshot_json"])
+
+    return out
+
@@ -0,0 +1,309 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from app.db.connection import get_connection, unit_of_work
+from app.db.event_ledger import append_event, append_events, ledger_event
+
+
+# ============================================================
+# FASE P21 — Escaneo de integridad de todo el store
+# ============================================================
+# Misma verificación que verify_snapshot_integrity (sha256 del
+# snapshot_json almacenado vs snapshot_hash), pero:
+# - lee por lotes ordenados por id y reparte el hash en un pool de procesos
+#   (mientras el pool hashea un lote se lee el siguiente);
+# - cada lote guarda su checkpoint (last_id) y sus fallas en una sola
+#   transacción: un escaneo interrumpido se retoma donde quedó;
+# - escribe un evento resumen por escaneo y uno por falla (no uno por snapshot).
+#
+# Modo incremental (nocturno): snapshots con id > último escaneo completo,
+# más los que cambiaron de JSON/hash desde entonces
+# (snapshot_integrity_pending, cargada por trigger).
+# Modo full: todo el store.
+
+INTEGRITY_SCAN_CHUNK_SIZE = 500
+INTEGRITY_SCAN_POOL_MIN = 200  # snapshots pendientes para justificar el pool
+
+
+def _verify_rows(rows: list[tuple]) -> list[dict]:
+    """
+    Corre en el pool: (id, claim_id, snapshot_json, snapshot_hash) → fallas.
+    """
+    failures = []
+    for snapshot_id, claim_id, snapshot_json, stored_hash in rows:
+        recalculated = hashlib.sha256(snapshot_json.encode("utf-8")).hexdigest()
+        if recalculated != stored_hash:
+            failures.append(
+                {
+                    "snapshot_id": snapshot_id,
+                    "claim_id": claim_id,
+                    "stored_hash": stored_hash,
+                    "recalculated_hash": recalculated,
+                }
+            )
+    return failures
+
+
+def _read_range(after_id: int, chunk_size: int) -> list[tuple]:
+    with get_connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT id, claim_id, snapshot_json, snapshot_hash
+            FROM cms1500_snapshots
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+            """,
+            (after_id, chunk_size),
+        ).fetchall()
+    return [tuple(r) for r in rows]
+
+
+def _read_pending(chunk_size: int) -> tuple[list[tuple], list[int]]:
+    with get_connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT p.id AS pending_id, s.id, s.claim_id, s.snapshot_json, s.snapshot_hash
+            FROM snapshot_integrity_pending p
+            JOIN cms1500_snapshots s ON s.id = p.snapshot_id
+            ORDER BY p.id
+            LIMIT ?
+            """,
+            (chunk_size,),
+        ).fetchall()
+    return [tuple(r)[1:] for r in rows], [r["pending_id"] for r in rows]
+
+
+def _split(rows: list[tuple], parts: int) -> list[list[tuple]]:
+    size = max(1, -(-len(rows) // parts))
+    return [rows[i:i + size] for i in range(0, len(rows), size)]
+
+
+def _open_scan(full: bool) -> dict:
+    """
+    Retoma el escaneo RUNNING del mismo modo si quedó uno interrumpido;
+    si no, abre uno nuevo (un RUNNING de otro modo queda ABANDONED).
+    """
+    mode = "full" if full else "incremental"
+
+    with unit_of_work() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM snapshot_integrity_scans WHERE status = 'RUNNING' ORDER BY id DESC LIMIT 1")
+        row = cur.fetchone()
+        if row and row["mode"] == mode:
+            return {**dict(row), "resumed": True}
+        if row:
+            cur.execute(
+                "UPDATE snapshot_integrity_scans SET status = 'ABANDONED', finished_at = ? WHERE status = 'RUNNING'",
+                (datetime.utcnow().isoformat(),),
+            )
+
+        start_after = 0
+        if not full:
+            cur.execute("SELECT MAX(last_id) FROM snapshot_integrity_scans WHERE status = 'COMPLETED'")
+            start_after = cur.fetchone()[0] or 0
+
+        cur.execute(
+            """
+            INSERT INTO snapshot_integrity_scans (mode, start_after_id, last_id, started_at)
+            VALUES (?, ?, ?, ?)
+            """,
+            (mode, start_after, start_after, datetime.utcnow().isoformat()),
+        )
+        cur.execute("SELECT * FROM snapshot_integrity_scans WHERE id = ?", (cur.lastrowid,))
+        return {**dict(cur.fetchone()), "resumed": False}
+
+
+def _record_chunk(scan_id: int, failures: list[dict], scanned: int, last_id: int | None, pending_ids: list[int]) -> None:
+    with unit_of_work() as conn:
+        append_events(
+            conn.cursor(),
+            [
+                ledger_event(
+                    entity_type="claim",
+                    entity_id=f["claim_id"],
+                    event_type="snapshot_integrity_failed",
+                    event_data={
+                        "snapshot_id": f["snapshot_id"],
+                        "expected_hash": f["stored_hash"],
+                        "recalculated_hash": f["recalculated_hash"],
+                        "scan_id": scan_id,
+                    },
+                )
+                for f in failures
+            ],
+        )
+
+        if pending_ids:
+            q_marks = ",".join(["?"] * len(pending_ids))
+            conn.execute(f"DELETE FROM snapshot_integrity_pending WHERE id IN ({q_marks})", tuple(pending_ids))
+
+        conn.execute(
+            """
+            UPDATE snapshot_integrity_scans
+            SET scanned = scanned + ?,
+                failures = failures + ?,
+                last_id = MAX(last_id, COALESCE(?, last_id))
+            WHERE id = ?
+            """,
+            (scanned, len(failures), last_id, scan_id),
+        )
+
+
+def _scan_failures(scan_id: int) -> list[dict]:
+    """
+    Fallas registradas por un escaneo (incluidas las de corridas
+    anteriores a una interrupción), desde el ledger.
+    """
+    with get_connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT entity_id AS claim_id,
+                   json_extract(event_data, '$.snapshot_id') AS snapshot_id,
+                   json_extract(event_data, '$.expected_hash') AS stored_hash,
+                   json_extract(event_data, '$.recalculated_hash') AS recalculated_hash
+            FROM event_ledger
+            WHERE event_type = 'snapshot_integrity_failed'
+              AND json_extract(event_data, '$.scan_id') = ?
+            ORDER BY id
+            """,
+            (scan_id,),
+        ).fetchall()
+    return [
+        {k: r[k] for k in ("snapshot_id", "claim_id", "stored_hash", "recalculated_hash")}
+        for r in rows
+    ]
+
+
+def run_integrity_scan(
+    full: bool = False,
+    workers: int | None = None,
+    chunk_size: int = INTEGRITY_SCAN_CHUNK_SIZE,
+) -> dict:
+    """
+    Verifica el hash de los snapshots por lotes, con checkpoint por lote.
+
+    full: todo el store (si no, incremental desde el último escaneo completo).
+    workers: procesos para hashear (None = os.cpu_count(), 1 = sin pool).
+
+    Si hay un escaneo interrumpido (RUNNING) del mismo modo, se retoma.
+    Retorna el resumen del escaneo; "failures" son todas las fallas del
+    escaneo, también las registradas antes de una interrupción.
+    """
+    chunk_size = max(1, int(chunk_size))
+    workers = workers or os.cpu_count() or 1
+    scan = _open_scan(full)
+    scan_id = scan["id"]
+    failures = []
+
+    with get_connection() as conn:
+        pending = conn.execute(
+            "SELECT COUNT(*) FROM cms1500_snapshots WHERE id > ?", (scan["last_id"],)
+        ).fetchone()[0]
+        if scan["mode"] == "incremental":
+            pending += conn.execute("SELECT COUNT(*) FROM snapshot_integrity_pending").fetchone()[0]
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and pending >= INTEGRITY_SCAN_POOL_MIN else None
+
+    def _submit(rows):
+        if pool is None:
+            return _verify_rows(rows)
+        return pool.map(_verify_rows, _split(rows, workers))
+
+    def _collect(job) -> list[dict]:
+        if pool is None:
+            return job
+        return [f for part in job for f in part]
+
+    try:
+        # Rango por id: el lote N se hashea mientras se lee el N+1
+        rows = _read_range(scan["last_id"], chunk_size)
+        while rows:
+            job = _submit(rows)
+            last_id = rows[-1][0]
+            next_rows = _read_range(last_id, chunk_size)
+
+            chunk_failures = _collect(job)
+            _record_chunk(scan_id, chunk_failures, len(rows), last_id, [])
+            failures.extend(chunk_failures)
+            rows = next_rows
+
+        # Incremental: snapshots modificados después de escritos
+        if scan["mode"] == "incremental":
+            while True:
+                rows, pending_ids = _read_pending(chunk_size)
+                if not pending_ids:
+                    break
+                chunk_failures = _collect(_submit(rows))
+                _record_chunk(scan_id, chunk_failures, len(rows), None, pending_ids)
+                failures.extend(chunk_failures)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    with unit_of_work() as conn:
+        conn.execute(
+            "UPDATE snapshot_integrity_scans SET status = 'COMPLETED', finished_at = ? WHERE id = ?",
+            (datetime.utcnow().isoformat(), scan_id),
+        )
+        row = dict(conn.execute("SELECT * FROM snapshot_integrity_scans WHERE id = ?", (scan_id,)).fetchone())
+
+        append_event(
+            conn.cursor(),
+            entity_type="integrity_scan",
+            entity_id=scan_id,
+            event_type="snapshot_integrity_scan",
+            event_data={
+                "mode": row["mode"],
+                "start_after_id": row["start_after_id"],
+                "last_id": row["last_id"],
+                "scanned": row["scanned"],
+                "failures": row["failures"],
+                "resumed": scan["resumed"],
+            },
+        )
+
+    if scan["resumed"]:
+        failures = _scan_failures(scan_id)
+
+    return {
+        "scan_id": scan_id,
+        "mode": row["mode"],
+        "resumed": scan["resumed"],
+        "start_after_id": row["start_after_id"],
+        "last_id": row["last_id"],
+        "scanned": row["scanned"],
+        "failure_count": row["failures"],
+        "failures": failures,
+    }
+
+
+def get_last_integrity_scan() -> dict | None:
+    with get_connection() as conn:
+        row = conn.execute("SELECT * FROM snapshot_integrity_scans ORDER BY id DESC LIMIT 1").fetchone()
+    return dict(row) if row else None
+
+
+def get_unresolved_integrity_failures() -> list[dict]:
+    """
+    Snapshots con alguna falla registrada (cualquier escaneo o verificación)
+    que HOY siguen sin coincidir con su hash. Solo se rehashean esos
+    candidatos: un escaneo incremental que ya consumió la cola no "limpia"
+    una falla que nadie corrigió.
+    """
+    with get_connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT s.id, s.claim_id, s.snapshot_json, s.snapshot_hash
+            FROM cms1500_snapshots s
+            WHERE s.id IN (
+                SELECT json_extract(event_data, '$.snapshot_id')
+                FROM event_ledger
+                WHERE event_type = 'snapshot_integrity_failed'
+            )
+            ORDER BY s.id
+            """
+        ).fetchall()
+    return _verify_rows([tuple(r) for r in rows])
@@ -0,0 +1,451 @@
+import hashlib
+import hmac
+from datetime import datetime
+
+from app.config import MERKLE_SIGNING_KEY
+from app.db.connection import get_connection, unit_of_work
+from app.db.event_ledger import append_event
+from app.db.schema_capabilities import has_table
+
+
+# ============================================================
+# FASE P22 — Árbol Merkle sobre snapshots
+# ============================================================
+# Hojas: snapshot_hash de cada cms1500_snapshots, en orden de id.
+# Hash de árbol como RFC 6962 (Certificate Transparency):
+#     hoja = sha256(0x00 || snapshot_hash)
+#     nodo = sha256(0x01 || izquierdo || derecho)
+# Se persisten los nodos de los subárboles completos (level, idx): agregar
+# una hoja escribe a lo sumo log2(n) nodos, y la raíz de cualquier tamaño
+# sale de los "picos" guardados sin volver a hashear el store.
+#
+# - Checkpoints: (tree_size, root_hash) firmados con HMAC si hay
+#   LIFETRACK_MERKLE_SIGNING_KEY.
+# - Prueba de inclusión: una versión de un claim está en la raíz R.
+# - Prueba de consistencia: la raíz vieja es prefijo de la nueva
+#   (nada se cambió ni se borró entre dos checkpoints).
+#
+# Tablas append-only (triggers). El árbol cubre snapshot_hash; que el
+# snapshot_json coincida con su hash lo verifica el escaneo de P21.
+
+MERKLE_BACKFILL_BATCH_SIZE = 1000
+
+
+def has_snapshot_merkle() -> bool:
+    return has_table("snapshot_merkle_leaves")
+
+
+# =========================
+# Hashes (puros)
+# =========================
+
+def merkle_leaf_hash(snapshot_hash: str) -> str:
+    return hashlib.sha256(b"\x00" + snapshot_hash.encode("utf-8")).hexdigest()
+
+
+def merkle_node_hash(left: str, right: str) -> str:
+    return hashlib.sha256(b"\x01" + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+EMPTY_TREE_ROOT = hashlib.sha256(b"").hexdigest()
+
+
+def _split_point(n: int) -> int:
+    # Mayor potencia de 2 estrictamente menor que n (n >= 2)
+    return 1 << ((n - 1).bit_length() - 1)
+
+
+# =========================
+# Escritura
+# =========================
+
+def _node(cur, level: int, idx: int) -> str:
+    row = cur.execute("SELECT hash FROM snapshot_merkle_nodes WHERE level = ? AND idx = ?", (level, idx)).fetchone()
+    if row is None:
+        raise ValueError(f"Falta el nodo Merkle ({level}, {idx})")
+    return row[0]
+
+
+def _tree_size(cur) -> int:
+    # Las posiciones son densas desde 0 y position es el rowid: MAX es O(log n), COUNT(*) recorre la tabla
+    return cur.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM snapshot_merkle_leaves").fetchone()[0]
+
+
+def _append_leaf(cur, position: int, snapshot_id: int, snapshot_hash: str) -> None:
+    cur.execute(
+        "INSERT INTO snapshot_merkle_leaves (position, snapshot_id, snapshot_hash) VALUES (?, ?, ?)",
+        (position, snapshot_id, snapshot_hash),
+    )
+
+    h = merkle_leaf_hash(snapshot_hash)
+    level, idx = 0, position
+    nodes = [(0, position, h)]
+    # Cada vez que la hoja cierra un subárbol completo se guarda su raíz
+    while idx % 2 == 1:
+        h = merkle_node_hash(_node(cur, level, idx - 1), h)
+        level, idx = level + 1, idx // 2
+        nodes.append((level, idx, h))
+
+    cur.executemany("INSERT INTO snapshot_merkle_nodes (level, idx, hash) VALUES (?, ?, ?)", nodes)
+
+
+def append_merkle_leaves(cur, limit: int | None = None) -> int:
+    """
+    Agrega al árbol los snapshots con id mayor a la última hoja (en orden
+    de id). Se llama desde insert_snapshot_row, en la misma transacción:
+    normalmente agrega solo el snapshot recién escrito.
+    Retorna cuántas hojas agregó.
+    """
+    size = _tree_size(cur)
+    last = cur.execute("SELECT COALESCE(MAX(snapshot_id), 0) FROM snapshot_merkle_leaves").fetchone()[0]
+
+    sql = "SELECT id, snapshot_hash FROM cms1500_snapshots WHERE id > ? ORDER BY id"
+    params = [last]
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+
+    rows = cur.execute(sql, tuple(params)).fetchall()
+    for offset, r in enumerate(rows):
+        _append_leaf(cur, size + offset, r[0], r[1])
+    return len(rows)
+
+
+def backfill_snapshot_merkle(batch_size: int = MERKLE_BACKFILL_BATCH_SIZE) -> int:
+    """
+    Agrega al árbol los snapshots existentes, por lotes (una transacción
+    por lote). Idempotente. Retorna cuántas hojas agregó.
+    """
+    if not has_snapshot_merkle():
+        raise ValueError("Faltan las tablas Merkle (migración 8)")
+
+    added = 0
+    while True:
+        with unit_of_work() as conn:
+            n = append_merkle_leaves(conn.cursor(), limit=batch_size)
+        added += n
+        if n < batch_size:
+            return added
+
+
+# =========================
+# Raíz y pruebas
+# =========================
+
+def _subtree_root(cur, start: int, end: int) -> str:
+    """
+    MTH(D[start:end]). Los subárboles completos salen de la tabla; el resto
+    (borde derecho) se arma con a lo sumo log2(n) combinaciones.
+    """
+    n = end - start
+    if n & (n - 1) == 0:
+        level = n.bit_length() - 1
+        return _node(cur, level, start >> level)
+    k = _split_point(n)
+    return merkle_node_hash(_subtree_root(cur, start, start + k), _subtree_root(cur, start + k, end))
+
+
+def _root(cur, tree_size: int) -> str:
+    return EMPTY_TREE_ROOT if tree_size == 0 else _subtree_root(cur, 0, tree_size)
+
+
+def _check_size(cur, tree_size: int | None) -> int:
+    size = _tree_size(cur)
+    if tree_size is None:
+        return size
+    if not 0 <= int(tree_size) <= size:
+        raise ValueError(f"Tamaño de árbol inválido: {tree_size} (actual {size})")
+    return int(tree_size)
+
+
+def get_merkle_root(tree_size: int | None = None) -> dict:
+    """
+    {"tree_size", "root_hash"} del árbol actual (o de un prefijo).
+    """
+    with get_connection() as conn:
+        cur = conn.cursor()
+        size = _check_size(cur, tree_size)
+        return {"tree_size": size, "root_hash": _root(cur, size)}
+
+
+def _inclusion_path(cur, m: int, start: int, end: int) -> list[str]:
+    # PATH(m, D[start:end]) — RFC 6962 2.1.1
+    n = end - start
+    if n == 1:
+        return []
+    k = _split_point(n)
+    if m < start + k:
+        return _inclusion_path(cur, m, start, start + k) + [_subtree_root(cur, start + k, end)]
+    return _inclusion_path(cur, m, start + k, end) + [_subtree_root(cur, start, start + k)]
+
+
+def get_inclusion_proof(snapshot_id: int, tree_size: int | None = None) -> dict:
+    """
+    Prueba de que el snapshot está en la raíz de tree_size (actual por defecto).
+    Se verifica con verify_inclusion, sin acceso a la DB.
+    """
+    with get_connection() as conn:
+        cur = conn.cursor()
+        leaf = cur.execute(
+            """
+            SELECT l.position, l.snapshot_id, l.snapshot_hash, s.claim_id, s.version_number
+            FROM snapshot_merkle_leaves l
+            LEFT JOIN cms1500_snapshots s ON s.id = l.snapshot_id
+            WHERE l.snapshot_id = ?
+            """,
+            (snapshot_id,),
+        ).fetchone()
+        if not leaf:
+            raise ValueError("Snapshot no está en el árbol Merkle")
+
+        size = _check_size(cur, tree_size)
+        if leaf["position"] >= size:
+            raise ValueError("Snapshot posterior al tamaño de árbol pedido")
+
+        return {
+            "snapshot_id": leaf["snapshot_id"],
+            "claim_id": leaf["claim_id"],
+            "version_number": leaf["version_number"],
+            "snapshot_hash": leaf["snapshot_hash"],
+            "leaf_index": leaf["position"],
+            "tree_size": size,
+            "root_hash": _root(cur, size),
+            "proof": _inclusion_path(cur, leaf["position"], 0, size),
+        }
+
+
+def get_claim_version_proof(claim_id: int, version_number: int, tree_size: int | None = None) -> dict:
+    with get_connection() as conn:
+        row = conn.execute(
+            "SELECT id FROM cms1500_snapshots WHERE claim_id = ? AND version_number = ? ORDER BY id DESC LIMIT 1",
+            (claim_id, version_number),
+        ).fetchone()
+    if not row:
+        raise ValueError("Snapshot no existe")
+    return get_inclusion_proof(row["id"], tree_size)
+
+
+def verify_inclusion(snapshot_hash: str, leaf_index: int, tree_size: int, proof: list[str], root_hash: str) -> bool:
+    """
+    RFC 9162 2.1.3.2. Puro: alcanza con el hash, la prueba y la raíz.
+    """
+    if not 0 <= leaf_index < tree_size:
+        return False
+
+    fn, sn = leaf_index, tree_size - 1
+    r = merkle_leaf_hash(snapshot_hash)
+    for p in proof:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            r = merkle_node_hash(p, r)
+            while not fn & 1 and fn != 0:
+                fn, sn = fn >> 1, sn >> 1
+        else:
+            r = merkle_node_hash(r, p)
+        fn, sn = fn >> 1, sn >> 1
+
+    return sn == 0 and r == root_hash
+
+
+def _consistency_path(cur, m: int, start: int, end: int, complete: bool) -> list[str]:
+    # SUBPROOF(m, D[start:end], b) — RFC 6962 2.1.2
+    n = end - start
+    if m == n:
+        return [] if complete else [_subtree_root(cur, start, end)]
+    k = _split_point(n)
+    if m <= k:
+        return _consistency_path(cur, m, start, start + k, complete) + [_subtree_root(cur, start + k, end)]
+    return _consistency_path(cur, m - k, start + k, end, False) + [_subtree_root(cur, start, start + k)]
+
+
+def get_consistency_proof(first_size: int, second_size: int | None = None) -> dict:
+    """
+    Prueba de que el árbol de first_size es prefijo del de second_size.
+    """
+    with get_connection() as conn:
+        cur = conn.cursor()
+        second = _check_size(cur, second_size)
+        first = _check_size(cur, first_size)
+        if first > second:
+            raise ValueError("first_size mayor que second_size")
+
+        proof = _consistency_path(cur, first, 0, second, True) if 0 < first < second else []
+        return {
+            "first_size": first,
+            "second_size": second,
+            "first_root": _root(cur, first),
+            "second_root": _root(cur, second),
+            "proof": proof,
+        }
+
+
+def verify_consistency(first_size: int, second_size: int, first_root: str, second_root: str, proof: list[str]) -> bool:
+    """
+    RFC 9162 2.1.4.2. Puro: compara dos raíces con la prueba.
+    """
+    if first_size > second_size:
+        return False
+    if first_size == second_size:
+        return not proof and first_root == second_root
+    if first_size == 0:
+        return not proof and first_root == EMPTY_TREE_ROOT
+    if not proof and first_size & (first_size - 1) != 0:
+        return False
+
+    path = list(proof)
+    if first_size & (first_size - 1) == 0:
+        path.insert(0, first_root)
+
+    fn, sn = first_size - 1, second_size - 1
+    while fn & 1:
+        fn, sn = fn >> 1, sn >> 1
+
+    fr = sr = path[0]
+    for c in path[1:]:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            fr = merkle_node_hash(c, fr)
+            sr = merkle_node_hash(c, sr)
+            while not fn & 1 and fn != 0:
+                fn, sn = fn >> 1, sn >> 1
+        else:
+            sr = merkle_node_hash(sr, c)
+        fn, sn = fn >> 1, sn >> 1
+
+    return sn == 0 and fr == first_root and sr == second_root
+
+
+# =========================
+# Checkpoints
+# =========================
+
+def _sign(tree_size: int, root_hash: str, created_at: str) -> str | None:
+    if not MERKLE_SIGNING_KEY:
+        return None
+    message = f"{tree_size}:{root_hash}:{created_at}".encode("utf-8")
+    return hmac.new(MERKLE_SIGNING_KEY.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def verify_checkpoint_signature(checkpoint: dict) -> bool | None:
+    """
+    True/False si hay clave configurada; None si no se puede verificar.
+    """
+    if not MERKLE_SIGNING_KEY or not checkpoint.get("signature"):
+        return None
+    expected = _sign(checkpoint["tree_size"], checkpoint["root_hash"], checkpoint["created_at"])
+    return hmac.compare_digest(expected, checkpoint["signature"])
+
+
+def create_merkle_checkpoint() -> dict:
+    """
+    Agrega los snapshots pendientes al árbol y registra la raíz actual
+    (firmada si hay clave). Un evento en el ledger por checkpoint.
+    """
+    with unit_of_work() as conn:
+        cur = conn.cursor()
+        append_merkle_leaves(cur)
+
+        size = _tree_size(cur)
+        root_hash = _root(cur, size)
+        created_at = datetime.utcnow().isoformat()
+        signature = _sign(size, root_hash, created_at)
+
+        cur.execute(
+            """
+            INSERT INTO snapshot_merkle_checkpoints (tree_size, root_hash, signature, created_at)
+            VALUES (?, ?, ?, ?)
+            """,
+            (size, root_hash, signature, created_at),
+        )
+        checkpoint_id = cur.lastrowid
+
+        append_event(
+            cur,
+            entity_type="merkle_checkpoint",
+            entity_id=checkpoint_id,
+            event_type="snapshot_merkle_checkpoint",
+            event_data={"tree_size": size, "root_hash": root_hash, "signed": signature is not None},
+        )
+
+    return {
+        "id": checkpoint_id,
+        "tree_size": size,
+        "root_hash": root_hash,
+        "signature": signature,
+        "created_at": created_at,
+    }
+
+
+def list_merkle_checkpoints(limit: int = 50) -> list[dict]:
+    with get_connection() as conn:
+        rows = conn.execute(
+            "SELECT * FROM snapshot_merkle_checkpoints ORDER BY id DESC LIMIT ?", (int(limit),)
+        ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def get_merkle_checkpoint(checkpoint_id: int) -> dict | None:
+    with get_connection() as conn:
+        row = conn.execute("SELECT * FROM snapshot_merkle_checkpoints WHERE id = ?", (checkpoint_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def verify_merkle_checkpoints(older_id: int, newer_id: int | None = None) -> dict:
+    """
+    Compara dos checkpoints (el más nuevo por defecto = el árbol actual):
+    la raíz vieja tiene que ser prefijo de la nueva.
+    """
+    older = get_merkle_checkpoint(older_id)
+    if not older:
+        raise ValueError("Checkpoint no existe")
+
+    if newer_id is None:
+        newer = get_merkle_root()
+    else:
+        newer = get_merkle_checkpoint(newer_id)
+        if not newer:
+            raise ValueError("Checkpoint no existe")
+
+    if older["tree_size"] > newer["tree_size"]:
+        raise ValueError("El checkpoint viejo es más grande que el nuevo")
+
+    proof = get_consistency_proof(older["tree_size"], newer["tree_size"])["proof"]
+    consistent = verify_consistency(
+        older["tree_size"], newer["tree_size"], older["root_hash"], newer["root_hash"], proof
+    )
+
+    return {
+        "older": older,
+        "newer": newer,
+        "proof": proof,
+        "consistent": consistent,
+        "signatures": {
+            "older": verify_checkpoint_signature(older),
+            "newer": verify_checkpoint_signature(newer) if "signature" in newer else None,
+        },
+    }
+
+
+def find_merkle_leaf_mismatches() -> list[dict]:
+    """
+    Hojas cuyo snapshot ya no existe o cambió de snapshot_hash, y snapshots
+    que no están en el árbol. Solo compara hashes (no lee snapshot_json).
+    """
+    with get_connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT l.position AS leaf_index, l.snapshot_id, l.snapshot_hash AS leaf_hash,
+                   s.snapshot_hash AS stored_hash
+            FROM snapshot_merkle_leaves l
+            LEFT JOIN cms1500_snapshots s ON s.id = l.snapshot_id
+            WHERE s.snapshot_hash IS NOT l.snapshot_hash
+            UNION ALL
+            SELECT NULL, s.id, NULL, s.snapshot_hash
+            FROM cms1500_snapshots s
+            WHERE s.id < (SELECT COALESCE(MAX(snapshot_id), 0) FROM snapshot_merkle_leaves)
+              AND NOT EXISTS (SELECT 1 FROM snapshot_merkle_leaves l WHERE l.snapshot_id = s.id)
+            """
+        ).fetchall()
+    return [dict(r) for r in rows]
@@ -0,0 +1,198 @@
+import json
+
+from app.db.connection import get_connection, unit_of_work
+from app.db.schema_capabilities import has_table
+
+
+# ============================================================
+# FASE P19 — Líneas de servicio del snapshot (proyección normalizada)
+# ============================================================
+# Una fila por línea 24A–24J de cada snapshot, escrita junto con el
+# snapshot (insert_snapshot_row) y nunca modificada (trigger). Permite
+# agregados entre claims como SQL indexado:
+#     unidades de 90837 por aseguradora en el trimestre
+# en vez de parsear snapshot_json de cada claim.
+#
+# Es una copia: la fuente legal sigue siendo snapshot_json.
+# Snapshots anteriores a la migración 6 se completan con
+# backfill_snapshot_service_lines() (scripts/backfill_snapshot_service_lines.py).
+
+SERVICE_LINE_COLUMNS = (
+    "snapshot_id",
+    "claim_id",
+    "line_number",
+    "service_id",
+    "service_date",
+    "place_of_service",
+    "cpt_code",
+    "modifier_1",
+    "modifier_2",
+    "modifier_3",
+    "modifier_4",
+    "dx_pointer",
+    "diagnosis_code",
+    "units",
+    "charge_amount",
+    "rendering_npi",
+)
+
+SERVICE_LINES_BATCH_SIZE = 500
+
+# Agrupaciones permitidas → expresión SQL
+SERVICE_LINE_GROUPS = {
+    "cpt_code": "sl.cpt_code",
+    "insurer_name": "s.insurer_name",
+    "rendering_npi": "sl.rendering_npi",
+    "place_of_service": "sl.place_of_service",
+    "service_month": "substr(sl.service_date, 1, 7)",
+    "claim_status": "c.status",
+}
+
+
+def service_line_rows(snapshot_id: int, claim_id: int, snapshot: dict) -> list[tuple]:
+    """
+    Filas (en el orden de SERVICE_LINE_COLUMNS) de las líneas del snapshot (puro).
+    """
+    rows = []
+    for line_number, s in enumerate(snapshot.get("services") or [], start=1):
+        modifiers = list(s.get("modifiers") or [])[:4]
+        modifiers += [None] * (4 - len(modifiers))
+        rows.append(
+            (
+                snapshot_id,
+                claim_id,
+                line_number,
+                s.get("id"),
+                s.get("service_date"),
+                s.get("place_of_service_24b"),
+                s.get("cpt_code"),
+                *modifiers,
+                s.get("dx_pointer"),
+                s.get("diagnosis_code"),
+                s.get("units"),
+                s.get("charge_amount_24f"),
+                s.get("rendering_npi_24j"),
+            )
+        )
+    return rows
+
+
+def has_snapshot_service_lines() -> bool:
+    return has_table("snapshot_service_lines")
+
+
+def insert_service_lines(cur, snapshot_id: int, claim_id: int, snapshot: dict) -> int:
+    rows = service_line_rows(snapshot_id, claim_id, snapshot)
+    if rows:
+        cur.executemany(
+            f"""
+            INSERT INTO snapshot_service_lines ({", ".join(SERVICE_LINE_COLUMNS)})
+            VALUES ({", ".join(["?"] * len(SERVICE_LINE_COLUMNS))})
+            """,
+            rows,
+        )
+    return len(rows)
+
+
+def backfill_snapshot_service_lines(batch_size: int = SERVICE_LINES_BATCH_SIZE) -> int:
+    """
+    Proyecta las líneas de los snapshots que todavía no las tienen.
+    Recorre por id en lotes (una transacción por lote): se puede
+    interrumpir y volver a correr. Retorna cuántas líneas insertó.
+    """
+    if not has_snapshot_service_lines():
+        raise ValueError("Falta la tabla snapshot_service_lines (migración 6)")
+
+    inserted = 0
+    last_id = 0
+
+    while True:
+        with unit_of_work() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                SELECT s.id, s.claim_id, s.snapshot_json
+                FROM cms1500_snapshots s
+                WHERE s.id > ?
+                  AND NOT EXISTS (SELECT 1 FROM snapshot_service_lines sl WHERE sl.snapshot_id = s.id)
+                ORDER BY s.id
+                LIMIT ?
+                """,
+                (last_id, int(batch_size)),
+            )
+            rows = cur.fetchall()
+            if not rows:
+                return inserted
+
+            for r in rows:
+                inserted += insert_service_lines(cur, r["id"], r["claim_id"], json.loads(r["snapshot_json"]))
+
+        last_id = rows[-1]["id"]
+
+
+def service_line_totals(
+    group_by: list[str] | tuple = ("cpt_code",),
+    cpt_code: str | None = None,
+    insurer_name: str | None = None,
+    rendering_npi: str | None = None,
+    service_date_from: str | None = None,
+    service_date_to: str | None = None,
+    latest_only: bool = True,
+) -> list[dict]:
+    """
+    Agregados de líneas de servicio de claims enviados:
+    {<group_by>..., "lines", "claims", "units", "charges"}.
+
+    latest_only: solo la última versión de cada claim (no cuenta dos
+    veces un claim re-enviado).
+    """
+    group_by = list(group_by)
+    if not group_by:
+        raise ValueError("Indique al menos una agrupación")
+    for g in group_by:
+        if g not in SERVICE_LINE_GROUPS:
+            raise ValueError(f"Agrupación inválida: {g}")
+
+    joins = ["JOIN cms1500_snapshots s ON s.id = sl.snapshot_id", "JOIN claims c ON c.id = sl.claim_id"]
+    if latest_only:
+        joins.append("JOIN claim_latest_snapshot l ON l.claim_id = sl.claim_id AND l.snapshot_id = sl.snapshot_id")
+
+    where = []
+    params = []
+    if cpt_code:
+        where.append("sl.cpt_code = ?")
+        params.append(cpt_code)
+    if insurer_name:
+        where.append("s.insurer_name = ?")
+        params.append(insurer_name)
+    if rendering_npi:
+        where.append("sl.rendering_npi = ?")
+        params.append(rendering_npi)
+    if service_date_from:
+        where.append("sl.service_date >= ?")
+        params.append(service_date_from)
+    if service_date_to:
+        where.append("sl.service_date <= ?")
+        params.append(service_date_to)
+
+    keys = [f"{SERVICE_LINE_GROUPS[g]} AS {g}" for g in group_by]
+
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"""
+            SELECT
+                {", ".join(keys)},
+                COUNT(*) AS lines,
+                COUNT(DISTINCT sl.claim_id) AS claims,
+                COALESCE(SUM(sl.units), 0) AS units,
+                ROUND(COALESCE(SUM(sl.charge_amount), 0), 2) AS charges
+            FROM snapshot_service_lines sl
+            {" ".join(joins)}
+            {"WHERE " + " AND ".join(where) if where else ""}
+            GROUP BY {", ".join(str(i) for i in range(1, len(group_by) + 1))}
+            ORDER BY {", ".join(str(i) for i in range(1, len(group_by) + 1))}
+            """,
+            tuple(params),
+        )
+        return [dict(r) for r in cur.fetchall()]
@@ -0,0 +1,175 @@
+import json
+
+from app.db.connection import get_connection, unit_of_work
+from app.db.schema_capabilities import has_column
+
+
+# ============================================================
+# FASE P18 — Columnas resumen del snapshot (desnormalizadas)
+# ============================================================
+# Totales, paciente, aseguradora y fechas de servicio se copian del
+# snapshot a columnas de cms1500_snapshots al escribirlo
+# (insert_snapshot_row). Listados, filtros y orden de claims congelados
+# corren como SQL indexado, sin parsear snapshot_json.
+#
+# Son una copia: la fuente legal sigue siendo snapshot_json.
+# Snapshots anteriores a la migración 5 se completan con
+# backfill_snapshot_summaries() (scripts/backfill_snapshot_summaries.py).
+
+SNAPSHOT_SUMMARY_COLUMNS = (
+    "total_charge",
+    "amount_paid",
+    "balance_due",
+    "service_count",
+    "patient_last_name",
+    "insurer_name",
+    "first_service_date",
+    "last_service_date",
+)
+
+BACKFILL_BATCH_SIZE = 500
+
+FROZEN_CLAIMS_SORTS = {
+    "first_service_date": "s.first_service_date",
+    "last_service_date": "s.last_service_date",
+    "patient_last_name": "s.patient_last_name",
+    "insurer_name": "s.insurer_name",
+    "balance_due": "s.balance_due",
+    "total_charge": "s.total_charge",
+    "claim_id": "l.claim_id",
+}
+
+
+def snapshot_summary(snapshot: dict) -> dict:
+    """
+    Valores de SNAPSHOT_SUMMARY_COLUMNS a partir del snapshot (puro).
+    """
+    totals = snapshot.get("totals") or {}
+    services = snapshot.get("services") or []
+    dates = sorted(s["service_date"] for s in services if s.get("service_date"))
+
+    return {
+        "total_charge": totals.get("total_charge"),
+        "amount_paid": totals.get("amount_paid"),
+        "balance_due": totals.get("balance_due"),
+        "service_count": len(services),
+        "patient_last_name": (snapshot.get("patient") or {}).get("last_name"),
+        "insurer_name": (snapshot.get("insurance") or {}).get("insurer_name"),
+        "first_service_date": dates[0] if dates else None,
+        "last_service_date": dates[-1] if dates else None,
+    }
+
+
+def has_snapshot_summary() -> bool:
+    return has_column("cms1500_snapshots", "service_count")
+
+
+def backfill_snapshot_summaries(batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """
+    Completa las columnas resumen de snapshots que no las tienen
+    (service_count IS NULL). Recorre por id en lotes; cada lote es una
+    transacción, así que se puede interrumpir y volver a correr.
+    Retorna cuántos snapshots actualizó.
+    """
+    if not has_snapshot_summary():
+        raise ValueError("Faltan las columnas resumen (migración 5)")
+
+    assignments = ", ".join(f"{col} = ?" for col in SNAPSHOT_SUMMARY_COLUMNS)
+    updated = 0
+    last_id = 0
+
+    while True:
+        with unit_of_work() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                SELECT id, snapshot_json
+                FROM cms1500_snapshots
+                WHERE service_count IS NULL AND id > ?
+                ORDER BY id
+                LIMIT ?
+                """,
+                (last_id, int(batch_size)),
+            )
+            rows = cur.fetchall()
+            if not rows:
+                return updated
+
+            params = []
+            for r in rows:
+                summary = snapshot_summary(json.loads(r["snapshot_json"]))
+                params.append((*(summary[col] for col in SNAPSHOT_SUMMARY_COLUMNS), r["id"]))
+
+            cur.executemany(f"UPDATE cms1500_snapshots SET {assignments} WHERE id = ?", params)
+
+        updated += len(rows)
+        last_id = rows[-1]["id"]
+
+
+def list_frozen_claims(
+    insurer_name: str | None = None,
+    patient_last_name: str | None = None,
+    service_date_from: str | None = None,
+    service_date_to: str | None = None,
+    min_balance_due: float | None = None,
+    sort: str = "first_service_date",
+    descending: bool = False,
+    limit: int = 100,
+    offset: int = 0,
+) -> list[dict]:
+    """
+    Claims congelados (último snapshot) con sus columnas resumen.
+    Filtros y orden sobre columnas indexadas; no lee snapshot_json.
+    """
+    if sort not in FROZEN_CLAIMS_SORTS:
+        raise ValueError(f"Orden inválido: {sort}")
+
+    where = []
+    params = []
+
+    if insurer_name:
+        where.append("s.insurer_name = ?")
+        params.append(insurer_name)
+    if patient_last_name:
+        where.append("s.patient_last_name = ?")
+        params.append(patient_last_name)
+    if service_date_from:
+        where.append("s.last_service_date >= ?")
+        params.append(service_date_from)
+    if service_date_to:
+        where.append("s.first_service_date <= ?")
+        params.append(service_date_to)
+    if min_balance_due is not None:
+        where.append("s.balance_due >= ?")
+        params.append(float(min_balance_due))
+
+    direction = "DESC" if descending else "ASC"
+    # Desempate por s.id: el índice de la columna ya lo incluye (rowid)
+    order = f"{FROZEN_CLAIMS_SORTS[sort]} {direction}"
+    if sort != "claim_id":
+        order += f", s.id {direction}"
+
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"""
+            SELECT
+                l.claim_id,
+                c.claim_number,
+                c.status AS claim_status,
+                s.id AS snapshot_id,
+                s.version_number,
+                s.snapshot_hash,
+                s.created_at,
+                s.payload_bytes,
+                {", ".join("s." + col for col in SNAPSHOT_SUMMARY_COLUMNS)}
+            FROM cms1500_snapshots s
+            JOIN claim_latest_snapshot l ON l.claim_id = s.claim_id AND l.snapshot_id = s.id
+            JOIN claims c ON c.id = l.claim_id
+            {"WHERE " + " AND ".join(where) if where else ""}
+            ORDER BY {order}
+            LIMIT ? OFFSET ?
+            """,
+            (*params, int(limit), int(offset)),
+        )
+        return [dict(r) for r in cur.fetchall()]
@@ -1,5 +1,3 @@
-import os
-import sqlite3
 from typing import Any, Dict, Optional
 
 from flask import (
@@ -9,11 +7,21 @@ from flask import (
     redirect,
     url_for,
     session,
+    send_file,
 )
 
 from werkzeug.security import check_password_hash
 
-from app.views.cms1500_render import get_latest_snapshot_by_claim
+from app.db.connection import get_connection, init_app as init_db
+from app.config import ARTIFACTS_PREBUILD
+from app.db.cms1500_snapshot import on_snapshot_created
+from app.views.cms1500_render import (
+    build_cms1500_html,
+    get_latest_snapshot_by_claim,
+    get_latest_snapshot_hash_by_claim,
+    prebuild_cms1500_artifacts,
+)
+from app.utils.artifact_store import get_artifact_store
 from app.utils.snapshot_hash import compute_snapshot_hash
 
 from app.routes.patients import patients_bp
@@ -26,6 +34,7 @@ from app.routes.claim_payments import claim_payments_bp
 from app.routes.claim_adjustments import claim_adjustments_bp
 from app.routes.claim_financial_summary import claim_financial_summary_bp
 from app.routes.payment_balance import payment_balance_bp
+from app.routes.balances_api import balances_api_bp
 from app.routes.claims_overview import claims_overview_bp
 from app.routes.snapshots_admin import snapshots_admin_bp
 from app.routes.claims_admin import claims_admin_bp
@@ -46,6 +55,7 @@ from app.routes.admin_notes_addendum import notes_addendum_admin_bp
 from app.routes.admin_notes_edit import notes_edit_admin_bp
 from app.routes.admin_coverages import coverages_admin_bp
 from app.routes.admin_claims import claims_admin_bp
+from app.routes.claims_bulk_submit import claims_bulk_submit_bp
 
 
 
@@ -56,13 +66,11 @@ from app.routes.admin_claims import claims_admin_bp
 app = Flask(__name__)
 app.secret_key = "dev-secret-key"
 
-DB_PATH = os.path.join("storage", "lifetrack.db")
+init_db(app)
 
 
 def get_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return get_connection()
 
 
 def get_current_user() -> Optional[Dict[str, Any]]:
@@ -166,9 +174,11 @@ app.register_blueprint(claim_payments_bp)
 app.register_blueprint(claim_adjustments_bp)
 app.register_blueprint(claim_financial_summary_bp)
 app.register_blueprint(payment_balance_bp)
+app.register_blueprint(balances_api_bp)
 app.register_blueprint(claims_overview_bp)
 app.register_blueprint(snapshots_admin_bp)
 app.register_blueprint(claims_admin_bp)
+app.register_blueprint(claims_bulk_submit_bp)
 app.register_blueprint(events_admin_bp)
 app.register_blueprint(cms1500_pdf_bp)
 app.register_blueprint(dashboard_admin_bp)
@@ -193,16 +203,27 @@ app.register_blueprint(coverages_admin_bp)
 # =========================
 @app.route("/cms1500/<int:claim_id>")
 def cms1500_view(claim_id):
-    snapshot = get_latest_snapshot_by_claim(claim_id)
-    if not snapshot:
+    # FASE P12: si el HTML de este snapshot ya existe se sirve el archivo
+    stored_hash = get_latest_snapshot_hash_by_claim(claim_id)
+    if not stored_hash:
         return "No hay snapshot para este claim", 404
 
+    path = get_artifact_store().get(stored_hash, "html")
+    if path:
+        return send_file(path, mimetype="text/html")
+
+    snapshot = get_latest_snapshot_by_claim(claim_id)
     snapshot_hash = compute_snapshot_hash(snapshot)
 
-    return render_template(
-        "cms1500.html",
-        snapshot=snapshot,
-        snapshot_hash=snapshot_hash,
+    return build_cms1500_html(snapshot, snapshot_hash)
+
+
+# =========================
+# Artefactos CMS-1500 en background (FASE P12, opt-in)
+# =========================
+if ARTIFACTS_PREBUILD:
+    on_snapshot_created(
+        lambda claim_id, snapshot_hash, snapshot: prebuild_cms1500_artifacts(app, snapshot, snapshot_hash)
     )
 
 
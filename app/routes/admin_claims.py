@@ -1,7 +1,6 @@
 from flask import Blueprint, render_template, request, redirect, url_for, abort
-import sqlite3
 
-from app.config import DB_PATH
+from app.db.connection import get_connection
 from app.security.auth import login_required, role_required
 
 
@@ -20,8 +19,7 @@ claims_admin_bp = Blueprint(
 @role_required("ADMIN", "FACTURADOR", "RECEPCION")
 def create_claim(coverage_id):
 
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = get_connection()
     cur = conn.cursor()
 
     cur.execute(
@@ -1,9 +1,7 @@
 from flask import Blueprint, render_template
-import sqlite3
 
-from app.config import DB_PATH
-from app.db.cms1500_snapshot import get_latest_snapshot_by_claim
-from app.db.claims import get_claim_financial_status
+from app.db.connection import get_connection
+from app.db.claims import get_claims_financial_status
 
 from app.security.auth import login_required, role_required
 
@@ -20,8 +18,7 @@ claims_list_bp = Blueprint(
 @role_required("ADMIN", "FACTURADOR", "RECEPCION", "DRA")
 def claims_list():
 
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = get_connection()
 
     cur = conn.cursor()
 
@@ -39,13 +36,14 @@ def claims_list():
 
     rows = cur.fetchall()
 
+    # Estado financiero + snapshot de todos los claims en queries agrupadas
+    financial_by_claim = get_claims_financial_status()
+
     claims = []
 
     for r in rows:
 
-        snapshot = get_latest_snapshot_by_claim(r["id"])
-
-        financial = get_claim_financial_status(r["id"])
+        financial = financial_by_claim[r["id"]]
 
         claims.append({
             "id": r["id"],
@@ -53,8 +51,8 @@ def claims_list():
             "patient": f'{r["first_name"]} {r["last_name"]}',
             "status": r["status"],
             "financial_status": financial["status"],
-            "locked": snapshot is not None,
-            "snapshot_version": snapshot["version_number"] if snapshot else None
+            "locked": financial["locked"],
+            "snapshot_version": financial["snapshot_version"]
         })
 
     conn.close()
@@ -1,7 +1,6 @@
 from flask import Blueprint, render_template
-import sqlite3
 
-from app.config import DB_PATH
+from app.db.connection import get_connection
 
 dashboard_admin_bp = Blueprint(
     "admin_dashboard",
@@ -12,7 +11,7 @@ dashboard_admin_bp = Blueprint(
 @dashboard_admin_bp.route("/dashboard")
 def dashboard():
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     cur = conn.cursor()
 
     cur.execute("SELECT COUNT(*) FROM claims")
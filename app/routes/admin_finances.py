@@ -1,6 +1,5 @@
 from flask import Blueprint, render_template
-import sqlite3
-from app.config import DB_PATH
+from app.db.connection import get_connection
 
 from app.security.auth import login_required, role_required
 
@@ -17,8 +16,7 @@ finances_admin_bp = Blueprint(
 @role_required("ADMIN", "FACTURADOR")
 def finances_dashboard():
 
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = get_connection()
     cur = conn.cursor()
 
     # =========================
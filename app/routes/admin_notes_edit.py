@@ -1,7 +1,6 @@
 from flask import Blueprint, render_template, request, redirect, url_for
-import sqlite3
 
-from app.config import DB_PATH
+from app.db.connection import get_connection
 from app.security.auth import login_required, role_required
 
 
@@ -17,8 +16,7 @@ notes_edit_admin_bp = Blueprint(
 @role_required("ADMIN", "DRA")
 def edit_note(note_id):
 
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = get_connection()
     cur = conn.cursor()
 
     cur.execute("""
@@ -1,8 +1,7 @@
 from flask import Blueprint, redirect, url_for
-import sqlite3
 from datetime import datetime
 
-from app.config import DB_PATH
+from app.db.connection import get_connection
 from app.security.auth import login_required, role_required
 
 
@@ -18,8 +17,7 @@ notes_sign_admin_bp = Blueprint(
 @role_required("ADMIN", "DRA")
 def sign_note(note_id):
 
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = get_connection()
     cur = conn.cursor()
 
     cur.execute("""
@@ -1,6 +1,5 @@
 from flask import Blueprint, render_template, abort, request, redirect, url_for
-import sqlite3
-from app.config import DB_PATH
+from app.db.connection import get_connection
 
 from app.security.auth import login_required, role_required
 
@@ -20,8 +19,7 @@ patients_admin_bp = Blueprint(
 @role_required("ADMIN", "FACTURADOR", "RECEPCION")
 def patients_list():
 
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = get_connection()
     cur = conn.cursor()
 
     cur.execute(
@@ -63,7 +61,7 @@ def create_patient():
         date_of_birth = request.form.get("date_of_birth")
         sex = request.form.get("sex")
 
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_connection()
         cur = conn.cursor()
 
         cur.execute(
@@ -95,8 +93,7 @@ def create_patient():
 @role_required("ADMIN", "FACTURADOR", "RECEPCION")
 def patient_detail(patient_id: int):
 
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = get_connection()
     cur = conn.cursor()
 
     # patient
@@ -1,6 +1,6 @@
-from flask import Blueprint, render_template
-import sqlite3
-from app.config import DB_PATH
+from flask import Blueprint, render_template, request, jsonify
+from app.db.connection import get_connection
+from app.db.snapshot_service_lines import service_line_totals
 
 from app.security.auth import login_required, role_required
 
@@ -17,8 +17,7 @@ reports_admin_bp = Blueprint(
 @role_required("ADMIN", "FACTURADOR")
 def reports_dashboard():
 
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = get_connection()
     cur = conn.cursor()
 
     # =========================
@@ -60,4 +59,32 @@ def reports_dashboard():
         total_charges=total_charges,
         total_payments=total_payments,
         total_adjustments=total_adjustments,
-    )
\ No newline at end of file
+    )
+
+
+# =========================
+# FASE P19 — Agregados de líneas de servicio enviadas
+# =========================
+# /admin/reports/service-lines?group_by=cpt_code,insurer_name&cpt_code=90837&from=2026-01-01&to=2026-03-31
+
+@reports_admin_bp.route("/service-lines")
+@login_required
+@role_required("ADMIN", "FACTURADOR")
+def service_lines_report():
+
+    group_by = [g for g in request.args.get("group_by", "cpt_code").split(",") if g]
+
+    try:
+        rows = service_line_totals(
+            group_by=group_by,
+            cpt_code=request.args.get("cpt_code"),
+            insurer_name=request.args.get("insurer_name"),
+            rendering_npi=request.args.get("rendering_npi"),
+            service_date_from=request.args.get("from"),
+            service_date_to=request.args.get("to"),
+            latest_only=request.args.get("all_versions") != "1",
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(rows)
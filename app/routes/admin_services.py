@@ -1,6 +1,6 @@
 from flask import Blueprint, render_template, request, redirect, url_for, abort
-import sqlite3
-from app.config import DB_PATH
+from app.db.connection import get_connection
+from app.db.financial_lock import freeze_guard
 
 from app.security.auth import login_required, role_required
 
@@ -20,8 +20,7 @@ services_admin_bp = Blueprint(
 @role_required("ADMIN", "FACTURADOR", "RECEPCION")
 def services_list():
 
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = get_connection()
     cur = conn.cursor()
 
     cur.execute(
@@ -60,8 +59,7 @@ def services_list():
 @role_required("ADMIN", "FACTURADOR")
 def create_service(claim_id):
 
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = get_connection()
     cur = conn.cursor()
 
     cur.execute(
@@ -92,41 +90,47 @@ def create_service(claim_id):
         units = request.form.get("units")
         charge_amount = request.form.get("charge_amount")
 
-        cur.execute(
-            """
-            INSERT INTO services (
-                claim_id,
-                service_date,
-                cpt_code,
-                units_24g,
-                charge_amount_24f
-            )
-            VALUES (?,?,?,?,?)
-            """,
-            (
-                claim_id,
-                service_date,
-                cpt_code,
-                units,
-                charge_amount
-            ),
-        )
-
-        service_id = cur.lastrowid
-
-        cur.execute(
-            """
-            INSERT INTO charges (
-                service_id,
-                amount
-            )
-            VALUES (?,?)
-            """,
-            (
-                service_id,
-                charge_amount
-            ),
-        )
+        # 🔒 Claim congelado por snapshot: lo bloquean los triggers (FASE P8)
+        try:
+            with freeze_guard():
+                cur.execute(
+                    """
+                    INSERT INTO services (
+                        claim_id,
+                        service_date,
+                        cpt_code,
+                        units_24g,
+                        charge_amount_24f
+                    )
+                    VALUES (?,?,?,?,?)
+                    """,
+                    (
+                        claim_id,
+                        service_date,
+                        cpt_code,
+                        units,
+                        charge_amount
+                    ),
+                )
+
+                service_id = cur.lastrowid
+
+                cur.execute(
+                    """
+                    INSERT INTO charges (
+                        service_id,
+                        amount
+                    )
+                    VALUES (?,?)
+                    """,
+                    (
+                        service_id,
+                        charge_amount
+                    ),
+                )
+        except ValueError as e:
+            conn.close()
+            return str(e), 409
 
         conn.commit()
         conn.close()
@@ -1,6 +1,5 @@
 from flask import Blueprint, render_template
-import sqlite3
-from app.config import DB_PATH
+from app.db.connection import get_connection
 
 snapshots_admin_bp = Blueprint(
     "snapshots_admin",
@@ -11,8 +10,7 @@ snapshots_admin_bp = Blueprint(
 @snapshots_admin_bp.route("/")
 def snapshots_list():
 
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = get_connection()
     cur = conn.cursor()
 
     cur.execute("""
@@ -0,0 +1,67 @@
+from flask import Blueprint, jsonify, request
+
+from app.db.balances import get_charge_balances, get_claim_balances
+from app.db.payments import get_payment_balances
+
+balances_api_bp = Blueprint("balances_api", __name__)
+
+
+# =========================================================
+# P5 — Balances por lote (JSON)
+# =========================================================
+# Usado por las pantallas de balance (charge / claim / payment) al refrescar
+# varios registros a la vez mientras se postean EOBs.
+#
+#   GET /balances/api?charge_ids=1,2,3&claim_ids=7&payment_ids=4
+#
+# Cada parámetro acepta lista separada por comas o repetido (?claim_ids=1&claim_ids=2).
+
+MAX_IDS_PER_REQUEST = 500
+
+
+def _ids_arg(name: str) -> list[int] | None:
+    values = request.args.getlist(name)
+    if not values:
+        return None
+
+    ids = []
+    for value in values:
+        for part in value.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            if not part.isdigit():
+                raise ValueError(f"{name} inválido: {part}")
+            ids.append(int(part))
+
+    if len(ids) > MAX_IDS_PER_REQUEST:
+        raise ValueError(f"{name}: máximo {MAX_IDS_PER_REQUEST} ids por request")
+
+    return list(dict.fromkeys(ids))
+
+
+@balances_api_bp.route("/balances/api", methods=["GET"])
+def balances_api():
+
+    try:
+        charge_ids = _ids_arg("charge_ids")
+        claim_ids = _ids_arg("claim_ids")
+        payment_ids = _ids_arg("payment_ids")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if charge_ids is None and claim_ids is None and payment_ids is None:
+        return jsonify({"error": "Indique charge_ids, claim_ids o payment_ids"}), 400
+
+    result = {}
+
+    if charge_ids is not None:
+        result["charges"] = get_charge_balances(charge_ids=charge_ids)
+
+    if claim_ids is not None:
+        result["claims"] = get_claim_balances(claim_ids)
+
+    if payment_ids is not None:
+        result["payments"] = get_payment_balances(payment_ids)
+
+    return jsonify(result)
@@ -11,14 +11,14 @@ from app.db.claims import (
 from app.db.cms1500_snapshot import (
     get_latest_snapshot_by_claim,
     generate_cms1500_snapshot,
-    list_snapshots_admin,
+    list_claim_snapshots,
 )
 
 from app.db.event_ledger import log_event, list_events_admin
+from app.db.financial_lock import is_claim_locked
 
 # H3.3 — lectura directa de servicios
-import sqlite3
-from app.config import DB_PATH
+from app.db.connection import get_connection
 
 
 claims_admin_bp = Blueprint(
@@ -48,8 +48,7 @@ def claim_detail_admin(claim_id: int):
     # =========================================================
     # H3.3 — SERVICES LIST FOR CLAIM
     # =========================================================
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = get_connection()
 
     cur = conn.cursor()
 
@@ -75,12 +74,7 @@ def claim_detail_admin(claim_id: int):
     # =========================================================
     # H3.4 — SNAPSHOTS FOR CLAIM
     # =========================================================
-    all_snaps = list_snapshots_admin()
-
-    claim_snapshots = [
-        s for s in all_snaps
-        if s["claim_id"] == claim_id
-    ]
+    claim_snapshots = list_claim_snapshots(claim_id)
 
     # =========================================================
     # H3.5 — EVENT LEDGER FOR CLAIM
@@ -110,7 +104,7 @@ def claim_transition(claim_id: int):
     # =========================================================
     # G41 — HTTP SNAPSHOT LOCK ENFORCEMENT
     # =========================================================
-    existing_snapshot = get_latest_snapshot_by_claim(claim_id)
+    existing_snapshot = is_claim_locked(claim_id)
 
     new_status = request.form.get("new_status")
     if not new_status:
@@ -142,7 +136,7 @@ def claim_transition(claim_id: int):
     # ---------------------------------------------------------
     if previous_status != "SUBMITTED" and new_status == "SUBMITTED":
 
-        existing_snapshot = get_latest_snapshot_by_claim(claim_id)
+        existing_snapshot = is_claim_locked(claim_id)
 
         if not existing_snapshot:
             try:
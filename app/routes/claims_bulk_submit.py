@@ -0,0 +1,59 @@
+from flask import Blueprint, jsonify, request
+
+from app.db.claim_submission import SUBMIT_MAX_CLAIMS, submit_claims
+from app.security.auth import login_required, role_required
+
+claims_bulk_submit_bp = Blueprint("claims_bulk_submit", __name__)
+
+
+# =========================================================
+# P14 — Envío de claims por lote
+# =========================================================
+#
+#   POST /admin/claims/bulk-submit
+#   claim_ids=1,2,3  (form, repetido o JSON {"claim_ids": [...]})
+#
+# Responde 200 con {"submitted": [...], "failed": [...]} aunque algunos fallen.
+# workers=1: los snapshots se arman en el thread del request; forkear un
+# pool de procesos desde un servidor web con threads no es seguro.
+# El pool queda para scripts / CLI.
+
+def _claim_ids_from_request() -> list[int]:
+    payload = request.get_json(silent=True) or {}
+    values = payload.get("claim_ids")
+    if values is None:
+        values = request.form.getlist("claim_ids")
+
+    if isinstance(values, (int, str)):
+        values = [values]
+
+    ids = []
+    for value in values:
+        for part in str(value).split(","):
+            part = part.strip()
+            if not part:
+                continue
+            if not part.isdigit():
+                raise ValueError(f"claim_ids inválido: {part}")
+            ids.append(int(part))
+
+    if not ids:
+        raise ValueError("Indique claim_ids")
+    if len(ids) > SUBMIT_MAX_CLAIMS:
+        raise ValueError(f"claim_ids: máximo {SUBMIT_MAX_CLAIMS} por envío")
+
+    return ids
+
+
+@claims_bulk_submit_bp.route("/admin/claims/bulk-submit", methods=["POST"])
+@login_required
+@role_required("ADMIN", "FACTURADOR")
+def claims_bulk_submit():
+
+    try:
+        claim_ids = _claim_ids_from_request()
+        result = submit_claims(claim_ids, workers=1)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(result)
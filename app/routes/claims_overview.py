@@ -1,6 +1,6 @@
 from flask import Blueprint, render_template
 from app.db.connection import get_connection
-from app.db.financial_lock import is_claim_locked
+from app.db.claims import get_claims_financial_status
 
 claims_overview_bp = Blueprint("claims_overview", __name__)
 
@@ -26,49 +26,24 @@ def claims_overview():
         """)
         claims = cur.fetchall()
 
-        data = []
+    # Totales financieros + congelación de todos los claims en queries agrupadas
+    financial = get_claims_financial_status()
 
-        for row in claims:
-            claim_id = row["claim_id"]
+    data = []
 
-            # Totales financieros
-            cur.execute("""
-                SELECT COALESCE(SUM(ch.amount), 0)
-                FROM charges ch
-                JOIN services s ON s.id = ch.service_id
-                WHERE s.claim_id = ?
-            """, (claim_id,))
-            total_charge = float(cur.fetchone()[0])
+    for row in claims:
+        claim_id = row["claim_id"]
+        status = financial[claim_id]
 
-            cur.execute("""
-                SELECT COALESCE(SUM(a.amount_applied), 0)
-                FROM applications a
-                JOIN charges ch ON ch.id = a.charge_id
-                JOIN services s ON s.id = ch.service_id
-                WHERE s.claim_id = ?
-            """, (claim_id,))
-            total_applied = float(cur.fetchone()[0])
-
-            cur.execute("""
-                SELECT COALESCE(SUM(ad.amount), 0)
-                FROM adjustments ad
-                JOIN charges ch ON ch.id = ad.charge_id
-                JOIN services s ON s.id = ch.service_id
-                WHERE s.claim_id = ?
-            """, (claim_id,))
-            total_adjustments = float(cur.fetchone()[0])
-
-            balance_due = total_charge - total_applied - total_adjustments
-
-            data.append({
-                "claim_id": claim_id,
-                "patient": f"{row['first_name']} {row['last_name']}",
-                "total_charge": total_charge,
-                "total_applied": total_applied,
-                "total_adjustments": total_adjustments,
-                "balance_due": balance_due,
-                "locked": is_claim_locked(claim_id),
-            })
+        data.append({
+            "claim_id": claim_id,
+            "patient": f"{row['first_name']} {row['last_name']}",
+            "total_charge": status["total_charge"],
+            "total_applied": status["total_applied"],
+            "total_adjustments": status["total_adjustments"],
+            "balance_due": status["balance_due"],
+            "locked": status["locked"],
+        })
 
     return render_template(
         "claims/overview.html",
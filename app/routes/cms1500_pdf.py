@@ -2,16 +2,30 @@
 # FASE C2 — Generación de PDF legal CMS-1500
 # G42 — Export legal con hash visible + auditoría
 # Solo lectura. No modifica datos. No genera snapshot.
-# Motor: Playwright (Chromium)
+# Motor: Playwright (Chromium) — renderer persistente, FASE P11
+
+# Artefactos por snapshot_hash — FASE P12
 
-from flask import Blueprint, render_template, make_response
 import tempfile
-import os
-from playwright.sync_api import sync_playwright
 
-from app.views.cms1500_render import get_latest_snapshot_by_claim
-from app.db.event_ledger import log_event
+from flask import Blueprint, Response, current_app, request, send_file
+
+from app.views.cms1500_render import (
+    build_cms1500_pdf,
+    get_latest_snapshot_by_claim,
+    get_latest_snapshot_hash_by_claim,
+)
+from app.db.event_ledger import log_read_event
+from app.utils.artifact_store import get_artifact_store
 from app.utils.snapshot_hash import compute_snapshot_hash
+from app.utils.pdf_renderer import PdfRenderError, PdfRendererBusy
+from app.views.cms1500_batch import (
+    BATCH_EXPORT_FORMATS,
+    BATCH_EXPORT_MAX_CLAIMS,
+    resolve_batch_claims,
+    stream_batch_zip,
+    write_batch_pdf,
+)
 
 
 cms1500_pdf_bp = Blueprint("cms1500_pdf", __name__)
@@ -32,67 +46,53 @@ def cms1500_pdf(claim_id):
     """
 
     # -------------------------
-    # Obtener snapshot
+    # PDF ya generado para este snapshot → archivo
     # -------------------------
 
-    snapshot_record = get_latest_snapshot_by_claim(claim_id)
+    stored_hash = get_latest_snapshot_hash_by_claim(claim_id)
 
-    if not snapshot_record:
+    if not stored_hash:
         return "No hay snapshot para este claim", 404
 
-    # Compatibilidad con dos formatos posibles
-    if isinstance(snapshot_record, dict) and "snapshot" in snapshot_record:
-        snapshot = snapshot_record["snapshot"]
-        snapshot_hash = snapshot_record.get(
-            "snapshot_hash",
-            compute_snapshot_hash(snapshot),
-        )
-    else:
-        snapshot = snapshot_record
-        snapshot_hash = compute_snapshot_hash(snapshot)
+    snapshot_hash = stored_hash
+    pdf_path = get_artifact_store().get(stored_hash, "pdf")
 
-    # -------------------------
-    # Render HTML
-    # -------------------------
+    if not pdf_path:
 
-    html = render_template(
-        "cms1500.html",
-        snapshot=snapshot,
-        snapshot_hash=snapshot_hash,
-    )
-
-    # -------------------------
-    # Generar PDF
-    # -------------------------
+        # -------------------------
+        # Obtener snapshot
+        # -------------------------
 
-    with tempfile.TemporaryDirectory() as tmpdir:
+        snapshot_record = get_latest_snapshot_by_claim(claim_id)
 
-        html_path = os.path.join(tmpdir, "cms1500.html")
-
-        with open(html_path, "w", encoding="utf-8") as f:
-            f.write(html)
-
-        with sync_playwright() as p:
-
-            browser = p.chromium.launch()
-
-            page = browser.new_page()
-
-            page.goto(f"file:///{html_path.replace(os.sep, '/')}")
-
-            pdf_bytes = page.pdf(
-                format="Letter",
-                print_background=True,
+        # Compatibilidad con dos formatos posibles
+        if isinstance(snapshot_record, dict) and "snapshot" in snapshot_record:
+            snapshot = snapshot_record["snapshot"]
+            snapshot_hash = snapshot_record.get(
+                "snapshot_hash",
+                compute_snapshot_hash(snapshot),
             )
+        else:
+            snapshot = snapshot_record
+            snapshot_hash = compute_snapshot_hash(snapshot)
 
-            browser.close()
+        # -------------------------
+        # Render HTML + PDF (se guardan en el store)
+        # -------------------------
+
+        try:
+            pdf_path = build_cms1500_pdf(snapshot, snapshot_hash)
+        except PdfRendererBusy as e:
+            return str(e), 503, {"Retry-After": "5"}
+        except PdfRenderError as e:
+            return str(e), 500
 
     # -------------------------
     # Auditoría export
     # -------------------------
 
     try:
-        log_event(
+        log_read_event(
             entity_type="claim",
             entity_id=claim_id,
             event_type="snapshot_pdf_exported",
@@ -107,12 +107,86 @@ def cms1500_pdf(claim_id):
     # Respuesta HTTP
     # -------------------------
 
-    response = make_response(pdf_bytes)
+    return send_file(
+        pdf_path,
+        mimetype="application/pdf",
+        as_attachment=True,
+        download_name=f"CMS1500_claim_{claim_id}_snapshot.pdf",
+    )
+
 
-    response.headers["Content-Type"] = "application/pdf"
+# =========================================================
+# P13 — Export por lote
+# =========================================================
+#
+#   GET /cms1500/batch?claim_ids=1,2,3&format=zip
+#   GET /cms1500/batch?status=SUBMITTED&since=2026-01-01&format=pdf
+#
+# zip: un PDF por claim + manifest.json (hashes), en streaming.
+# pdf: un solo PDF combinado (requiere pypdf; hasta BATCH_PDF_MAX_CLAIMS claims).
 
-    response.headers["Content-Disposition"] = (
-        f"attachment; filename=CMS1500_claim_{claim_id}_snapshot.pdf"
-    )
+def _claim_ids_arg() -> list[int] | None:
+    values = request.args.getlist("claim_ids")
+    if not values:
+        return None
+
+    ids = []
+    for value in values:
+        for part in value.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            if not part.isdigit():
+                raise ValueError(f"claim_ids inválido: {part}")
+            ids.append(int(part))
+
+    if len(ids) > BATCH_EXPORT_MAX_CLAIMS:
+        raise ValueError(f"claim_ids: máximo {BATCH_EXPORT_MAX_CLAIMS} por export")
+
+    return ids
 
-    return response
\ No newline at end of file
+
+@cms1500_pdf_bp.route("/cms1500/batch")
+def cms1500_batch():
+
+    fmt = (request.args.get("format") or "zip").lower()
+    if fmt not in BATCH_EXPORT_FORMATS:
+        return f"format inválido: {fmt}", 400
+
+    try:
+        targets = resolve_batch_claims(
+            claim_ids=_claim_ids_arg(),
+            status=request.args.get("status") or None,
+            since=request.args.get("since") or None,
+        )
+    except ValueError as e:
+        return str(e), 400
+
+    if not targets:
+        return "No hay snapshots para los claims seleccionados", 404
+
+    app = current_app._get_current_object()
+
+    if fmt == "zip":
+        return Response(
+            stream_batch_zip(app, targets),
+            mimetype="application/zip",
+            headers={"Content-Disposition": f"attachment; filename=CMS1500_batch_{len(targets)}_claims.zip"},
+        )
+
+    spool = tempfile.TemporaryFile()
+    try:
+        manifest = write_batch_pdf(app, targets, spool)
+    except ValueError as e:
+        spool.close()
+        return str(e), 400
+
+    spool.seek(0)
+    response = send_file(
+        spool,
+        mimetype="application/pdf",
+        as_attachment=True,
+        download_name=f"CMS1500_batch_{manifest['claims']}_claims.pdf",
+    )
+    response.headers["X-Batch-Id"] = manifest["batch_id"]
+    return response
@@ -1,10 +1,15 @@
 from flask import Blueprint, render_template, abort, jsonify, request
 
 from app.db.cms1500_snapshot import (
-    list_snapshots_admin,
+    SNAPSHOT_CATALOG_PAGE_SIZE,
+    list_claim_snapshots,
+    list_snapshot_catalog,
     get_snapshot_by_id,
+    get_snapshot_projection,
+    get_snapshots_projection,
     verify_snapshot_integrity,
 )
+from app.db.snapshot_summary import list_frozen_claims
 
 snapshots_admin_bp = Blueprint(
     "snapshots_admin",
@@ -15,11 +20,16 @@ snapshots_admin_bp = Blueprint(
 
 @snapshots_admin_bp.route("/", methods=["GET"])
 def snapshots_index():
-    snapshots = list_snapshots_admin()
+    # FASE P16: paginado por id (?before_id=), solo metadatos
+    page = list_snapshot_catalog(
+        before_id=request.args.get("before_id", type=int),
+        limit=request.args.get("limit", SNAPSHOT_CATALOG_PAGE_SIZE, type=int),
+    )
 
     return render_template(
         "admin/snapshots_index.html",
-        snapshots=snapshots,
+        snapshots=page["items"],
+        next_before_id=page["next_before_id"],
     )
 
 
@@ -65,15 +75,62 @@ def snapshot_verify(snapshot_id: int):
 @snapshots_admin_bp.route("/api", methods=["GET"])
 def snapshots_api():
 
-    snapshots = list_snapshots_admin()
+    # {"items": [...], "next_before_id": id | null}
+    page = list_snapshot_catalog(
+        before_id=request.args.get("before_id", type=int),
+        limit=request.args.get("limit", SNAPSHOT_CATALOG_PAGE_SIZE, type=int),
+    )
+
+    return jsonify(page)
+
+
+@snapshots_admin_bp.route("/api/claims", methods=["GET"])
+def frozen_claims_api():
+
+    # FASE P18: claims congelados filtrados/ordenados por columnas resumen
+    try:
+        rows = list_frozen_claims(
+            insurer_name=request.args.get("insurer_name"),
+            patient_last_name=request.args.get("patient_last_name"),
+            service_date_from=request.args.get("from"),
+            service_date_to=request.args.get("to"),
+            min_balance_due=request.args.get("min_balance_due", type=float),
+            sort=request.args.get("sort", "first_service_date"),
+            descending=request.args.get("desc") == "1",
+            limit=min(request.args.get("limit", 100, type=int), 500),
+            offset=request.args.get("offset", 0, type=int),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(rows)
+
 
-    return jsonify(snapshots)
+@snapshots_admin_bp.route("/api/projection", methods=["GET"])
+def snapshots_projection_api():
+
+    # FASE P20: ?ids=1,2,3&fields=totals,services
+    try:
+        ids = [int(i) for i in request.args.get("ids", "").split(",") if i.strip()]
+        items = get_snapshots_projection(ids, request.args.get("fields", ""))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify([items[i] for i in dict.fromkeys(ids) if i in items])
 
 
 @snapshots_admin_bp.route("/api/<int:snapshot_id>", methods=["GET"])
 def snapshot_api(snapshot_id: int):
 
-    snap = get_snapshot_by_id(snapshot_id)
+    # FASE P20: ?fields=totals,patient → solo esos subárboles
+    fields = request.args.get("fields")
+    if fields:
+        try:
+            snap = get_snapshot_projection(snapshot_id, fields)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    else:
+        snap = get_snapshot_by_id(snapshot_id)
 
     if not snap:
         abort(404)
@@ -153,16 +210,7 @@ def snapshot_diff():
 @snapshots_admin_bp.route("/claim/<int:claim_id>", methods=["GET"])
 def snapshots_by_claim(claim_id: int):
 
-    all_snaps = list_snapshots_admin()
-
-    claim_snaps = [
-        s for s in all_snaps if s["claim_id"] == claim_id
-    ]
-
-    claim_snaps.sort(
-        key=lambda x: x.get("version_number", 0),
-        reverse=True
-    )
+    claim_snaps = list_claim_snapshots(claim_id)
 
     return render_template(
         "admin/snapshots_claim_index.html",
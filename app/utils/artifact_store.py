@@ -0,0 +1,166 @@
+# app/utils/artifact_store.py
+# FASE P12 — Store de artefactos direccionado por contenido
+# No toca la DB.
+#
+# Los snapshots son inmutables (docs/SNAPSHOT_INVARIANTS.md): su HTML y su
+# PDF dependen solo de snapshot_hash, así que se generan una vez y se guardan
+# en disco.
+#
+# Layout:  <ARTIFACTS_DIR>/ab/cd/abcd…64hex.v<RENDER_VERSION>.<kind>
+# - Escritura atómica: archivo temporal en el mismo directorio + os.replace.
+# - LRU por tamaño: el índice (ruta → bytes) se arma una vez desde disco
+#   ordenado por mtime; cada lectura hace touch para que el orden sobreviva
+#   reinicios.
+
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from app.config import ARTIFACTS_DIR, ARTIFACTS_MAX_BYTES
+
+# Subir si cambia templates/cms1500.html o el formato del PDF
+RENDER_VERSION = 1
+
+ARTIFACT_KINDS = {"html", "pdf"}
+
+_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class ArtifactStore:
+    def __init__(self, root: str = ARTIFACTS_DIR, max_bytes: int = ARTIFACTS_MAX_BYTES):
+        self.root = root
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._index = None
+        self._total = 0
+
+    def path_for(self, snapshot_hash: str, kind: str) -> str:
+        if not _HASH_RE.match(snapshot_hash or ""):
+            raise ValueError("snapshot_hash inválido")
+        if kind not in ARTIFACT_KINDS:
+            raise ValueError(f"Tipo de artefacto inválido: {kind}")
+
+        return os.path.join(
+            self.root,
+            snapshot_hash[:2],
+            snapshot_hash[2:4],
+            f"{snapshot_hash}.v{RENDER_VERSION}.{kind}",
+        )
+
+    def get(self, snapshot_hash: str, kind: str) -> str | None:
+        """
+        Ruta del artefacto si existe (y lo marca como usado), o None.
+        """
+        if not _HASH_RE.match(snapshot_hash or ""):
+            return None
+        path = self.path_for(snapshot_hash, kind)
+
+        with self._lock:
+            index = self._load_index()
+            if path not in index:
+                return None
+            if not os.path.exists(path):
+                # Borrado por otro proceso
+                self._total -= index.pop(path)
+                return None
+            index.move_to_end(path)
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def put(self, snapshot_hash: str, kind: str, data: bytes) -> str:
+        path = self.path_for(snapshot_hash, kind)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        with self._lock:
+            index = self._load_index()
+            self._total -= index.pop(path, 0)
+            index[path] = len(data)
+            self._total += len(data)
+            self._evict(keep=path)
+
+        return path
+
+    def stats(self) -> dict:
+        with self._lock:
+            index = self._load_index()
+            return {"artifacts": len(index), "bytes": self._total, "max_bytes": self.max_bytes}
+
+    # =========================
+    # Índice LRU (con self._lock tomado)
+    # =========================
+
+    def _load_index(self) -> OrderedDict:
+        if self._index is not None:
+            return self._index
+
+        found = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+
+                if name.startswith(".tmp-"):
+                    # Escritura interrumpida (las recientes pueden estar en curso)
+                    if time.time() - st.st_mtime > 3600:
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            pass
+                    continue
+                found.append((st.st_mtime, path, st.st_size))
+
+        found.sort()
+        self._index = OrderedDict((path, size) for _, path, size in found)
+        self._total = sum(size for _, _, size in found)
+        self._evict()
+        return self._index
+
+    def _evict(self, keep: str | None = None) -> None:
+        while self._total > self.max_bytes and self._index:
+            path = next(iter(self._index))
+            if path == keep:
+                if len(self._index) == 1:
+                    break
+                self._index.move_to_end(path)
+                continue
+
+            self._total -= self._index.pop(path)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ArtifactStore()
+        return _store
@@ -0,0 +1,260 @@
+# app/utils/pdf_renderer.py
+# FASE P11 — Renderer PDF persistente (Playwright / Chromium)
+# Solo render. No toca la DB.
+#
+# Un thread dedicado corre un event loop asyncio con UN browser Chromium
+# y un pool fijo de páginas reutilizables. Los requests Flask envían el HTML
+# (string, sin archivo temporal) y esperan el PDF con timeout.
+#
+# - Backpressure: más de PDF_RENDER_MAX_PENDING renders pendientes → PdfRendererBusy.
+# - Timeout: cubre la espera por una página libre + set_content + pdf.
+# - Si el browser se cae se relanza en el siguiente render; las páginas
+#   de la generación anterior se descartan al devolverse.
+# - playwright se importa recién al lanzar el browser.
+
+import asyncio
+import atexit
+import threading
+
+from app.config import PDF_RENDER_MAX_PENDING, PDF_RENDER_PAGES, PDF_RENDER_TIMEOUT_S
+
+
+class PdfRenderError(RuntimeError):
+    pass
+
+
+class PdfRendererBusy(PdfRenderError):
+    pass
+
+
+class PdfRenderer:
+    def __init__(
+        self,
+        pages: int = PDF_RENDER_PAGES,
+        max_pending: int = PDF_RENDER_MAX_PENDING,
+        timeout: float = PDF_RENDER_TIMEOUT_S,
+    ):
+        if pages < 1:
+            raise ValueError("pages debe ser >= 1")
+
+        self.pages = int(pages)
+        self.max_pending = int(max_pending)
+        self.timeout = float(timeout)
+
+        # Lado Flask (cualquier thread)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._thread = None
+        self._loop = None
+
+        # Lado loop (solo el thread del renderer)
+        self._playwright = None
+        self._browser = None
+        self._generation = 0
+        self._free_pages = None
+        self._launch_lock = None
+
+        self.stats = {"renders": 0, "failures": 0, "timeouts": 0, "rejected": 0, "launches": 0}
+
+    # =========================
+    # API (threads Flask)
+    # =========================
+
+    def render(self, html: str, timeout: float | None = None) -> bytes:
+        """
+        Imprime `html` a PDF Letter con fondos. Bloquea hasta terminar.
+        """
+        timeout = self.timeout if timeout is None else float(timeout)
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.stats["rejected"] += 1
+                raise PdfRendererBusy("Renderer PDF saturado, reintente en unos segundos")
+            self._pending += 1
+
+        try:
+            loop = self._ensure_loop()
+            future = asyncio.run_coroutine_threadsafe(
+                asyncio.wait_for(self._render(html), timeout), loop
+            )
+            try:
+                pdf_bytes = future.result(timeout + 1)
+            except TimeoutError:
+                future.cancel()
+                self.stats["timeouts"] += 1
+                raise PdfRenderError(f"Timeout generando PDF ({timeout:.0f}s)") from None
+            except PdfRenderError:
+                self.stats["failures"] += 1
+                raise
+            except Exception as e:
+                self.stats["failures"] += 1
+                raise PdfRenderError(f"Error generando PDF: {e}") from e
+
+            self.stats["renders"] += 1
+            return pdf_bytes
+
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def warm_up(self, timeout: float | None = None) -> None:
+        """
+        Lanza el browser y abre las páginas sin esperar al primer request.
+        """
+        future = asyncio.run_coroutine_threadsafe(self._ensure_browser(), self._ensure_loop())
+        future.result(self.timeout if timeout is None else timeout)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = None
+            self._thread = None
+
+        if loop is None:
+            return
+
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_browser(stop_playwright=True), loop).result(10)
+        except Exception:
+            pass
+
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(10)
+
+    # =========================
+    # Thread del event loop
+    # =========================
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            thread = threading.Thread(
+                target=self._run_loop, args=(loop, ready), name="pdf-renderer", daemon=True
+            )
+            thread.start()
+            ready.wait()
+
+            self._loop = loop
+            self._thread = thread
+            return loop
+
+    def _run_loop(self, loop: asyncio.AbstractEventLoop, ready: threading.Event) -> None:
+        asyncio.set_event_loop(loop)
+        self._launch_lock = asyncio.Lock()
+        self._free_pages = asyncio.Queue()
+        ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    # =========================
+    # Browser + pool de páginas (corre en el loop)
+    # =========================
+
+    async def _launch_browser(self):
+        from playwright.async_api import async_playwright
+
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        return await self._playwright.chromium.launch()
+
+    def _browser_alive(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def _ensure_browser(self) -> None:
+        if self._browser_alive():
+            return
+
+        async with self._launch_lock:
+            if self._browser_alive():
+                return
+
+            await self._close_browser()
+
+            self._browser = await self._launch_browser()
+            self._generation += 1
+            self.stats["launches"] += 1
+
+            # Las páginas viejas que queden en la cola ya no sirven
+            while not self._free_pages.empty():
+                self._free_pages.get_nowait()
+
+            for _ in range(self.pages):
+                page = await self._browser.new_page()
+                self._free_pages.put_nowait((self._generation, page))
+
+    async def _close_browser(self, stop_playwright: bool = False) -> None:
+        browser, self._browser = self._browser, None
+        if browser is not None:
+            try:
+                await browser.close()
+            except Exception:
+                pass
+
+        if stop_playwright and self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
+
+    async def _render(self, html: str) -> bytes:
+        await self._ensure_browser()
+
+        generation, page = await self._free_pages.get()
+        healthy = False
+        try:
+            await page.set_content(html, wait_until="load")
+            pdf_bytes = await page.pdf(format="Letter", print_background=True)
+            healthy = True
+            return pdf_bytes
+        finally:
+            self._return_page(generation, page, healthy)
+
+    def _return_page(self, generation: int, page, healthy: bool) -> None:
+        if healthy and generation == self._generation and self._browser_alive():
+            self._free_pages.put_nowait((generation, page))
+            return
+
+        # Página dañada, cancelada a mitad de render o de un browser anterior
+        asyncio.get_running_loop().create_task(self._replace_page(generation, page))
+
+    async def _replace_page(self, generation: int, page) -> None:
+        try:
+            await page.close()
+        except Exception:
+            pass
+
+        if generation != self._generation:
+            return
+
+        try:
+            if not self._browser_alive():
+                await self._ensure_browser()
+                return
+            self._free_pages.put_nowait((generation, await self._browser.new_page()))
+        except Exception:
+            # Browser en mal estado: se cierra y el próximo render lo relanza
+            await self._close_browser()
+
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def get_pdf_renderer() -> PdfRenderer:
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = PdfRenderer()
+            atexit.register(_renderer.shutdown)
+        return _renderer
+
+
+def render_pdf(html: str) -> bytes:
+    return get_pdf_renderer().render(html)
@@ -0,0 +1,213 @@
+# app/utils/x12_835.py
+# FASE P7 — Parser X12 835 (ERA) en streaming
+# Solo lectura. No toca la DB.
+#
+# El archivo se lee por bloques: nunca se carga completo en memoria.
+# Los delimitadores se toman del segmento ISA (largo fijo de 106 caracteres).
+
+import math
+from datetime import datetime
+
+ISA_LENGTH = 106
+READ_CHUNK_SIZE = 64 * 1024
+
+# Códigos CAS que se registran como adjustment (PR = responsabilidad del paciente)
+ADJUSTMENT_GROUP_CODES = {"CO", "OA", "PI", "CR"}
+PATIENT_RESPONSIBILITY_GROUP = "PR"
+
+# BPR04 → payments.method
+PAYMENT_METHODS = {
+    "CHK": "check",
+    "ACH": "eft",
+    "FWT": "eft",
+    "BOP": "eft",
+}
+
+
+def iter_segments(stream):
+    """
+    Genera cada segmento como lista de elementos (segment[0] es el ID).
+    `stream` es un archivo de texto abierto.
+    """
+    head = stream.read(ISA_LENGTH)
+    head = head.lstrip()
+    while len(head) < ISA_LENGTH:
+        more = stream.read(ISA_LENGTH - len(head))
+        if not more:
+            break
+        head += more
+
+    if not head.startswith("ISA") or len(head) < ISA_LENGTH:
+        raise ValueError("Archivo 835 inválido: falta segmento ISA")
+
+    element_sep = head[3]
+    segment_term = head[105]
+
+    buffer = head
+    while True:
+        parts = buffer.split(segment_term)
+        buffer = parts.pop()
+        for raw in parts:
+            raw = raw.strip("\r\n ")
+            if raw:
+                yield raw.split(element_sep)
+
+        chunk = stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        buffer += chunk
+
+    tail = buffer.strip("\r\n ")
+    if tail:
+        yield tail.split(element_sep)
+
+
+def component_separator(isa: list[str]) -> str:
+    return isa[16][:1] if len(isa) > 16 and isa[16] else ":"
+
+
+def _el(segment: list[str], idx: int) -> str:
+    return segment[idx].strip() if len(segment) > idx else ""
+
+
+def _amount(value: str) -> float:
+    amount = float(value) if value else 0.0
+    # float() acepta "NaN" / "inf": en un 835 no son montos
+    if not math.isfinite(amount):
+        raise ValueError(f"Archivo 835 inválido: monto no finito {value!r}")
+    return amount
+
+
+def _date(value: str) -> str | None:
+    if not value:
+        return None
+    return datetime.strptime(value[:8], "%Y%m%d").strftime("%Y-%m-%d")
+
+
+def _cas(segment: list[str]) -> list[dict]:
+    """
+    CAS*grupo*razón*monto*cantidad*razón*monto*cantidad... (hasta 6 tríos)
+    """
+    group = _el(segment, 1)
+    out = []
+    for i in range(2, len(segment), 3):
+        reason = _el(segment, i)
+        amount = _el(segment, i + 1)
+        if reason and amount:
+            out.append({"group": group, "reason": reason, "amount": _amount(amount)})
+    return out
+
+
+def iter_835(stream):
+    """
+    Genera eventos del remittance en orden:
+
+    {"type": "payment", ...}  — uno por transacción ST/SE (BPR/TRN/N1*PR)
+    {"type": "claim", ...}    — uno por loop CLP, con sus líneas SVC
+
+    Solo se mantiene en memoria el claim en curso. El payment se emite
+    al llegar el primer CLP (la cabecera BPR/TRN/N1 ya está completa).
+    """
+    comp_sep = ":"
+    payment = None
+    claim = None
+    service = None
+
+    def _close_claim():
+        nonlocal claim, service
+        done = claim
+        claim = None
+        service = None
+        return done
+
+    for seg in iter_segments(stream):
+        tag = seg[0]
+
+        if tag == "ISA":
+            comp_sep = component_separator(seg)
+
+        elif tag == "ST":
+            payment = {
+                "type": "payment",
+                "control_number": _el(seg, 2),
+                "amount": 0.0,
+                "method": "other",
+                "reference": None,
+                "received_date": None,
+                "payer": None,
+            }
+
+        elif tag == "BPR" and payment is not None:
+            payment["amount"] = _amount(_el(seg, 2))
+            payment["method"] = PAYMENT_METHODS.get(_el(seg, 4), "other")
+            payment["received_date"] = _date(_el(seg, 16))
+
+        elif tag == "TRN" and payment is not None:
+            payment["reference"] = _el(seg, 2) or None
+
+        elif tag == "DTM" and payment is not None and claim is None and _el(seg, 1) == "405":
+            payment["received_date"] = payment["received_date"] or _date(_el(seg, 2))
+
+        elif tag == "N1" and payment is not None and claim is None and _el(seg, 1) == "PR":
+            payment["payer"] = _el(seg, 2) or None
+
+        elif tag == "CLP":
+            if claim is not None:
+                yield _close_claim()
+
+            if payment is not None and not payment.get("_emitted"):
+                payment["_emitted"] = True
+                yield {k: v for k, v in payment.items() if not k.startswith("_")}
+
+            claim = {
+                "type": "claim",
+                "payment_reference": payment["reference"] if payment else None,
+                "claim_number": _el(seg, 1),
+                "status_code": _el(seg, 2),
+                "total_charge": _amount(_el(seg, 3)),
+                "total_paid": _amount(_el(seg, 4)),
+                "patient_responsibility": _amount(_el(seg, 5)),
+                "payer_claim_control": _el(seg, 7) or None,
+                "service_date": None,
+                "adjustments": [],
+                "services": [],
+            }
+
+        elif tag == "SVC" and claim is not None:
+            procedure = _el(seg, 1).split(comp_sep)
+            service = {
+                "qualifier": procedure[0] if procedure else "",
+                "cpt_code": procedure[1] if len(procedure) > 1 else "",
+                "modifiers": [m for m in procedure[2:6] if m],
+                "charge": _amount(_el(seg, 2)),
+                "paid": _amount(_el(seg, 3)),
+                "units": _el(seg, 5) or None,
+                "service_date": None,
+                "control_number": None,
+                "adjustments": [],
+            }
+            claim["services"].append(service)
+
+        elif tag == "DTM" and claim is not None:
+            qualifier = _el(seg, 1)
+            if service is not None and qualifier in ("472", "150"):
+                service["service_date"] = _date(_el(seg, 2))
+            elif service is None and qualifier in ("232", "050"):
+                claim["service_date"] = claim["service_date"] or _date(_el(seg, 2))
+
+        elif tag == "CAS" and claim is not None:
+            target = service if service is not None else claim
+            target["adjustments"].extend(_cas(seg))
+
+        elif tag == "REF" and service is not None and _el(seg, 1) == "6R":
+            service["control_number"] = _el(seg, 2) or None
+
+        elif tag == "SE":
+            if claim is not None:
+                yield _close_claim()
+            if payment is not None and not payment.get("_emitted"):
+                yield {k: v for k, v in payment.items() if not k.startswith("_")}
+            payment = None
+
+    if claim is not None:
+        yield _close_claim()
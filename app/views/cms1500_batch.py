@@ -0,0 +1,317 @@
+# app/views/cms1500_batch.py
+# FASE P13 — Export CMS-1500 por lote (ZIP o PDF combinado)
+# Solo lectura sobre snapshots. Escribe únicamente auditoría en event_ledger.
+#
+# - Los PDFs se resuelven en paralelo (tantos workers como páginas tiene el
+#   renderer) y se reutilizan los artefactos ya guardados (FASE P12).
+# - El ZIP se genera en streaming: cada PDF se copia desde disco al stream
+#   de salida por bloques; en memoria solo hay una ventana de rutas.
+# - Auditoría: un snapshot_pdf_exported por claim, todos en UNA transacción
+#   y con el mismo batch_id. En el ZIP se escribe también si el cliente corta
+#   la descarga (complete = false, solo los PDFs ya enviados).
+# - El PDF combinado se arma en memoria (pypdf): tope BATCH_PDF_MAX_CLAIMS.
+
+import hashlib
+import json
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from app.config import PDF_RENDER_PAGES
+from app.db.connection import get_connection
+from app.db.event_ledger import ledger_event, log_read_events
+from app.db.snapshot_cache import load_snapshots
+from app.views.cms1500_render import build_cms1500_pdf
+
+BATCH_EXPORT_MAX_CLAIMS = 500
+# PdfWriter guarda todas las páginas hasta write(): el pico de memoria es
+# del orden de la suma de los PDFs del lote. Para lotes grandes, format=zip.
+BATCH_PDF_MAX_CLAIMS = 100
+BATCH_EXPORT_FORMATS = {"zip", "pdf"}
+
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+def resolve_batch_claims(
+    claim_ids: list[int] | None = None,
+    status: str | None = None,
+    since: str | None = None,
+) -> list[dict]:
+    """
+    Último snapshot de cada claim seleccionado, en orden de claim_id.
+
+    claim_ids: lista explícita.
+    status / since: filtro (since compara contra la fecha del snapshot,
+    que se genera al pasar a SUBMITTED).
+    Claims sin snapshot se omiten.
+    """
+    if claim_ids is None and status is None and since is None:
+        raise ValueError("Indique claim_ids o un filtro (status / since)")
+
+    where = []
+    params = []
+
+    if claim_ids is not None:
+        claim_ids = sorted({int(c) for c in claim_ids})
+        if not claim_ids:
+            return []
+        where.append(f"l.claim_id IN ({','.join(['?'] * len(claim_ids))})")
+        params.extend(claim_ids)
+
+    if status:
+        where.append("c.status = ?")
+        params.append(status.upper())
+
+    if since:
+        where.append("s.created_at >= ?")
+        params.append(since)
+
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"""
+            SELECT l.claim_id, l.snapshot_id, l.snapshot_hash, s.created_at
+            FROM claim_latest_snapshot l
+            JOIN cms1500_snapshots s ON s.id = l.snapshot_id
+            JOIN claims c ON c.id = l.claim_id
+            WHERE {" AND ".join(where)}
+            ORDER BY l.claim_id
+            LIMIT ?
+            """,
+            (*params, BATCH_EXPORT_MAX_CLAIMS + 1),
+        )
+        rows = [dict(r) for r in cur.fetchall()]
+
+    if len(rows) > BATCH_EXPORT_MAX_CLAIMS:
+        raise ValueError(f"Máximo {BATCH_EXPORT_MAX_CLAIMS} claims por export")
+
+    return rows
+
+
+def _load_snapshots(targets: list[dict]) -> dict[int, dict]:
+    if not targets:
+        return {}
+
+    with get_connection() as conn:
+        return load_snapshots(conn.cursor(), [(t["snapshot_id"], t["snapshot_hash"]) for t in targets])
+
+
+def iter_batch_pdfs(app, targets: list[dict], workers: int = PDF_RENDER_PAGES):
+    """
+    Genera (target, ruta_pdf | None, error | None) en el orden de `targets`.
+    Hasta `workers` renders en paralelo; nunca hay más de 2×workers
+    resultados pendientes en memoria.
+    """
+    from app.utils.artifact_store import get_artifact_store
+    from app.utils.snapshot_hash import compute_snapshot_hash
+
+    store = get_artifact_store()
+    workers = max(1, int(workers))
+    window = workers * 2
+
+    def _job(target, snapshot):
+        try:
+            with app.test_request_context():
+                return target, build_cms1500_pdf(snapshot, compute_snapshot_hash(snapshot)), None
+        except Exception as e:
+            return target, None, str(e)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cms1500-batch") as executor:
+        for start in range(0, len(targets), window):
+            chunk = targets[start:start + window]
+
+            ready = {}
+            missing = []
+            for target in chunk:
+                path = store.get(target["snapshot_hash"], "pdf")
+                if path:
+                    ready[target["snapshot_id"]] = (target, path, None)
+                else:
+                    missing.append(target)
+
+            # Solo los que faltan cargan snapshot_json (una consulta por ventana)
+            snapshots = _load_snapshots(missing)
+            futures = {
+                t["snapshot_id"]: executor.submit(_job, t, snapshots[t["snapshot_id"]])
+                for t in missing
+            }
+
+            for target in chunk:
+                sid = target["snapshot_id"]
+                yield ready[sid] if sid in ready else futures[sid].result()
+
+
+class _StreamBuffer:
+    """
+    Destino de escritura sin seek: zipfile escribe aquí y el generador
+    vacía los bloques al cliente.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data) -> int:
+        if data:
+            self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+
+def _copy_into(src_path: str, dst) -> tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    with open(src_path, "rb") as src:
+        while True:
+            block = src.read(COPY_CHUNK_SIZE)
+            if not block:
+                break
+            digest.update(block)
+            size += len(block)
+            dst.write(block)
+    return digest.hexdigest(), size
+
+
+def _log_batch(batch_id: str, fmt: str, exported: list[dict], complete: bool = True) -> None:
+    # FASE P24: un solo executemany, fuera de la transacción de lectura
+    # del request; wait=True → ya están en el ledger al terminar el export
+    log_read_events(
+        [
+            ledger_event(
+                entity_type="claim",
+                entity_id=item["claim_id"],
+                event_type="snapshot_pdf_exported",
+                event_data={
+                    "snapshot_hash": item["snapshot_hash"],
+                    "batch_id": batch_id,
+                    "format": fmt,
+                    "batch_size": len(exported),
+                    "complete": complete,
+                },
+            )
+            for item in exported
+        ],
+        wait=True,
+    )
+
+
+def _manifest(batch_id: str, fmt: str, exported: list[dict], failed: list[dict]) -> dict:
+    return {
+        "batch_id": batch_id,
+        "format": fmt,
+        "generated_at": datetime.utcnow().isoformat(),
+        "claims": len(exported),
+        "failed": failed,
+        "files": exported,
+    }
+
+
+def stream_batch_zip(app, targets: list[dict], batch_id: str | None = None, manifest_out: dict | None = None):
+    """
+    Genera los bytes de un ZIP: un PDF por claim + manifest.json con el
+    snapshot_hash y el sha256 de cada PDF.
+
+    La auditoría se escribe al terminar, o al cerrarse el generador antes
+    (cliente desconectado, error): en ese caso cubre los PDFs ya enviados,
+    con complete = false.
+    Si se pasa manifest_out, se completa con el manifest al terminar.
+    """
+    batch_id = batch_id or uuid.uuid4().hex
+    exported = []
+    failed = []
+    complete = False
+
+    out = _StreamBuffer()
+    try:
+        with zipfile.ZipFile(out, mode="w", compression=zipfile.ZIP_STORED) as zf:
+            for target, path, error in iter_batch_pdfs(app, targets):
+                if error:
+                    failed.append({"claim_id": target["claim_id"], "error": error})
+                    continue
+
+                name = f"CMS1500_claim_{target['claim_id']}_snapshot.pdf"
+                with zf.open(name, mode="w") as entry:
+                    pdf_sha256, size = _copy_into(path, entry)
+
+                exported.append(
+                    {
+                        "file": name,
+                        "claim_id": target["claim_id"],
+                        "snapshot_id": target["snapshot_id"],
+                        "snapshot_hash": target["snapshot_hash"],
+                        "pdf_sha256": pdf_sha256,
+                        "bytes": size,
+                    }
+                )
+                yield from out.drain()
+
+            manifest = _manifest(batch_id, "zip", exported, failed)
+            zf.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=2))
+
+        yield from out.drain()
+        complete = True
+    finally:
+        _log_batch(batch_id, "zip", exported, complete=complete)
+
+    if manifest_out is not None:
+        manifest_out.update(manifest)
+
+
+def write_batch_pdf(app, targets: list[dict], fileobj, batch_id: str | None = None) -> dict:
+    """
+    Un solo PDF con todos los claims (en orden). Requiere pypdf.
+    Retorna el manifest (sin sha256 por claim: las páginas se re-escriben).
+    Hasta BATCH_PDF_MAX_CLAIMS claims: el documento se arma en memoria.
+    """
+    if len(targets) > BATCH_PDF_MAX_CLAIMS:
+        raise ValueError(f"Máximo {BATCH_PDF_MAX_CLAIMS} claims por PDF combinado; use format=zip")
+
+    try:
+        from pypdf import PdfWriter
+    except ImportError:
+        raise ValueError("El PDF combinado requiere pypdf (pip install pypdf); use format=zip") from None
+
+    batch_id = batch_id or uuid.uuid4().hex
+    exported = []
+    failed = []
+
+    writer = PdfWriter()
+    for target, path, error in iter_batch_pdfs(app, targets):
+        if error:
+            failed.append({"claim_id": target["claim_id"], "error": error})
+            continue
+
+        first_page = len(writer.pages) + 1
+        writer.append(path)
+        exported.append(
+            {
+                "claim_id": target["claim_id"],
+                "snapshot_id": target["snapshot_id"],
+                "snapshot_hash": target["snapshot_hash"],
+                "pages": [first_page, len(writer.pages)],
+            }
+        )
+
+    writer.write(fileobj)
+    writer.close()
+
+    _log_batch(batch_id, "pdf", exported)
+    return _manifest(batch_id, "pdf", exported, failed)
+
+
+def write_batch_zip(app, targets: list[dict], fileobj, batch_id: str | None = None) -> dict:
+    """
+    Igual que stream_batch_zip pero a un archivo; retorna el manifest.
+    """
+    manifest = {}
+    for chunk in stream_batch_zip(app, targets, batch_id=batch_id, manifest_out=manifest):
+        fileobj.write(chunk)
+
+    fileobj.flush()
+    return manifest
@@ -1,19 +1,101 @@
-import json
 from app.db.connection import get_connection
+from app.db.snapshot_cache import load_snapshot
 
 
+# FASE P17: "último snapshot" = puntero claim_latest_snapshot (mayor id),
+# una lectura por PK. Antes se ordenaba por created_at (resolución de 1s).
+
 def get_latest_snapshot_by_claim(claim_id: int):
     with get_connection() as conn:
         cur = conn.cursor()
         cur.execute(
             """
-            SELECT snapshot_json
-            FROM cms1500_snapshots
+            SELECT snapshot_id, snapshot_hash
+            FROM claim_latest_snapshot
+            WHERE claim_id = ?
+            """,
+            (claim_id,),
+        )
+        row = cur.fetchone()
+        # FASE P15: snapshot_json solo se lee/parsea si no está en cache
+        return load_snapshot(cur, row["snapshot_id"], row["snapshot_hash"]) if row else None
+
+
+def get_latest_snapshot_hash_by_claim(claim_id: int):
+    """
+    Solo el hash del último snapshot (sin parsear snapshot_json).
+    Alcanza para buscar el artefacto ya generado.
+    """
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT snapshot_hash
+            FROM claim_latest_snapshot
             WHERE claim_id = ?
-            ORDER BY created_at DESC
-            LIMIT 1
             """,
             (claim_id,),
         )
         row = cur.fetchone()
-        return json.loads(row["snapshot_json"]) if row else None
+        return row["snapshot_hash"] if row else None
+
+
+# ============================================================
+# FASE P12 — Artefactos HTML/PDF por snapshot_hash
+# ============================================================
+# El HTML y el PDF de un snapshot se generan una vez y se sirven desde
+# app/utils/artifact_store.py. Requieren contexto de request (url_for).
+
+def build_cms1500_html(snapshot: dict, snapshot_hash: str) -> str:
+    from flask import render_template
+    from app.utils.artifact_store import get_artifact_store
+
+    store = get_artifact_store()
+    path = store.get(snapshot_hash, "html")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+    html = render_template("cms1500.html", snapshot=snapshot, snapshot_hash=snapshot_hash)
+    store.put(snapshot_hash, "html", html.encode("utf-8"))
+    return html
+
+
+def build_cms1500_pdf(snapshot: dict, snapshot_hash: str) -> str:
+    """
+    Retorna la ruta del PDF en el store; lo imprime solo si no existe.
+    """
+    from app.utils.artifact_store import get_artifact_store
+    from app.utils.pdf_renderer import render_pdf
+
+    store = get_artifact_store()
+    path = store.get(snapshot_hash, "pdf")
+    if path:
+        return path
+
+    html = build_cms1500_html(snapshot, snapshot_hash)
+    return store.put(snapshot_hash, "pdf", render_pdf(html))
+
+
+_prebuild_executor = None
+
+
+def prebuild_cms1500_artifacts(app, snapshot: dict, snapshot_hash: str) -> None:
+    """
+    Encola la generación de HTML + PDF en background (un worker).
+    Errores se ignoran: la ruta los genera al primer acceso.
+    """
+    global _prebuild_executor
+    from concurrent.futures import ThreadPoolExecutor
+
+    if _prebuild_executor is None:
+        _prebuild_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cms1500-artifacts")
+
+    def _job():
+        try:
+            with app.test_request_context():
+                build_cms1500_pdf(snapshot, snapshot_hash)
+        except Exception:
+            pass
+
+    _prebuild_executor.submit(_job)
@@ -1,6 +1,8 @@
 import sqlite3
 from pathlib import Path
 
+from app.db.migrations import run_migrations, get_schema_version
+
 BASE_DIR = Path(__file__).resolve().parent
 DB_PATH = BASE_DIR / "storage" / "lifetrack.db"
 SCHEMA_PATH = BASE_DIR / "storage" / "schema.sql"
@@ -18,8 +20,11 @@ def main():
         conn.execute("PRAGMA foreign_keys = ON;")
         schema_sql = SCHEMA_PATH.read_text(encoding="utf-8")
         conn.executescript(schema_sql)
+        applied = run_migrations(conn)
+        version = get_schema_version(conn)
 
     print("Base de datos creada correctamente con todas las tablas.")
+    print(f"Migraciones aplicadas: {applied or 'ninguna'} (user_version={version})")
 
 if __name__ == "__main__":
     main()
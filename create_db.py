@@ -1,6 +1,8 @@
 import sqlite3
 from pathlib import Path
 
+from app.db.migrations import run_migrations
+
 # Asegurar carpeta storage
 Path("storage").mkdir(exist_ok=True)
 
@@ -11,6 +13,8 @@ with open("storage/schema.sql", encoding="utf-8") as f:
 # Crear base de datos
 conn = sqlite3.connect("storage/lifetrack.db")
 conn.executescript(schema)
+# Migraciones versionadas (FASE P9)
+run_migrations(conn)
 conn.close()
 
 print("Base de datos creada correctamente")
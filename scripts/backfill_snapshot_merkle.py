@@ -0,0 +1,19 @@
+# scripts/backfill_snapshot_merkle.py
+# FASE P22 — Agrega los snapshots existentes al árbol Merkle (orden por id)
+# y registra un checkpoint de la raíz. Idempotente.
+
+import sys
+
+from app.db.snapshot_merkle import MERKLE_BACKFILL_BATCH_SIZE, backfill_snapshot_merkle, create_merkle_checkpoint
+
+
+def main():
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else MERKLE_BACKFILL_BATCH_SIZE
+    added = backfill_snapshot_merkle(batch_size=batch_size)
+    checkpoint = create_merkle_checkpoint()
+    print(f"P22: {added} hojas agregadas.")
+    print(f"Checkpoint {checkpoint['id']}: tree_size={checkpoint['tree_size']} root={checkpoint['root_hash']}")
+
+
+if __name__ == "__main__":
+    main()
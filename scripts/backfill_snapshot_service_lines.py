@@ -0,0 +1,17 @@
+# scripts/backfill_snapshot_service_lines.py
+# FASE P19 — Proyecta las líneas 24A–24J de snapshots existentes.
+# Idempotente: solo toca snapshots que todavía no tienen líneas.
+
+import sys
+
+from app.db.snapshot_service_lines import SERVICE_LINES_BATCH_SIZE, backfill_snapshot_service_lines
+
+
+def main():
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else SERVICE_LINES_BATCH_SIZE
+    inserted = backfill_snapshot_service_lines(batch_size=batch_size)
+    print(f"P19: {inserted} líneas de servicio proyectadas.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+# scripts/backfill_snapshot_summaries.py
+# FASE P18 — Completa las columnas resumen de snapshots existentes.
+# Idempotente: solo toca snapshots con service_count NULL.
+
+import sys
+
+from app.db.snapshot_summary import BACKFILL_BATCH_SIZE, backfill_snapshot_summaries
+
+
+def main():
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else BACKFILL_BATCH_SIZE
+    updated = backfill_snapshot_summaries(batch_size=batch_size)
+    print(f"P18: {updated} snapshots con resumen completado.")
+
+
+if __name__ == "__main__":
+    main()
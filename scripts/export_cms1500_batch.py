@@ -0,0 +1,64 @@
+# scripts/export_cms1500_batch.py
+# FASE P13 — Export CMS-1500 por lote (ZIP o PDF combinado)
+#
+# Uso:
+#   python -m scripts.export_cms1500_batch --claim-ids 1,2,3 [--format zip|pdf] [--out exports/lote.zip]
+#   python -m scripts.export_cms1500_batch --status SUBMITTED --since 2026-01-01 [--format pdf]
+
+import sys
+import time
+from pathlib import Path
+
+from app.views.cms1500_batch import BATCH_EXPORT_FORMATS, resolve_batch_claims, write_batch_pdf, write_batch_zip
+
+MAX_LISTED = 20
+
+
+def _arg(args: list[str], name: str) -> str | None:
+    if name in args:
+        return args[args.index(name) + 1]
+    return None
+
+
+def main():
+    args = sys.argv[1:]
+
+    claim_ids = _arg(args, "--claim-ids")
+    status = _arg(args, "--status")
+    since = _arg(args, "--since")
+    fmt = (_arg(args, "--format") or "zip").lower()
+
+    if not (claim_ids or status or since) or fmt not in BATCH_EXPORT_FORMATS:
+        print("Uso: python -m scripts.export_cms1500_batch (--claim-ids 1,2 | --status S [--since AAAA-MM-DD]) [--format zip|pdf] [--out ruta]")
+        sys.exit(2)
+
+    ids = [int(x) for x in claim_ids.split(",") if x.strip()] if claim_ids else None
+    targets = resolve_batch_claims(claim_ids=ids, status=status, since=since)
+    if not targets:
+        print("No hay snapshots para los claims seleccionados")
+        sys.exit(1)
+
+    out = Path(_arg(args, "--out") or f"exports/CMS1500_batch_{time.strftime('%Y%m%d_%H%M%S')}.{fmt}")
+    out.parent.mkdir(parents=True, exist_ok=True)
+
+    from app.main import app
+
+    started = time.perf_counter()
+    with open(out, "wb") as f:
+        if fmt == "zip":
+            manifest = write_batch_zip(app, targets, f)
+        else:
+            manifest = write_batch_pdf(app, targets, f)
+    elapsed = time.perf_counter() - started
+
+    print(f"=== EXPORT CMS-1500 ({fmt}) ===")
+    print(f"Archivo: {out} ({out.stat().st_size} bytes)")
+    print(f"Batch: {manifest['batch_id']}  Claims: {manifest['claims']}/{len(targets)}")
+    print(f"FAILED: {len(manifest['failed'])}")
+    for item in manifest["failed"][:MAX_LISTED]:
+        print(f"  {item}")
+    print(f"Tiempo: {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,30 +4,29 @@
 # - Borra events post-snapshot (applications, adjustments, charges) del claim
 # - Restaura charges faltantes para igualar snapshot.total_charge (best-effort)
 # - NO inventa pagos/adjustments faltantes si snapshot los tiene y DB no
+# - Escribe sobre claims congelados vía freeze_override (FASE P8), solo
+#   dentro de la transacción de la reconciliación
 
 import json
 import sqlite3
 from typing import Any, Dict, List, Tuple
 
-DB_PATH = "storage/lifetrack.db"
+from app.db.connection import get_connection
+from app.db.financial_lock import freeze_override
 
 
 def conn() -> sqlite3.Connection:
-    c = sqlite3.connect(DB_PATH)
-    c.row_factory = sqlite3.Row
-    c.execute("PRAGMA foreign_keys = ON;")
-    return c
+    return get_connection()
 
 
 def fetch_latest_snapshot(c: sqlite3.Connection, claim_id: int) -> Dict[str, Any] | None:
     cur = c.cursor()
     cur.execute(
         """
-        SELECT id, claim_id, snapshot_json, snapshot_hash, created_at
-        FROM cms1500_snapshots
-        WHERE claim_id = ?
-        ORDER BY id DESC
-        LIMIT 1
+        SELECT s.id, s.claim_id, s.snapshot_json, s.snapshot_hash, s.created_at
+        FROM claim_latest_snapshot l
+        JOIN cms1500_snapshots s ON s.id = l.snapshot_id
+        WHERE l.claim_id = ?
         """,
         (int(claim_id),),
     )
@@ -112,7 +111,7 @@ def approx_equal(a: float, b: float, tol: float = 0.01) -> bool:
 
 def find_mismatched_claims(c: sqlite3.Connection) -> List[Tuple[int, Dict[str, Any], Dict[str, float], Dict[str, float]]]:
     cur = c.cursor()
-    cur.execute("SELECT DISTINCT claim_id FROM cms1500_snapshots ORDER BY claim_id")
+    cur.execute("SELECT claim_id FROM claim_latest_snapshot ORDER BY claim_id")
     claim_ids = [int(r["claim_id"]) for r in cur.fetchall()]
 
     mismatches = []
@@ -364,26 +363,27 @@ def reconcile() -> int:
             snap_created_at = latest["created_at"]
             snap = latest["snapshot"]
 
-            # 1) eliminar eventos post-snapshot
-            deleted = delete_post_snapshot_events(c, cid, snap_created_at)
-            print(f"[claim {cid}] deleted post-snapshot: {deleted}")
-
-            # 2) si snapshot exige payments/adjustments y DB se quedó corto, no inventamos
-            dt_after = db_totals(c, cid)
-            if float(dt_after["total_applied"]) < float(st["total_applied"]) - 0.01:
-                raise ValueError(
-                    f"Claim {cid}: DB amount_paid ({dt_after['total_applied']}) < snapshot ({st['total_applied']}). "
-                    "No se puede reconstruir applications sin detalle. Requiere restore desde backup."
-                )
-            if float(dt_after["total_adjustments"]) < float(st["total_adjustments"]) - 0.01:
-                raise ValueError(
-                    f"Claim {cid}: DB adjustments ({dt_after['total_adjustments']}) < snapshot ({st['total_adjustments']}). "
-                    "No se puede reconstruir adjustments sin detalle. Requiere restore desde backup."
-                )
-
-            # 3) restaurar charges faltantes (best-effort)
-            restored = ensure_charge_totals_match_snapshot(c, cid, snap_created_at, snap)
-            print(f"[claim {cid}] charges reconcile: {restored}")
+            with freeze_override(c, cid, "forensic_reconcile_snapshots"):
+                # 1) eliminar eventos post-snapshot
+                deleted = delete_post_snapshot_events(c, cid, snap_created_at)
+                print(f"[claim {cid}] deleted post-snapshot: {deleted}")
+
+                # 2) si snapshot exige payments/adjustments y DB se quedó corto, no inventamos
+                dt_after = db_totals(c, cid)
+                if float(dt_after["total_applied"]) < float(st["total_applied"]) - 0.01:
+                    raise ValueError(
+                        f"Claim {cid}: DB amount_paid ({dt_after['total_applied']}) < snapshot ({st['total_applied']}). "
+                        "No se puede reconstruir applications sin detalle. Requiere restore desde backup."
+                    )
+                if float(dt_after["total_adjustments"]) < float(st["total_adjustments"]) - 0.01:
+                    raise ValueError(
+                        f"Claim {cid}: DB adjustments ({dt_after['total_adjustments']}) < snapshot ({st['total_adjustments']}). "
+                        "No se puede reconstruir adjustments sin detalle. Requiere restore desde backup."
+                    )
+
+                # 3) restaurar charges faltantes (best-effort)
+                restored = ensure_charge_totals_match_snapshot(c, cid, snap_created_at, snap)
+                print(f"[claim {cid}] charges reconcile: {restored}")
 
             # 4) validar match final
             final_dt = db_totals(c, cid)
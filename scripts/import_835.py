@@ -0,0 +1,49 @@
+# scripts/import_835.py
+# FASE P7 — Importa un remittance X12 835 desde disco
+#
+# Uso:
+#   python -m scripts.import_835 ruta/archivo.835 [--batch-size 200]
+
+import sys
+import time
+
+from app.db.era_import import import_835, ERA_BATCH_SIZE
+
+MAX_LISTED = 20
+
+
+def main():
+    args = sys.argv[1:]
+    if not args:
+        print("Uso: python -m scripts.import_835 ruta/archivo.835 [--batch-size N]")
+        sys.exit(2)
+
+    path = args[0]
+    batch_size = ERA_BATCH_SIZE
+    if "--batch-size" in args:
+        batch_size = int(args[args.index("--batch-size") + 1])
+
+    started = time.perf_counter()
+    summary = import_835(path, batch_size=batch_size)
+    elapsed = time.perf_counter() - started
+
+    print(f"=== IMPORT 835: {path} ===")
+    print(f"Payments creados: {len(summary['payments'])}  Duplicados: {len(summary['duplicates'])}")
+    print(f"Claims: {summary['claims']}  Líneas SVC: {summary['service_lines']}  Matched: {summary['matched']}")
+    print(f"Applications: {summary['posted_applications']}  Adjustments: {summary['posted_adjustments']}")
+    print(f"Total aplicado: {summary['total_applied']:.2f}  Total ajustado: {summary['total_adjusted']:.2f}")
+    print(f"Responsabilidad paciente (PR): {summary['patient_responsibility']:.2f}")
+
+    for key in ("unmatched", "over_applied", "frozen", "already_posted", "skipped", "failed"):
+        items = summary[key]
+        print(f"{key.upper()}: {len(items)}")
+        for item in items[:MAX_LISTED]:
+            print(f"  {item}")
+        if len(items) > MAX_LISTED:
+            print(f"  ... {len(items) - MAX_LISTED} más")
+
+    print(f"Tiempo: {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import sys
+
+from app.db.materialized_balances import (
+    enable_materialized_balances,
+    disable_materialized_balances,
+    verify_materialized_balances,
+)
+
+
+def main():
+    action = sys.argv[1] if len(sys.argv) > 1 else "enable"
+
+    if action == "enable":
+        counts = enable_materialized_balances()
+        print(f"P4: balances materializados activos ({counts}).")
+    elif action == "disable":
+        disable_materialized_balances()
+        print("P4: balances materializados desactivados.")
+    elif action == "verify":
+        report = verify_materialized_balances()
+        print(f"P4: verificados {report['checked']}")
+        for kind in ("charges", "claims", "payments"):
+            for item in report[kind]:
+                print(f"DRIFT {kind}: {item}")
+        print("P4: OK" if report["ok"] else "P4: DRIFT DETECTADO")
+        if not report["ok"]:
+            sys.exit(1)
+    else:
+        print("Uso: migrate_phase_p4_materialized_balances.py [enable|disable|verify]")
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
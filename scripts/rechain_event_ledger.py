@@ -0,0 +1,24 @@
+# scripts/rechain_event_ledger.py
+# FASE P23 — Encadena por hash los eventos existentes del ledger (orden por id),
+# verifica la cadena completa y deja un checkpoint verificado. Idempotente.
+
+import sys
+
+from app.db.event_ledger import LEDGER_RECHAIN_BATCH_SIZE, rechain_event_ledger, verify_event_ledger
+
+
+def main():
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else LEDGER_RECHAIN_BATCH_SIZE
+    chained = rechain_event_ledger(batch_size=batch_size)
+    result = verify_event_ledger(full=True)
+
+    print(f"P23: {chained} eventos encadenados.")
+    print(f"Cadena verificada: {result['checked']} eventos (hasta id {result['to_event_id']})")
+    for e in result["errors"]:
+        print(e)
+
+    sys.exit(0 if result["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
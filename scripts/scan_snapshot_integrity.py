@@ -0,0 +1,33 @@
+# scripts/scan_snapshot_integrity.py
+# FASE P21 — Escaneo de integridad de snapshots (nocturno / auditoría).
+# Uso: python -m scripts.scan_snapshot_integrity [--full] [--workers N] [--chunk-size N]
+# Sin --full verifica solo lo nuevo o modificado desde el último escaneo completo.
+# Si una corrida se interrumpe, la siguiente la retoma desde su checkpoint.
+
+import argparse
+import sys
+
+from app.db.snapshot_integrity import INTEGRITY_SCAN_CHUNK_SIZE, run_integrity_scan
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--full", action="store_true")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=INTEGRITY_SCAN_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    result = run_integrity_scan(full=args.full, workers=args.workers, chunk_size=args.chunk_size)
+
+    resumed = " (retomado)" if result["resumed"] else ""
+    print(f"P21: escaneo {result['scan_id']} {result['mode']}{resumed}")
+    print(f"Snapshots verificados: {result['scanned']} (hasta id {result['last_id']})")
+    print(f"Fallas: {result['failure_count']}")
+    for f in result["failures"]:
+        print(f)
+
+    sys.exit(1 if result["failure_count"] else 0)
+
+
+if __name__ == "__main__":
+    main()
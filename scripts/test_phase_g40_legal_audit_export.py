@@ -1,7 +1,13 @@
 import json
 from datetime import datetime
 from app.db.connection import get_connection
-from scripts.test_phase_g39_snapshot_integrity_scanner import canonical_json, sha256
+from app.db.snapshot_integrity import get_unresolved_integrity_failures, run_integrity_scan
+from app.db.snapshot_merkle import (
+    create_merkle_checkpoint,
+    find_merkle_leaf_mismatches,
+    list_merkle_checkpoints,
+    verify_merkle_checkpoints,
+)
 
 
 EXPORT_PATH = "exports/legal_audit_report.json"
@@ -9,15 +15,32 @@ EXPORT_PATH = "exports/legal_audit_report.json"
 
 def run_legal_audit_export():
 
+    # FASE P22: integridad por raíz Merkle, sin rehashear todo el store.
+    # - snapshot_json vs snapshot_hash: solo lo nuevo o modificado (escaneo P21)
+    #   + toda falla registrada antes que siga sin resolver
+    # - snapshot_hash vs hoja del árbol: comparación en SQL
+    # - raíz anterior prefijo de la actual: prueba de consistencia
+    scan = run_integrity_scan()
+
+    previous = list_merkle_checkpoints(limit=1)
+    checkpoint = create_merkle_checkpoint()
+    consistency = verify_merkle_checkpoints(previous[0]["id"], checkpoint["id"]) if previous else None
+
+    invalid = {f["snapshot_id"] for f in scan["failures"]}
+    invalid.update(f["snapshot_id"] for f in get_unresolved_integrity_failures())
+    invalid.update(m["snapshot_id"] for m in find_merkle_leaf_mismatches())
+
     with get_connection() as conn:
         cur = conn.cursor()
 
         cur.execute("""
-            SELECT s.id, s.claim_id, s.snapshot_json,
+            SELECT s.id, s.claim_id,
                    s.snapshot_hash, s.created_at,
-                   c.status as claim_status
+                   c.status as claim_status,
+                   l.position as leaf_index
             FROM cms1500_snapshots s
             JOIN claims c ON c.id = s.claim_id
+            LEFT JOIN snapshot_merkle_leaves l ON l.snapshot_id = s.id
             ORDER BY s.id
         """)
 
@@ -28,32 +51,38 @@ def run_legal_audit_export():
 
     for row in rows:
         snapshot_id = row["id"]
-        claim_id = row["claim_id"]
-        stored_hash = row["snapshot_hash"]
-        created_at = row["created_at"]
-        claim_status = row["claim_status"]
-
-        parsed = json.loads(row["snapshot_json"])
-        recalculated_hash = sha256(canonical_json(parsed))
 
-        valid = stored_hash == recalculated_hash
+        valid = snapshot_id not in invalid
 
         if not valid:
             integrity_failures.append(snapshot_id)
 
         report.append({
             "snapshot_id": snapshot_id,
-            "claim_id": claim_id,
-            "created_at": created_at,
-            "claim_status": claim_status,
-            "snapshot_hash": stored_hash,
+            "claim_id": row["claim_id"],
+            "created_at": row["created_at"],
+            "claim_status": row["claim_status"],
+            "snapshot_hash": row["snapshot_hash"],
+            "merkle_leaf_index": row["leaf_index"],
             "integrity_valid": valid,
         })
 
+    # Hojas cuyo snapshot ya no existe
+    integrity_failures.extend(sorted(invalid - {r["id"] for r in rows}))
+
+    merkle = {
+        "checkpoint": checkpoint,
+        "previous_checkpoint": previous[0] if previous else None,
+        "consistency_proof": consistency["proof"] if consistency else [],
+        "consistent": consistency["consistent"] if consistency else True,
+        "integrity_scan": {k: scan[k] for k in ("scan_id", "mode", "start_after_id", "last_id", "scanned")},
+    }
+
     output = {
         "generated_at": datetime.utcnow().isoformat(),
         "total_snapshots": len(report),
         "integrity_failures": integrity_failures,
+        "merkle": merkle,
         "snapshots": report,
     }
 
@@ -63,8 +92,11 @@ def run_legal_audit_export():
     print("=== G40 LEGAL AUDIT EXPORT ===")
     print(f"Export file: {EXPORT_PATH}")
     print(f"Total snapshots: {len(report)}")
+    print(f"Merkle root: {checkpoint['root_hash']} (tree_size={checkpoint['tree_size']})")
 
-    if not integrity_failures:
+    if not merkle["consistent"]:
+        print("RESULT: MERKLE ROOT INCONSISTENT WITH PREVIOUS CHECKPOINT ❌")
+    elif not integrity_failures:
         print("RESULT: AUDIT CLEAN ✅")
     else:
         print("RESULT: INTEGRITY FAILURES DETECTED ❌")
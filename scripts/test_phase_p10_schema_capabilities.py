@@ -0,0 +1,65 @@
+# scripts/test_phase_p10_schema_capabilities.py
+# FASE P10 — Capacidades del schema cacheadas
+# Verifica que los flags coinciden con PRAGMA table_info, que se cargan una
+# sola vez por proceso y que las migraciones los invalidan.
+
+import time
+
+from app.db.connection import get_connection
+from app.db import migrations
+from app.db.schema_capabilities import (
+    has_column,
+    has_table,
+    invalidate_schema_capabilities,
+    schema_capabilities,
+)
+from app.db.cms1500_snapshot import list_snapshots_admin
+
+
+def _pragma_columns(table: str) -> set:
+    with get_connection() as conn:
+        return {r["name"] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+
+
+def main():
+    print("=== TEST P10: SCHEMA CAPABILITIES ===")
+
+    caps = schema_capabilities()
+    if caps["schema_version"] != migrations.SCHEMA_VERSION:
+        raise AssertionError(f"FAIL: schema_version={caps['schema_version']}")
+
+    for table in ("cms1500_snapshots", "services", "claims"):
+        if set(caps["tables"][table]) != _pragma_columns(table):
+            raise AssertionError(f"FAIL: columnas de {table} no coinciden con PRAGMA")
+    print(f"OK: {len(caps['tables'])} tablas cargadas (user_version={caps['schema_version']})")
+
+    if not has_column("cms1500_snapshots", "snapshot_hash") or has_column("cms1500_snapshots", "nope"):
+        raise AssertionError("FAIL: has_column")
+    if not has_table("claims") or has_table("nope") or has_column("nope", "id"):
+        raise AssertionError("FAIL: has_table")
+    print("OK: has_column / has_table")
+
+    # Lecturas de snapshots no recargan el cache
+    list_snapshots_admin()
+    start = time.perf_counter()
+    for _ in range(10000):
+        has_column("cms1500_snapshots", "version_number")
+    elapsed = time.perf_counter() - start
+    if schema_capabilities() is not caps:
+        raise AssertionError("FAIL: el cache se recargó sin migración")
+    print(f"OK: cache estable (10000 checks en {elapsed:.4f}s)")
+
+    # Invalidación: run_migrations notifica a los listeners
+    if invalidate_schema_capabilities not in migrations._listeners:
+        raise AssertionError("FAIL: no registrado en on_schema_change")
+    invalidate_schema_capabilities()
+    reloaded = schema_capabilities()
+    if reloaded is caps or reloaded["tables"] != caps["tables"]:
+        raise AssertionError("FAIL: recarga tras invalidar")
+    print("OK: invalidación y recarga")
+
+    print("SCHEMA CAPABILITIES PASSED ✅")
+
+
+if __name__ == "__main__":
+    main()
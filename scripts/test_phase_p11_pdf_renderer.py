@@ -0,0 +1,161 @@
+# scripts/test_phase_p11_pdf_renderer.py
+# FASE P11 — Renderer PDF persistente
+# Verifica reutilización de páginas, backpressure, timeout y relanzamiento
+# del browser caído. Usa un browser en memoria (sin Chromium) que imita
+# la parte de la API de Playwright que usa el renderer.
+
+import asyncio
+import threading
+import time
+
+from app.utils.pdf_renderer import PdfRenderError, PdfRenderer, PdfRendererBusy
+
+
+class FakePage:
+    def __init__(self, browser):
+        self.browser = browser
+        self.html = None
+        self.closed = False
+
+    async def set_content(self, html, wait_until=None):
+        if not self.browser.connected:
+            raise RuntimeError("Target closed")
+        self.html = html
+        if "CRASH" in html:
+            self.browser.connected = False
+            raise RuntimeError("Browser has been closed")
+
+    async def pdf(self, **kwargs):
+        await asyncio.sleep(self.browser.delay)
+        if not self.browser.connected:
+            raise RuntimeError("Target closed")
+        self.browser.prints += 1
+        return b"%PDF-" + self.html.encode("utf-8")
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self, delay):
+        self.delay = delay
+        self.connected = True
+        self.pages = []
+        self.prints = 0
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_page(self):
+        page = FakePage(self)
+        self.pages.append(page)
+        return page
+
+    async def close(self):
+        self.connected = False
+
+
+class FakeRenderer(PdfRenderer):
+    delay = 0.0
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.browsers = []
+
+    async def _launch_browser(self):
+        browser = FakeBrowser(self.delay)
+        self.browsers.append(browser)
+        return browser
+
+
+def main():
+    print("=== TEST P11: PDF RENDERER ===")
+
+    # 1) Un browser, páginas reutilizadas
+    r = FakeRenderer(pages=2, max_pending=8, timeout=5)
+    for i in range(10):
+        out = r.render(f"<p>{i}</p>")
+        if out != f"%PDF-<p>{i}</p>".encode():
+            raise AssertionError(f"FAIL: salida inesperada {out!r}")
+    if len(r.browsers) != 1 or len(r.browsers[0].pages) != 2:
+        raise AssertionError("FAIL: se lanzó más de un browser o más páginas que el pool")
+    print("OK: 10 renders con 1 browser y 2 páginas")
+
+    # 2) Concurrencia acotada por el pool
+    r.browsers[0].delay = 0.05
+    results = []
+
+    def worker(i):
+        results.append(r.render(f"<p>c{i}</p>"))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(6)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    if len(results) != 6 or len(r.browsers[0].pages) != 2:
+        raise AssertionError("FAIL: concurrencia")
+    print(f"OK: 6 renders concurrentes con 2 páginas ({elapsed:.2f}s)")
+
+    # 3) Backpressure
+    r2 = FakeRenderer(pages=1, max_pending=2, timeout=5)
+    r2.warm_up()
+    r2.browsers[0].delay = 0.3
+    errors = []
+
+    def slow(i):
+        try:
+            r2.render(f"<p>s{i}</p>")
+        except PdfRendererBusy:
+            errors.append(i)
+
+    threads = [threading.Thread(target=slow, args=(i,)) for i in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if len(errors) != 3 or r2.stats["rejected"] != 3:
+        raise AssertionError(f"FAIL: backpressure rechazó {len(errors)}")
+    print("OK: backpressure (2 aceptados, 3 rechazados)")
+
+    # 4) Timeout: la página cancelada se reemplaza
+    r2.browsers[0].delay = 1.0
+    try:
+        r2.render("<p>lento</p>", timeout=0.2)
+        raise AssertionError("FAIL: esperaba timeout")
+    except PdfRendererBusy:
+        raise
+    except PdfRenderError as e:
+        if "Timeout" not in str(e):
+            raise
+    r2.browsers[0].delay = 0.0
+    time.sleep(0.1)
+    if r2.render("<p>ok</p>") != b"%PDF-<p>ok</p>":
+        raise AssertionError("FAIL: render después de timeout")
+    print("OK: timeout y recuperación de página")
+
+    # 5) Browser caído → se relanza
+    try:
+        r.render("<p>CRASH</p>")
+        raise AssertionError("FAIL: esperaba error")
+    except PdfRenderError:
+        pass
+    if r.render("<p>despues</p>") != b"%PDF-<p>despues</p>":
+        raise AssertionError("FAIL: render después del crash")
+    if len(r.browsers) != 2 or r.stats["launches"] != 2:
+        raise AssertionError("FAIL: el browser no se relanzó")
+    print("OK: browser relanzado tras crash")
+
+    r.shutdown()
+    r2.shutdown()
+    if r.browsers[-1].connected:
+        raise AssertionError("FAIL: shutdown no cerró el browser")
+    print("OK: shutdown")
+
+    print("PDF RENDERER PASSED ✅")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# scripts/test_phase_p12_artifact_store.py
+# FASE P12 — Artefactos HTML/PDF por snapshot_hash
+# Verifica layout, escritura atómica, LRU por tamaño, que /cms1500/<id>
+# sirve el HTML guardado y que /cms1500/<id>/pdf sirve el PDF guardado
+# sin lanzar el browser. Usa un directorio temporal (no storage/artifacts).
+
+import os
+import shutil
+import tempfile
+import time
+
+ARTIFACTS_TMP = tempfile.mkdtemp(prefix="lifetrack-artifacts-")
+os.environ["LIFETRACK_ARTIFACTS_DIR"] = ARTIFACTS_TMP
+
+from app.db import create_patient, create_coverage, create_claim, create_service, create_charge
+from app.db.connection import unit_of_work
+from app.db.cms1500_snapshot import generate_cms1500_snapshot, on_snapshot_created
+from app.utils import artifact_store
+from app.utils.artifact_store import RENDER_VERSION, ArtifactStore, get_artifact_store
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _hash(n: int) -> str:
+    return f"{n:064x}"
+
+
+def test_store(root: str):
+    store = ArtifactStore(root=root, max_bytes=250)
+
+    h = "ab" + "c" * 62
+    path = store.put(h, "html", b"<p>x</p>")
+    expected = os.path.join(root, "ab", "cc", f"{h}.v{RENDER_VERSION}.html")
+    if path != expected or open(path, "rb").read() != b"<p>x</p>":
+        raise AssertionError(f"FAIL: layout {path}")
+    if store.get(h, "pdf") is not None or store.get("../../etc", "html") is not None:
+        raise AssertionError("FAIL: get de artefacto inexistente / hash inválido")
+    try:
+        store.put("../../etc/passwd", "html", b"x")
+        raise AssertionError("FAIL: hash inválido aceptado")
+    except ValueError:
+        pass
+    print("OK: layout particionado + validación de hash")
+
+    leftovers = [n for _, _, files in os.walk(root) for n in files if n.startswith(".tmp-")]
+    if leftovers:
+        raise AssertionError("FAIL: quedaron temporales")
+    print("OK: escritura atómica sin temporales")
+
+    # LRU: 100 bytes c/u, tope 250 → quedan 2
+    store2 = ArtifactStore(root=os.path.join(root, "lru"), max_bytes=250)
+    store2.put(_hash(1), "pdf", b"1" * 100)
+    store2.put(_hash(2), "pdf", b"2" * 100)
+    store2.get(_hash(1), "pdf")  # 1 pasa a ser el más reciente
+    store2.put(_hash(3), "pdf", b"3" * 100)
+    if store2.get(_hash(2), "pdf") is not None:
+        raise AssertionError("FAIL: LRU no expulsó el menos usado")
+    if not store2.get(_hash(1), "pdf") or not store2.get(_hash(3), "pdf"):
+        raise AssertionError("FAIL: LRU expulsó uno reciente")
+    if store2.stats()["bytes"] != 200:
+        raise AssertionError(f"FAIL: bytes={store2.stats()['bytes']}")
+    print("OK: LRU por tamaño")
+
+    # Índice reconstruido desde disco (otro proceso / reinicio)
+    time.sleep(0.01)
+    os.utime(store2.path_for(_hash(3), "pdf"))
+    store3 = ArtifactStore(root=os.path.join(root, "lru"), max_bytes=150)
+    if store3.stats()["artifacts"] != 1 or store3.get(_hash(3), "pdf") is None:
+        raise AssertionError("FAIL: índice desde disco / orden por mtime")
+    print("OK: índice reconstruido desde disco")
+
+
+def test_routes():
+    from app.main import app
+
+    app.testing = True
+    client = app.test_client()
+
+    pid = create_patient("Artifact", "Store", "1990-01-01")
+    cov = create_coverage(pid, "Test", "Plan", "P1", "G1", "I1", "2025-01-01", None)
+    claim_id = create_claim(pid, cov)
+    service_id = create_service(claim_id, "2026-05-01", "90834", 1, "F41.1", "P12")
+    create_charge(service_id, 100.00)
+
+    created = []
+    on_snapshot_created(lambda cid, h, snap: created.append((cid, h)))
+    result = generate_cms1500_snapshot(claim_id)
+    snapshot_hash = result["snapshot_hash"]
+    if created != [(claim_id, snapshot_hash)]:
+        raise AssertionError(f"FAIL: on_snapshot_created {created}")
+
+    # Dentro de una transacción: se notifica al confirmar, nunca si se descarta
+    for commit in (False, True):
+        other = create_claim(pid, cov)
+        create_charge(create_service(other, "2026-05-02", "90834", 1, "F41.1", "P12"), 100.00)
+        created.clear()
+        try:
+            with unit_of_work():
+                generate_cms1500_snapshot(other)
+                if created:
+                    raise AssertionError("FAIL: on_snapshot_created antes del commit")
+                if not commit:
+                    raise _Rollback
+        except _Rollback:
+            pass
+        if [cid for cid, _ in created] != ([other] if commit else []):
+            raise AssertionError(f"FAIL: on_snapshot_created commit={commit} {created}")
+    print("OK: on_snapshot_created notificado tras el commit (no con rollback)")
+
+    store = get_artifact_store()
+    if store.root != ARTIFACTS_TMP:
+        raise AssertionError("FAIL: store no usa LIFETRACK_ARTIFACTS_DIR")
+
+    r1 = client.get(f"/cms1500/{claim_id}")
+    if r1.status_code != 200 or snapshot_hash not in r1.get_data(as_text=True):
+        raise AssertionError(f"FAIL: primer render {r1.status_code}")
+    html_path = store.get(snapshot_hash, "html")
+    if not html_path:
+        raise AssertionError("FAIL: HTML no guardado")
+
+    # Segundo acceso: send_file (ETag) en vez de re-renderizar el template
+    mtime = os.stat(html_path).st_mtime_ns
+    r2 = client.get(f"/cms1500/{claim_id}")
+    if r2.status_code != 200 or r2.get_data() != r1.get_data() or "ETag" not in r2.headers:
+        raise AssertionError("FAIL: segundo acceso no sirvió el archivo")
+    r2.close()
+    if open(html_path, "rb").read() != r1.get_data() or os.stat(html_path).st_mtime_ns < mtime:
+        raise AssertionError("FAIL: HTML re-escrito")
+    print("OK: /cms1500/<id> sirve HTML guardado")
+
+    # PDF guardado → no se lanza Chromium
+    store.put(snapshot_hash, "pdf", b"%PDF-1.4 test")
+    r3 = client.get(f"/cms1500/{claim_id}/pdf")
+    if r3.status_code != 200 or r3.get_data() != b"%PDF-1.4 test":
+        raise AssertionError(f"FAIL: PDF guardado {r3.status_code}")
+    if "CMS1500_claim_" not in r3.headers.get("Content-Disposition", ""):
+        raise AssertionError("FAIL: Content-Disposition")
+    r3.close()
+    print("OK: /cms1500/<id>/pdf sirve PDF guardado sin browser")
+
+    if client.get("/cms1500/999999999").status_code != 404:
+        raise AssertionError("FAIL: 404 sin snapshot")
+
+
+def main():
+    print("=== TEST P12: ARTIFACT STORE ===")
+    try:
+        test_store(os.path.join(ARTIFACTS_TMP, "unit"))
+        shutil.rmtree(os.path.join(ARTIFACTS_TMP, "unit"))
+        artifact_store._store = None
+        test_routes()
+    finally:
+        shutil.rmtree(ARTIFACTS_TMP, ignore_errors=True)
+
+    print("ARTIFACT STORE PASSED ✅")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# scripts/test_phase_p13_batch_export.py
+# FASE P13 — Export CMS-1500 por lote
+# 200 claims con snapshot → ZIP en streaming con manifest de hashes,
+# auditoría en una transacción (también si se corta la descarga) y
+# tiempo < 60s. El renderer usa el browser
+# en memoria del test P11 (sin Chromium).
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+
+ARTIFACTS_TMP = tempfile.mkdtemp(prefix="lifetrack-batch-")
+os.environ["LIFETRACK_ARTIFACTS_DIR"] = ARTIFACTS_TMP
+
+from app.db import create_patient, create_coverage, create_claim, create_service, create_charge
+from app.db.connection import get_connection
+from app.db.cms1500_snapshot import generate_cms1500_snapshot
+from app.utils import pdf_renderer
+from app.views.cms1500_batch import (
+    BATCH_PDF_MAX_CLAIMS,
+    resolve_batch_claims,
+    stream_batch_zip,
+    write_batch_pdf,
+    write_batch_zip,
+)
+from scripts.test_phase_p11_pdf_renderer import FakeRenderer
+
+N_CLAIMS = 200
+
+
+def _batch_events(batch_id: str) -> list[int]:
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT entity_id
+            FROM event_ledger
+            WHERE event_type = 'snapshot_pdf_exported'
+              AND json_extract(event_data, '$.batch_id') = ?
+            """,
+            (batch_id,),
+        )
+        return [r["entity_id"] for r in cur.fetchall()]
+
+
+def main():
+    print("=== TEST P13: BATCH EXPORT ===")
+
+    fake = FakeRenderer(pages=4, max_pending=64, timeout=10)
+    pdf_renderer._renderer = fake
+
+    from app.main import app
+
+    app.testing = True
+    client = app.test_client()
+
+    try:
+        pid = create_patient("Batch", "Export", "1990-01-01")
+        cov = create_coverage(pid, "Test", "Plan", "P1", "G1", "I1", "2025-01-01", None)
+
+        claim_ids = []
+        for i in range(N_CLAIMS):
+            claim_id = create_claim(pid, cov)
+            service_id = create_service(claim_id, "2026-06-01", "90834", 1, "F41.1", f"P13-{i}")
+            create_charge(service_id, 100.00 + i)
+            generate_cms1500_snapshot(claim_id)
+            claim_ids.append(claim_id)
+
+        # Un claim sin snapshot se omite
+        extra = create_claim(pid, cov)
+
+        targets = resolve_batch_claims(claim_ids=claim_ids + [extra])
+        if [t["claim_id"] for t in targets] != claim_ids:
+            raise AssertionError("FAIL: resolve_batch_claims")
+        print(f"OK: {len(targets)} claims resueltos (sin snapshot omitido)")
+
+        # =========================
+        # CLI / archivo
+        # =========================
+        out = io.BytesIO()
+        started = time.perf_counter()
+        manifest = write_batch_zip(app, targets, out)
+        elapsed = time.perf_counter() - started
+
+        if elapsed >= 60:
+            raise AssertionError(f"FAIL: {elapsed:.1f}s para {N_CLAIMS} claims")
+        if manifest["claims"] != N_CLAIMS or manifest["failed"]:
+            raise AssertionError(f"FAIL: manifest {manifest['claims']} / {manifest['failed'][:3]}")
+        print(f"OK: ZIP de {N_CLAIMS} claims en {elapsed:.2f}s ({fake.stats['renders']} renders)")
+
+        with zipfile.ZipFile(io.BytesIO(out.getvalue())) as zf:
+            if zf.testzip() is not None:
+                raise AssertionError("FAIL: ZIP corrupto")
+            inner = json.loads(zf.read("manifest.json"))
+            if inner["batch_id"] != manifest["batch_id"] or len(inner["files"]) != N_CLAIMS:
+                raise AssertionError("FAIL: manifest.json")
+            for item in inner["files"]:
+                data = zf.read(item["file"])
+                if hashlib.sha256(data).hexdigest() != item["pdf_sha256"]:
+                    raise AssertionError(f"FAIL: sha256 de {item['file']}")
+                if item["snapshot_hash"] not in data.decode("utf-8"):
+                    raise AssertionError(f"FAIL: {item['file']} no contiene su snapshot_hash")
+        print("OK: ZIP válido, manifest con sha256 verificado")
+
+        if sorted(_batch_events(manifest["batch_id"])) != claim_ids:
+            raise AssertionError("FAIL: auditoría por claim del batch")
+        print("OK: snapshot_pdf_exported por claim con batch_id")
+
+        # Descarga cortada: la auditoría cubre lo ya enviado
+        stream = stream_batch_zip(app, targets[:3], batch_id="p13-disconnect")
+        next(stream)
+        stream.close()
+        if _batch_events("p13-disconnect") != claim_ids[:1]:
+            raise AssertionError(f"FAIL: auditoría de descarga cortada {_batch_events('p13-disconnect')}")
+        print("OK: descarga cortada → auditoría de los PDFs ya enviados")
+
+        # Segunda corrida: todo desde el store, sin render
+        renders = fake.stats["renders"]
+        write_batch_zip(app, targets, io.BytesIO())
+        if fake.stats["renders"] != renders:
+            raise AssertionError("FAIL: re-export volvió a renderizar")
+        print("OK: re-export sin renders")
+
+        # =========================
+        # HTTP
+        # =========================
+        ids = ",".join(str(c) for c in claim_ids[:5])
+        r = client.get(f"/cms1500/batch?claim_ids={ids}&format=zip")
+        if r.status_code != 200 or r.mimetype != "application/zip" or not r.is_streamed:
+            raise AssertionError(f"FAIL: HTTP zip {r.status_code}")
+        with zipfile.ZipFile(io.BytesIO(r.get_data())) as zf:
+            if len(zf.namelist()) != 6:
+                raise AssertionError("FAIL: HTTP zip contenido")
+        print("OK: GET /cms1500/batch (zip en streaming)")
+
+        if client.get("/cms1500/batch").status_code != 400:
+            raise AssertionError("FAIL: sin filtros debe ser 400")
+        if client.get("/cms1500/batch?claim_ids=abc").status_code != 400:
+            raise AssertionError("FAIL: ids inválidos debe ser 400")
+        if client.get(f"/cms1500/batch?claim_ids={extra}").status_code != 404:
+            raise AssertionError("FAIL: sin snapshots debe ser 404")
+        try:
+            write_batch_pdf(app, targets[:BATCH_PDF_MAX_CLAIMS + 1], io.BytesIO())
+            raise AssertionError("FAIL: PDF combinado sin tope")
+        except ValueError as e:
+            if "format=zip" not in str(e):
+                raise
+        r = client.get(f"/cms1500/batch?claim_ids={ids}&format=pdf")
+        try:
+            import pypdf  # noqa: F401
+        except ImportError:
+            if r.status_code != 400 or "pypdf" not in r.get_data(as_text=True):
+                raise AssertionError("FAIL: format=pdf sin pypdf debe ser 400")
+        print("OK: validaciones HTTP")
+
+    finally:
+        fake.shutdown()
+        pdf_renderer._renderer = None
+        shutil.rmtree(ARTIFACTS_TMP, ignore_errors=True)
+
+    print("BATCH EXPORT PASSED ✅")
+
+
+if __name__ == "__main__":
+    main()
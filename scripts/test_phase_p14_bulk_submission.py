@@ -0,0 +1,183 @@
+# scripts/test_phase_p14_bulk_submission.py
+# FASE P14 — Envío de claims por lote
+# Verifica que submit_claims genera el mismo snapshot que el flujo
+# individual, reporta fallas por claim sin abortar el resto, escribe los
+# eventos esperados y arma lotes grandes en un pool de procesos.
+
+import json
+import time
+
+from app.db import (
+    create_patient,
+    create_coverage,
+    create_claim,
+    create_service,
+    create_charge,
+    create_payment,
+    create_application,
+    create_adjustment,
+    get_provider_settings,
+    update_claim_operational_status,
+)
+from app.db.connection import get_connection, unit_of_work
+from app.db.claim_submission import SUBMIT_PROCESS_POOL_MIN, submit_claims
+from app.db.cms1500_snapshot import generate_cms1500_snapshot, on_snapshot_created
+
+N_LARGE = SUBMIT_PROCESS_POOL_MIN
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _ready_claim(pid: int, cov: int, amount: float = 100.0, with_charge: bool = True) -> int:
+    claim_id = create_claim(pid, cov)
+    service_id = create_service(claim_id, "2026-07-01", "90834", 1, "F41.1", "P14")
+    if with_charge:
+        create_charge(service_id, amount)
+    update_claim_operational_status(claim_id, "READY")
+    return claim_id
+
+
+def _latest(claim_id: int):
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT s.snapshot_json, s.snapshot_hash, s.version_number, c.status
+            FROM cms1500_snapshots s
+            JOIN claims c ON c.id = s.claim_id
+            WHERE s.claim_id = ?
+            ORDER BY s.id DESC
+            LIMIT 1
+            """,
+            (claim_id,),
+        )
+        return cur.fetchone()
+
+
+def _events(claim_ids: list[int]) -> dict[str, int]:
+    q_marks = ",".join(["?"] * len(claim_ids))
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"""
+            SELECT event_type, COUNT(*) AS n
+            FROM event_ledger
+            WHERE entity_type = 'claim' AND entity_id IN ({q_marks})
+              AND (event_type NOT LIKE '%transition' OR json_extract(event_data, '$.to') = 'SUBMITTED'
+                   OR json_extract(event_data, '$.attempted_new_status') = 'SUBMITTED')
+            GROUP BY event_type
+            """,
+            tuple(claim_ids),
+        )
+        return {r["event_type"]: r["n"] for r in cur.fetchall()}
+
+
+def main():
+    print("=== TEST P14: BULK SUBMISSION ===")
+
+    get_provider_settings()
+
+    pid = create_patient("Bulk", "Submit", "1990-01-01")
+    cov = create_coverage(pid, "Test", "Plan", "P1", "G1", "I1", "2025-01-01", None)
+
+    # =========================
+    # 1) Mismo snapshot que el flujo individual
+    # =========================
+    claim_id = _ready_claim(pid, cov, 250.0)
+    charge_id = None
+    with get_connection() as conn:
+        charge_id = conn.execute(
+            "SELECT c.id FROM charges c JOIN services s ON s.id = c.service_id WHERE s.claim_id = ?",
+            (claim_id,),
+        ).fetchone()[0]
+    payment_id = create_payment(80.0, "check", "P14-REF", "2026-07-10")
+    create_application(payment_id, charge_id, 80.0)
+    create_adjustment(charge_id, 20.0, "CO-45")
+
+    # Referencia: transición + generate en una transacción descartada
+    try:
+        with unit_of_work():
+            update_claim_operational_status(claim_id, "SUBMITTED")
+            expected = generate_cms1500_snapshot(claim_id)["snapshot"]
+            raise _Rollback
+    except _Rollback:
+        pass
+
+    result = submit_claims([claim_id], workers=1)
+    if [s["claim_id"] for s in result["submitted"]] != [claim_id] or result["failed"]:
+        raise AssertionError(f"FAIL: {result}")
+
+    row = _latest(claim_id)
+    got = json.loads(row["snapshot_json"])
+    expected["meta"].pop("created_at")
+    got["meta"].pop("created_at")
+    if got != expected:
+        raise AssertionError("FAIL: snapshot del lote difiere del individual")
+    if row["status"] != "SUBMITTED" or row["version_number"] != 1:
+        raise AssertionError("FAIL: status / version_number")
+    if got["totals"] != {"total_charge": 250.0, "amount_paid": 80.0, "total_adjustments": 20.0, "balance_due": 150.0}:
+        raise AssertionError(f"FAIL: totals {got['totals']}")
+    print("OK: snapshot idéntico al flujo individual (totales 250/80/20/150)")
+
+    # =========================
+    # 2) Fallas por claim sin abortar el resto
+    # =========================
+    good = [_ready_claim(pid, cov, 100.0 + i) for i in range(3)]
+    draft = create_claim(pid, cov)
+    no_charge = _ready_claim(pid, cov, with_charge=False)
+    missing = 999999999
+
+    notified = []
+    on_snapshot_created(lambda cid, h, snap: notified.append(cid))
+    result = submit_claims(good + [draft, no_charge, claim_id, missing], workers=1)
+    errors = {f["claim_id"]: f["error"] for f in result["failed"]}
+
+    if sorted(s["claim_id"] for s in result["submitted"]) != good:
+        raise AssertionError(f"FAIL: enviados {result['submitted']}")
+    expected_errors = {
+        draft: "Transición inválida",
+        no_charge: "no tiene charges",
+        claim_id: "congelado",
+        missing: "no existe",
+    }
+    for cid, fragment in expected_errors.items():
+        if fragment not in errors.get(cid, ""):
+            raise AssertionError(f"FAIL: claim {cid} error={errors.get(cid)!r}")
+    print(f"OK: {len(good)} enviados, {len(errors)} fallas reportadas por claim")
+
+    # Mismos eventos que el flujo individual: update_claim_operational_status
+    # escribe operational_transition dos veces (G43)
+    events = _events(good)
+    expected_events = {"operational_transition": 2, "snapshot_created": 1, "claim_status_transition": 1}
+    for event_type, per_claim in expected_events.items():
+        if events.get(event_type) != per_claim * len(good):
+            raise AssertionError(f"FAIL: eventos {event_type}={events.get(event_type)}")
+    if _events([claim_id]).get("freeze_blocked_transition") != 1:
+        raise AssertionError("FAIL: freeze_blocked_transition no auditado")
+    if sorted(notified) != good:
+        raise AssertionError(f"FAIL: on_snapshot_created {notified}")
+    print("OK: eventos por claim (transición, snapshot, congelación) y listeners tras el commit")
+
+    # =========================
+    # 3) Lote grande con pool de procesos
+    # =========================
+    large = [_ready_claim(pid, cov, 50.0 + i) for i in range(N_LARGE)]
+    started = time.perf_counter()
+    result = submit_claims(large, workers=2)
+    elapsed = time.perf_counter() - started
+
+    if len(result["submitted"]) != N_LARGE or result["failed"]:
+        raise AssertionError(f"FAIL: lote grande {len(result['submitted'])} / {result['failed'][:3]}")
+    for item in result["submitted"][:10]:
+        row = _latest(item["claim_id"])
+        if row["snapshot_hash"] != item["snapshot_hash"] or row["status"] != "SUBMITTED":
+            raise AssertionError("FAIL: snapshot del lote grande")
+    print(f"OK: {N_LARGE} claims enviados en {elapsed:.2f}s (pool de procesos)")
+
+    print("BULK SUBMISSION PASSED ✅")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+# scripts/test_phase_p15_snapshot_cache.py
+# FASE P15 — Snapshots parseados en memoria
+# Verifica que las lecturas repetidas no vuelven a parsear snapshot_json,
+# que las entradas son de solo lectura, que el LRU respeta el tope de bytes
+# y que las estadísticas de hits/misses cuadran.
+
+import copy
+import json
+import time
+
+from app.db import (
+    create_patient,
+    create_coverage,
+    create_claim,
+    create_service,
+    create_charge,
+    get_provider_settings,
+    update_claim_operational_status,
+)
+from app.db import snapshot_cache
+from app.db.connection import get_connection
+from app.db.claim_submission import submit_claims
+from app.db.cms1500_snapshot import get_latest_snapshot_by_claim, get_snapshot_by_id
+from app.db.snapshot_cache import SnapshotCache, get_snapshot_cache, load_snapshots
+from app.utils.snapshot_hash import compute_snapshot_hash
+from app.views import cms1500_render
+
+N_CLAIMS = 5
+
+
+class _CountingJson:
+    """Reemplaza json en snapshot_cache para contar los parseos."""
+
+    def __init__(self):
+        self.loads_calls = 0
+
+    def loads(self, s):
+        self.loads_calls += 1
+        return json.loads(s)
+
+
+def _submitted_claims(n: int) -> list[int]:
+    pid = create_patient("Cache", "Snapshot", "1990-01-01")
+    cov = create_coverage(pid, "Test", "Plan", "P1", "G1", "I1", "2025-01-01", None)
+
+    claim_ids = []
+    for i in range(n):
+        claim_id = create_claim(pid, cov)
+        service_id = create_service(claim_id, "2026-07-01", "90834", 1, "F41.1", "P15")
+        create_charge(service_id, 100.0 + i)
+        update_claim_operational_status(claim_id, "READY")
+        claim_ids.append(claim_id)
+
+    result = submit_claims(claim_ids, workers=1)
+    if result["failed"]:
+        raise AssertionError(f"FAIL: submit {result['failed']}")
+    return claim_ids
+
+
+def _stored(claim_id: int):
+    with get_connection() as conn:
+        return conn.execute(
+            "SELECT id, snapshot_json, snapshot_hash FROM cms1500_snapshots WHERE claim_id = ? ORDER BY id DESC LIMIT 1",
+            (claim_id,),
+        ).fetchone()
+
+
+def main():
+    print("=== TEST P15: SNAPSHOT CACHE ===")
+
+    get_provider_settings()
+    claim_ids = _submitted_claims(N_CLAIMS)
+    cache = get_snapshot_cache()
+    cache.clear()
+
+    counting = _CountingJson()
+    real_json = snapshot_cache.json
+    snapshot_cache.json = counting
+    try:
+        # =========================
+        # 1) Un solo parseo por snapshot
+        # =========================
+        claim_id = claim_ids[0]
+        stored = _stored(claim_id)
+        before = cache.stats()
+
+        first = get_latest_snapshot_by_claim(claim_id)
+        second = get_latest_snapshot_by_claim(claim_id)
+        by_id = get_snapshot_by_id(stored["id"])
+        view = cms1500_render.get_latest_snapshot_by_claim(claim_id)
+
+        if counting.loads_calls != 1:
+            raise AssertionError(f"FAIL: {counting.loads_calls} parseos (esperado 1)")
+        if not (first["snapshot"] is second["snapshot"] is by_id["snapshot"] is view):
+            raise AssertionError("FAIL: las lecturas no comparten la entrada cacheada")
+        if first["snapshot"] != json.loads(stored["snapshot_json"]):
+            raise AssertionError("FAIL: snapshot cacheado distinto del almacenado")
+        if first["snapshot_hash"] != stored["snapshot_hash"] or first["id"] != stored["id"]:
+            raise AssertionError("FAIL: metadatos del snapshot")
+
+        stats = cache.stats()
+        if stats["misses"] - before["misses"] != 1 or stats["hits"] - before["hits"] != 3:
+            raise AssertionError(f"FAIL: stats {stats}")
+        print(f"OK: 4 lecturas, 1 parseo (hits={stats['hits']}, misses={stats['misses']})")
+
+        # =========================
+        # 2) Lectura por lote: una consulta para los que faltan
+        # =========================
+        rows = [_stored(cid) for cid in claim_ids]
+        keys = [(r["id"], r["snapshot_hash"]) for r in rows]
+        with get_connection() as conn:
+            batch = load_snapshots(conn.cursor(), keys)
+            again = load_snapshots(conn.cursor(), keys)
+
+        if counting.loads_calls != N_CLAIMS:
+            raise AssertionError(f"FAIL: {counting.loads_calls} parseos en lote (esperado {N_CLAIMS})")
+        if set(batch) != {r["id"] for r in rows} or any(again[k] is not batch[k] for k in batch):
+            raise AssertionError("FAIL: load_snapshots")
+        print(f"OK: load_snapshots parsea solo los {N_CLAIMS - 1} que faltaban")
+
+        # Hash distinto para el mismo id = otra entrada (nunca se reutiliza)
+        with get_connection() as conn:
+            load_snapshots(conn.cursor(), [(stored["id"], "0" * 64)])
+        if counting.loads_calls != N_CLAIMS + 1:
+            raise AssertionError("FAIL: la clave no incluye snapshot_hash")
+        print("OK: clave (snapshot_id, snapshot_hash)")
+
+    finally:
+        snapshot_cache.json = real_json
+
+    # =========================
+    # 3) Solo lectura
+    # =========================
+    snapshot = get_latest_snapshot_by_claim(claim_id)["snapshot"]
+    mutations = [
+        lambda: snapshot.__setitem__("claim", {}),
+        lambda: snapshot.update(x=1),
+        lambda: snapshot.pop("services"),
+        lambda: snapshot["services"].append({}),
+        lambda: snapshot["services"].__setitem__(0, {}),
+        lambda: snapshot["services"][0].__setitem__("units", 99),
+    ]
+    for mutate in mutations:
+        try:
+            mutate()
+        except TypeError:
+            continue
+        raise AssertionError("FAIL: el snapshot cacheado se pudo modificar")
+
+    if compute_snapshot_hash(snapshot) != stored["snapshot_hash"]:
+        raise AssertionError("FAIL: compute_snapshot_hash sobre la entrada cacheada")
+    if not isinstance(snapshot, dict) or not isinstance(snapshot["services"], list):
+        raise AssertionError("FAIL: la entrada dejó de ser dict / list")
+
+    editable = copy.deepcopy(snapshot)
+    editable["services"][0]["units"] = 99
+    editable["claim"] = {}
+    if type(editable) is not dict or snapshot["services"][0].get("units") == 99:
+        raise AssertionError("FAIL: deepcopy no es una copia mutable independiente")
+    print("OK: entradas de solo lectura; deepcopy devuelve copia mutable")
+
+    # =========================
+    # 4) LRU por bytes
+    # =========================
+    payload = json.dumps({"x": "a" * 100})
+    small = SnapshotCache(max_bytes=len(payload) * 2)
+    small.put(1, "h1", payload)
+    small.put(2, "h2", payload)
+    small.get(1, "h1")  # 1 pasa a ser el más reciente
+    small.put(3, "h3", payload)
+
+    stats = small.stats()
+    if small.get(2, "h2") is not None or small.get(1, "h1") is None or small.get(3, "h3") is None:
+        raise AssertionError("FAIL: orden LRU")
+    if stats["bytes"] != len(payload) * 2 or stats["evictions"] != 1 or stats["entries"] != 2:
+        raise AssertionError(f"FAIL: contabilidad de bytes {stats}")
+
+    disabled = SnapshotCache(max_bytes=0)
+    if disabled.put(1, "h1", payload)["x"] != "a" * 100 or disabled.stats()["entries"] != 0:
+        raise AssertionError("FAIL: cache desactivado")
+    print(f"OK: LRU por bytes (bytes={stats['bytes']}, evictions={stats['evictions']})")
+
+    # =========================
+    # 5) Costo de lecturas repetidas
+    # =========================
+    start = time.perf_counter()
+    for _ in range(200):
+        get_snapshot_by_id(stored["id"])
+    elapsed = time.perf_counter() - start
+    print(f"OK: 200 lecturas cacheadas en {elapsed:.4f}s — {cache.stats()}")
+
+    print("SNAPSHOT CACHE PASSED ✅")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# scripts/test_phase_p16_snapshot_catalog.py
+# FASE P16 — Catálogo de snapshots (solo metadatos, keyset)
+# Verifica que el catálogo no lee snapshot_json, que la paginación por id
+# recorre todas las filas sin repetir, que el listado por claim usa el
+# índice (claim_id, version_number) y que payload_bytes se completa.
+
+import sqlite3
+import time
+
+from app.db import (
+    create_patient,
+    create_coverage,
+    create_claim,
+    create_service,
+    create_charge,
+    get_provider_settings,
+    update_claim_operational_status,
+)
+from app.db.connection import get_connection, unit_of_work
+from app.db.claim_submission import submit_claims
+from app.db.cms1500_snapshot import (
+    _catalog_select,
+    list_claim_snapshots,
+    list_snapshot_catalog,
+)
+
+N_CLAIMS = 4
+N_BULK_VERSIONS = 3000
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _submitted_claims(n: int) -> list[int]:
+    pid = create_patient("Catalog", "Snapshot", "1990-01-01")
+    cov = create_coverage(pid, "Test", "Plan", "P1", "G1", "I1", "2025-01-01", None)
+
+    claim_ids = []
+    for i in range(n):
+        claim_id = create_claim(pid, cov)
+        service_id = create_service(claim_id, "2026-07-01", "90834", 1, "F41.1", "P16")
+        create_charge(service_id, 100.0 + i)
+        update_claim_operational_status(claim_id, "READY")
+        claim_ids.append(claim_id)
+
+    result = submit_claims(claim_ids, workers=1)
+    if result["failed"]:
+        raise AssertionError(f"FAIL: submit {result['failed']}")
+    return claim_ids
+
+
+def _walk(limit: int) -> list[int]:
+    ids = []
+    before_id = None
+    while True:
+        page = list_snapshot_catalog(before_id=before_id, limit=limit)
+        ids.extend(item["id"] for item in page["items"])
+        before_id = page["next_before_id"]
+        if before_id is None:
+            return ids
+
+
+def _plan(conn, sql: str, params: tuple) -> str:
+    return " | ".join(r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall())
+
+
+def main():
+    print("=== TEST P16: SNAPSHOT CATALOG ===")
+
+    get_provider_settings()
+    claim_ids = _submitted_claims(N_CLAIMS)
+
+    # =========================
+    # 1) payload_bytes en la escritura
+    # =========================
+    with get_connection() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT id, payload_bytes, length(CAST(snapshot_json AS BLOB)) AS real_bytes
+            FROM cms1500_snapshots
+            WHERE claim_id IN ({",".join(["?"] * len(claim_ids))})
+            """,
+            tuple(claim_ids),
+        ).fetchall()
+    if len(rows) != N_CLAIMS or any(r["payload_bytes"] != r["real_bytes"] for r in rows):
+        raise AssertionError("FAIL: payload_bytes no coincide con snapshot_json")
+    print(f"OK: payload_bytes completo en {len(rows)} snapshots nuevos")
+
+    # =========================
+    # 2) El catálogo nunca lee snapshot_json
+    # =========================
+    touched = []
+
+    def _authorizer(action, table, column, db_name, trigger):
+        if action == sqlite3.SQLITE_READ and table == "cms1500_snapshots" and column == "snapshot_json":
+            touched.append(column)
+        return sqlite3.SQLITE_OK
+
+    with unit_of_work(write=False) as conn:
+        conn.set_authorizer(_authorizer)
+        try:
+            page = list_snapshot_catalog(limit=10)
+            per_claim = list_claim_snapshots(claim_ids[0])
+        finally:
+            conn.set_authorizer(None)
+
+    if touched:
+        raise AssertionError("FAIL: el catálogo leyó snapshot_json")
+
+    required = {"id", "snapshot_id", "claim_id", "version_number", "snapshot_hash", "created_at", "payload_bytes", "claim_status"}
+    if not page["items"] or not required.issubset(page["items"][0]):
+        raise AssertionError(f"FAIL: estructura {page['items'][:1]}")
+    if [s["claim_id"] for s in per_claim] != [claim_ids[0]] or per_claim[0]["version_number"] != 1:
+        raise AssertionError(f"FAIL: list_claim_snapshots {per_claim}")
+    print("OK: solo metadatos (snapshot_json no se lee)")
+
+    # =========================
+    # 3) Keyset: recorre todo, sin repetir, en orden
+    # =========================
+    with get_connection() as conn:
+        expected = [r[0] for r in conn.execute("SELECT id FROM cms1500_snapshots ORDER BY id DESC").fetchall()]
+
+    for limit in (1, 3, 1000):
+        if _walk(limit) != expected:
+            raise AssertionError(f"FAIL: paginación limit={limit}")
+
+    last = list_snapshot_catalog(before_id=min(expected), limit=10)
+    if last["items"] or last["next_before_id"] is not None:
+        raise AssertionError("FAIL: página después del último")
+    print(f"OK: keyset recorre {len(expected)} snapshots sin repetir")
+
+    # =========================
+    # 4) Planes de consulta + tabla grande
+    # =========================
+    try:
+        with unit_of_work() as conn:
+            big_claim = claim_ids[-1]
+            conn.executemany(
+                """
+                INSERT INTO cms1500_snapshots (claim_id, version_number, snapshot_json, snapshot_hash, payload_bytes)
+                VALUES (?, ?, '{}', ?, 2)
+                """,
+                [(big_claim, v, f"{v:064x}") for v in range(2, N_BULK_VERSIONS + 2)],
+            )
+
+            plan_global = _plan(conn, _catalog_select() + " WHERE s.id < ? ORDER BY s.id DESC LIMIT ?", (10**9, 51))
+            plan_claim = _plan(
+                conn,
+                _catalog_select() + " WHERE s.claim_id = ? ORDER BY s.version_number DESC, s.id DESC",
+                (big_claim,),
+            )
+            if "TEMP B-TREE" in plan_global or "INTEGER PRIMARY KEY" not in plan_global:
+                raise AssertionError(f"FAIL: plan global {plan_global}")
+            if "idx_snapshot_claim_version" not in plan_claim or "TEMP B-TREE" in plan_claim:
+                raise AssertionError(f"FAIL: plan por claim {plan_claim}")
+
+            start = time.perf_counter()
+            first = list_snapshot_catalog(limit=50)
+            t_first = time.perf_counter() - start
+
+            deep_id = first["items"][0]["id"] - N_BULK_VERSIONS + 100
+            start = time.perf_counter()
+            deep = list_snapshot_catalog(before_id=deep_id, limit=50)
+            t_deep = time.perf_counter() - start
+
+            if len(deep["items"]) != 50 or deep["items"][0]["id"] != deep_id - 1:
+                raise AssertionError("FAIL: página profunda")
+            if len(list_claim_snapshots(big_claim)) != N_BULK_VERSIONS + 1:
+                raise AssertionError("FAIL: listado por claim grande")
+
+            raise _Rollback
+    except _Rollback:
+        pass
+
+    print(f"OK: planes con índice; página 1 {t_first * 1000:.2f}ms, página profunda {t_deep * 1000:.2f}ms")
+
+    print("SNAPSHOT CATALOG PASSED ✅")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# scripts/test_phase_p17_latest_snapshot_pointer.py
+# FASE P17 — Puntero claim_latest_snapshot
+# Verifica que los triggers mantienen el puntero en la misma transacción
+# del INSERT/DELETE, que todas las lecturas de "último snapshot" coinciden
+# (incluso con created_at repetido) y que la consulta es por PK.
+
+from app.db import (
+    create_patient,
+    create_coverage,
+    create_claim,
+    create_service,
+    create_charge,
+    get_provider_settings,
+    update_claim_operational_status,
+)
+from app.db.connection import get_connection, unit_of_work
+from app.db.claim_submission import submit_claims
+from app.db.claims import get_claims_financial_status
+from app.db.cms1500_snapshot import get_latest_snapshot_by_claim
+from app.db.financial_lock import is_claim_locked
+from app.views import cms1500_render
+from app.views.cms1500_batch import resolve_batch_claims
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _pointer_mismatches() -> list:
+    with get_connection() as conn:
+        return conn.execute(
+            """
+            SELECT m.claim_id
+            FROM (
+                SELECT claim_id, MAX(id) AS snapshot_id
+                FROM cms1500_snapshots
+                GROUP BY claim_id
+            ) m
+            LEFT JOIN claim_latest_snapshot l ON l.claim_id = m.claim_id
+            LEFT JOIN cms1500_snapshots s ON s.id = l.snapshot_id
+            WHERE l.snapshot_id IS NOT m.snapshot_id
+               OR l.snapshot_hash IS NOT s.snapshot_hash
+               OR l.version_number IS NOT s.version_number
+            UNION ALL
+            SELECT l.claim_id
+            FROM claim_latest_snapshot l
+            WHERE NOT EXISTS (SELECT 1 FROM cms1500_snapshots s WHERE s.claim_id = l.claim_id)
+            """
+        ).fetchall()
+
+
+def _insert_version(conn, claim_id: int, version: int, created_at: str) -> tuple[int, str]:
+    snapshot_hash = f"{version:064x}"
+    cur = conn.execute(
+        """
+        INSERT INTO cms1500_snapshots (claim_id, version_number, snapshot_json, snapshot_hash, created_at)
+        VALUES (?, ?, '{}', ?, ?)
+        """,
+        (claim_id, version, snapshot_hash, created_at),
+    )
+    return cur.lastrowid, snapshot_hash
+
+
+def main():
+    print("=== TEST P17: LATEST SNAPSHOT POINTER ===")
+
+    get_provider_settings()
+    pid = create_patient("Pointer", "Latest", "1990-01-01")
+    cov = create_coverage(pid, "Test", "Plan", "P1", "G1", "I1", "2025-01-01", None)
+
+    claim_ids = []
+    for _ in range(3):
+        claim_id = create_claim(pid, cov)
+        service_id = create_service(claim_id, "2026-07-01", "90834", 1, "F41.1", "P17")
+        create_charge(service_id, 100.0)
+        update_claim_operational_status(claim_id, "READY")
+        claim_ids.append(claim_id)
+    unsubmitted = create_claim(pid, cov)
+
+    result = submit_claims(claim_ids, workers=1)
+    if result["failed"]:
+        raise AssertionError(f"FAIL: submit {result['failed']}")
+
+    # =========================
+    # 1) Puntero al día tras el envío
+    # =========================
+    if _pointer_mismatches():
+        raise AssertionError(f"FAIL: puntero desalineado {_pointer_mismatches()}")
+    if not all(is_claim_locked(cid) for cid in claim_ids) or is_claim_locked(unsubmitted):
+        raise AssertionError("FAIL: is_claim_locked")
+    print("OK: puntero alineado con MAX(id) para todos los claims")
+
+    # =========================
+    # 2) Nuevas versiones con el mismo created_at
+    # =========================
+    claim_id = claim_ids[0]
+    try:
+        with unit_of_work() as conn:
+            created_at = "2026-07-02 10:00:00"
+            _insert_version(conn, claim_id, 2, created_at)
+            v3_id, v3_hash = _insert_version(conn, claim_id, 3, created_at)
+
+            latest = get_latest_snapshot_by_claim(claim_id)
+            if latest["id"] != v3_id or latest["version_number"] != 3:
+                raise AssertionError(f"FAIL: db latest {latest['id']} != {v3_id}")
+            if cms1500_render.get_latest_snapshot_hash_by_claim(claim_id) != v3_hash:
+                raise AssertionError("FAIL: views latest hash (created_at repetido)")
+            if cms1500_render.get_latest_snapshot_by_claim(claim_id) != {}:
+                raise AssertionError("FAIL: views latest snapshot")
+            if get_claims_financial_status([claim_id])[claim_id]["snapshot_version"] != 3:
+                raise AssertionError("FAIL: snapshot_version del listado")
+            batch = resolve_batch_claims(claim_ids=[claim_id])
+            if [(t["snapshot_id"], t["snapshot_hash"]) for t in batch] != [(v3_id, v3_hash)]:
+                raise AssertionError(f"FAIL: batch {batch}")
+            print("OK: db / views / listado / batch coinciden en v3")
+
+            # Borrar el último (reparación forense) vuelve al anterior
+            conn.execute("DELETE FROM cms1500_snapshots WHERE id = ?", (v3_id,))
+            if get_latest_snapshot_by_claim(claim_id)["version_number"] != 2:
+                raise AssertionError("FAIL: puntero tras DELETE")
+            if _pointer_mismatches():
+                raise AssertionError("FAIL: puntero desalineado tras DELETE")
+            print("OK: DELETE del último recalcula el puntero")
+
+            raise _Rollback
+    except _Rollback:
+        pass
+
+    # El rollback deshace también el puntero
+    if get_latest_snapshot_by_claim(claim_id)["version_number"] != 1 or _pointer_mismatches():
+        raise AssertionError("FAIL: puntero tras rollback")
+    print("OK: rollback deshace snapshot y puntero juntos")
+
+    # =========================
+    # 3) Lectura por PK
+    # =========================
+    with get_connection() as conn:
+        plan = " | ".join(
+            r[3]
+            for r in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT snapshot_hash FROM claim_latest_snapshot WHERE claim_id = ?",
+                (claim_id,),
+            ).fetchall()
+        )
+    if "INTEGER PRIMARY KEY" not in plan:
+        raise AssertionError(f"FAIL: plan {plan}")
+    print(f"OK: {plan}")
+
+    print("LATEST SNAPSHOT POINTER PASSED ✅")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# scripts/test_phase_p18_snapshot_summary.py
+# FASE P18 — Columnas resumen del snapshot
+# Verifica que la escritura completa el resumen igual que el snapshot,
+# que el backfill reconstruye filas sin resumen (por lotes, idempotente)
+# y que list_frozen_claims filtra y ordena con índices.
+
+import json
+import uuid
+
+from app.db import (
+    create_patient,
+    create_coverage,
+    create_claim,
+    create_service,
+    create_charge,
+    get_provider_settings,
+    update_claim_operational_status,
+)
+from app.db.connection import get_connection, unit_of_work
+from app.db.claim_submission import submit_claims
+from app.db.cms1500_snapshot import generate_cms1500_snapshot
+from app.db.snapshot_summary import (
+    SNAPSHOT_SUMMARY_COLUMNS,
+    backfill_snapshot_summaries,
+    list_frozen_claims,
+    snapshot_summary,
+)
+
+# Único por corrida: la DB de pruebas se reutiliza
+INSURER = f"P18 Mutual {uuid.uuid4().hex[:8]}"
+
+
+def _ready_claim(pid: int, cov: int, dates: list[str], amount: float) -> int:
+    claim_id = create_claim(pid, cov)
+    for d in dates:
+        service_id = create_service(claim_id, d, "90834", 1, "F41.1", "P18")
+        create_charge(service_id, amount)
+    update_claim_operational_status(claim_id, "READY")
+    return claim_id
+
+
+def _summary_rows(claim_ids: list[int]) -> dict:
+    q_marks = ",".join(["?"] * len(claim_ids))
+    with get_connection() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT claim_id, snapshot_json, {", ".join(SNAPSHOT_SUMMARY_COLUMNS)}
+            FROM cms1500_snapshots
+            WHERE claim_id IN ({q_marks})
+            """,
+            tuple(claim_ids),
+        ).fetchall()
+    return {r["claim_id"]: dict(r) for r in rows}
+
+
+def _check(rows: dict) -> None:
+    for cid, row in rows.items():
+        expected = snapshot_summary(json.loads(row["snapshot_json"]))
+        got = {col: row[col] for col in SNAPSHOT_SUMMARY_COLUMNS}
+        if got != expected:
+            raise AssertionError(f"FAIL: resumen claim {cid}: {got} != {expected}")
+
+
+def main():
+    print("=== TEST P18: SNAPSHOT SUMMARY ===")
+
+    get_provider_settings()
+
+    pid_a = create_patient("Ana", "Zuloaga", "1990-01-01")
+    pid_b = create_patient("Beto", "Arce", "1985-05-05")
+    cov_a = create_coverage(pid_a, INSURER, "Plan", "P1", "G1", "I1", "2025-01-01", None)
+    cov_b = create_coverage(pid_b, INSURER, "Plan", "P2", "G2", "I2", "2025-01-01", None)
+
+    c1 = _ready_claim(pid_a, cov_a, ["2026-03-10", "2026-03-01", "2026-03-20"], 50.0)
+    c2 = _ready_claim(pid_b, cov_b, ["2026-02-01"], 300.0)
+    c3 = _ready_claim(pid_b, cov_b, ["2026-04-15", "2026-04-16"], 80.0)
+
+    # =========================
+    # 1) Escritura (lote e individual)
+    # =========================
+    result = submit_claims([c1, c2], workers=1)
+    if result["failed"]:
+        raise AssertionError(f"FAIL: submit {result['failed']}")
+
+    update_claim_operational_status(c3, "SUBMITTED")
+    with get_connection() as conn:
+        if not conn.execute("SELECT 1 FROM cms1500_snapshots WHERE claim_id = ?", (c3,)).fetchone():
+            generate_cms1500_snapshot(c3)
+
+    rows = _summary_rows([c1, c2, c3])
+    _check(rows)
+    if (rows[c1]["service_count"], rows[c1]["first_service_date"], rows[c1]["last_service_date"]) != (
+        3,
+        "2026-03-01",
+        "2026-03-20",
+    ):
+        raise AssertionError(f"FAIL: fechas/servicios {rows[c1]}")
+    if rows[c2]["total_charge"] != 300.0 or rows[c2]["patient_last_name"] != "Arce":
+        raise AssertionError(f"FAIL: totales/paciente {rows[c2]}")
+    print("OK: resumen completo al escribir (submit_claims y generate_cms1500_snapshot)")
+
+    # =========================
+    # 2) Backfill por lotes
+    # =========================
+    assignments = ", ".join(f"{col} = NULL" for col in SNAPSHOT_SUMMARY_COLUMNS)
+    with unit_of_work() as conn:
+        conn.execute(f"UPDATE cms1500_snapshots SET {assignments} WHERE claim_id IN (?, ?, ?)", (c1, c2, c3))
+        pending = conn.execute("SELECT COUNT(*) FROM cms1500_snapshots WHERE service_count IS NULL").fetchone()[0]
+
+    updated = backfill_snapshot_summaries(batch_size=2)
+    if updated != pending:
+        raise AssertionError(f"FAIL: backfill actualizó {updated}, pendientes {pending}")
+    _check(_summary_rows([c1, c2, c3]))
+
+    if backfill_snapshot_summaries() != 0:
+        raise AssertionError("FAIL: backfill no es idempotente")
+    print(f"OK: backfill completó {updated} snapshots en lotes; segunda corrida = 0")
+
+    # =========================
+    # 3) Listado / filtros / orden
+    # =========================
+    by_balance = list_frozen_claims(insurer_name=INSURER, sort="balance_due", descending=True)
+    if [r["claim_id"] for r in by_balance] != [c2, c3, c1]:
+        raise AssertionError(f"FAIL: orden por balance {[r['claim_id'] for r in by_balance]}")
+
+    arce = list_frozen_claims(insurer_name=INSURER, patient_last_name="Arce", sort="first_service_date")
+    if [r["claim_id"] for r in arce] != [c2, c3]:
+        raise AssertionError("FAIL: filtro por paciente")
+
+    april = list_frozen_claims(insurer_name=INSURER, service_date_from="2026-04-01", service_date_to="2026-04-30")
+    if [r["claim_id"] for r in april] != [c3]:
+        raise AssertionError("FAIL: filtro por rango de fechas")
+
+    try:
+        list_frozen_claims(sort="snapshot_json")
+        raise AssertionError("FAIL: orden inválido aceptado")
+    except ValueError:
+        pass
+    print("OK: filtros y orden sobre columnas resumen")
+
+    with get_connection() as conn:
+        plan = " | ".join(
+            r[3]
+            for r in conn.execute(
+                """
+                EXPLAIN QUERY PLAN
+                SELECT s.id FROM cms1500_snapshots s
+                JOIN claim_latest_snapshot l ON l.claim_id = s.claim_id AND l.snapshot_id = s.id
+                WHERE s.insurer_name = ?
+                ORDER BY s.first_service_date, s.id
+                """,
+                (INSURER,),
+            ).fetchall()
+        )
+    if "idx_snapshots_" not in plan:
+        raise AssertionError(f"FAIL: plan sin índice {plan}")
+    print(f"OK: {plan}")
+
+    print("SNAPSHOT SUMMARY PASSED ✅")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+# scripts/test_phase_p19_snapshot_service_lines.py
+# FASE P19 — Líneas de servicio del snapshot
+# Verifica que cada snapshot proyecta sus líneas 24A–24J al escribirse,
+# que son inmutables, que el backfill reconstruye las faltantes y que
+# los agregados por CPT / aseguradora salen de SQL con índices.
+
+import json
+import sqlite3
+import uuid
+
+from app.db import (
+    create_patient,
+    create_coverage,
+    create_claim,
+    create_service,
+    create_charge,
+    get_provider_settings,
+    update_claim_operational_status,
+)
+from app.db.connection import get_connection, unit_of_work
+from app.db.claim_submission import submit_claims
+from app.db.snapshot_service_lines import (
+    SERVICE_LINE_COLUMNS,
+    backfill_snapshot_service_lines,
+    service_line_rows,
+    service_line_totals,
+)
+
+# Únicos por corrida: la DB de pruebas se reutiliza
+INSURER_A = f"P19 Alfa {uuid.uuid4().hex[:8]}"
+INSURER_B = f"P19 Beta {uuid.uuid4().hex[:8]}"
+
+
+def _ready_claim(pid: int, cov: int, lines: list[tuple[str, str, int]]) -> int:
+    claim_id = create_claim(pid, cov)
+    for service_date, cpt, units in lines:
+        service_id = create_service(claim_id, service_date, cpt, units, "F41.1", "P19")
+        create_charge(service_id, 100.0 * units)
+    update_claim_operational_status(claim_id, "READY")
+    return claim_id
+
+
+def _lines(claim_ids: list[int]) -> list[tuple]:
+    q_marks = ",".join(["?"] * len(claim_ids))
+    with get_connection() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT {", ".join(SERVICE_LINE_COLUMNS)}
+            FROM snapshot_service_lines
+            WHERE claim_id IN ({q_marks})
+            ORDER BY snapshot_id, line_number
+            """,
+            tuple(claim_ids),
+        ).fetchall()
+    return [tuple(r) for r in rows]
+
+
+def _expected(claim_ids: list[int]) -> list[tuple]:
+    q_marks = ",".join(["?"] * len(claim_ids))
+    with get_connection() as conn:
+        snaps = conn.execute(
+            f"SELECT id, claim_id, snapshot_json FROM cms1500_snapshots WHERE claim_id IN ({q_marks}) ORDER BY id",
+            tuple(claim_ids),
+        ).fetchall()
+    out = []
+    for s in snaps:
+        out.extend(service_line_rows(s["id"], s["claim_id"], json.loads(s["snapshot_json"])))
+    return out
+
+
+def main():
+    print("=== TEST P19: SNAPSHOT SERVICE LINES ===")
+
+    get_provider_settings()
+
+    pid = create_patient("Lineas", "Servicio", "1990-01-01")
+    cov_a = create_coverage(pid, INSURER_A, "Plan", "P1", "G1", "I1", "2025-01-01", None)
+    cov_b = create_coverage(pid, INSURER_B, "Plan", "P2", "G2", "I2", "2025-01-01", None)
+
+    c1 = _ready_claim(pid, cov_a, [("2026-01-10", "90837", 2), ("2026-01-17", "90834", 1)])
+    c2 = _ready_claim(pid, cov_a, [("2026-02-05", "90837", 3)])
+    c3 = _ready_claim(pid, cov_b, [("2026-03-01", "90837", 1), ("2026-05-01", "90837", 4)])
+    claim_ids = [c1, c2, c3]
+
+    result = submit_claims(claim_ids, workers=1)
+    if result["failed"]:
+        raise AssertionError(f"FAIL: submit {result['failed']}")
+
+    # =========================
+    # 1) Proyección al escribir
+    # =========================
+    lines = _lines(claim_ids)
+    if len(lines) != 5 or lines != _expected(claim_ids):
+        raise AssertionError(f"FAIL: líneas proyectadas {lines}")
+    print(f"OK: {len(lines)} líneas escritas junto con los snapshots")
+
+    # =========================
+    # 2) Inmutables
+    # =========================
+    try:
+        with unit_of_work() as conn:
+            conn.execute("UPDATE snapshot_service_lines SET units = 99 WHERE claim_id = ?", (c1,))
+        raise AssertionError("FAIL: UPDATE permitido")
+    except sqlite3.IntegrityError:
+        pass
+    print("OK: UPDATE bloqueado por trigger")
+
+    # =========================
+    # 3) Backfill
+    # =========================
+    with unit_of_work() as conn:
+        conn.execute(
+            f"DELETE FROM snapshot_service_lines WHERE claim_id IN ({','.join(['?'] * len(claim_ids))})",
+            tuple(claim_ids),
+        )
+
+    inserted = backfill_snapshot_service_lines(batch_size=1)
+    if inserted < 5 or _lines(claim_ids) != _expected(claim_ids):
+        raise AssertionError(f"FAIL: backfill insertó {inserted}")
+    if backfill_snapshot_service_lines() != 0:
+        raise AssertionError("FAIL: backfill no es idempotente")
+    print(f"OK: backfill reconstruyó {inserted} líneas; segunda corrida = 0")
+
+    # =========================
+    # 4) Agregados
+    # =========================
+    q1 = service_line_totals(
+        group_by=["insurer_name"],
+        cpt_code="90837",
+        service_date_from="2026-01-01",
+        service_date_to="2026-03-31",
+    )
+    by_insurer = {r["insurer_name"]: r for r in q1 if r["insurer_name"] in (INSURER_A, INSURER_B)}
+    if by_insurer[INSURER_A]["units"] != 5 or by_insurer[INSURER_A]["claims"] != 2:
+        raise AssertionError(f"FAIL: agregado {INSURER_A} {by_insurer[INSURER_A]}")
+    if by_insurer[INSURER_B]["units"] != 1 or by_insurer[INSURER_B]["lines"] != 1:
+        raise AssertionError(f"FAIL: agregado {INSURER_B} {by_insurer[INSURER_B]}")
+
+    by_month = service_line_totals(group_by=["cpt_code", "service_month"], insurer_name=INSURER_B)
+    if [(r["cpt_code"], r["service_month"], r["units"]) for r in by_month] != [
+        ("90837", "2026-03", 1),
+        ("90837", "2026-05", 4),
+    ]:
+        raise AssertionError(f"FAIL: agrupado por mes {by_month}")
+
+    try:
+        service_line_totals(group_by=["snapshot_json"])
+        raise AssertionError("FAIL: agrupación inválida aceptada")
+    except ValueError:
+        pass
+    print("OK: unidades 90837 Q1 por aseguradora = {A: 5, B: 1}")
+
+    with get_connection() as conn:
+        plan = " | ".join(
+            r[3]
+            for r in conn.execute(
+                """
+                EXPLAIN QUERY PLAN
+                SELECT SUM(units) FROM snapshot_service_lines
+                WHERE cpt_code = ? AND service_date BETWEEN ? AND ?
+                """,
+                ("90837", "2026-01-01", "2026-03-31"),
+            ).fetchall()
+        )
+    if "idx_service_lines_cpt_date" not in plan:
+        raise AssertionError(f"FAIL: plan {plan}")
+    print(f"OK: {plan}")
+
+    print("SNAPSHOT SERVICE LINES PASSED ✅")
+
+
+if __name__ == "__main__":
+    main()
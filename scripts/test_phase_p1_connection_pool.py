@@ -0,0 +1,89 @@
+# scripts/test_phase_p1_connection_pool.py
+# FASE P1 — Pool de conexiones SQLite por thread
+# Verifica que la conexión se reutiliza (configurada una sola vez), que el
+# pool está acotado por DB_POOL_SIZE, que cada thread tiene el suyo y que
+# lo no confirmado se descarta al devolver la conexión.
+
+import threading
+
+from app.config import DB_POOL_SIZE
+from app.db import connection
+from app.db.connection import close_thread_connections, get_connection
+
+
+def _raw(conn):
+    return conn._raw()
+
+
+def main():
+    print("=== TEST P1: CONNECTION POOL ===")
+
+    close_thread_connections()
+
+    # =========================
+    # 1) Reutilización + PRAGMAs
+    # =========================
+    with get_connection() as conn:
+        first = _raw(conn)
+        journal = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        fk = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+    with get_connection() as conn:
+        if _raw(conn) is not first:
+            raise AssertionError("FAIL: la conexión no se reutilizó")
+    if journal.lower() != "wal" or fk != 1:
+        raise AssertionError(f"FAIL: PRAGMAs journal_mode={journal} foreign_keys={fk}")
+    print("OK: misma conexión en usos sucesivos; WAL + foreign_keys")
+
+    # =========================
+    # 2) Tope del pool
+    # =========================
+    open_conns = [get_connection() for _ in range(DB_POOL_SIZE + 2)]
+    raws = [_raw(c) for c in open_conns]
+    if len({id(r) for r in raws}) != len(raws):
+        raise AssertionError("FAIL: la misma conexión prestada dos veces")
+    for c in open_conns:
+        c.close()
+    if len(connection._idle_connections()) != DB_POOL_SIZE:
+        raise AssertionError(f"FAIL: pool con {len(connection._idle_connections())} inactivas")
+    print(f"OK: {len(raws)} conexiones simultáneas; quedan {DB_POOL_SIZE} en el pool")
+
+    # =========================
+    # 3) Pool por thread
+    # =========================
+    seen = {}
+
+    def _worker():
+        with get_connection() as conn:
+            seen["raw"] = _raw(conn)
+        close_thread_connections()
+
+    t = threading.Thread(target=_worker)
+    t.start()
+    t.join()
+    if seen["raw"] in raws:
+        raise AssertionError("FAIL: conexión compartida entre threads")
+    print("OK: cada thread usa sus propias conexiones")
+
+    # =========================
+    # 4) Lo no confirmado se descarta al devolverla
+    # =========================
+    conn = get_connection()
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS p1_probe (x INTEGER)")
+    conn.commit()
+    conn.execute("INSERT INTO p1_probe VALUES (1)")
+    raw = _raw(conn)
+    conn.close()
+    if raw.in_transaction:
+        raise AssertionError("FAIL: transacción abierta en el pool")
+    with get_connection() as conn:
+        if _raw(conn) is not raw or conn.execute("SELECT COUNT(*) FROM p1_probe").fetchone()[0] != 0:
+            raise AssertionError("FAIL: quedó el INSERT sin commit")
+        conn.execute("DROP TABLE p1_probe")
+    print("OK: close() sin commit hace rollback antes de volver al pool")
+
+    close_thread_connections()
+    print("CONNECTION POOL PASSED ✅")
+
+
+if __name__ == "__main__":
+    main()
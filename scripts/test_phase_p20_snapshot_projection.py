@@ -0,0 +1,126 @@
+# scripts/test_phase_p20_snapshot_projection.py
+# FASE P20 — Proyección de campos del snapshot en SQL
+# Verifica que get_snapshot_projection / get_snapshots_projection devuelven
+# exactamente los subárboles pedidos (iguales al documento completo), que
+# no pasan por el parseo en Python y que rechazan paths inválidos.
+
+import json
+
+from app.db import (
+    create_patient,
+    create_coverage,
+    create_claim,
+    create_service,
+    create_charge,
+    get_provider_settings,
+    update_claim_operational_status,
+)
+from app.db.connection import get_connection
+from app.db.claim_submission import submit_claims
+from app.db.cms1500_snapshot import (
+    get_snapshot_by_id,
+    get_snapshot_projection,
+    get_snapshots_projection,
+    parse_snapshot_fields,
+)
+from app.db.snapshot_cache import snapshot_cache_stats
+
+
+def _raw(snapshot_id: int) -> dict:
+    with get_connection() as conn:
+        row = conn.execute("SELECT snapshot_json FROM cms1500_snapshots WHERE id = ?", (snapshot_id,)).fetchone()
+    return json.loads(row["snapshot_json"])
+
+
+def main():
+    print("=== TEST P20: SNAPSHOT PROJECTION ===")
+
+    get_provider_settings()
+    pid = create_patient("Proyeccion", "Campos", "1990-01-01")
+    cov = create_coverage(pid, "Test", "Plan", "P1", "G1", "I1", "2025-01-01", None)
+
+    claim_ids = []
+    for n in range(3):
+        claim_id = create_claim(pid, cov)
+        for d in range(n + 1):
+            service_id = create_service(claim_id, f"2026-08-0{d + 1}", "90834", 1, "F41.1", "P20")
+            create_charge(service_id, 75.0)
+        update_claim_operational_status(claim_id, "READY")
+        claim_ids.append(claim_id)
+
+    result = submit_claims(claim_ids, workers=1)
+    if result["failed"]:
+        raise AssertionError(f"FAIL: submit {result['failed']}")
+
+    with get_connection() as conn:
+        snapshot_ids = [
+            conn.execute("SELECT snapshot_id FROM claim_latest_snapshot WHERE claim_id = ?", (cid,)).fetchone()[0]
+            for cid in claim_ids
+        ]
+
+    # =========================
+    # 1) Un snapshot
+    # =========================
+    sid = snapshot_ids[-1]
+    full = _raw(sid)
+    stats_before = snapshot_cache_stats()
+
+    proj = get_snapshot_projection(sid, "totals, services, patient.last_name, services[1].units, no_existe")
+    expected = {
+        "totals": full["totals"],
+        "services": full["services"],
+        "patient.last_name": full["patient"]["last_name"],
+        "services[1].units": full["services"][1]["units"],
+        "no_existe": None,
+    }
+    if proj["snapshot"] != expected:
+        raise AssertionError(f"FAIL: proyección {proj['snapshot']}")
+
+    meta = get_snapshot_by_id(sid)
+    for key in ("id", "claim_id", "snapshot_hash", "created_at", "version_number", "locked"):
+        if proj[key] != meta[key]:
+            raise AssertionError(f"FAIL: metadato {key}")
+    print("OK: subárboles iguales al documento; campo inexistente = null")
+
+    # =========================
+    # 2) Varios snapshots
+    # =========================
+    bulk = get_snapshots_projection([*snapshot_ids, snapshot_ids[0], 10**9], ["totals"])
+    if sorted(bulk) != sorted(snapshot_ids):
+        raise AssertionError(f"FAIL: ids bulk {sorted(bulk)}")
+    for s in snapshot_ids:
+        if bulk[s]["snapshot"] != {"totals": _raw(s)["totals"]}:
+            raise AssertionError(f"FAIL: bulk {s}")
+
+    # get_snapshot_by_id sí usa el cache; la proyección no lo toca
+    stats_after = snapshot_cache_stats()
+    if (stats_after["hits"] + stats_after["misses"]) - (stats_before["hits"] + stats_before["misses"]) != 1:
+        raise AssertionError(f"FAIL: la proyección pasó por el cache {stats_before} → {stats_after}")
+    print(f"OK: bulk de {len(bulk)} snapshots en una consulta; sin parseo del documento")
+
+    projected = len(json.dumps(bulk[snapshot_ids[0]]["snapshot"]))
+    whole = len(json.dumps(_raw(snapshot_ids[0])))
+    if projected >= whole:
+        raise AssertionError("FAIL: la proyección no reduce el payload")
+    print(f"OK: totals = {projected} bytes vs documento {whole} bytes")
+
+    # =========================
+    # 3) Validación
+    # =========================
+    if parse_snapshot_fields("totals,,totals, patient") != ["totals", "patient"]:
+        raise AssertionError("FAIL: normalización de fields")
+    for bad in ("", "totals;drop", "$.totals", "services[x]", "a..b"):
+        try:
+            get_snapshot_projection(sid, bad)
+            raise AssertionError(f"FAIL: campo aceptado {bad!r}")
+        except ValueError:
+            pass
+    if get_snapshot_projection(10**9, "totals") is not None:
+        raise AssertionError("FAIL: snapshot inexistente")
+    print("OK: paths inválidos → ValueError; id inexistente → None")
+
+    print("SNAPSHOT PROJECTION PASSED ✅")
+
+
+if __name__ == "__main__":
+    main()
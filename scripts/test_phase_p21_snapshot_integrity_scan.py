@@ -0,0 +1,187 @@
+# scripts/test_phase_p21_snapshot_integrity_scan.py
+# FASE P21 — Escaneo de integridad por lotes, en paralelo y retomable
+# Verifica el checkpoint incremental (nuevos + modificados), que un
+# escaneo interrumpido se retoma sin repetir lotes, que el pool da el
+# mismo resultado y que el ledger recibe un resumen + una falla por snapshot.
+
+import json
+
+import app.db.snapshot_integrity as integrity
+from app.db import (
+    create_patient,
+    create_coverage,
+    create_claim,
+    create_service,
+    create_charge,
+    get_provider_settings,
+    update_claim_operational_status,
+)
+from app.db.connection import get_connection, unit_of_work
+from app.db.claim_submission import submit_claims
+from app.db.snapshot_integrity import get_last_integrity_scan, run_integrity_scan
+
+
+class _Interrupted(Exception):
+    pass
+
+
+def _submitted_snapshots(pid: int, cov: int, n: int) -> list[int]:
+    claim_ids = []
+    for _ in range(n):
+        claim_id = create_claim(pid, cov)
+        service_id = create_service(claim_id, "2026-09-01", "90834", 1, "F41.1", "P21")
+        create_charge(service_id, 100.0)
+        update_claim_operational_status(claim_id, "READY")
+        claim_ids.append(claim_id)
+
+    result = submit_claims(claim_ids, workers=1)
+    if result["failed"]:
+        raise AssertionError(f"FAIL: submit {result['failed']}")
+
+    q_marks = ",".join(["?"] * len(claim_ids))
+    with get_connection() as conn:
+        rows = conn.execute(
+            f"SELECT id FROM cms1500_snapshots WHERE claim_id IN ({q_marks}) ORDER BY id", tuple(claim_ids)
+        ).fetchall()
+    return [r["id"] for r in rows]
+
+
+def _events(event_type: str) -> int:
+    with get_connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM event_ledger WHERE event_type = ?", (event_type,)).fetchone()[0]
+
+
+def _total_snapshots() -> int:
+    with get_connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM cms1500_snapshots").fetchone()[0]
+
+
+def main():
+    print("=== TEST P21: SNAPSHOT INTEGRITY SCAN ===")
+
+    get_provider_settings()
+    pid = create_patient("Integridad", "Escaneo", "1990-01-01")
+    cov = create_coverage(pid, "Test", "Plan", "P1", "G1", "I1", "2025-01-01", None)
+    # Suficientes para 3+ lotes de 3 en la sección 3, aun con la DB vacía
+    _submitted_snapshots(pid, cov, 5)
+
+    # =========================
+    # 1) Full + incremental
+    # =========================
+    verified_before = _events("snapshot_integrity_verified")
+    summaries_before = _events("snapshot_integrity_scan")
+
+    full = run_integrity_scan(full=True, workers=1)
+    if full["scanned"] != _total_snapshots() or full["failure_count"]:
+        raise AssertionError(f"FAIL: full {full}")
+    if run_integrity_scan(workers=1)["scanned"] != 0:
+        raise AssertionError("FAIL: incremental sin cambios")
+
+    new_ids = _submitted_snapshots(pid, cov, 3)
+    inc = run_integrity_scan(workers=1)
+    if inc["scanned"] != 3 or inc["start_after_id"] != full["last_id"] or inc["last_id"] != new_ids[-1]:
+        raise AssertionError(f"FAIL: incremental {inc}")
+    print(f"OK: full = {full['scanned']}; incremental solo los {inc['scanned']} nuevos")
+
+    # =========================
+    # 2) Modificados después de escritos
+    # =========================
+    target = new_ids[0]
+    with get_connection() as conn:
+        original = conn.execute("SELECT snapshot_json FROM cms1500_snapshots WHERE id = ?", (target,)).fetchone()[0]
+    tampered = json.loads(original)
+    tampered["totals"]["total_charge"] = 1.0
+
+    try:
+        with unit_of_work() as conn:
+            conn.execute(
+                "UPDATE cms1500_snapshots SET snapshot_json = ? WHERE id = ?",
+                (json.dumps(tampered, sort_keys=True, separators=(",", ":")), target),
+            )
+
+        failed_before = _events("snapshot_integrity_failed")
+        bad = run_integrity_scan(workers=1)
+        if bad["scanned"] != 1 or [f["snapshot_id"] for f in bad["failures"]] != [target]:
+            raise AssertionError(f"FAIL: modificado no detectado {bad}")
+        if _events("snapshot_integrity_failed") != failed_before + 1:
+            raise AssertionError("FAIL: evento de falla")
+
+        # El pool detecta lo mismo
+        integrity.INTEGRITY_SCAN_POOL_MIN = 0
+        pooled = run_integrity_scan(full=True, workers=2, chunk_size=7)
+        if pooled["scanned"] != _total_snapshots() or target not in [f["snapshot_id"] for f in pooled["failures"]]:
+            raise AssertionError(f"FAIL: pool {pooled['scanned']} {pooled['failure_count']}")
+        print(f"OK: snapshot {target} modificado → falla (serial y pool de 2 procesos)")
+    finally:
+        integrity.INTEGRITY_SCAN_POOL_MIN = 200
+        with unit_of_work() as conn:
+            conn.execute("UPDATE cms1500_snapshots SET snapshot_json = ? WHERE id = ?", (original, target))
+
+    restored = run_integrity_scan(workers=1)
+    with get_connection() as conn:
+        queued = conn.execute("SELECT COUNT(*) FROM snapshot_integrity_pending").fetchone()[0]
+    if restored["failure_count"] or queued:
+        raise AssertionError(f"FAIL: restaurado {restored} / cola {queued}")
+    print("OK: restaurado → incremental limpio y cola vacía")
+
+    # =========================
+    # 3) Interrupción y reanudación
+    # =========================
+    # Falla en el primer lote: queda registrada antes de la interrupción
+    with get_connection() as conn:
+        first_id, first_json = conn.execute(
+            "SELECT id, snapshot_json FROM cms1500_snapshots ORDER BY id LIMIT 1"
+        ).fetchone()
+    with unit_of_work() as conn:
+        conn.execute("UPDATE cms1500_snapshots SET snapshot_json = ? WHERE id = ?", (first_json + " ", first_id))
+
+    record_chunk = integrity._record_chunk
+    calls = {"n": 0}
+
+    def _flaky(*args, **kwargs):
+        if calls["n"] == 2:
+            raise _Interrupted
+        calls["n"] += 1
+        record_chunk(*args, **kwargs)
+
+    integrity._record_chunk = _flaky
+    try:
+        run_integrity_scan(full=True, workers=1, chunk_size=3)
+        raise AssertionError("FAIL: no se interrumpió")
+    except _Interrupted:
+        pass
+    finally:
+        integrity._record_chunk = record_chunk
+
+    running = get_last_integrity_scan()
+    if running["status"] != "RUNNING" or running["scanned"] != 6:
+        raise AssertionError(f"FAIL: checkpoint {running}")
+
+    try:
+        resumed = run_integrity_scan(full=True, workers=1, chunk_size=3)
+    finally:
+        with unit_of_work() as conn:
+            conn.execute("UPDATE cms1500_snapshots SET snapshot_json = ? WHERE id = ?", (first_json, first_id))
+        run_integrity_scan(workers=1)
+
+    if not resumed["resumed"] or resumed["scan_id"] != running["id"] or resumed["scanned"] != _total_snapshots():
+        raise AssertionError(f"FAIL: reanudación {resumed}")
+    if [f["snapshot_id"] for f in resumed["failures"]] != [first_id] or resumed["failure_count"] != 1:
+        raise AssertionError(f"FAIL: fallas previas a la interrupción {resumed['failures']}")
+    print(f"OK: interrumpido tras 2 lotes (id {running['last_id']}), retomado hasta {resumed['last_id']}")
+    print("OK: el escaneo retomado devuelve la falla registrada antes de la interrupción")
+
+    # =========================
+    # 4) Ledger
+    # =========================
+    if _events("snapshot_integrity_verified") != verified_before:
+        raise AssertionError("FAIL: eventos por snapshot")
+    if _events("snapshot_integrity_scan") - summaries_before != 8:
+        raise AssertionError("FAIL: un resumen por escaneo completo")
+    print("OK: un evento resumen por escaneo; ninguno por snapshot verificado")
+
+    print("SNAPSHOT INTEGRITY SCAN PASSED ✅")
+
+
+if __name__ == "__main__":
+    main()
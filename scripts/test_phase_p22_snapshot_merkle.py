@@ -0,0 +1,184 @@
+# scripts/test_phase_p22_snapshot_merkle.py
+# FASE P22 — Árbol Merkle sobre snapshots
+# Verifica que cada snapshot escrito agrega su hoja en la misma transacción,
+# que la raíz coincide con la definición RFC 6962, que las pruebas de
+# inclusión / consistencia verifican (y fallan ante alteraciones) y que
+# los checkpoints se firman.
+
+import sqlite3
+
+import app.db.snapshot_merkle as merkle
+from app.db import (
+    create_patient,
+    create_coverage,
+    create_claim,
+    create_service,
+    create_charge,
+    get_provider_settings,
+    update_claim_operational_status,
+)
+from app.db.connection import get_connection, unit_of_work
+from app.db.claim_submission import submit_claims
+from app.db.cms1500_snapshot import insert_snapshot_row
+from app.db.snapshot_merkle import (
+    backfill_snapshot_merkle,
+    create_merkle_checkpoint,
+    find_merkle_leaf_mismatches,
+    get_claim_version_proof,
+    get_merkle_root,
+    merkle_leaf_hash,
+    merkle_node_hash,
+    verify_checkpoint_signature,
+    verify_consistency,
+    verify_inclusion,
+    verify_merkle_checkpoints,
+)
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _reference_root(hashes: list[str]) -> str:
+    # MTH de RFC 6962 recalculado desde cero (solo para el test)
+    if len(hashes) == 1:
+        return merkle_leaf_hash(hashes[0])
+    k = 1 << ((len(hashes) - 1).bit_length() - 1)
+    return merkle_node_hash(_reference_root(hashes[:k]), _reference_root(hashes[k:]))
+
+
+def _store_hashes() -> list[str]:
+    with get_connection() as conn:
+        return [r[0] for r in conn.execute("SELECT snapshot_hash FROM cms1500_snapshots ORDER BY id")]
+
+
+def _counts() -> tuple[int, int]:
+    with get_connection() as conn:
+        leaves = conn.execute("SELECT COUNT(*) FROM snapshot_merkle_leaves").fetchone()[0]
+        nodes = conn.execute("SELECT COUNT(*) FROM snapshot_merkle_nodes").fetchone()[0]
+    return leaves, nodes
+
+
+def _submit(pid: int, cov: int, n: int) -> list[int]:
+    claim_ids = []
+    for _ in range(n):
+        claim_id = create_claim(pid, cov)
+        service_id = create_service(claim_id, "2026-10-01", "90834", 1, "F41.1", "P22")
+        create_charge(service_id, 100.0)
+        update_claim_operational_status(claim_id, "READY")
+        claim_ids.append(claim_id)
+    result = submit_claims(claim_ids, workers=1)
+    if result["failed"]:
+        raise AssertionError(f"FAIL: submit {result['failed']}")
+    return claim_ids
+
+
+def main():
+    print("=== TEST P22: SNAPSHOT MERKLE ===")
+
+    get_provider_settings()
+    pid = create_patient("Merkle", "Arbol", "1990-01-01")
+    cov = create_coverage(pid, "Test", "Plan", "P1", "G1", "I1", "2025-01-01", None)
+
+    # Árbol propio no vacío antes del primer checkpoint (la DB puede venir
+    # vacía); backfill por snapshots insertados por fuera de insert_snapshot_row
+    _submit(pid, cov, 3)
+    backfill_snapshot_merkle()
+    checkpoint_a = create_merkle_checkpoint()
+
+    claim_ids = _submit(pid, cov, 5)
+
+    # =========================
+    # 1) Hojas al escribir + raíz
+    # =========================
+    hashes = _store_hashes()
+    leaves, nodes = _counts()
+    if leaves != len(hashes):
+        raise AssertionError(f"FAIL: hojas {leaves} != snapshots {len(hashes)}")
+    # Solo subárboles completos: 2n - popcount(n) nodos
+    if nodes != 2 * leaves - bin(leaves).count("1"):
+        raise AssertionError(f"FAIL: nodos {nodes} para {leaves} hojas")
+
+    root = get_merkle_root()
+    if root["root_hash"] != _reference_root(hashes):
+        raise AssertionError("FAIL: raíz distinta de RFC 6962")
+    print(f"OK: {leaves} hojas / {nodes} nodos; raíz = MTH recalculado")
+
+    # Rollback del snapshot deshace su hoja
+    try:
+        with unit_of_work() as conn:
+            insert_snapshot_row(conn.cursor(), claim_ids[0], 99, "{}", "f" * 64, {})
+            if _counts()[0] != leaves + 1:
+                raise AssertionError("FAIL: hoja no agregada en la transacción")
+            raise _Rollback
+    except _Rollback:
+        pass
+    if _counts() != (leaves, nodes):
+        raise AssertionError("FAIL: rollback dejó hojas/nodos")
+    print("OK: hoja en la misma transacción del snapshot (rollback la deshace)")
+
+    # =========================
+    # 2) Prueba de inclusión (versión de un claim)
+    # =========================
+    proof = get_claim_version_proof(claim_ids[2], 1)
+    if len(proof["proof"]) > leaves.bit_length():
+        raise AssertionError(f"FAIL: prueba de {len(proof['proof'])} hashes")
+    args = (proof["leaf_index"], proof["tree_size"], proof["proof"], proof["root_hash"])
+    if not verify_inclusion(proof["snapshot_hash"], *args):
+        raise AssertionError("FAIL: inclusión no verifica")
+    if verify_inclusion("0" * 64, *args):
+        raise AssertionError("FAIL: inclusión acepta hash alterado")
+    print(f"OK: inclusión claim {claim_ids[2]} v1 con {len(proof['proof'])} hashes")
+
+    # =========================
+    # 3) Consistencia entre checkpoints + firma
+    # =========================
+    merkle.MERKLE_SIGNING_KEY = "p22-test-key"
+    try:
+        checkpoint_b = create_merkle_checkpoint()
+        if verify_checkpoint_signature(checkpoint_b) is not True:
+            raise AssertionError("FAIL: firma")
+        if verify_checkpoint_signature({**checkpoint_b, "root_hash": "0" * 64}) is not False:
+            raise AssertionError("FAIL: firma acepta raíz alterada")
+    finally:
+        merkle.MERKLE_SIGNING_KEY = ""
+
+    check = verify_merkle_checkpoints(checkpoint_a["id"], checkpoint_b["id"])
+    if not check["consistent"] or checkpoint_b["tree_size"] - checkpoint_a["tree_size"] != 5:
+        raise AssertionError(f"FAIL: consistencia {check}")
+    if verify_consistency(
+        checkpoint_a["tree_size"], checkpoint_b["tree_size"], "0" * 64, checkpoint_b["root_hash"], check["proof"]
+    ):
+        raise AssertionError("FAIL: consistencia acepta raíz vieja alterada")
+    if verify_consistency(0, checkpoint_b["tree_size"], "0" * 64, checkpoint_b["root_hash"], []):
+        raise AssertionError("FAIL: consistencia acepta árbol vacío con raíz alterada")
+    print(f"OK: checkpoint {checkpoint_a['tree_size']} → {checkpoint_b['tree_size']} consistente; firma HMAC")
+
+    # =========================
+    # 4) Alteraciones
+    # =========================
+    target = proof["snapshot_id"]
+    try:
+        with unit_of_work() as conn:
+            conn.execute("UPDATE cms1500_snapshots SET snapshot_hash = ? WHERE id = ?", ("e" * 64, target))
+            if [m["snapshot_id"] for m in find_merkle_leaf_mismatches()] != [target]:
+                raise AssertionError("FAIL: hash alterado no detectado")
+            raise _Rollback
+    except _Rollback:
+        pass
+    if find_merkle_leaf_mismatches():
+        raise AssertionError("FAIL: mismatches tras rollback")
+
+    try:
+        with unit_of_work() as conn:
+            conn.execute("UPDATE snapshot_merkle_nodes SET hash = ? WHERE level = 0 AND idx = 0", ("0" * 64,))
+        raise AssertionError("FAIL: nodo modificable")
+    except sqlite3.IntegrityError:
+        pass
+    print("OK: snapshot_hash alterado detectado; tablas Merkle append-only")
+
+    print("SNAPSHOT MERKLE PASSED ✅")
+
+
+if __name__ == "__main__":
+    main()
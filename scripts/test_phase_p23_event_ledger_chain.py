@@ -0,0 +1,218 @@
+# scripts/test_phase_p23_event_ledger_chain.py
+# FASE P23 — Event ledger encadenado por hash
+# Verifica que cada evento extiende la cadena en su transacción, que la
+# verificación incremental parte del último checkpoint confiable y que
+# ediciones, borrados y truncamientos se detectan. Las alteraciones se
+# hacen dentro de una transacción que se descarta.
+
+import sqlite3
+
+import app.db.event_ledger as ledger
+from app.db.connection import get_connection, unit_of_work
+from app.db.event_ledger import (
+    LEDGER_GENESIS_HASH,
+    create_ledger_checkpoint,
+    ledger_row_hash,
+    log_event,
+    rechain_event_ledger,
+    verify_checkpoint_signature,
+    verify_event_ledger,
+)
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _tail(n: int) -> list[dict]:
+    with get_connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT id, entity_type, entity_id, event_type, event_data, created_at, prev_hash, row_hash
+            FROM event_ledger
+            ORDER BY id DESC
+            LIMIT ?
+            """,
+            (n,),
+        ).fetchall()
+    return [dict(r) for r in reversed(rows)]
+
+
+def _log(n: int) -> list[int]:
+    for i in range(n):
+        log_event("claim", 0, "p23_test_event", {"i": i})
+    return [e["id"] for e in _tail(n)]
+
+
+def _tampered(statements: list[tuple]) -> dict:
+    """
+    Aplica cambios "a mano" (sin triggers, como con el archivo de la DB),
+    verifica y descarta todo.
+    """
+    result = {}
+    try:
+        with unit_of_work() as conn:
+            conn.execute("DROP TRIGGER trg_event_ledger_no_delete")
+            conn.execute("DROP TRIGGER trg_event_ledger_chained_no_update")
+            for sql, params in statements:
+                conn.execute(sql, params)
+            result.update(verify_event_ledger())
+            raise _Rollback
+    except _Rollback:
+        pass
+    return result
+
+
+def main():
+    print("=== TEST P23: EVENT LEDGER CHAIN ===")
+
+    rechain_event_ledger()
+    verify_event_ledger(full=True)
+
+    # =========================
+    # 1) Cadena al escribir
+    # =========================
+    _log(4)
+    events = _tail(5)
+    for prev, e in zip(events, events[1:]):
+        if e["prev_hash"] != prev["row_hash"]:
+            raise AssertionError(f"FAIL: prev_hash evento {e['id']}")
+        expected = ledger_row_hash(
+            e["prev_hash"], e["entity_type"], e["entity_id"], e["event_type"], e["event_data"], e["created_at"]
+        )
+        if e["row_hash"] != expected:
+            raise AssertionError(f"FAIL: row_hash evento {e['id']}")
+    if len(LEDGER_GENESIS_HASH) != 64:
+        raise AssertionError("FAIL: génesis")
+    print("OK: cada evento encadena prev_hash → row_hash")
+
+    head = _tail(1)[0]
+    try:
+        with unit_of_work():
+            log_event("claim", 0, "p23_test_event", {"rollback": True})
+            raise _Rollback
+    except _Rollback:
+        pass
+    if _tail(1)[0]["id"] != head["id"]:
+        raise AssertionError("FAIL: rollback dejó evento")
+    print("OK: evento y cabeza se descartan con la transacción")
+
+    # =========================
+    # 2) Verificación incremental
+    # =========================
+    first = verify_event_ledger()
+    _log(3)
+    second = verify_event_ledger()
+    if not second["ok"] or second["full"] or second["from_event_id"] != first["to_event_id"] or second["checked"] != 3:
+        raise AssertionError(f"FAIL: incremental {second}")
+    print(f"OK: verificación desde el checkpoint {first['to_event_id']} → {second['checked']} eventos")
+
+    # =========================
+    # 3) Alteraciones
+    # =========================
+    ids = _log(3)
+
+    try:
+        with unit_of_work() as conn:
+            conn.execute("UPDATE event_ledger SET event_data = '{}' WHERE id = ?", (ids[0],))
+        raise AssertionError("FAIL: UPDATE permitido")
+    except sqlite3.IntegrityError:
+        pass
+
+    edited = _tampered([("UPDATE event_ledger SET event_data = '{\"i\": 99}' WHERE id = ?", (ids[1],))])
+    if edited["ok"] or edited["errors"][0]["event_id"] != ids[1]:
+        raise AssertionError(f"FAIL: edición {edited}")
+
+    deleted = _tampered([("DELETE FROM event_ledger WHERE id = ?", (ids[1],))])
+    if deleted["ok"] or deleted["errors"][0]["event_id"] != ids[2]:
+        raise AssertionError(f"FAIL: borrado {deleted}")
+
+    checkpoint = create_ledger_checkpoint()
+    truncated = _tampered([("DELETE FROM event_ledger WHERE id = ?", (checkpoint["event_id"],))])
+    if truncated["ok"] or truncated["errors"][-1]["event_id"] != checkpoint["event_id"]:
+        raise AssertionError(f"FAIL: truncado {truncated}")
+    print("OK: edición, borrado en el medio y truncado de la cola detectados")
+
+    # =========================
+    # 4) Re-chain de eventos sin hash
+    # =========================
+    original = {e["id"]: e["row_hash"] for e in _tail(3)}
+    try:
+        with unit_of_work() as conn:
+            conn.execute("DROP TRIGGER trg_event_ledger_chained_no_update")
+            conn.execute(
+                f"UPDATE event_ledger SET prev_hash = NULL, row_hash = NULL WHERE id IN ({','.join('?' * 3)})",
+                tuple(original),
+            )
+            if verify_event_ledger()["ok"]:
+                raise AssertionError("FAIL: eventos sin encadenar aceptados")
+            if rechain_event_ledger(batch_size=2) != 3:
+                raise AssertionError("FAIL: rechain")
+            if {e["id"]: e["row_hash"] for e in _tail(3)} != original:
+                raise AssertionError("FAIL: rechain distinto del original")
+            raise _Rollback
+    except _Rollback:
+        pass
+    print("OK: rechain reconstruye los mismos hashes, por lotes")
+
+    # Backlog mayor que el límite por escritura: el evento nuevo no encadena
+    # todo el ledger; queda sin hash detrás del backlog hasta el rechain
+    backlog = [e["id"] for e in _tail(5)]
+    inline_limit = ledger.LEDGER_INLINE_CHAIN_LIMIT
+    ledger.LEDGER_INLINE_CHAIN_LIMIT = 2
+    try:
+        with unit_of_work() as conn:
+            conn.execute("DROP TRIGGER trg_event_ledger_chained_no_update")
+            conn.execute(
+                f"UPDATE event_ledger SET prev_hash = NULL, row_hash = NULL WHERE id IN ({','.join('?' * 5)})",
+                tuple(backlog),
+            )
+            log_event("claim", 0, "p23_test_event", {"i": "backlog"})
+            tail = _tail(6)
+            if [e["row_hash"] is not None for e in tail] != [True, True, False, False, False, False]:
+                raise AssertionError(f"FAIL: encadenado en la escritura {[e['row_hash'] for e in tail]}")
+            if rechain_event_ledger(batch_size=2) != 4 or not verify_event_ledger()["ok"]:
+                raise AssertionError("FAIL: rechain del backlog")
+            raise _Rollback
+    except _Rollback:
+        pass
+    finally:
+        ledger.LEDGER_INLINE_CHAIN_LIMIT = inline_limit
+    print("OK: cada escritura encadena a lo sumo LEDGER_INLINE_CHAIN_LIMIT eventos del backlog")
+
+    # =========================
+    # 5) Checkpoints periódicos y firmados
+    # =========================
+    ledger.LEDGER_CHECKPOINT_EVERY = 1
+    ledger.LEDGER_SIGNING_KEY = "p23-test-key"
+    try:
+        _log(1)
+        with get_connection() as conn:
+            cp = dict(conn.execute("SELECT * FROM event_ledger_checkpoints ORDER BY id DESC LIMIT 1").fetchone())
+        if cp["event_id"] != _tail(1)[0]["id"] or cp["verified"] != 0:
+            raise AssertionError(f"FAIL: checkpoint periódico {cp}")
+
+        signed = verify_event_ledger()
+        with get_connection() as conn:
+            cp = dict(
+                conn.execute("SELECT * FROM event_ledger_checkpoints WHERE id = ?", (signed["checkpoint_id"],)).fetchone()
+            )
+        if verify_checkpoint_signature(cp) is not True:
+            raise AssertionError("FAIL: firma")
+        if verify_checkpoint_signature({**cp, "row_hash": "0" * 64}) is not False:
+            raise AssertionError("FAIL: firma acepta hash alterado")
+
+        _log(2)
+        again = verify_event_ledger()
+        if again["from_event_id"] != cp["event_id"] or again["checked"] != 2:
+            raise AssertionError(f"FAIL: ancla firmada {again}")
+    finally:
+        ledger.LEDGER_CHECKPOINT_EVERY = 1000
+        ledger.LEDGER_SIGNING_KEY = ""
+    print("OK: checkpoint periódico en la cabeza; checkpoint verificado firmado y usado como ancla")
+
+    print("EVENT LEDGER CHAIN PASSED ✅")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# scripts/test_phase_p24_ledger_buffer.py
+# FASE P24 — Eventos en la transacción del caller + buffer de lecturas
+# Verifica que los eventos de escritura se confirman / descartan con la
+# transacción que auditan, que los de lectura no escriben en la transacción
+# del request (buffer por tamaño o tiempo, executemany) y que un flush
+# fallido no pierde eventos.
+
+import time
+import uuid
+
+import app.db.event_ledger as ledger
+from app.db import (
+    create_patient,
+    create_coverage,
+    create_claim,
+    create_service,
+    create_charge,
+    get_provider_settings,
+    update_claim_operational_status,
+)
+from app.db.connection import discard_request_connection, get_connection, unit_of_work
+from app.db.claim_submission import submit_claims
+from app.db.cms1500_snapshot import verify_snapshot_integrity
+from app.db.event_ledger import (
+    LedgerBuffer,
+    flush_ledger_buffer,
+    get_ledger_buffer,
+    ledger_event,
+    log_read_event,
+    verify_event_ledger,
+)
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _count(event_type: str) -> int:
+    with get_connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM event_ledger WHERE event_type = ?", (event_type,)).fetchone()[0]
+
+
+def _wait_for(event_type: str, expected: int, timeout: float = 5.0) -> float:
+    start = time.monotonic()
+    while _count(event_type) != expected:
+        if time.monotonic() - start > timeout:
+            raise AssertionError(f"FAIL: {event_type} = {_count(event_type)}, esperado {expected}")
+        time.sleep(0.02)
+    return time.monotonic() - start
+
+
+def main():
+    print("=== TEST P24: LEDGER BUFFER ===")
+
+    # Tipos de evento propios de esta corrida (el test se puede repetir)
+    size_event, time_event, retry_event = (f"p24_{k}_{uuid.uuid4().hex[:8]}" for k in ("size", "time", "retry"))
+
+    get_provider_settings()
+    pid = create_patient("Ledger", "Buffer", "1990-01-01")
+    cov = create_coverage(pid, "Test", "Plan", "P1", "G1", "I1", "2025-01-01", None)
+    claim_id = create_claim(pid, cov)
+    service_id = create_service(claim_id, "2026-10-01", "90834", 1, "F41.1", "P24")
+    create_charge(service_id, 100.0)
+
+    # =========================
+    # 1) Escrituras: misma transacción del cambio
+    # =========================
+    before = _count("operational_transition")
+    try:
+        with unit_of_work():
+            update_claim_operational_status(claim_id, "READY")
+            if _count("operational_transition") != before + 2:
+                raise AssertionError("FAIL: eventos fuera de la transacción")
+            raise _Rollback
+    except _Rollback:
+        pass
+    if _count("operational_transition") != before:
+        raise AssertionError("FAIL: rollback dejó eventos")
+
+    update_claim_operational_status(claim_id, "READY")
+    submitted_before = _count("snapshot_created")
+    if submit_claims([claim_id], workers=1)["failed"] or _count("snapshot_created") != submitted_before + 1:
+        raise AssertionError("FAIL: eventos del envío")
+    print("OK: transición / envío escriben sus eventos en la transacción del caller")
+
+    # =========================
+    # 2) Lecturas: buffer fuera de la transacción
+    # =========================
+    flush_ledger_buffer()
+    exported = _count("p24_read_event")
+    log_read_event("claim", claim_id, "p24_read_event", {"i": 0})
+    if get_ledger_buffer().pending() != 1 or _count("p24_read_event") != exported:
+        raise AssertionError("FAIL: evento de lectura escrito sin buffer")
+    if flush_ledger_buffer() != 1 or _count("p24_read_event") != exported + 1:
+        raise AssertionError("FAIL: flush")
+
+    # Con una transacción de escritura abierta, va en ella
+    try:
+        with unit_of_work():
+            log_read_event("claim", claim_id, "p24_read_event", {"i": 1})
+            if get_ledger_buffer().pending() or _count("p24_read_event") != exported + 2:
+                raise AssertionError("FAIL: evento fuera de la transacción de escritura")
+            raise _Rollback
+    except _Rollback:
+        pass
+    if _count("p24_read_event") != exported + 1:
+        raise AssertionError("FAIL: rollback dejó evento de lectura")
+    print("OK: lectura → buffer; dentro de una escritura → su transacción")
+
+    # GET (transacción de lectura): el request no escribe el evento
+    from app.main import app
+
+    app.testing = True
+    with get_connection() as conn:
+        snapshot_id = conn.execute(
+            "SELECT id FROM cms1500_snapshots WHERE claim_id = ? ORDER BY id DESC LIMIT 1", (claim_id,)
+        ).fetchone()[0]
+    verified = _count("snapshot_integrity_verified")
+    with app.test_request_context(f"/admin/snapshots/{snapshot_id}/verify", method="GET"):
+        request_conn = get_connection()
+        changes = request_conn.total_changes
+        if not verify_snapshot_integrity(snapshot_id)["match"]:
+            raise AssertionError("FAIL: integridad")
+        if request_conn.write or request_conn.total_changes != changes:
+            raise AssertionError("FAIL: el GET escribió en su transacción")
+        discard_request_connection()
+    flush_ledger_buffer()
+    if _count("snapshot_integrity_verified") != verified + 1:
+        raise AssertionError("FAIL: evento de verificación")
+    print("OK: verificación en GET → evento por el buffer, no en la transacción del request")
+
+    # =========================
+    # 3) Umbrales de tamaño y de tiempo
+    # =========================
+    by_size = LedgerBuffer(max_events=5, flush_s=60)
+    try:
+        by_size.add([ledger_event("claim", claim_id, size_event, {"i": i}) for i in range(4)])
+        time.sleep(0.2)
+        if _count(size_event):
+            raise AssertionError("FAIL: flush antes del tamaño")
+        by_size.add([ledger_event("claim", claim_id, size_event, {"i": 4})])
+        _wait_for(size_event, 5)
+        if by_size.stats["flushes"] != 1:
+            raise AssertionError(f"FAIL: {by_size.stats}")
+    finally:
+        by_size.shutdown()
+
+    by_time = LedgerBuffer(max_events=1000, flush_s=0.3)
+    try:
+        by_time.add([ledger_event("claim", claim_id, time_event)])
+        elapsed = _wait_for(time_event, 1)
+        if elapsed < 0.2:
+            raise AssertionError(f"FAIL: flush a los {elapsed:.2f}s")
+    finally:
+        by_time.shutdown()
+    print(f"OK: flush por tamaño (5 eventos, 1 transacción) y por tiempo ({elapsed:.2f}s)")
+
+    # =========================
+    # 4) Falla de escritura + apagado
+    # =========================
+    insert_events = ledger._insert_events
+    calls = {"n": 0}
+
+    def _flaky(cur, events):
+        calls["n"] += 1
+        if calls["n"] == 1:
+            raise RuntimeError("disco lleno")
+        insert_events(cur, events)
+
+    buffer = LedgerBuffer(max_events=1000, flush_s=60)
+    ledger._insert_events = _flaky
+    try:
+        buffer.add([ledger_event("claim", claim_id, retry_event, {"i": i}) for i in range(3)])
+        try:
+            buffer.flush()
+            raise AssertionError("FAIL: flush no falló")
+        except RuntimeError:
+            pass
+        if buffer.pending() != 3 or buffer.stats["failures"] != 1:
+            raise AssertionError("FAIL: lote perdido tras la falla")
+        buffer.add([ledger_event("claim", claim_id, retry_event, {"i": 3})])
+    finally:
+        buffer.shutdown()
+        ledger._insert_events = insert_events
+
+    with get_connection() as conn:
+        order = [
+            r[0]
+            for r in conn.execute(
+                "SELECT json_extract(event_data, '$.i') FROM event_ledger WHERE event_type = ? ORDER BY id",
+                (retry_event,),
+            )
+        ]
+    if order != [0, 1, 2, 3]:
+        raise AssertionError(f"FAIL: orden {order}")
+
+    buffer.add([ledger_event("claim", claim_id, retry_event, {"i": 4})])
+    if _count(retry_event) != 5:
+        raise AssertionError("FAIL: escritura directa tras el apagado")
+    print("OK: lote fallido reintentado en orden; shutdown vacía el buffer")
+
+    if not verify_event_ledger()["ok"]:
+        raise AssertionError("FAIL: cadena del ledger")
+    print("OK: cadena del ledger intacta")
+
+    print("LEDGER BUFFER PASSED ✅")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# scripts/test_phase_p25_coalesced_read_events.py
+# FASE P25 — Eventos de lectura agrupados
+# Verifica que la primera vista de un snapshot (verificación, PDF) se
+# escribe sin esperar la ventana, que las repeticiones quedan en UNA fila con
+# count / first_seen / last_seen, que la ventana vence y abre otra, y que
+# los eventos de escritura y los exports por lote siguen siendo exactos.
+
+import json
+import time
+
+from app.db import (
+    create_patient,
+    create_coverage,
+    create_claim,
+    create_service,
+    create_charge,
+    get_provider_settings,
+    update_claim_operational_status,
+)
+from app.db.connection import get_connection, unit_of_work
+from app.db.claim_submission import submit_claims
+from app.db.cms1500_snapshot import verify_snapshot_integrity
+from app.db.event_ledger import (
+    LedgerBuffer,
+    flush_ledger_buffer,
+    get_ledger_buffer,
+    ledger_event,
+    log_read_event,
+    log_read_events,
+    verify_event_ledger,
+)
+
+
+def _events(claim_id: int, event_type: str) -> list[dict]:
+    with get_connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT event_data, created_at
+            FROM event_ledger
+            WHERE entity_type = 'claim' AND entity_id = ? AND event_type = ?
+            ORDER BY id
+            """,
+            (claim_id, event_type),
+        ).fetchall()
+    return [{**json.loads(r["event_data"] or "{}"), "created_at": r["created_at"]} for r in rows]
+
+
+def _submitted(pid: int, cov: int) -> tuple[int, int, str]:
+    claim_id = create_claim(pid, cov)
+    service_id = create_service(claim_id, "2026-10-01", "90834", 1, "F41.1", "P25")
+    create_charge(service_id, 100.0)
+    update_claim_operational_status(claim_id, "READY")
+    result = submit_claims([claim_id], workers=1)
+    if result["failed"]:
+        raise AssertionError(f"FAIL: submit {result['failed']}")
+    with get_connection() as conn:
+        row = conn.execute("SELECT id, snapshot_hash FROM cms1500_snapshots WHERE claim_id = ?", (claim_id,)).fetchone()
+    return claim_id, row["id"], row["snapshot_hash"]
+
+
+def main():
+    print("=== TEST P25: COALESCED READ EVENTS ===")
+
+    get_provider_settings()
+    pid = create_patient("Lecturas", "Agrupadas", "1990-01-01")
+    cov = create_coverage(pid, "Test", "Plan", "P1", "G1", "I1", "2025-01-01", None)
+    claim_id, snapshot_id, snapshot_hash = _submitted(pid, cov)
+    flush_ledger_buffer()
+
+    # =========================
+    # 1) Vistas repetidas → primera vista + una fila de repeticiones
+    # =========================
+    for _ in range(3):
+        verify_snapshot_integrity(snapshot_id)
+    for _ in range(2):
+        log_read_event("claim", claim_id, "snapshot_pdf_exported", {"snapshot_hash": snapshot_hash})
+    if get_ledger_buffer().pending() != 4:
+        raise AssertionError(f"FAIL: pendientes {get_ledger_buffer().pending()}")
+    if flush_ledger_buffer() != 4:
+        raise AssertionError("FAIL: flush")
+
+    verified = _events(claim_id, "snapshot_integrity_verified")
+    exported = _events(claim_id, "snapshot_pdf_exported")
+    if [e.get("count") for e in verified] != [None, 2] or any(e["hash"] != snapshot_hash for e in verified):
+        raise AssertionError(f"FAIL: verificaciones {verified}")
+    if [e.get("count") for e in exported] != [None, 1]:
+        raise AssertionError(f"FAIL: exports {exported}")
+    v = verified[1]
+    if not v["first_seen"] <= v["last_seen"] == v["created_at"]:
+        raise AssertionError(f"FAIL: first_seen / last_seen {v}")
+    print("OK: 3 verificaciones → 1 fila + 1 fila (count 2); 2 PDFs → 1 fila + 1 fila (count 1)")
+
+    # Otro hash (otra versión) no se mezcla
+    other_id, other_snapshot, other_hash = _submitted(pid, cov)
+    verify_snapshot_integrity(snapshot_id)
+    verify_snapshot_integrity(other_snapshot)
+    flush_ledger_buffer()
+    if len(_events(claim_id, "snapshot_integrity_verified")) != 3 or len(_events(other_id, "snapshot_integrity_verified")) != 1:
+        raise AssertionError("FAIL: agrupó snapshots distintos")
+    print("OK: la clave es (entidad, tipo, hash)")
+
+    # =========================
+    # 2) Ventana
+    # =========================
+    buffer = LedgerBuffer(max_events=1000, flush_s=0.05, coalesce_s=0.5)
+    key = ("claim", claim_id, "snapshot_pdf_exported", "p25-window")
+
+    def _window_rows() -> list:
+        return [e.get("count", 1) for e in _events(claim_id, "snapshot_pdf_exported") if e["snapshot_hash"] == "p25-window"]
+
+    def _wait_rows(n: int) -> float:
+        start = time.monotonic()
+        while len(_window_rows()) < n:
+            if time.monotonic() - start > 5:
+                raise AssertionError(f"FAIL: ventana {_window_rows()}")
+            time.sleep(0.02)
+        return time.monotonic() - start
+
+    try:
+        started = time.monotonic()
+        for _ in range(4):
+            buffer.coalesce(ledger_event("claim", claim_id, "snapshot_pdf_exported", {"snapshot_hash": "p25-window"}), key)
+        _wait_rows(1)
+        if time.monotonic() - started >= 0.5 or _window_rows() != [1]:
+            raise AssertionError(f"FAIL: la primera vista esperó la ventana {_window_rows()}")
+        _wait_rows(2)
+
+        buffer.coalesce(ledger_event("claim", claim_id, "snapshot_pdf_exported", {"snapshot_hash": "p25-window"}), key)
+    finally:
+        buffer.shutdown()
+    if _window_rows() != [1, 3, 1]:
+        raise AssertionError(f"FAIL: ventana {_window_rows()}")
+    print("OK: la primera vista se escribe con el flush; al vencer la ventana, las repeticiones; la siguiente abre otra")
+
+    # =========================
+    # 3) Eventos exactos
+    # =========================
+    before = len(_events(claim_id, "snapshot_pdf_exported"))
+    batch = [ledger_event("claim", claim_id, "snapshot_pdf_exported", {"snapshot_hash": snapshot_hash, "batch_id": "p25"})]
+    log_read_events(batch * 2, wait=True)
+    with unit_of_work():
+        log_read_event("claim", claim_id, "snapshot_pdf_exported", {"snapshot_hash": snapshot_hash})
+        log_read_event("claim", claim_id, "snapshot_pdf_exported", {"snapshot_hash": snapshot_hash})
+    after = _events(claim_id, "snapshot_pdf_exported")[before:]
+    if len(after) != 4 or any("count" in e for e in after):
+        raise AssertionError(f"FAIL: exports exactos {after}")
+
+    transitions = _events(claim_id, "claim_status_transition")
+    if len(transitions) != 1 or "count" in transitions[0]:
+        raise AssertionError(f"FAIL: transiciones {transitions}")
+
+    exact = LedgerBuffer(max_events=1000, flush_s=60, coalesce_s=0)
+    for _ in range(2):
+        exact.coalesce(ledger_event("claim", claim_id, "snapshot_pdf_exported", {"snapshot_hash": "p25-exact"}), key)
+    if exact.pending() != 2:
+        raise AssertionError("FAIL: ventana 0 agrupa")
+    exact.shutdown()
+    print("OK: lotes, eventos dentro de una escritura, transiciones y ventana 0 → exactos")
+
+    if not verify_event_ledger()["ok"]:
+        raise AssertionError("FAIL: cadena del ledger")
+    print("OK: cadena del ledger intacta")
+
+    print("COALESCED READ EVENTS PASSED ✅")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# scripts/test_phase_p2_request_scope.py
+# FASE P2 — Conexión compartida por request / unidad de trabajo
+# Verifica que un request escribe todo o nada: commit con respuesta < 400,
+# rollback con 4xx / 5xx / excepción; que un GET no abre transacción de
+# escritura; que un SAVEPOINT fallido deshace solo su parte (también sus
+# callbacks after_commit); y que el intento bloqueado por congelación queda
+# auditado aunque el request responda 400.
+
+import uuid
+
+from flask import Flask
+
+from app.db import (
+    create_patient,
+    create_coverage,
+    create_claim,
+    create_service,
+    create_charge,
+    get_provider_settings,
+    update_claim_operational_status,
+)
+from app.db.connection import after_commit, get_connection, init_app, unit_of_work
+from app.db.claim_submission import submit_claims
+from app.db.event_ledger import flush_ledger_buffer
+
+
+def _patients(marker: str) -> int:
+    with get_connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM patients WHERE first_name = ?", (marker,)).fetchone()[0]
+
+
+def _freeze_events(claim_id: int) -> int:
+    with get_connection() as conn:
+        return conn.execute(
+            """
+            SELECT COUNT(*) FROM event_ledger
+            WHERE entity_type = 'claim' AND entity_id = ? AND event_type = 'freeze_blocked_transition'
+            """,
+            (claim_id,),
+        ).fetchone()[0]
+
+
+_committed = []
+
+
+def _app() -> Flask:
+    app = Flask(__name__)
+    # Sin testing: una excepción del route responde 500 en vez de propagarse
+    app.testing = False
+    init_app(app)
+
+    @app.route("/p2/<marker>/<int:status>", methods=["POST"])
+    def _two_writes(marker: str, status: int):
+        create_patient(marker, "Uno", "1990-01-01")
+        create_patient(marker, "Dos", "1990-01-01")
+        if status == 500:
+            raise RuntimeError("falla a mitad del request")
+        return "ok", status
+
+    @app.route("/p2/savepoint/<marker>/<int:status>", methods=["POST"])
+    def _savepoint(marker: str, status: int):
+        create_patient(marker, "Queda", "1990-01-01")
+        after_commit(lambda: _committed.append((marker, "queda")))
+        try:
+            with unit_of_work():
+                create_patient(marker, "Se descarta", "1990-01-01")
+                after_commit(lambda: _committed.append((marker, "se descarta")))
+                raise ValueError("paso fallido")
+        except ValueError:
+            pass
+        if _committed:
+            raise RuntimeError("after_commit antes del commit")
+        return "ok", status
+
+    @app.route("/p2/read", methods=["GET"])
+    def _read():
+        return "write" if get_connection().write else "read", 200
+
+    @app.route("/p2/transition/<int:claim_id>", methods=["POST"])
+    def _transition(claim_id: int):
+        try:
+            update_claim_operational_status(claim_id, "DRAFT")
+        except ValueError as e:
+            return str(e), 400
+        return "ok", 200
+
+    return app
+
+
+def main():
+    print("=== TEST P2: REQUEST SCOPE ===")
+
+    client = _app().test_client()
+
+    # =========================
+    # 1) Todo o nada por respuesta
+    # =========================
+    for status, expected in ((200, 2), (302, 2), (400, 0), (409, 0), (500, 0)):
+        marker = f"P2-{uuid.uuid4().hex[:8]}"
+        r = client.post(f"/p2/{marker}/{status}")
+        if r.status_code != status:
+            raise AssertionError(f"FAIL: status {r.status_code} != {status}")
+        if _patients(marker) != expected:
+            raise AssertionError(f"FAIL: respuesta {status} dejó {_patients(marker)} filas (esperado {expected})")
+    print("OK: < 400 confirma las dos escrituras; 4xx / 5xx no deja ninguna")
+
+    # =========================
+    # 2) SAVEPOINT + GET
+    # =========================
+    marker = f"P2-{uuid.uuid4().hex[:8]}"
+    client.post(f"/p2/savepoint/{marker}/200")
+    if _patients(marker) != 1:
+        raise AssertionError("FAIL: el SAVEPOINT fallido deshizo más (o menos) que su parte")
+    if _committed != [(marker, "queda")]:
+        raise AssertionError(f"FAIL: after_commit {_committed}")
+    _committed.clear()
+    client.post(f"/p2/savepoint/{marker}/400")
+    if _committed:
+        raise AssertionError(f"FAIL: after_commit con rollback {_committed}")
+    if client.get("/p2/read").data != b"read":
+        raise AssertionError("FAIL: GET con transacción de escritura")
+    print("OK: SAVEPOINT fallido deshace solo su parte (y sus after_commit); GET en transacción de lectura")
+
+    # =========================
+    # 3) Intento bloqueado auditado aunque el request haga rollback
+    # =========================
+    get_provider_settings()
+    pid = create_patient("Scope", "Request", "1990-01-01")
+    cov = create_coverage(pid, "Test", "Plan", "P1", "G1", "I1", "2025-01-01", None)
+    claim_id = create_claim(pid, cov)
+    service_id = create_service(claim_id, "2026-10-01", "90834", 1, "F41.1", "P2")
+    create_charge(service_id, 100.0)
+    update_claim_operational_status(claim_id, "READY")
+    if submit_claims([claim_id], workers=1)["failed"]:
+        raise AssertionError("FAIL: submit")
+
+    if client.post(f"/p2/transition/{claim_id}").status_code != 400:
+        raise AssertionError("FAIL: transición de claim congelado aceptada")
+    flush_ledger_buffer()
+    if _freeze_events(claim_id) != 1:
+        raise AssertionError("FAIL: freeze_blocked_transition perdido con el rollback")
+    print("OK: freeze_blocked_transition queda aunque el request responda 400")
+
+    print("REQUEST SCOPE PASSED ✅")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# scripts/test_phase_p3_bulk_financial_status.py
+# FASE P3 — Estado financiero set-based
+# Verifica que get_claims_financial_status coincide con el cálculo por claim.
+# Solo lectura. No muta datos.
+
+from app.db.connection import get_connection
+from app.db.claims import get_claims_financial_status
+
+
+def _round2(x: float) -> float:
+    return float(round(float(x), 2))
+
+
+def _single_claim_totals(cur, claim_id: int) -> dict:
+    cur.execute(
+        """
+        SELECT COALESCE(SUM(c.amount), 0)
+        FROM charges c
+        JOIN services s ON s.id = c.service_id
+        WHERE s.claim_id = ?
+        """,
+        (claim_id,),
+    )
+    total_charge = float(cur.fetchone()[0])
+
+    cur.execute(
+        """
+        SELECT COALESCE(SUM(a.amount_applied), 0)
+        FROM applications a
+        JOIN charges c ON c.id = a.charge_id
+        JOIN services s ON s.id = c.service_id
+        WHERE s.claim_id = ?
+        """,
+        (claim_id,),
+    )
+    total_applied = float(cur.fetchone()[0])
+
+    cur.execute(
+        """
+        SELECT COALESCE(SUM(ad.amount), 0)
+        FROM adjustments ad
+        JOIN charges c ON c.id = ad.charge_id
+        JOIN services s ON s.id = c.service_id
+        WHERE s.claim_id = ?
+        """,
+        (claim_id,),
+    )
+    total_adjustments = float(cur.fetchone()[0])
+
+    cur.execute("SELECT 1 FROM cms1500_snapshots WHERE claim_id = ? LIMIT 1", (claim_id,))
+    locked = cur.fetchone() is not None
+
+    return {
+        "total_charge": total_charge,
+        "total_applied": total_applied,
+        "total_adjustments": total_adjustments,
+        "balance_due": total_charge - total_applied - total_adjustments,
+        "locked": locked,
+    }
+
+
+def main():
+    print("=== TEST P3: BULK FINANCIAL STATUS ===")
+
+    bulk = get_claims_financial_status()
+
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id FROM claims ORDER BY id")
+        claim_ids = [r["id"] for r in cur.fetchall()]
+
+        if sorted(bulk.keys()) != claim_ids:
+            raise ValueError("FAIL: bulk no devuelve todos los claims")
+
+        for claim_id in claim_ids:
+            expected = _single_claim_totals(cur, claim_id)
+            got = bulk[claim_id]
+
+            for key in ("total_charge", "total_applied", "total_adjustments", "balance_due"):
+                if _round2(expected[key]) != _round2(got[key]):
+                    raise ValueError(f"FAIL: claim {claim_id} {key} esperado={expected[key]} bulk={got[key]}")
+
+            if expected["locked"] != got["locked"]:
+                raise ValueError(f"FAIL: claim {claim_id} locked esperado={expected['locked']}")
+
+    subset = claim_ids[:2] + [10**9]
+    partial = get_claims_financial_status(subset)
+    if sorted(partial.keys()) != claim_ids[:2]:
+        raise ValueError("FAIL: filtro por claim_ids incorrecto")
+
+    print(f"OK: {len(claim_ids)} claims comparados")
+    print("BULK FINANCIAL STATUS PASSED ✅")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# scripts/test_phase_p4_materialized_balances.py
+# FASE P4 — Balances materializados
+# Activa los triggers, muta datos financieros y verifica que las tablas
+# materializadas coinciden con el cálculo derivado, y que desactivarlas desde
+# otra conexión (otro proceso) se nota sin reiniciar. Deja la DB como estaba.
+
+import sqlite3
+
+from app.config import DB_PATH
+from app.db import (
+    create_patient,
+    create_coverage,
+    create_claim,
+    create_service,
+    create_charge,
+    create_payment,
+    update_charge,
+    update_payment,
+    delete_charge,
+)
+from app.db.applications import create_application
+from app.db.adjustments import create_adjustment
+from app.db.balances import get_charge_balance, get_claim_balance
+from app.db.payments import get_payment_balance
+from app.db.connection import get_connection
+from app.db.materialized_balances import (
+    materialized_balances_enabled,
+    enable_materialized_balances,
+    disable_materialized_balances,
+    rebuild_materialized_balances,
+    verify_materialized_balances,
+)
+
+
+def _assert_ok(label: str):
+    report = verify_materialized_balances()
+    if not report["ok"]:
+        raise ValueError(f"FAIL ({label}): drift {report}")
+    print(f"OK: {label}")
+
+
+def main():
+    print("=== TEST P4: MATERIALIZED BALANCES ===")
+
+    was_enabled = materialized_balances_enabled()
+    enable_materialized_balances()
+    _assert_ok("backfill inicial")
+
+    try:
+        pid = create_patient("Materialized", "Balance", "1990-01-01")
+        cov = create_coverage(pid, "Test", "Plan", "P1", "G1", "I1", "2025-01-01", None)
+        claim_id = create_claim(pid, cov)
+
+        s1 = create_service(claim_id, "2026-02-04", "90834", 1, "F41.1", "P4 uno")
+        s2 = create_service(claim_id, "2026-02-05", "90837", 1, "F41.1", "P4 dos")
+        c1 = create_charge(s1, 150.00)
+        c2 = create_charge(s2, 200.00)
+        c3 = create_charge(s2, 10.00)
+
+        payment_id = create_payment(300.00, "check", "EOB-P4", "2026-02-06")
+        create_application(payment_id, c1, 100.00)
+        create_application(payment_id, c2, 120.00)
+        create_adjustment(c1, 20.00, "Contractual P4")
+        _assert_ok("inserts")
+
+        update_charge(c2, 180.00)
+        update_payment(payment_id, 320.00, "check", "EOB-P4", "2026-02-06")
+        delete_charge(c3)
+        _assert_ok("updates/deletes")
+
+        charge = get_charge_balance(c1)
+        if round(charge["balance"], 2) != 30.00:
+            raise ValueError(f"FAIL: balance charge {charge}")
+
+        claim = get_claim_balance(claim_id)
+        if round(claim["balance_due"], 2) != 90.00 or len(claim["charges"]) != 2:
+            raise ValueError(f"FAIL: balance claim {claim}")
+
+        payment = get_payment_balance(payment_id)
+        if round(payment["remaining"], 2) != 100.00:
+            raise ValueError(f"FAIL: balance payment {payment}")
+
+        try:
+            create_application(payment_id, c1, 50.00)
+            raise ValueError("FAIL: permitió aplicar más del balance")
+        except ValueError as e:
+            if "balance actual" not in str(e):
+                raise
+
+        # Drift artificial: el verificador debe detectarlo
+        with get_connection() as conn:
+            conn.execute("UPDATE charge_balances SET balance = balance + 1 WHERE charge_id = ?", (c1,))
+            conn.execute("UPDATE claim_balances SET balance_due = balance_due + 1 WHERE claim_id = ?", (claim_id,))
+            conn.commit()
+
+        # get_claim_balance lee los totales de claim_balances
+        if round(get_claim_balance(claim_id)["balance_due"], 2) != 91.00:
+            raise ValueError("FAIL: get_claim_balance no lee claim_balances")
+
+        report = verify_materialized_balances()
+        if report["ok"] or not report["charges"]:
+            raise ValueError("FAIL: drift no detectado")
+        print("OK: drift detectado")
+
+        rebuild_materialized_balances()
+        _assert_ok("rebuild")
+
+        # Otro proceso desactiva los balances: las lecturas vuelven al cálculo derivado
+        other = sqlite3.connect(DB_PATH)
+        try:
+            with other:
+                for (name,) in other.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_balances_%'"
+                ).fetchall():
+                    other.execute(f"DROP TRIGGER {name}")
+                other.execute("DROP TABLE charge_balances")
+        finally:
+            other.close()
+        if materialized_balances_enabled():
+            raise ValueError("FAIL: estado cacheado tras desactivar en otro proceso")
+        if round(get_charge_balance(c1)["balance"], 2) != 30.00:
+            raise ValueError("FAIL: balance derivado tras desactivar")
+        enable_materialized_balances()
+        if not materialized_balances_enabled():
+            raise ValueError("FAIL: reactivación")
+        _assert_ok("desactivado en otro proceso y reactivado")
+
+    finally:
+        if not was_enabled:
+            disable_materialized_balances()
+
+    print("MATERIALIZED BALANCES PASSED ✅")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# scripts/test_phase_p5_batched_balances.py
+# FASE P5 — Balances por lote
+# Verifica que get_charge_balances / get_claim_balances / get_payment_balances
+# coinciden con el cálculo por registro y que /balances/api responde igual.
+# Solo lectura. No muta datos.
+
+from app.db.connection import get_connection
+from app.db.balances import get_charge_balances, get_claim_balances, get_claim_balance
+from app.db.payments import get_payment_balances
+
+
+def _round2(x: float) -> float:
+    return float(round(float(x), 2))
+
+
+def _single_charge_balance(cur, charge_id: int) -> float:
+    cur.execute("SELECT amount FROM charges WHERE id = ?", (charge_id,))
+    total = float(cur.fetchone()[0])
+    cur.execute("SELECT COALESCE(SUM(amount_applied), 0) FROM applications WHERE charge_id = ?", (charge_id,))
+    total -= float(cur.fetchone()[0])
+    cur.execute("SELECT COALESCE(SUM(amount), 0) FROM adjustments WHERE charge_id = ?", (charge_id,))
+    total -= float(cur.fetchone()[0])
+    return total
+
+
+def _single_payment_remaining(cur, payment_id: int) -> float:
+    cur.execute("SELECT amount FROM payments WHERE id = ?", (payment_id,))
+    total = float(cur.fetchone()[0])
+    cur.execute("SELECT COALESCE(SUM(amount_applied), 0) FROM applications WHERE payment_id = ?", (payment_id,))
+    return total - float(cur.fetchone()[0])
+
+
+def main():
+    print("=== TEST P5: BATCHED BALANCES ===")
+
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id FROM charges ORDER BY id")
+        charge_ids = [r["id"] for r in cur.fetchall()]
+        cur.execute("SELECT id FROM claims ORDER BY id")
+        claim_ids = [r["id"] for r in cur.fetchall()]
+        cur.execute("SELECT id FROM payments ORDER BY id")
+        payment_ids = [r["id"] for r in cur.fetchall()]
+
+        charges = get_charge_balances()
+        if list(charges.keys()) != charge_ids:
+            raise ValueError("FAIL: get_charge_balances no devuelve todos los charges")
+
+        for charge_id in charge_ids:
+            expected = _single_charge_balance(cur, charge_id)
+            if _round2(expected) != _round2(charges[charge_id]["balance"]):
+                raise ValueError(f"FAIL: charge {charge_id} esperado={expected} lote={charges[charge_id]}")
+
+        payments = get_payment_balances(payment_ids)
+        for payment_id in payment_ids:
+            expected = _single_payment_remaining(cur, payment_id)
+            if _round2(expected) != _round2(payments[payment_id]["remaining"]):
+                raise ValueError(f"FAIL: payment {payment_id} esperado={expected}")
+
+    claims = get_claim_balances(claim_ids)
+    for claim_id in claim_ids:
+        claim = claims[claim_id]
+        expected = sum(charges[c["charge_id"]]["balance"] for c in claim["charges"])
+        if _round2(expected) != _round2(claim["balance_due"]):
+            raise ValueError(f"FAIL: claim {claim_id} balance_due")
+        if claim != get_claim_balance(claim_id):
+            raise ValueError(f"FAIL: claim {claim_id} difiere de get_claim_balance")
+
+    if get_charge_balances(charge_ids=[]) != {} or get_charge_balances(charge_ids=[10**9]) != {}:
+        raise ValueError("FAIL: filtros vacíos / inexistentes")
+
+    # Endpoint JSON
+    from app.main import app
+
+    client = app.test_client()
+    ids = ",".join(str(c) for c in charge_ids[:5])
+    resp = client.get(f"/balances/api?charge_ids={ids}&claim_ids={claim_ids[0] if claim_ids else 0}")
+    if resp.status_code != 200:
+        raise ValueError(f"FAIL: /balances/api status {resp.status_code}")
+
+    data = resp.get_json()
+    for charge_id in charge_ids[:5]:
+        if _round2(data["charges"][str(charge_id)]["balance"]) != _round2(charges[charge_id]["balance"]):
+            raise ValueError(f"FAIL: API charge {charge_id}")
+
+    if client.get("/balances/api?charge_ids=abc").status_code != 400:
+        raise ValueError("FAIL: API acepta ids inválidos")
+
+    print(f"OK: {len(charge_ids)} charges, {len(claim_ids)} claims, {len(payment_ids)} payments")
+    print("BATCHED BALANCES PASSED ✅")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# scripts/test_phase_p6_bulk_eob_posting.py
+# FASE P6 — Posteo de EOB por lote
+# Un EOB válido entra completo; un EOB con una línea inválida no deja rastro.
+
+from app.db import (
+    create_patient,
+    create_coverage,
+    create_claim,
+    create_service,
+    create_charge,
+    create_payment,
+)
+from app.db.connection import get_connection
+from app.db.eob_posting import post_eob
+from app.db.balances import get_charge_balance
+from app.db.payments import get_payment_balance
+from app.db.cms1500_snapshot import generate_cms1500_snapshot
+
+
+def _count(cur, table: str) -> int:
+    cur.execute(f"SELECT COUNT(*) FROM {table}")
+    return int(cur.fetchone()[0])
+
+
+def _counts() -> tuple:
+    with get_connection() as conn:
+        cur = conn.cursor()
+        return (_count(cur, "applications"), _count(cur, "adjustments"), _count(cur, "event_ledger"))
+
+
+def _expect_failure(label: str, payment_id: int, lines: list[dict], fragment: str):
+    before = _counts()
+    try:
+        post_eob(payment_id, lines)
+        raise AssertionError(f"FAIL ({label}): EOB inválido fue aceptado")
+    except ValueError as e:
+        if fragment not in str(e):
+            raise AssertionError(f"FAIL ({label}): error inesperado: {e}")
+    if _counts() != before:
+        raise AssertionError(f"FAIL ({label}): quedaron filas de un EOB rechazado")
+    print(f"OK: {label}")
+
+
+def main():
+    print("=== TEST P6: BULK EOB POSTING ===")
+
+    pid = create_patient("Eob", "Bulk", "1990-01-01")
+    cov = create_coverage(pid, "Test", "Plan", "P1", "G1", "I1", "2025-01-01", None)
+    claim_id = create_claim(pid, cov)
+
+    charge_ids = []
+    for i in range(12):
+        service_id = create_service(claim_id, f"2026-03-{i + 1:02d}", "90834", 1, "F41.1", f"P6 línea {i + 1}")
+        charge_ids.append(create_charge(service_id, 100.00))
+
+    payment_id = create_payment(1000.00, "eft", "EOB-P6", "2026-03-20")
+
+    lines = [
+        {"charge_id": cid, "amount_applied": 80.00, "adjustments": [{"amount": 20.00, "reason": "CO-45"}]}
+        for cid in charge_ids[:10]
+    ]
+    lines.append({"charge_id": charge_ids[10], "amount_applied": 0, "adjustments": [{"amount": 100.00, "reason": "CO-97"}]})
+
+    # Línea con charge inexistente → nada entra
+    _expect_failure("charge inexistente", payment_id, lines + [{"charge_id": 10**9, "amount_applied": 1}], "Charge no existe")
+
+    # Sobre-aplicación agregada en el mismo charge → nada entra
+    _expect_failure(
+        "sobre-aplicación agregada",
+        payment_id,
+        lines + [{"charge_id": charge_ids[0], "amount_applied": 30.00}],
+        "balance actual del charge",
+    )
+
+    # Montos no finitos (float acepta "nan" / "inf") → nada entra
+    _expect_failure(
+        "amount_applied NaN",
+        payment_id,
+        lines + [{"charge_id": charge_ids[11], "amount_applied": "nan"}],
+        "amount_applied debe ser un número finito",
+    )
+    _expect_failure(
+        "adjustment inf",
+        payment_id,
+        lines + [{"charge_id": charge_ids[11], "amount_applied": 0, "adjustments": [{"amount": float("inf"), "reason": "CO-45"}]}],
+        "adjustment amount debe ser un número finito",
+    )
+
+    # Payment insuficiente → nada entra
+    small_payment_id = create_payment(100.00, "check", "EOB-P6-SMALL", "2026-03-20")
+    _expect_failure("payment insuficiente", small_payment_id, lines, "suficiente monto disponible")
+
+    before = _counts()
+    result = post_eob(payment_id, lines)
+    after = _counts()
+
+    if after != (before[0] + 10, before[1] + 11, before[2] + 1):
+        raise AssertionError(f"FAIL: filas insertadas {before} -> {after}")
+
+    if round(get_payment_balance(payment_id)["remaining"], 2) != 200.00:
+        raise AssertionError("FAIL: remaining del payment")
+
+    for cid in charge_ids[:11]:
+        if round(get_charge_balance(cid)["balance"], 2) != 0.00:
+            raise AssertionError(f"FAIL: balance charge {cid}")
+
+    print(f"OK: EOB posteado {result}")
+
+    # Claim congelado → nada entra
+    generate_cms1500_snapshot(claim_id)
+    _expect_failure(
+        "claim congelado",
+        payment_id,
+        [{"charge_id": charge_ids[11], "amount_applied": 50.00}],
+        "congelado",
+    )
+
+    print("BULK EOB POSTING PASSED ✅")
+
+
+if __name__ == "__main__":
+    main()
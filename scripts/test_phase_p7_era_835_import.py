@@ -0,0 +1,272 @@
+# scripts/test_phase_p7_era_835_import.py
+# FASE P7 — Importador ERA / 835
+# Genera un 835 sintético, lo importa y verifica matched / unmatched /
+# over_applied / frozen, duplicados y balances resultantes; que un reimport
+# tras un lote fallido postea lo que faltaba y que un 835 sin monto postea
+# sus ajustes.
+
+import os
+import tempfile
+import time
+
+from app.db import (
+    create_patient,
+    create_coverage,
+    create_claim,
+    create_service,
+    create_charge,
+)
+from app.db.connection import get_connection
+from app.db.balances import get_charge_balance
+from app.db.cms1500_snapshot import generate_cms1500_snapshot
+import app.db.era_import as era_import
+from app.db.era_import import import_835
+
+BULK_CLAIMS = 300
+
+
+def _isa() -> str:
+    return (
+        "ISA*00*          *00*          *ZZ*PAYER          *ZZ*LIFETRACK      "
+        "*260301*1200*^*00501*000000001*0*P*:~"
+    )
+
+
+def _build_835(payment_amount: float, reference: str, claims: list[tuple]) -> str:
+    """
+    claims: [(claim_number, paid_total, [(cpt, date, charge, paid, [(group, reason, amount)])], [cas de claim])]
+    (el CAS de claim es opcional)
+    """
+    segs = [
+        _isa(),
+        "GS*HP*PAYER*LIFETRACK*20260301*1200*1*X*005010X221A1",
+        "ST*835*0001",
+        f"BPR*I*{payment_amount:.2f}*C*ACH*CCP*01*999999999*DA*123456*1512345678**01*999988880*DA*98765*20260301",
+        f"TRN*1*{reference}*1512345678",
+        "N1*PR*TEST PAYER",
+        "LX*1",
+    ]
+    for claim_number, paid_total, services, *claim_cas in claims:
+        total_charge = sum(s[2] for s in services)
+        segs.append(f"CLP*{claim_number}*1*{total_charge:.2f}*{paid_total:.2f}*0*12*PAYERCTRL{claim_number}")
+        for group, reason, amount in (claim_cas[0] if claim_cas else []):
+            segs.append(f"CAS*{group}*{reason}*{amount:.2f}")
+        for cpt, service_date, charge, paid, cas in services:
+            segs.append(f"SVC*HC:{cpt}*{charge:.2f}*{paid:.2f}**1")
+            segs.append(f"DTM*472*{service_date.replace('-', '')}")
+            for group, reason, amount in cas:
+                segs.append(f"CAS*{group}*{reason}*{amount:.2f}")
+    segs.append(f"SE*{len(segs) - 1}*0001")
+    segs.append("GE*1*1")
+    segs.append("IEA*1*000000001")
+    return "~\n".join(s.rstrip("~") for s in segs) + "~\n"
+
+
+def _new_claim(pid: int, cov: int, claim_number: str, lines: list[tuple]) -> tuple[int, list[int]]:
+    claim_id = create_claim(pid, cov)
+    with get_connection() as conn:
+        conn.execute("UPDATE claims SET claim_number = ? WHERE id = ?", (claim_number, claim_id))
+        conn.commit()
+
+    charge_ids = []
+    for cpt, service_date, amount in lines:
+        service_id = create_service(claim_id, service_date, cpt, 1, "F41.1", f"P7 {cpt}")
+        charge_ids.append(create_charge(service_id, amount))
+    return claim_id, charge_ids
+
+
+def _write(content: str) -> str:
+    fd, path = tempfile.mkstemp(suffix=".835")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(content)
+    return path
+
+
+def main():
+    print("=== TEST P7: ERA 835 IMPORT ===")
+
+    pid = create_patient("Era", "Import", "1990-01-01")
+    cov = create_coverage(pid, "Test", "Plan", "P1", "G1", "I1", "2025-01-01", None)
+    tag = str(int(time.time() * 1000))
+
+    _, (c1, c2) = _new_claim(pid, cov, f"ERA-{tag}-1", [("90834", "2026-02-01", 150.0), ("90837", "2026-02-01", 200.0)])
+    _, (c3,) = _new_claim(pid, cov, f"ERA-{tag}-2", [("90834", "2026-02-02", 100.0)])
+    frozen_claim, (c4,) = _new_claim(pid, cov, f"ERA-{tag}-3", [("90834", "2026-02-03", 100.0)])
+    generate_cms1500_snapshot(frozen_claim)
+
+    content = _build_835(
+        370.0,
+        f"EFT-{tag}",
+        [
+            (f"ERA-{tag}-1", 260.0, [
+                ("90834", "2026-02-01", 150.0, 100.0, [("CO", "45", 30.0), ("PR", "2", 20.0)]),
+                ("90837", "2026-02-01", 200.0, 160.0, [("CO", "45", 40.0)]),
+            ]),
+            (f"ERA-{tag}-2", 110.0, [("90834", "2026-02-02", 100.0, 110.0, [])]),
+            (f"ERA-{tag}-3", 80.0, [("90834", "2026-02-03", 100.0, 80.0, [])]),
+            (f"ERA-{tag}-X", 50.0, [("90834", "2026-02-04", 50.0, 50.0, [])]),
+        ],
+    )
+    path = _write(content)
+
+    try:
+        summary = import_835(path, batch_size=2)
+
+        if len(summary["payments"]) != 1:
+            raise AssertionError(f"FAIL: payments {summary['payments']}")
+        if summary["posted_applications"] != 2 or summary["posted_adjustments"] != 2:
+            raise AssertionError(f"FAIL: posteo {summary}")
+        if len(summary["unmatched"]) != 1 or len(summary["over_applied"]) != 1 or len(summary["frozen"]) != 1:
+            raise AssertionError(f"FAIL: clasificación {summary}")
+        if round(summary["patient_responsibility"], 2) != 20.00:
+            raise AssertionError("FAIL: PR")
+
+        if round(get_charge_balance(c1)["balance"], 2) != 20.00:
+            raise AssertionError("FAIL: balance c1")
+        if round(get_charge_balance(c2)["balance"], 2) != 0.00:
+            raise AssertionError("FAIL: balance c2")
+        if round(get_charge_balance(c3)["balance"], 2) != 100.00:
+            raise AssertionError("FAIL: c3 sobre-aplicado fue posteado")
+        if round(get_charge_balance(c4)["balance"], 2) != 100.00:
+            raise AssertionError("FAIL: c4 congelado fue posteado")
+        print("OK: matched / unmatched / over_applied / frozen")
+
+        again = import_835(path)
+        if len(again["duplicates"]) != 1 or again["posted_applications"] != 0 or len(again["already_posted"]) != 2:
+            raise AssertionError(f"FAIL: reimport duplicado {again}")
+        print("OK: reimport detectado como duplicado")
+    finally:
+        os.remove(path)
+
+    # Lote fallido: el payment entra con el primer lote que postea y el
+    # reimport retoma solo lo que faltó
+    _, (r1,) = _new_claim(pid, cov, f"ERA-{tag}-R1", [("90834", "2026-02-05", 100.0)])
+    _, (r2,) = _new_claim(pid, cov, f"ERA-{tag}-R2", [("90834", "2026-02-06", 100.0)])
+    path = _write(_build_835(
+        140.0,
+        f"EFT-{tag}-R",
+        [
+            (f"ERA-{tag}-R1", 70.0, [("90834", "2026-02-05", 100.0, 70.0, [("CO", "45", 30.0)])]),
+            (f"ERA-{tag}-R2", 70.0, [("90834", "2026-02-06", 100.0, 70.0, [("CO", "45", 30.0)])]),
+        ],
+    ))
+    real_post_eob = era_import.post_eob
+    calls = {"n": 0}
+
+    def _flaky(payment_id, lines):
+        calls["n"] += 1
+        if calls["n"] == 1:
+            raise ValueError("falla simulada")
+        return real_post_eob(payment_id, lines)
+
+    try:
+        era_import.post_eob = _flaky
+        try:
+            first = import_835(path, batch_size=1)
+        finally:
+            era_import.post_eob = real_post_eob
+        if len(first["failed"]) != 1 or first["posted_applications"] != 1 or len(first["payments"]) != 1:
+            raise AssertionError(f"FAIL: lote fallido {first}")
+        if round(get_charge_balance(r1)["balance"], 2) != 100.00:
+            raise AssertionError("FAIL: r1 posteado pese al lote fallido")
+
+        resumed = import_835(path, batch_size=1)
+        if len(resumed["duplicates"]) != 1 or resumed["payments"]:
+            raise AssertionError(f"FAIL: reimport no retomó el payment {resumed}")
+        if resumed["posted_applications"] != 1 or len(resumed["already_posted"]) != 1:
+            raise AssertionError(f"FAIL: reimport {resumed}")
+        if round(get_charge_balance(r1)["balance"], 2) != 0.00 or round(get_charge_balance(r2)["balance"], 2) != 0.00:
+            raise AssertionError("FAIL: balances tras retomar")
+    finally:
+        os.remove(path)
+    print("OK: reimport tras lote fallido postea solo las líneas que faltaban")
+
+    # CAS a nivel de claim con líneas SVC: va a la primera línea emparejada
+    _, (k1,) = _new_claim(pid, cov, f"ERA-{tag}-K", [("90834", "2026-02-08", 150.0)])
+    _new_claim(pid, cov, f"ERA-{tag}-K2", [("90834", "2026-02-08", 10.0)])
+    path = _write(_build_835(
+        100.0,
+        f"EFT-{tag}-K",
+        [
+            (f"ERA-{tag}-K", 100.0, [("90834", "2026-02-08", 150.0, 100.0, [])], [("CO", "45", 50.0), ("PR", "1", 10.0)]),
+            (f"ERA-{tag}-K2", 0.0, [("99213", "2026-02-08", 10.0, 0.0, [])], [("CO", "45", 10.0)]),
+        ],
+    ))
+    try:
+        claim_level = import_835(path)
+        if claim_level["posted_adjustments"] != 1 or round(claim_level["patient_responsibility"], 2) != 10.00:
+            raise AssertionError(f"FAIL: CAS de claim {claim_level}")
+        if round(get_charge_balance(k1)["balance"], 2) != 0.00:
+            raise AssertionError("FAIL: CAS de claim no posteado")
+        if len(claim_level["unmatched"]) != 1 or len(claim_level["skipped"]) != 1:
+            raise AssertionError(f"FAIL: clasificación CAS de claim {claim_level}")
+    finally:
+        os.remove(path)
+    print("OK: CAS a nivel de claim posteado en la línea SVC (PR reportado; sin línea → skipped)")
+
+    # 835 sin monto (BPR02 = 0): solo ajustes, sin payment
+    _, (z1,) = _new_claim(pid, cov, f"ERA-{tag}-Z", [("90834", "2026-02-07", 100.0)])
+    path = _write(_build_835(
+        0.0,
+        f"EFT-{tag}-Z",
+        [(f"ERA-{tag}-Z", 0.0, [("90834", "2026-02-07", 100.0, 0.0, [("CO", "45", 100.0)])])],
+    ))
+    try:
+        zero = import_835(path)
+        if zero["payments"] or zero["posted_adjustments"] != 1 or zero["skipped"] or zero["failed"]:
+            raise AssertionError(f"FAIL: 835 sin monto {zero}")
+        if round(get_charge_balance(z1)["balance"], 2) != 0.00:
+            raise AssertionError("FAIL: ajuste sin payment no posteado")
+        again = import_835(path)
+        if again["posted_adjustments"] != 0 or len(again["already_posted"]) != 1:
+            raise AssertionError(f"FAIL: reimport sin monto {again}")
+    finally:
+        os.remove(path)
+    print("OK: 835 sin monto postea sus ajustes (una vez)")
+
+    # Monto no finito ("nan") en un CAS → el parser rechaza el archivo, nada entra
+    _, (n1,) = _new_claim(pid, cov, f"ERA-{tag}-N", [("90834", "2026-02-08", 100.0)])
+    path = _write(_build_835(
+        70.0,
+        f"EFT-{tag}-N",
+        [(f"ERA-{tag}-N", 70.0, [("90834", "2026-02-08", 100.0, 70.0, [("CO", "45", float("nan"))])])],
+    ))
+    try:
+        import_835(path)
+        raise AssertionError("FAIL: 835 con monto NaN fue aceptado")
+    except ValueError as e:
+        if "no finito" not in str(e):
+            raise AssertionError(f"FAIL: error inesperado: {e}")
+    finally:
+        os.remove(path)
+    if round(get_charge_balance(n1)["balance"], 2) != 100.00:
+        raise AssertionError("FAIL: 835 con NaN posteó")
+    print("OK: monto no finito rechazado")
+
+    # Volumen: BULK_CLAIMS claims con 2 líneas cada uno
+    bulk = []
+    for i in range(BULK_CLAIMS):
+        number = f"ERA-{tag}-B{i}"
+        _new_claim(pid, cov, number, [("90834", "2026-02-10", 100.0), ("90837", "2026-02-10", 120.0)])
+        bulk.append((number, 150.0, [
+            ("90834", "2026-02-10", 100.0, 70.0, [("CO", "45", 30.0)]),
+            ("90837", "2026-02-10", 120.0, 80.0, [("CO", "45", 40.0)]),
+        ]))
+
+    path = _write(_build_835(150.0 * BULK_CLAIMS, f"EFT-{tag}-BULK", bulk))
+    try:
+        started = time.perf_counter()
+        summary = import_835(path)
+        elapsed = time.perf_counter() - started
+    finally:
+        os.remove(path)
+
+    if summary["posted_applications"] != 2 * BULK_CLAIMS or summary["matched"] != 2 * BULK_CLAIMS:
+        raise AssertionError(f"FAIL: volumen {summary['posted_applications']}")
+    print(f"OK: {2 * BULK_CLAIMS} líneas SVC en {elapsed:.2f}s")
+
+    print("ERA 835 IMPORT PASSED ✅")
+
+
+if __name__ == "__main__":
+    main()
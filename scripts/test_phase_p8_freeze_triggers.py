@@ -0,0 +1,114 @@
+# scripts/test_phase_p8_freeze_triggers.py
+# FASE P8 — Congelación aplicada por triggers
+# Verifica que la DB bloquea escrituras sobre claims con snapshot,
+# incluso con sqlite3 directo (sin pasar por app/db), y que
+# freeze_override solo abre la transacción que lo usa.
+
+import sqlite3
+
+from app.config import DB_PATH
+from app.db import (
+    create_patient,
+    create_coverage,
+    create_claim,
+    create_service,
+    create_charge,
+    update_charge,
+    update_claim_cms_fields,
+)
+from app.db.connection import get_connection
+from app.db.cms1500_snapshot import generate_cms1500_snapshot
+from app.db.financial_lock import FREEZE_MESSAGE, FREEZE_TRIGGERS, freeze_override
+
+
+def _expect_abort(cur, label: str, sql: str, params: tuple):
+    try:
+        cur.execute(sql, params)
+        raise AssertionError(f"FAIL ({label}): escritura directa no bloqueada")
+    except sqlite3.IntegrityError as e:
+        if FREEZE_MESSAGE not in str(e):
+            raise AssertionError(f"FAIL ({label}): error inesperado {e}")
+    print(f"OK: {label}")
+
+
+def main():
+    print("=== TEST P8: FREEZE TRIGGERS ===")
+
+    pid = create_patient("Freeze", "Trigger", "1990-01-01")
+    cov = create_coverage(pid, "Test", "Plan", "P1", "G1", "I1", "2025-01-01", None)
+    claim_id = create_claim(pid, cov)
+    service_id = create_service(claim_id, "2026-04-01", "90834", 1, "F41.1", "P8")
+    charge_id = create_charge(service_id, 100.00)
+
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_freeze_%'")
+        if int(cur.fetchone()[0]) != len(FREEZE_TRIGGERS):
+            raise AssertionError("FAIL: triggers de congelación no instalados")
+
+    # Antes del snapshot: escrituras permitidas
+    update_charge(charge_id, 120.00)
+
+    generate_cms1500_snapshot(claim_id)
+
+    # app/db traduce el abort a ValueError
+    try:
+        update_charge(charge_id, 130.00)
+        raise AssertionError("FAIL: update_charge permitido sobre claim congelado")
+    except ValueError as e:
+        if str(e) != FREEZE_MESSAGE:
+            raise
+    print("OK: update_charge → ValueError")
+
+    try:
+        update_claim_cms_fields(claim_id, referring_provider_name="X")
+        raise AssertionError("FAIL: update_claim_cms_fields permitido")
+    except ValueError:
+        print("OK: update_claim_cms_fields → ValueError")
+
+    # sqlite3 directo (como un script externo)
+    raw = sqlite3.connect(DB_PATH)
+    try:
+        cur = raw.cursor()
+        cur.execute("SELECT id FROM payments LIMIT 1")
+        payment = cur.fetchone()
+        if payment is None:
+            cur.execute("INSERT INTO payments (amount, method, received_date) VALUES (10, 'cash', '2026-04-02')")
+            payment_id = cur.lastrowid
+        else:
+            payment_id = payment[0]
+
+        _expect_abort(cur, "INSERT services", "INSERT INTO services (claim_id, service_date, cpt_code, charge_amount_24f, units_24g) VALUES (?, '2026-04-02', '90834', 0, 1)", (claim_id,))
+        _expect_abort(cur, "UPDATE services", "UPDATE services SET cpt_code = '90837' WHERE id = ?", (service_id,))
+        _expect_abort(cur, "INSERT charges", "INSERT INTO charges (service_id, amount) VALUES (?, 5)", (service_id,))
+        _expect_abort(cur, "DELETE charges", "DELETE FROM charges WHERE id = ?", (charge_id,))
+        _expect_abort(cur, "INSERT applications", "INSERT INTO applications (payment_id, charge_id, amount_applied) VALUES (?, ?, 1)", (payment_id, charge_id))
+        _expect_abort(cur, "INSERT adjustments", "INSERT INTO adjustments (charge_id, amount, reason) VALUES (?, 1, 'x')", (charge_id,))
+
+        # Status del claim sigue editable (transiciones operativas)
+        cur.execute("UPDATE claims SET updated_at = updated_at WHERE id = ?", (claim_id,))
+        raw.rollback()
+    finally:
+        raw.close()
+
+    # Override forense: solo dentro de su transacción
+    with get_connection() as conn:
+        with freeze_override(conn, claim_id, "test_phase_p8"):
+            conn.execute("UPDATE charges SET amount = 125 WHERE id = ?", (charge_id,))
+        conn.rollback()
+
+        cur = conn.cursor()
+        cur.execute("SELECT amount FROM charges WHERE id = ?", (charge_id,))
+        if float(cur.fetchone()[0]) != 120.00:
+            raise AssertionError("FAIL: override persistió tras rollback")
+
+        cur.execute("SELECT COUNT(*) FROM freeze_overrides")
+        if int(cur.fetchone()[0]) != 0:
+            raise AssertionError("FAIL: quedó un freeze_override abierto")
+    print("OK: freeze_override acotado a la transacción")
+
+    print("FREEZE TRIGGERS PASSED ✅")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# scripts/test_phase_p9_migrations.py
+# FASE P9 — Migraciones versionadas
+# Crea una DB temporal con schema.sql, aplica migraciones y verifica
+# user_version, idempotencia y que las consultas calientes usan índices.
+# No toca storage/lifetrack.db.
+
+import os
+import sqlite3
+import tempfile
+
+from app.db.financial_lock import FREEZE_TRIGGERS
+from app.db.migrations import MIGRATIONS, SCHEMA_VERSION, get_schema_version, run_migrations
+
+SCHEMA_PATH = "storage/schema.sql"
+
+EXPECTED_INDEXES = {
+    "idx_applications_payment",
+    "idx_claims_status",
+    "idx_claims_patient",
+    "idx_claims_claim_number",
+    "idx_event_ledger_created",
+    "idx_event_ledger_type_id",
+    "idx_services_service_date",
+    "idx_addendums_note",
+}
+
+# (consulta, índice que debe aparecer en el plan)
+HOT_QUERIES = [
+    ("SELECT SUM(amount_applied) FROM applications WHERE payment_id = 1", "idx_applications_payment"),
+    ("SELECT id FROM claims WHERE status = 'draft'", "idx_claims_status"),
+    ("SELECT id FROM claims WHERE patient_id = 1", "idx_claims_patient"),
+    ("SELECT id FROM event_ledger WHERE event_type = 'x' ORDER BY id DESC LIMIT 50", "idx_event_ledger_type_id"),
+    ("SELECT id FROM services WHERE service_date BETWEEN '2026-01-01' AND '2026-01-31'", "idx_services_service_date"),
+    ("SELECT * FROM progress_note_addendums WHERE note_id = 1 ORDER BY created_at ASC", "idx_addendums_note"),
+]
+
+
+def main():
+    print("=== TEST P9: MIGRATIONS ===")
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+
+    try:
+        conn = sqlite3.connect(path)
+        conn.executescript(open(SCHEMA_PATH, encoding="utf-8").read())
+
+        if get_schema_version(conn) != 0:
+            raise AssertionError("FAIL: schema.sql no debe fijar user_version")
+
+        applied = run_migrations(conn)
+        if applied != [name for _, name, _ in MIGRATIONS]:
+            raise AssertionError(f"FAIL: aplicadas {applied}")
+        if get_schema_version(conn) != SCHEMA_VERSION:
+            raise AssertionError("FAIL: user_version no avanzó")
+        print(f"OK: {applied} → user_version={SCHEMA_VERSION}")
+
+        if run_migrations(conn) != []:
+            raise AssertionError("FAIL: segunda corrida no es no-op")
+        print("OK: idempotente")
+
+        names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        missing = EXPECTED_INDEXES - names
+        if missing:
+            raise AssertionError(f"FAIL: faltan índices {missing}")
+
+        conn.execute("ANALYZE")
+        for sql, index in HOT_QUERIES:
+            plan = " ".join(str(r[-1]) for r in conn.execute(f"EXPLAIN QUERY PLAN {sql}"))
+            if index not in plan:
+                raise AssertionError(f"FAIL: {sql!r} no usa {index}: {plan}")
+        print(f"OK: {len(HOT_QUERIES)} consultas usan índice")
+
+        # Los triggers de congelación salen sólo de la migración 2:
+        # lo instalado debe coincidir con FREEZE_TRIGGERS (SQLite guarda el SQL sin IF NOT EXISTS)
+        installed = dict(conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_freeze_%'"
+        ))
+        if set(installed) != set(FREEZE_TRIGGERS):
+            raise AssertionError(f"FAIL: triggers de congelación {sorted(installed)}")
+        for name, sql in FREEZE_TRIGGERS.items():
+            if installed[name] != sql.replace(" IF NOT EXISTS", "", 1):
+                raise AssertionError(f"FAIL: {name} difiere de FREEZE_TRIGGERS")
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'freeze_overrides'").fetchone():
+            raise AssertionError("FAIL: falta freeze_overrides")
+        print(f"OK: {len(FREEZE_TRIGGERS)} triggers de congelación = FREEZE_TRIGGERS")
+
+        # Re-aplicar pasos sobre una DB ya migrada (user_version reseteado) no falla
+        conn.execute("PRAGMA user_version = 0")
+        run_migrations(conn)
+        print("OK: pasos re-ejecutables")
+
+        conn.close()
+    finally:
+        os.remove(path)
+
+    print("MIGRATIONS PASSED ✅")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+# scripts/verify_event_ledger.py
+# FASE P23 — Verifica la cadena de hashes del event_ledger.
+# Uso: python -m scripts.verify_event_ledger [--full]
+# Sin --full recorre solo desde el último checkpoint verificado.
+
+import argparse
+import sys
+
+from app.db.event_ledger import verify_event_ledger
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--full", action="store_true")
+    args = parser.parse_args()
+
+    result = verify_event_ledger(full=args.full)
+
+    mode = "completa" if result["full"] else f"desde el evento {result['from_event_id']}"
+    print(f"P23: cadena {mode} → {result['to_event_id']} ({result['checked']} eventos)")
+    if result["ok"]:
+        print(f"RESULT: LEDGER CHAIN VALID ✅ (checkpoint {result['checkpoint_id']})")
+    else:
+        print("RESULT: LEDGER CHAIN BROKEN ❌")
+        for e in result["errors"]:
+            print(e)
+
+    sys.exit(0 if result["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -233,6 +233,7 @@ ON cms1500_snapshots(claim_id, version_number);
 
 CREATE INDEX IF NOT EXISTS idx_snapshots_claim ON cms1500_snapshots(claim_id);
 CREATE INDEX IF NOT EXISTS idx_services_claim ON services(claim_id);
+CREATE INDEX IF NOT EXISTS idx_claims_claim_number ON claims(claim_number);
 CREATE INDEX IF NOT EXISTS idx_charges_service ON charges(service_id);
 CREATE INDEX IF NOT EXISTS idx_applications_charge ON applications(charge_id);
 CREATE INDEX IF NOT EXISTS idx_adjustments_charge ON adjustments(charge_id);